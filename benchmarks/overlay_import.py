@@ -0,0 +1,90 @@
+"""
+Benchmark of the import of a large overlay table: creates --count points, polygons, rectangles and contours with import_overlays(...), renders
+them once and hovers one of them. Above the threshold of the rasterizer, the overlays are created rasterized: the number of canvas items and of tcl
+commands (one per binding) must not grow with the number of imported overlays, only the hovered overlay gets canvas items.
+
+    python benchmarks/overlay_import.py --count 100000
+    python benchmarks/overlay_import.py --count 100000 --offscreen  # without window, see OffscreenDisplay
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tkinter as tk
+from typing import Optional
+
+import numpy as np
+
+from guibbon import overlay_io
+from guibbon.display_backend import OffscreenDisplay
+from guibbon.image_viewer import ImageViewer
+
+
+def make_table(count: int, img_shape_hw: tuple[int, int], seed: int = 0) -> overlay_io.OverlayTable:
+    """count overlays of the 4 rasterizable kinds, at random positions of the image"""
+    rng = np.random.default_rng(seed)
+    kinds = np.array([overlay_io.OverlayKind.POINT, overlay_io.OverlayKind.POLYGON, overlay_io.OverlayKind.RECTANGLE, overlay_io.OverlayKind.CONTOUR])
+    kinds = kinds[np.arange(count) % len(kinds)].astype(np.int8)
+    n_vertices = np.choose(kinds, [1, 4, 2, 16])
+    offsets = np.concatenate([[0], np.cumsum(n_vertices)]).astype(np.int64)
+    imgh, imgw = img_shape_hw
+    centers_xy = np.repeat(rng.uniform((0, 0), (imgw, imgh), size=(count, 2)), n_vertices, axis=0)
+    vertices = centers_xy + rng.uniform(-10, 10, size=(int(offsets[-1]), 2))
+    return overlay_io.OverlayTable(kinds, ["imported"] * count, offsets, vertices)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100_000, help="number of imported overlays")
+    parser.add_argument("--offscreen", action="store_true", help="renders without window, the tcl commands are not counted")
+    args = parser.parse_args()
+
+    img = np.zeros(shape=(1080, 1920, 3), dtype=np.uint8)
+    root: Optional[tk.Tk] = None
+    if args.offscreen:
+        image_viewer = ImageViewer(None, height=720, width=1280, display=OffscreenDisplay())
+    else:
+        root = tk.Tk()
+        root.withdraw()
+        image_viewer = ImageViewer(root, height=720, width=1280)
+    image_viewer.imshow(img)
+
+    def measure() -> tuple[int, int]:
+        n_items = len(image_viewer.canvas.find_all())
+        n_commands = -1 if root is None else len(root.tk.call("info", "commands"))
+        return n_items, n_commands
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "overlays.npz")
+        overlay_io.save_overlay_table(make_table(args.count, img.shape[:2]), path)
+        n_items_before, n_commands_before = measure()
+
+        tic = time.perf_counter()
+        overlays = image_viewer.import_overlays(path)
+        import_time = time.perf_counter() - tic
+
+    rasterized = sum(bool(getattr(overlay, "rasterized", False)) for overlay in overlays)
+    n_items, n_commands = measure()
+    print(f"import of {len(overlays)} overlays: {import_time:.2f} s ({rasterized} rasterized), first render included")
+    print(f"canvas items: {n_items} (before import {n_items_before}) | tcl commands: {n_commands} (before import {n_commands_before})")
+
+    tic = time.perf_counter()
+    image_viewer.draw()
+    print(f"redraw of the view: {1000 * (time.perf_counter() - tic):.1f} ms")
+
+    # hover the first imported overlay, as the <Motion> events of the canvas do
+    can_xy = image_viewer.rasterizer.handles_xy[0].tolist() if len(image_viewer.rasterizer.handles_xy) > 0 else (0.0, 0.0)
+    tic = time.perf_counter()
+    if image_viewer.rasterizer.update_hovered(can_xy, image_viewer.img2can_matrix):
+        image_viewer.schedule_render_viewport()
+        image_viewer.canvas.update_idletasks()
+    n_items, n_commands = measure()
+    print(f"hover: {1000 * (time.perf_counter() - tic):.1f} ms | canvas items: {n_items} | tcl commands: {n_commands}")
+
+    if root is not None:
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Soak benchmark of the overlay lifecycle: creates and removes interactive overlays in a loop and checks that the number of canvas items, the number
+of tcl commands (one per binding) and the python memory stay constant. Exits with an error if the canvas items or the tcl commands grew, or if
+the python memory grew by more than --max-growth MB since the first report.
+
+    python benchmarks/overlay_soak.py --cycles 1000000
+"""
+
+import argparse
+import time
+import tracemalloc
+import tkinter as tk
+from typing import Optional, Union
+
+import numpy as np
+
+from guibbon.image_viewer import ImageViewer
+from guibbon.interactive_overlays import Point, Polygon, Rectangle
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cycles", type=int, default=1_000_000, help="number of overlays created then removed")
+    parser.add_argument("--report", type=int, default=100_000, help="number of cycles between 2 reports")
+    parser.add_argument("--max-growth", type=float, default=1.0, help="maximum growth of the python memory (MB) since the first report")
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    root.withdraw()
+    image_viewer = ImageViewer(root, height=720, width=720)
+    image_viewer.imshow(np.zeros(shape=(480, 640, 3), dtype=np.uint8))
+
+    def measure() -> tuple[int, int, int]:
+        n_items = len(image_viewer.canvas.find_all())
+        n_commands = len(root.tk.call("info", "commands"))
+        current_bytes, _ = tracemalloc.get_traced_memory()
+        return n_items, n_commands, current_bytes
+
+    tracemalloc.start()
+    reference: Optional[tuple[int, int, int]] = None
+    tic = time.perf_counter()
+    for k in range(args.cycles):
+        kind = k % 3
+        overlay: Union[Point, Polygon, Rectangle]
+        if kind == 0:
+            overlay = image_viewer.createInteractivePoint((10, 10), "soak", on_drag=lambda event: None)
+        elif kind == 1:
+            overlay = image_viewer.createInteractivePolygon([(0, 0), (10, 0), (10, 10)], "soak", on_drag=lambda event, pts: None)
+        else:
+            overlay = image_viewer.createInteractiveRectangle((0, 0), (10, 10), "soak", on_drag=lambda event, p0, p1: None)
+        image_viewer.remove_overlay(overlay)
+
+        if (k + 1) % args.report == 0:
+            root.update()
+            n_items, n_commands, current_bytes = measure()
+            if reference is None:
+                reference = n_items, n_commands, current_bytes
+            dt = time.perf_counter() - tic
+            print(
+                f"{k + 1:>9} cycles | {(k + 1) / dt:8.0f} cycles/s | live overlays: {image_viewer.get_overlay_count()} | canvas items: {n_items} "
+                f"(ref {reference[0]}) | tcl commands: {n_commands} (ref {reference[1]}) | python memory: {current_bytes / 1e6:.2f} MB "
+                f"(ref {reference[2] / 1e6:.2f} MB)"
+            )
+
+    root.destroy()
+
+    if reference is None:
+        return
+    errors = []
+    if n_items != reference[0]:
+        errors.append(f"canvas items grew from {reference[0]} to {n_items}")
+    if n_commands != reference[1]:
+        errors.append(f"tcl commands grew from {reference[1]} to {n_commands}")
+    if current_bytes - reference[2] > args.max_growth * 1e6:
+        errors.append(f"python memory grew by {(current_bytes - reference[2]) / 1e6:.2f} MB (max {args.max_growth:.2f} MB)")
+    if len(errors) > 0:
+        raise SystemExit("Leak detected: " + ", ".join(errors))
+    print("No leak detected")
+
+
+if __name__ == "__main__":
+    main()
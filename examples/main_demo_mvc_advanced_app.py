@@ -5,6 +5,7 @@ import guibbon as gbn
 from guibbon.typedef import Image_t
 import threading
 import tkinter as tk
+from typing import Sequence
 
 
 def on_click_treeview(*args):
@@ -89,10 +90,10 @@ class DemoMVCAdvApp:
             # print(event.x, event.y)
             self.is_update_needed = True
 
-    def on_drag_poly(self, event: tk.Event, point_xy_list: gbn.Point2DList) -> None:
+    def on_drag_poly(self, event: tk.Event, point_xy_list: Sequence[gbn.Point2D]) -> None:
         # print(point_xy_list)
         with self.lock:
-            self.point_xy_list = point_xy_list + []
+            self.point_xy_list = list(point_xy_list)
             self.model.cross_xy = (event.x, event.y)
             self.is_update_needed = True
 
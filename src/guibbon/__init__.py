@@ -1,17 +1,30 @@
+import contextlib
 import os
 import re
 import time
 import tkinter as tk
 import PIL
-from typing import Optional, Type, Sequence, Any
+from typing import Optional, Type, Sequence, Any, Callable, Union
 
 import cv2
 
+from .async_bridge import AsyncBridge as AsyncBridge, GuiEvent as GuiEvent, as_sync_callback
 from .colors import COLORS
-from .image_viewer import ImageViewer, MODE
+from .dashboard import Dashboard as Dashboard, RenderScheduler as RenderScheduler, SchedulerStats as SchedulerStats
+from .dataset_navigator import DatasetNavigator as DatasetNavigator, NavigatorStats as NavigatorStats, ImageLoader
+from .display_backend import DisplayBackend as DisplayBackend, OffscreenDisplay as OffscreenDisplay
+from .frame_history import FrameHistory as FrameHistory
+from .gui_server import GuiClient as GuiClient, WindowProxy as WindowProxy
+from .image_viewer import ImageViewer, MODE, RenderStats as RenderStats
+from .interactive_overlays import PointCloud, AnnotationLayer, Layer, MaskOverlay
 from .keyboard_event_handler import KeyboardEventHandler
-from .typedef import Image_t, CallbackPoint, CallbackPolygon, CallbackRect, Point2DList, InteractivePolygon, CallbackMouse
+from .mirror_server import MirrorServer as MirrorServer, MirrorStats as MirrorStats
+from .recorder import VideoRecorder as VideoRecorder, RecorderStats as RecorderStats
+from .shared_frames import SharedFrameWriter as SharedFrameWriter, SharedFrameReader as SharedFrameReader, SharedFramesStats as SharedFramesStats
+from .typedef import Image_t, CallbackPoint, CallbackPolygon, CallbackRect, Point2DList, InteractivePoint, InteractivePolygon, CallbackMouse, CallbackPointCloud, Point2DArray
 from .typedef import Point2D as Point2D
+from .video_player import VideoPlayer as VideoPlayer, PlaybackStats as PlaybackStats, PlayerToolbar, FrameSource
+from .view_link import ViewLink as ViewLink, LinkStats as LinkStats
 from .widgets.button_widget import ButtonWidget, CallbackButton
 from .widgets.check_button_list_widget import CheckButtonListWidget, CallbackCheckButtonList
 from .widgets.check_button_widget import CheckButtonWidget, CallbackCheckButton
@@ -56,7 +69,7 @@ def inject(cv2_package):
     cv2_package.imshow = imshow
     cv2_package.moveWindow = not_implemented_error
     cv2_package.namedWindow = namedWindow
-    cv2_package.pollKey = not_implemented_error
+    cv2_package.pollKey = pollKey
     cv2_package.resizeWindow = not_implemented_error
     cv2_package.selectROI = not_implemented_error
     cv2_package.selectROIs = not_implemented_error
@@ -75,8 +88,9 @@ def not_implemented_error():
     raise NotImplementedError("Function not implemented in current version of Guibbon")
 
 
-def imshow(winname: str, mat: Image_t, mode: MODE = MODE.FIT, cv2_interpolation: Optional[int] = None):
-    Guibbon.get_instance(winname).imshow(mat, mode, cv2_interpolation)
+def imshow(winname: str, mat: Image_t, mode: MODE = MODE.FIT, cv2_interpolation: Optional[int] = None, mask=None, palette=None, alpha: Optional[float] = None):
+    """mask: optional label map blended on the image, see ImageViewer.imshow(...)"""
+    Guibbon.get_instance(winname).imshow(mat, mode, cv2_interpolation, mask, palette, alpha)
 
 
 def getWindowProperty(winname: str, prop_id: int) -> float:
@@ -98,6 +112,196 @@ def waitKeyEx(delay: int, track_keypress=True, track_keyrelease=False) -> int:
     return Guibbon.waitKeyEx(delay, track_keypress, track_keyrelease)
 
 
+def start_async_bridge(interval: float = AsyncBridge.DEFAULT_INTERVAL) -> AsyncBridge:
+    """
+    Processes the GUI events inside the running asyncio loop (which must run in the main thread) every interval seconds, instead of in waitKeyEx.
+    wait_key_async(...) and next_event() start it with the default interval. Widget callbacks may be coroutine functions: they are scheduled as
+    tasks on the loop, and raise a RuntimeError if called while no loop is running.
+    """
+    if AsyncBridge.instance is not None:
+        AsyncBridge.instance.stop()
+    AsyncBridge.instance = AsyncBridge(Guibbon, interval)
+    return AsyncBridge.instance
+
+
+def stop_async_bridge():
+    if AsyncBridge.instance is not None:
+        AsyncBridge.instance.stop()
+        AsyncBridge.instance = None
+
+
+async def wait_key_async(timeout: Optional[float] = None) -> int:
+    """Awaitable waitKeyEx: waits for a key press for timeout seconds (forever if None) while the loop runs other tasks. Returns -1 on timeout."""
+    return await AsyncBridge.get_instance(Guibbon).wait_key(timeout)
+
+
+async def next_event() -> GuiEvent:
+    """Next key press, key release or window closing"""
+    return await AsyncBridge.get_instance(Guibbon).next_event()
+
+
+def pollKey() -> int:
+    """Processes the pending GUI events once and returns the oldest key press not consumed yet, or -1. Never waits."""
+    return Guibbon.pollKey()
+
+
+def batch(winname: str) -> contextlib.AbstractContextManager[None]:
+    """
+    Defers all the redraws of the window (imshow and interactive overlays) until the end of the with block. Can be nested.
+        with gbn.batch(winname):
+            gbn.imshow(winname, frame)
+            for polygon, points in zip(polygons, tracked_points):
+                polygon.set_point_xy_list(points)
+    """
+    return Guibbon.get_instance(winname).image_viewer.batch()
+
+
+def play(
+        winname: str,
+        source: FrameSource,
+        fps: Optional[float] = None,
+        loop: bool = False,
+        queue_size: int = 8,
+        on_frame: Optional[Callable[[int, Image_t], None]] = None,
+) -> PlaybackStats:
+    """
+    Plays a video in the window until its end or until the window is closed, and returns the playback counters.
+    source: path of a video file, cv2.VideoCapture, or any iterable of BGR frames.
+    fps: presentation rate, defaults to the fps of the video (30 if unknown).
+    Frames are decoded and converted in a background thread, up to queue_size frames ahead, and presented at a steady rate: when rendering can not
+    keep up, late frames are dropped. on_frame(index, frame_rgb) is called after each presented frame, e.g. to update overlays.
+    """
+    instance = Guibbon.get_instance(winname)
+    player = VideoPlayer(instance.image_viewer, source, fps=fps, queue_size=queue_size, loop=loop, on_frame=on_frame)
+    toolbar = PlayerToolbar(instance.image_viewer.frame, player)
+
+    def update_gui() -> bool:
+        Guibbon.root.update_idletasks()
+        Guibbon.root.update()  # root can be destroyed at this line
+        if not Guibbon.is_alive or not Guibbon.is_instance(winname):
+            return False
+        toolbar.refresh()
+        return True
+
+    try:
+        player.run(update_gui)
+    finally:
+        try:
+            player.close()
+        finally:
+            if Guibbon.is_alive and Guibbon.is_instance(winname):
+                toolbar.destroy()
+    return player.get_stats()
+
+
+def enableFrameHistory(
+        winname: str,
+        max_seconds: float = FrameHistory.DEFAULT_MAX_SECONDS,
+        max_bytes: int = FrameHistory.DEFAULT_MAX_BYTES,
+        codec: str = FrameHistory.DEFAULT_CODEC,
+) -> FrameHistory:
+    """
+    Keeps the last max_seconds of frames displayed in the window, compressed with codec (".jpg" or ".png") within max_bytes, and adds a timeline to
+    scrub back through them. Recording never slows down imshow: frames arriving while the encoder is busy are skipped.
+    """
+    return Guibbon.get_instance(winname).image_viewer.enable_frame_history(max_seconds, max_bytes, codec)
+
+
+def disableFrameHistory(winname: str):
+    Guibbon.get_instance(winname).image_viewer.disable_frame_history()
+
+
+def get_rendered_view(winname: str) -> Optional[Image_t]:
+    """
+    Screenshot of the window canvas (BGR, like the images given to imshow): the displayed part of the image with the masks, the interactive overlays
+    and the annotation layers. None if no image was shown. See ImageViewer(None, height, width, display=OffscreenDisplay()) to render without a window.
+    """
+    view_rgb = Guibbon.get_instance(winname).image_viewer.get_rendered_view()
+    if view_rgb is None:
+        return None
+    view_bgr: Image_t = cv2.cvtColor(view_rgb, cv2.COLOR_RGB2BGR)  # type: ignore
+    return view_bgr
+
+
+def get_render_stats(winname: str) -> RenderStats:
+    """Number and duration of the renders of the window, and number of frames skipped while it was minimized or hidden"""
+    return Guibbon.get_instance(winname).image_viewer.get_stats()
+
+
+def create_dashboard(winname: str, pane_names: Sequence[str], cols: Optional[int] = None) -> Dashboard:
+    """
+    Replaces the image of the window by a grid of image panes sized to the window, shown with dashboard.imshow(pane_name, mat).
+    The panes of all the dashboards are rendered by one scheduler: only the panes with a new frame and not hidden are rendered, conversion and
+    warp run in a thread pool, and the display work per tick is bounded so that a busy feed can't starve the others. See get_scheduler_stats().
+    """
+    return Guibbon.get_instance(winname).create_dashboard(pane_names, cols)
+
+
+def get_scheduler_stats() -> Optional[SchedulerStats]:
+    """Counters of the scheduler rendering the dashboards, None if no dashboard was created"""
+    return Guibbon.render_scheduler.get_stats() if Guibbon.render_scheduler is not None else None
+
+
+def link_views(winnames: Sequence[str]) -> ViewLink:
+    """
+    Shares the pan and the zoom of the windows: panning or zooming one of them applies to all, redrawn together in a single pass.
+    Use ViewLink(viewers) directly to link the panes of a dashboard, see create_dashboard(...).
+    """
+    return ViewLink([Guibbon.get_instance(winname).image_viewer for winname in winnames])
+
+
+def start_recording(winname: str, path, fps: float = VideoRecorder.DEFAULT_FPS, queue_size: int = 8, fourcc: str = VideoRecorder.DEFAULT_FOURCC) -> VideoRecorder:
+    """
+    Records what is displayed in the window (pan/zoom, masks and overlays included) to a video file, fps frames per second, until stop_recording
+    or until the window is closed. Encoding runs in a background thread: when it can not keep up, frames are dropped instead of slowing down the GUI.
+    The counters of recorded, dropped and encoded frames and the encoder latency are available with recorder.get_stats().
+    Raises if the video file can not be opened. A failure of the encoder is raised by stop_recording, or printed if the window is closed first.
+    """
+    return Guibbon.get_instance(winname).image_viewer.start_recording(path, fps, queue_size, fourcc)
+
+
+def stop_recording(winname: str) -> Optional[RecorderStats]:
+    return Guibbon.get_instance(winname).image_viewer.stop_recording()
+
+
+def attach_shared_frames(winname: str, name: str, poll_interval_ms: int = 5) -> SharedFrameReader:
+    """
+    Displays in the window the frames written by a SharedFrameWriter to the shared memory block name, typically from a capture process: frames are
+    not pickled, only the newest one is copied once from the shared memory and rendered while the GUI is updated (waitKey, ...).
+    """
+    return Guibbon.get_instance(winname).image_viewer.attach_shared_frames(name, poll_interval_ms)
+
+
+def detach_shared_frames(winname: str):
+    Guibbon.get_instance(winname).image_viewer.detach_shared_frames()
+
+
+def start_mirror(
+        host: str = "127.0.0.1", port: int = MirrorServer.DEFAULT_PORT, max_fps: float = 15.0, quality: int = 80, num_workers: int = 2
+) -> MirrorServer:
+    """
+    Serves all the windows over HTTP for remote viewing, see MirrorServer.url: the rendered view of each window as an MJPEG stream
+    (/<winname>/stream.mjpg) and the values of its widgets as JSON (/<winname>/widgets.json). Use host="0.0.0.0" to serve on all interfaces.
+    Views are only captured while a client watches the stream, at up to max_fps, and encoded by num_workers threads. Frame rate and JPEG quality
+    decrease when clients can not keep up.
+    """
+    stop_mirror()
+    Guibbon.mirror = MirrorServer(host, port, max_fps, quality, num_workers)
+    if Guibbon.is_alive:
+        Guibbon.on_mirror_tick()
+    return Guibbon.mirror
+
+
+def stop_mirror():
+    if Guibbon.mirror is None:
+        return
+    if Guibbon.mirror_after_id is not None and Guibbon.is_alive:
+        Guibbon.root.after_cancel(Guibbon.mirror_after_id)
+    Guibbon.mirror_after_id = None
+    mirror, Guibbon.mirror = Guibbon.mirror, None
+    mirror.close()
+
+
 def setMouseCallback(winname: str, onMouse: CallbackMouse, userdata=None):
     Guibbon.get_instance(winname).setMouseCallback(onMouse, userdata=userdata)
 
@@ -189,7 +393,14 @@ def namedWindow(winname):
     Guibbon.get_instance(winname)
 
 
-def create_window(winname: str) -> "Guibbon":
+def create_window(winname: str, out_of_process: bool = False) -> Union["Guibbon", WindowProxy]:
+    """
+    out_of_process: runs the GUI in a child process and returns a proxy of the window, with the same functions as this module (without winname).
+    The GUI then stays responsive while this process computes, frames are sent through shared memory and callbacks are called by waitKeyEx.
+    The child process is started with "spawn": the script must guard its entry point with if __name__ == "__main__":, see GuiClient.
+    """
+    if out_of_process:
+        return WindowProxy(GuiClient.get_instance(), winname)
     return Guibbon.get_instance(winname)
 
 
@@ -225,8 +436,28 @@ def createInteractivePoint(
         on_drag: CallbackPoint = None,
         on_release: CallbackPoint = None,
         magnet_points: Optional[Point2DList] = None,
-):
-    Guibbon.get_instance(windowName).image_viewer.createInteractivePoint(point_xy, label, on_click, on_drag, on_release, magnet_points)
+) -> InteractivePoint:
+    ipoint: InteractivePoint
+    ipoint = Guibbon.get_instance(windowName).image_viewer.createInteractivePoint(point_xy, label, on_click, on_drag, on_release, magnet_points)
+    return ipoint
+
+
+def createInteractivePointCloud(
+        windowName,
+        points_xy: Point2DArray,
+        label="",
+        on_click: CallbackPointCloud = None,
+        on_drag: CallbackPointCloud = None,
+        on_release: CallbackPointCloud = None,
+        magnet_points: Optional[Point2DList] = None,
+) -> PointCloud:
+    """
+    Draws a large set of draggable points over the displayed image. The coordinates are stored in a single numpy array of shape (N, 2) that can be
+    updated in place with set_points(...). Callbacks receive the index of the point and the whole array: foo(event, point_index, points_xy).
+    """
+    ipoint_cloud: PointCloud
+    ipoint_cloud = Guibbon.get_instance(windowName).image_viewer.createInteractivePointCloud(points_xy, label, on_click, on_drag, on_release, magnet_points)
+    return ipoint_cloud
 
 
 def createInteractivePolygon(
@@ -246,6 +477,24 @@ def createInteractivePolygon(
     return ipolygon
 
 
+def createInteractiveContour(
+        windowName,
+        point_xy_list,
+        label="",
+        on_click: CallbackPolygon = None,
+        on_drag: CallbackPolygon = None,
+        on_release: CallbackPolygon = None,
+        magnet_points: Optional[Point2DList] = None,
+) -> InteractivePolygon:
+    """
+    Same as createInteractivePolygon(...) but for contours with a high number of vertices. The contour is drawn as a single polyline, simplified at low
+    zoom, and its vertex handles only appear when zooming close enough.
+    """
+    icontour: InteractivePolygon
+    icontour = Guibbon.get_instance(windowName).image_viewer.createInteractiveContour(point_xy_list, label, on_click, on_drag, on_release, magnet_points)
+    return icontour
+
+
 def createInteractiveRectangle(
         windowName,
         point0_xy,
@@ -262,6 +511,106 @@ def createInteractiveRectangle(
     return irect
 
 
+def createAnnotationLayer(windowName, label="") -> AnnotationLayer:
+    """
+    Creates a non-interactive layer to draw boxes, points, line segments and labels given as arrays, typically the output of a detector:
+        layer.set_boxes(boxes_xyxy)
+        layer.set_labels(boxes_xyxy[:, :2], class_names)
+    Canvas items are reused from one frame to the next one, making it suitable for per-frame updates.
+    """
+    return Guibbon.get_instance(windowName).image_viewer.createAnnotationLayer(label)
+
+
+def createMaskOverlay(windowName, mask, label="", palette=None, alpha: float = MaskOverlay.DEFAULT_ALPHA) -> MaskOverlay:
+    """
+    Blends a binary mask or a label map (2D uint8 array, same size as the image) on the image. Label 0 is transparent.
+    palette: optional array of shape (N, 3) of BGR colors by label. The mask is not copied: enable the brush to paint it with the mouse
+        mask_overlay.set_brush(label=1, radius=10)
+    and read the result with mask_overlay.get_mask().
+    """
+    return Guibbon.get_instance(windowName).image_viewer.createMaskOverlay(mask, label, palette, alpha)
+
+
+def removeInteractiveOverlay(windowName, overlay):
+    """Removes an overlay returned by one of the createInteractive...(...) functions and releases its canvas items"""
+    Guibbon.get_instance(windowName).image_viewer.remove_overlay(overlay)
+
+
+def removeInteractiveOverlays(windowName, label: Optional[str] = None, tag: Optional[str] = None):
+    """Removes all the overlays of the window matching the given label and/or canvas tag"""
+    Guibbon.get_instance(windowName).image_viewer.remove_overlays(label, tag)
+
+
+def clearInteractiveOverlays(windowName):
+    Guibbon.get_instance(windowName).image_viewer.clear_overlays()
+
+
+def getInteractiveOverlayCount(windowName) -> int:
+    return Guibbon.get_instance(windowName).image_viewer.get_overlay_count()
+
+
+def exportInteractiveOverlays(windowName, path, label: Optional[str] = None):
+    """
+    Saves the type, label and vertices of the interactive overlays (points, polygons, rectangles, contours, point clouds) of the window.
+    The format is given by the extension of path: .npz (compact, columnar numpy arrays) or .json
+    """
+    Guibbon.get_instance(windowName).image_viewer.export_overlays(path, label)
+
+
+def importInteractiveOverlays(windowName, path) -> list[Any]:
+    """Creates in bulk the overlays saved by exportInteractiveOverlays(...) and returns them. The scene is drawn once, at the end of the import."""
+    return Guibbon.get_instance(windowName).image_viewer.import_overlays(path)
+
+
+def createDatasetNavigator(
+        windowName,
+        paths: Sequence[str],
+        prefetch: int = DatasetNavigator.DEFAULT_PREFETCH,
+        max_bytes: int = DatasetNavigator.DEFAULT_MAX_BYTES,
+        num_workers: int = DatasetNavigator.DEFAULT_NUM_WORKERS,
+        loader: Optional[ImageLoader] = None,
+) -> DatasetNavigator:
+    """
+    Browses a list of image files in the window. The images around the current one are decoded in background threads and cached, so that
+    navigation does not wait for cv2.imread:
+        navigator = gbn.createDatasetNavigator("win", paths)
+        navigator.next()
+        while True:
+            key = gbn.waitKey(0)
+            if key == ord("n"):
+                navigator.next()
+            elif key == ord("p"):
+                navigator.previous()
+    navigator.get_stats() returns the cache hit rate and the decode latencies. Call navigator.close() to stop the worker threads.
+    """
+    image_viewer = Guibbon.get_instance(windowName).image_viewer
+    return DatasetNavigator(paths, image_viewer, prefetch=prefetch, max_bytes=max_bytes, num_workers=num_workers, loader=loader)
+
+
+def undo(windowName) -> bool:
+    """Reverts the last move of a vertex or brush stroke made with the mouse. Returns False if there is nothing to undo."""
+    return Guibbon.get_instance(windowName).image_viewer.undo()
+
+
+def redo(windowName) -> bool:
+    return Guibbon.get_instance(windowName).image_viewer.redo()
+
+
+def setHistoryBudget(windowName, max_bytes: int):
+    """Max memory used by the undo/redo history of the window. The oldest edits are evicted first."""
+    Guibbon.get_instance(windowName).image_viewer.set_history_budget(max_bytes)
+
+
+def setLayerVisible(windowName, layer: Layer, value: bool):
+    """Shows/hides all the items of a layer (gbn.Layer.POLYGONS, gbn.Layer.HANDLES, ...) at once"""
+    Guibbon.get_instance(windowName).image_viewer.set_layer_visible(layer, value)
+
+
+def setLayerOrder(windowName, order: Sequence[Layer]):
+    """Changes the z-order of the layers. order: all the layers, from bottom to top"""
+    Guibbon.get_instance(windowName).image_viewer.set_layer_order(order)
+
+
 class Guibbon:
     """The Guibbon object contains the list of open windows"""
 
@@ -271,6 +620,10 @@ class Guibbon:
     active_instance_name: Optional[str]
     is_timeout: bool
     keyboard: KeyboardEventHandler
+    mirror: Optional[MirrorServer] = None  # see start_mirror(...)
+    mirror_after_id: Optional[str] = None
+    MIRROR_TICK_MS = 10
+    render_scheduler: Optional[RenderScheduler] = None  # renders the panes of the dashboards, see create_dashboard(...)
 
     @staticmethod
     def init():
@@ -279,6 +632,28 @@ class Guibbon:
         Guibbon.keyboard = KeyboardEventHandler()
         Guibbon.root.withdraw()
         Guibbon.reset()
+        if Guibbon.mirror is not None:
+            Guibbon.on_mirror_tick()
+
+    @staticmethod
+    def on_mirror_tick():
+        """Captures the views watched by the mirror clients and the widget values they requested. Encoding happens in the mirror worker pool."""
+        Guibbon.mirror_after_id = None
+        mirror_server = Guibbon.mirror
+        if mirror_server is None or not Guibbon.is_alive:
+            return
+        now = time.perf_counter()
+        for winname, instance in Guibbon.instances.items():
+            mirror = mirror_server.get_window(winname)
+            if mirror.is_frame_due(now):
+                view_rgb = instance.image_viewer.get_rendered_view()
+                if view_rgb is None:
+                    mirror.cancel_encoding()
+                else:
+                    mirror_server.submit_frame(mirror, view_rgb)
+            if mirror.is_widgets_wanted(now):
+                mirror.set_widget_values(instance.get_widget_values())
+        Guibbon.mirror_after_id = Guibbon.root.after(Guibbon.MIRROR_TICK_MS, Guibbon.on_mirror_tick)
 
     @staticmethod
     def reset():
@@ -305,6 +680,22 @@ class Guibbon:
     def get_active_instance() -> "Guibbon":
         return Guibbon.get_instance(Guibbon.active_instance_name)
 
+    @staticmethod
+    def is_root_alive() -> bool:
+        """True from the creation of the first window until the last one is closed. A function, so that its value isn't narrowed by a previous check."""
+        return Guibbon.is_alive
+
+    @staticmethod
+    def pollKey() -> int:
+        if not Guibbon.is_root_alive():  # no root to update before the first window or after the last one
+            return -1
+        Guibbon.root.update_idletasks()
+        Guibbon.root.update()  # root can be destroyed at this line
+        if not Guibbon.is_root_alive():
+            return -1
+        event = Guibbon.keyboard.pop_event()
+        return event.key if event is not None else -1
+
     @staticmethod
     def waitKeyEx(delay, track_keypress=True, track_keyrelease=False) -> int:
         Guibbon.reset()
@@ -320,12 +711,9 @@ class Guibbon:
             if not Guibbon.is_alive:
                 return -1
 
-            if track_keypress and Guibbon.keyboard.is_keypress_updated:
-                Guibbon.keyboard.is_keypress_updated = False
-                return Guibbon.keyboard.last_keypressed
-            if track_keyrelease and Guibbon.keyboard.is_keyrelease_updated:
-                Guibbon.keyboard.is_keyrelease_updated = False
-                return Guibbon.keyboard.last_keyreleased
+            event = Guibbon.keyboard.pop_event(track_keypress, track_keyrelease)
+            if event is not None:
+                return event.key
             if Guibbon.is_timeout:
                 return -1
 
@@ -376,6 +764,7 @@ class Guibbon:
         # Load an image in the script
         self.img_ratio = 4 / 4
         self.image_viewer = ImageViewer(self.frame, height=720, width=int(720 * self.img_ratio))
+        self.dashboard: Optional[Dashboard] = None  # see create_dashboard(...)
 
         # add dummy image to image_viewer
         # img = np.zeros(shape=(100, 100, 3), dtype=np.uint8)
@@ -389,6 +778,9 @@ class Guibbon:
         self.custom_widtgets_by_names: dict[str, WidgetInterface] = {}
         self.radio_buttons_by_names: dict[str, RadioButtonsWidget] = {}
         self.buttons_by_names: dict[str, ButtonWidget] = {}
+        self.check_buttons_by_names: dict[str, CheckButtonWidget] = {}
+        self.check_button_lists_by_names: dict[str, CheckButtonListWidget] = {}
+        self.color_pickers_by_names: dict[str, ColorPickerWidget] = {}
 
         self.frame.pack()
         self.image_viewer.frame.pack(side=tk.LEFT)
@@ -398,19 +790,47 @@ class Guibbon:
     def on_closing(self):
         print("Destroy Root", self.winname)
         Guibbon.instances.pop(self.winname)
+        try:
+            self.image_viewer.stop_recording()
+        except Exception as e:
+            # the window must be destroyed anyway
+            print(f"ERROR: {self.winname}: the recording could not be written --->", e)
+        self.image_viewer.detach_shared_frames()
+        if self.image_viewer.view_link is not None:
+            self.image_viewer.view_link.remove(self.image_viewer)
+        if self.dashboard is not None:
+            self.dashboard.close()
+        if Guibbon.mirror is not None:
+            Guibbon.mirror.remove_window(self.winname)
         self.window.destroy()
 
         if len(Guibbon.instances) == 0:
             print("destroy root master")
+            if Guibbon.render_scheduler is not None:
+                Guibbon.render_scheduler.close()
+                Guibbon.render_scheduler = None
             Guibbon.root.destroy()
             Guibbon.is_alive = False
         elif Guibbon.active_instance_name == self.winname:
             Guibbon.active_instance_name = list(Guibbon.instances.keys())[-1]
 
+    def create_dashboard(self, pane_names: Sequence[str], cols: Optional[int] = None) -> Dashboard:
+        if self.dashboard is not None:
+            raise ValueError(f"Window {self.winname} already has a dashboard")
+        if Guibbon.render_scheduler is None:
+            Guibbon.render_scheduler = RenderScheduler()
+            Guibbon.render_scheduler.start(Guibbon.root)
+        height, width = self.image_viewer.canvas_shape_hw
+        self.dashboard = Dashboard(self.frame, pane_names, Guibbon.render_scheduler, cols, height=height, width=width)
+        self.image_viewer.frame.pack_forget()
+        self.frame.pack_configure(fill=tk.BOTH, expand=True)  # the panes follow the size of the window
+        self.dashboard.frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, before=self.ctrl_frame)
+        return self.dashboard
+
     def create_button(self, text: str, on_click: CallbackButton) -> ButtonWidget:
         tk_frame = tk.Frame(self.ctrl_frame, bg=COLORS.ctrl_panel)
         tk_frame.pack_propagate(True)
-        button = ButtonWidget(tk_frame, text, on_click)
+        button = ButtonWidget(tk_frame, text, as_sync_callback(on_click))
         self.buttons_by_names[text] = button
         tk_frame.pack(padx=4, pady=4, side=tk.TOP, fill=tk.BOTH)
         return button
@@ -420,7 +840,7 @@ class Guibbon:
 
     def create_slider(self, slider_name: str, values: Sequence[Any], on_change: CallbackSlider, initial_index: int = 0):
         tk_frame = tk.Frame(self.ctrl_frame, bg=COLORS.widget)
-        slider = SliderWidget(tk_frame, slider_name, values, initial_index, on_change, COLORS.widget)
+        slider = SliderWidget(tk_frame, slider_name, values, initial_index, as_sync_callback(on_change), COLORS.widget)
         self.sliders_by_names[slider_name] = slider
         tk_frame.pack(padx=4, pady=4, side=tk.TOP, fill=tk.X, expand=1)
         return slider
@@ -432,14 +852,14 @@ class Guibbon:
                                   on_release: Optional[CallbackColorSpace] = None) -> ColorSpaceWidget:
         tk_frame = tk.Frame(self.ctrl_frame, bg=COLORS.widget)
         tk_frame.pack(padx=4, pady=4, side=tk.TOP, fill=tk.X, expand=1)
-        color_space_widget = ColorSpaceWidget(tk_frame, color_space_name, initial_color_space, on_drag, on_release, COLORS.widget)
+        color_space_widget = ColorSpaceWidget(tk_frame, color_space_name, initial_color_space, as_sync_callback(on_drag), as_sync_callback(on_release), COLORS.widget)
         return color_space_widget
 
     def create_multislider(self, multislider_name: str, values: Sequence[Any], initial_indexes: Sequence[int], on_drag: Optional[CallbackMultiSlider] = None,
                            on_release: Optional[CallbackMultiSlider] = None) -> MultiSliderWidget:
         tk_frame = tk.Frame(self.ctrl_frame, bg=COLORS.widget)
         tk_frame.pack(padx=4, pady=4, side=tk.TOP, fill=tk.X, expand=1)
-        multi_slider_widget = MultiSliderWidget(tk_frame, multislider_name, values, initial_indexes, on_drag, on_release, COLORS.widget)
+        multi_slider_widget = MultiSliderWidget(tk_frame, multislider_name, values, initial_indexes, as_sync_callback(on_drag), as_sync_callback(on_release), COLORS.widget)
         return multi_slider_widget
 
     def create_custom_widget(self, CustomWidgetClass: Type[WidgetInterface], *params) -> WidgetInterface:
@@ -450,7 +870,7 @@ class Guibbon:
 
     def create_radio_buttons(self, name: str, options: list[str], on_change: CallbackRadioButtons) -> RadioButtonsWidget:
         tk_frame = tk.Frame(self.ctrl_frame, bg=COLORS.widget)
-        radio_buttons = RadioButtonsWidget(tk_frame, name, options, on_change)
+        radio_buttons = RadioButtonsWidget(tk_frame, name, options, as_sync_callback(on_change))
         self.radio_buttons_by_names[name] = radio_buttons
         tk_frame.pack(padx=4, pady=4, side=tk.TOP, fill=tk.X, expand=1)
         return radio_buttons
@@ -460,30 +880,50 @@ class Guibbon:
 
     def create_check_button(self, name: str, on_change: CallbackCheckButton, initial_value: bool = False) -> CheckButtonWidget:
         tk_frame = tk.Frame(self.ctrl_frame, bg=COLORS.widget)
-        cb = CheckButtonWidget(tk_frame, name, on_change, initial_value)
+        cb = CheckButtonWidget(tk_frame, name, as_sync_callback(on_change), initial_value)
+        self.check_buttons_by_names[name] = cb
         tk_frame.pack(padx=4, pady=4, side=tk.TOP, fill=tk.X, expand=1)
         return cb
 
     def create_check_button_list(self, name: str, options: list[str], on_change: CallbackCheckButtonList, initial_values: Optional[list[bool]] = None) -> CheckButtonListWidget:
         tk_frame = tk.Frame(self.ctrl_frame)
-        cb = CheckButtonListWidget(tk_frame, name, options, on_change, initial_values)
+        cb = CheckButtonListWidget(tk_frame, name, options, as_sync_callback(on_change), initial_values)
+        self.check_button_lists_by_names[name] = cb
         tk_frame.pack(padx=4, pady=4, side=tk.TOP, fill=tk.X, expand=1)
         return cb
 
     def create_color_picker(self, name: str, on_change: CallbackColorPicker, initial_color_rgb: Optional[tuple[int, int, int]] = None) -> ColorPickerWidget:
         tk_frame = tk.Frame(self.ctrl_frame)
-        cpw = ColorPickerWidget(tk_frame, name, on_change, initial_color_rgb)
+        cpw = ColorPickerWidget(tk_frame, name, as_sync_callback(on_change), initial_color_rgb)
+        self.color_pickers_by_names[name] = cpw
         tk_frame.pack(padx=4, pady=4, side=tk.TOP, fill=tk.X, expand=1)
         return cpw
 
+    def get_widget_values(self) -> dict[str, Any]:
+        """Current values of the sliders, radio buttons, check buttons and color pickers, by widget name"""
+        values: dict[str, Any] = {}
+        for name, slider in self.sliders_by_names.items():
+            position = int(slider.get_position())
+            values[name] = {"index": position, "value": slider.get_values()[position]}
+        for name, radio_buttons in self.radio_buttons_by_names.items():
+            index, option = radio_buttons.get_current_selection()
+            values[name] = {"index": index, "value": option}
+        for name, check_button in self.check_buttons_by_names.items():
+            values[name] = {"value": check_button.get_current_value()}
+        for name, check_button_list in self.check_button_lists_by_names.items():
+            values[name] = {"value": check_button_list.get_current_value()}
+        for name, color_picker in self.color_pickers_by_names.items():
+            values[name] = {"value": color_picker.get_current_value()}
+        return values
+
     def create_treeview(self, name: str, tree: TreeNode, on_click: CallbackTreeview) -> TreeviewWidget:
         tk_frame = tk.Frame(self.ctrl_frame)
-        widget = TreeviewWidget(tk_frame, name, tree, on_click)
+        widget = TreeviewWidget(tk_frame, name, tree, as_sync_callback(on_click))
         tk_frame.pack(padx=4, pady=4, side=tk.TOP, fill=tk.X, expand=1)
         return widget
 
-    def imshow(self, mat: Image_t, mode: MODE = MODE.FIT, cv2_interpolation: Optional[int] = None):
-        self.image_viewer.imshow(mat, mode, cv2_interpolation)
+    def imshow(self, mat: Image_t, mode: MODE = MODE.FIT, cv2_interpolation: Optional[int] = None, mask=None, palette=None, alpha: Optional[float] = None):
+        self.image_viewer.imshow(mat, mode, cv2_interpolation, mask, palette, alpha)
 
     def getWindowProperty(self, prop_id: int) -> float:
         """
@@ -505,4 +945,4 @@ class Guibbon:
             )
 
     def setMouseCallback(self, onMouse: CallbackMouse, userdata=None):
-        self.image_viewer.setMouseCallback(onMouse, userdata)
+        self.image_viewer.setMouseCallback(as_sync_callback(onMouse), userdata)
@@ -0,0 +1,138 @@
+import asyncio
+import collections
+import dataclasses
+import functools
+import inspect
+from typing import Any, Optional, TypeVar
+
+CallbackT = TypeVar("CallbackT")  # a callback or None
+
+
+@dataclasses.dataclass(frozen=True)
+class GuiEvent:
+    kind: str  # "keypress", "keyrelease" or "closed"
+    key: int = -1  # key code, like waitKeyEx, for the key events
+    winname: Optional[str] = None  # for the "closed" events
+
+
+pending_tasks: set["asyncio.Task[Any]"] = set()  # tasks of the coroutine callbacks, referenced until they are done
+
+
+def as_sync_callback(callback: CallbackT) -> CallbackT:
+    """
+    Widgets call their callbacks synchronously from the Tk event loop. A coroutine function is wrapped to be scheduled as a task on the running
+    asyncio loop (see AsyncBridge). Without running loop, the wrapper raises a RuntimeError instead of running the coroutine, which would block the
+    GUI until it completes. Other callbacks are returned unchanged.
+    """
+    if not inspect.iscoroutinefunction(callback):
+        return callback
+
+    @functools.wraps(callback)
+    def sync_callback(*args, **kwargs):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            raise RuntimeError(
+                f"The coroutine callback {getattr(callback, '__name__', callback)} requires a running asyncio loop processing the GUI events, see "
+                "start_async_bridge(...)"
+            ) from None
+        task = loop.create_task(callback(*args, **kwargs))
+        pending_tasks.add(task)
+        task.add_done_callback(pending_tasks.discard)
+
+    return sync_callback  # type: ignore[return-value]
+
+
+class AsyncBridge:
+    """
+    Runs the Tk event processing inside a running asyncio loop: root.update() is called every interval seconds by loop.call_later, without
+    blocking nor sleeping, so that the GUI, network I/O and other tasks share the loop. Tk requires the loop to run in the main thread.
+    Key presses, key releases and window closings are delivered to wait_key(...) and next_event(). Key presses arriving while no wait_key(...) is
+    waiting are kept for the next one, like with waitKeyEx.
+    """
+
+    DEFAULT_INTERVAL = 1 / 60  # seconds
+    EVENT_QUEUE_SIZE = 256  # oldest events are dropped when nobody consumes them
+
+    instance: Optional["AsyncBridge"] = None
+
+    @staticmethod
+    def get_instance(guibbon_cls: Any) -> "AsyncBridge":
+        """Bridge of the running loop, started on first use"""
+        loop = asyncio.get_running_loop()
+        if AsyncBridge.instance is None or AsyncBridge.instance.loop is not loop or not AsyncBridge.instance.is_running:
+            AsyncBridge.instance = AsyncBridge(guibbon_cls)
+        return AsyncBridge.instance
+
+    def __init__(self, guibbon_cls: Any, interval: float = DEFAULT_INTERVAL):
+        self.Guibbon = guibbon_cls
+        self.interval = interval
+        self.loop = asyncio.get_running_loop()
+        self.key_waiters: list[asyncio.Future[int]] = []
+        self.pending_keys: collections.deque[int] = collections.deque(maxlen=AsyncBridge.EVENT_QUEUE_SIZE)  # key presses without waiter
+        self.events: asyncio.Queue[GuiEvent] = asyncio.Queue(maxsize=AsyncBridge.EVENT_QUEUE_SIZE)
+        self.winnames: set[str] = set()
+        self.is_running = True
+        self.handle: Optional[asyncio.Handle] = self.loop.call_soon(self.pump)
+
+    def put_event(self, event: GuiEvent):
+        if self.events.full():
+            self.events.get_nowait()
+        self.events.put_nowait(event)
+
+    def on_keypress(self, key: int):
+        waiters = [waiter for waiter in self.key_waiters if not waiter.done()]
+        for waiter in waiters:
+            waiter.set_result(key)
+        if len(waiters) == 0:
+            self.pending_keys.append(key)
+        self.key_waiters = []
+        self.put_event(GuiEvent("keypress", key))
+
+    def pump(self):
+        self.handle = None
+        if not self.is_running:
+            return
+        Guibbon = self.Guibbon
+        if Guibbon.is_alive:
+            Guibbon.root.update_idletasks()
+            Guibbon.root.update()  # root can be destroyed at this line
+        while Guibbon.is_alive and (key_event := Guibbon.keyboard.pop_event(track_keypress=True, track_keyrelease=True)) is not None:
+            if key_event.is_press:
+                self.on_keypress(key_event.key)
+            else:
+                self.put_event(GuiEvent("keyrelease", key_event.key))
+        winnames = set(Guibbon.instances.keys()) if Guibbon.is_alive else set()
+        for winname in self.winnames - winnames:
+            self.put_event(GuiEvent("closed", winname=winname))
+        self.winnames = winnames
+        if len(self.winnames) == 0:
+            for waiter in self.key_waiters:
+                if not waiter.done():
+                    waiter.set_result(-1)  # like waitKeyEx once all the windows are closed
+            self.key_waiters = []
+        self.handle = self.loop.call_later(self.interval, self.pump)
+
+    async def wait_key(self, timeout: Optional[float] = None) -> int:
+        """Returns the oldest pending key press, or waits for one for timeout seconds (forever if None). Returns -1 if none."""
+        if len(self.pending_keys) > 0:
+            return self.pending_keys.popleft()
+        waiter: asyncio.Future[int] = self.loop.create_future()
+        self.key_waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return -1
+
+    async def next_event(self) -> GuiEvent:
+        return await self.events.get()
+
+    def stop(self):
+        self.is_running = False
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        for waiter in self.key_waiters:
+            if not waiter.done():
+                waiter.set_result(-1)
+        self.key_waiters = []
@@ -0,0 +1,183 @@
+import concurrent.futures
+import dataclasses
+import math
+import time
+import tkinter as tk
+from typing import Any, Optional, Sequence
+
+from .image_viewer import ImageViewer, MODE
+from .typedef import Image_t, CallbackMouse
+
+
+@dataclasses.dataclass
+class SchedulerStats:
+    ticks: int = 0
+    submitted: int = 0  # renders started in the worker threads
+    presented: int = 0  # renders displayed in the Tk thread
+    deferred: int = 0  # renders ready but postponed to a later tick by the frame budget
+    over_budget: int = 0  # ticks where presenting the renders took longer than the frame budget
+    present_time_total: float = 0.0  # seconds, in the Tk thread
+
+    @property
+    def present_time_mean(self) -> float:
+        return self.present_time_total / self.presented if self.presented > 0 else 0.0
+
+
+class RenderScheduler:
+    """
+    Renders the viewers (panes) given to add(...) from a Tk timer: only the panes with a pending frame and not hidden are rendered. The conversion
+    and the warp of the frames run in a thread pool, the compositing and the display in the Tk thread within a frame budget per tick.
+    The panes are served least recently rendered first and at most one render per pane is in flight, so a busy feed can't starve the others:
+    its intermediate frames are skipped instead.
+
+    A pane implements is_hidden(), is_render_pending(), begin_render() -> job run by a worker, and end_render(result of the job), see ImageViewer.
+    """
+
+    DEFAULT_INTERVAL_MS = 10
+    DEFAULT_FRAME_BUDGET = 0.012  # seconds of Tk thread time per tick
+
+    def __init__(self, num_workers: int = 4, frame_budget: float = DEFAULT_FRAME_BUDGET, interval_ms: int = DEFAULT_INTERVAL_MS):
+        self.num_workers = num_workers
+        self.frame_budget = frame_budget
+        self.interval_ms = interval_ms
+        self.panes: list[Any] = []
+        self.last_submit_tick: dict[Any, int] = {}  # by pane, for the round robin
+        self.in_flight: dict[Any, concurrent.futures.Future[Any]] = {}
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="gbn_render")
+        self.stats = SchedulerStats()
+        self.widget: Optional[tk.Misc] = None
+        self.after_id: Optional[str] = None
+
+    def add(self, pane):
+        if pane not in self.last_submit_tick:
+            self.panes.append(pane)
+            self.last_submit_tick[pane] = -1
+
+    def remove(self, pane):
+        if pane in self.last_submit_tick:
+            self.panes.remove(pane)
+            self.last_submit_tick.pop(pane)
+            future = self.in_flight.pop(pane, None)
+            if future is not None:
+                future.cancel()
+
+    def tick(self):
+        """Presents the finished renders within the frame budget, then starts the renders of the stalest dirty panes"""
+        self.stats.ticks += 1
+        tic = time.perf_counter()
+        is_over_budget = False
+        for pane, future in sorted(self.in_flight.items(), key=lambda item: self.last_submit_tick[item[0]]):
+            if not future.done():
+                continue
+            if time.perf_counter() - tic > self.frame_budget:
+                self.stats.deferred += 1
+                is_over_budget = True
+                continue
+            del self.in_flight[pane]
+            pane.end_render(future.result())
+            self.stats.presented += 1
+        present_time = time.perf_counter() - tic
+        self.stats.present_time_total += present_time
+        if is_over_budget:
+            self.stats.over_budget += 1
+
+        # the expected Tk thread time of the next tick bounds the number of renders started now
+        max_in_flight = self.num_workers
+        if self.stats.present_time_mean > 0:
+            max_in_flight = max(1, min(max_in_flight, int(self.frame_budget / self.stats.present_time_mean)))
+        candidates = [pane for pane in self.panes if pane not in self.in_flight and pane.is_render_pending() and not pane.is_hidden()]
+        candidates.sort(key=lambda pane: self.last_submit_tick[pane])
+        for pane in candidates[: max(0, max_in_flight - len(self.in_flight))]:
+            self.in_flight[pane] = self.executor.submit(pane.begin_render())
+            self.last_submit_tick[pane] = self.stats.ticks
+            self.stats.submitted += 1
+
+    def start(self, widget: tk.Misc):
+        """Runs tick() every interval_ms with the Tk timers of widget"""
+        self.widget = widget
+        if self.after_id is None:
+            self.after_id = widget.after(self.interval_ms, self.on_tick)
+
+    def on_tick(self):
+        assert self.widget is not None
+        self.after_id = self.widget.after(self.interval_ms, self.on_tick)
+        self.tick()
+
+    def get_stats(self) -> SchedulerStats:
+        return dataclasses.replace(self.stats)
+
+    def close(self):
+        if self.widget is not None and self.after_id is not None:
+            self.widget.after_cancel(self.after_id)
+        self.after_id = None
+        for future in self.in_flight.values():
+            future.cancel()
+        self.in_flight = {}
+        self.executor.shutdown(wait=True)
+
+
+class Dashboard:
+    """
+    Grid of ImageViewer panes in one frame, sized to the frame and rendered by a shared RenderScheduler. The panes have no toolbar by default,
+    mouse pan and zoom are still enabled.
+    """
+
+    def __init__(
+        self,
+        master,
+        pane_names: Sequence[str],
+        scheduler: RenderScheduler,
+        cols: Optional[int] = None,
+        height: int = 720,
+        width: int = 720,
+        show_toolbar: bool = False,
+    ):
+        if len(pane_names) == 0:
+            raise ValueError("A dashboard needs at least one pane")
+        self.scheduler = scheduler
+        self.cols = math.ceil(math.sqrt(len(pane_names))) if cols is None else cols
+        self.rows = math.ceil(len(pane_names) / self.cols)
+
+        # the size of the frame is given by its master, not by the panes: resizing the panes must not resize the window
+        self.frame = tk.Frame(master=master, height=height, width=width, bg="gray10")
+        self.frame.grid_propagate(False)
+        for row in range(self.rows):
+            self.frame.rowconfigure(row, weight=1, uniform="row")
+        for col in range(self.cols):
+            self.frame.columnconfigure(col, weight=1, uniform="col")
+
+        self.viewers: dict[str, ImageViewer] = {}
+        pane_height, pane_width = height // self.rows, width // self.cols
+        for k, name in enumerate(pane_names):
+            viewer = ImageViewer(self.frame, height=pane_height, width=pane_width, show_toolbar=show_toolbar)
+            viewer.frame.grid(row=k // self.cols, column=k % self.cols, sticky=tk.NSEW)
+            viewer.set_render_scheduler(scheduler)
+            self.viewers[name] = viewer
+        self.pane_shape_hw = (pane_height, pane_width)
+        self.frame.bind("<Configure>", self.on_configure)
+
+    def on_configure(self, event):
+        pane_shape_hw = (event.height // self.rows, event.width // self.cols)
+        if pane_shape_hw == self.pane_shape_hw:
+            return
+        self.pane_shape_hw = pane_shape_hw
+        for viewer in self.viewers.values():
+            border = 2 * int(viewer.canvas.cget("highlightthickness"))
+            toolbar_height = viewer.toolbar_frame.winfo_reqheight() if viewer.toolbar_frame.winfo_manager() else 0
+            viewer.resize(pane_shape_hw[0] - border - toolbar_height, pane_shape_hw[1] - border)
+
+    def get_viewer(self, pane_name: str) -> ImageViewer:
+        return self.viewers[pane_name]
+
+    def imshow(self, pane_name: str, mat: Image_t, mode: MODE = MODE.FIT, cv2_interpolation: Optional[int] = None, mask=None, palette=None, alpha: Optional[float] = None):
+        """Keeps the frame for the next render of the pane by the scheduler, see ImageViewer.imshow(...)"""
+        self.viewers[pane_name].imshow(mat, mode, cv2_interpolation, mask, palette, alpha)
+
+    def setMouseCallback(self, pane_name: str, onMouse: CallbackMouse, userdata=None):
+        self.viewers[pane_name].setMouseCallback(onMouse, userdata)
+
+    def close(self):
+        for viewer in self.viewers.values():
+            self.scheduler.remove(viewer)
+            if viewer.view_link is not None:
+                viewer.view_link.remove(viewer)
@@ -0,0 +1,230 @@
+import collections
+import concurrent.futures
+import dataclasses
+import time
+from typing import Any, Callable, Optional, Sequence
+
+import cv2
+
+from .typedef import Image_t
+
+ImageLoader = Callable[[str], Optional[Image_t]]
+
+
+@dataclasses.dataclass
+class NavigatorStats:
+    hits: int = 0  # images shown without waiting for a decode
+    misses: int = 0  # images shown after waiting for a decode
+    decoded: int = 0
+    failed: int = 0  # decodes which raised or returned None
+    evicted: int = 0
+    cancelled: int = 0  # prefetches cancelled before starting, because the user moved away
+    decode_time_total: float = 0.0  # seconds, measured in the worker threads
+    decode_time_max: float = 0.0
+    wait_time_total: float = 0.0  # seconds the caller was blocked waiting for a decode
+    cache_nbytes: int = 0
+    cache_count: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        n = self.hits + self.misses
+        return self.hits / n if n > 0 else 0.0
+
+    @property
+    def decode_time_mean(self) -> float:
+        return self.decode_time_total / self.decoded if self.decoded > 0 else 0.0
+
+
+class ImageCache:
+    """LRU cache of decoded images, bounded by the total number of bytes of the images"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.images: collections.OrderedDict[int, Image_t] = collections.OrderedDict()  # by index, least recently used first
+        self.nbytes = 0
+
+    def __contains__(self, index: int) -> bool:
+        return index in self.images
+
+    def __len__(self) -> int:
+        return len(self.images)
+
+    def get(self, index: int) -> Optional[Image_t]:
+        img = self.images.get(index, None)
+        if img is not None:
+            self.images.move_to_end(index)
+        return img
+
+    def put(self, index: int, img: Image_t) -> int:
+        """Adds the image as the most recently used one and returns the number of evicted images. The added image itself is never evicted."""
+        old = self.images.pop(index, None)
+        if old is not None:
+            self.nbytes -= old.nbytes
+        self.images[index] = img
+        self.nbytes += img.nbytes
+
+        n_evicted = 0
+        while self.nbytes > self.max_bytes and len(self.images) > 1:
+            _, evicted = self.images.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            n_evicted += 1
+        return n_evicted
+
+    def clear(self):
+        self.images.clear()
+        self.nbytes = 0
+
+
+def read_image(path: str) -> Optional[Image_t]:
+    """Default loader. Returns None if the file can not be decoded, like cv2.imread"""
+    img: Optional[Image_t] = cv2.imread(path)  # type: ignore
+    return img
+
+
+def _timed_load(loader: ImageLoader, path: str) -> tuple[Optional[Image_t], float]:
+    tic = time.perf_counter()
+    img = loader(path)
+    return img, time.perf_counter() - tic
+
+
+class DatasetNavigator:
+    """
+    Browses a list of image files. The K images before and after the current one are decoded in a thread pool and kept in a LRU cache bounded in
+    bytes, so that moving to the next/previous image does not wait for a decode.
+    The navigator must be used from the thread of the GUI: worker threads only decode, the results are collected and shown by the calling thread.
+    """
+
+    DEFAULT_PREFETCH = 4  # number of images decoded ahead, in each direction
+    DEFAULT_MAX_BYTES = 512 * 2**20
+    DEFAULT_NUM_WORKERS = 4
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        image_viewer: Optional[Any] = None,
+        prefetch: int = DEFAULT_PREFETCH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        num_workers: int = DEFAULT_NUM_WORKERS,
+        loader: Optional[ImageLoader] = None,
+        on_change: Optional[Callable[[int, Image_t], None]] = None,
+    ):
+        self.paths = list(paths)
+        self.image_viewer = image_viewer  # shows the current image with imshow(img) if given
+        self.prefetch = prefetch
+        self.loader: ImageLoader = read_image if loader is None else loader
+        self.on_change = on_change  # called with (index, img) after the current image changed
+
+        self.index = -1  # nothing shown yet
+        self.cache = ImageCache(max_bytes)
+        self.pending: dict[int, concurrent.futures.Future[tuple[Optional[Image_t], float]]] = {}
+        self.errors: dict[int, Exception] = {}  # failed prefetches by index, raised when their image is requested
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="gbn_dataset_navigator")
+        self.stats = NavigatorStats()
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def get_stats(self) -> NavigatorStats:
+        self._collect_done()
+        return dataclasses.replace(self.stats, cache_nbytes=self.cache.nbytes, cache_count=len(self.cache))
+
+    def set_max_bytes(self, max_bytes: int):
+        self.cache.max_bytes = max_bytes
+
+    def _submit(self, index: int):
+        if index in self.cache or index in self.pending or index in self.errors:
+            return
+        self.pending[index] = self.executor.submit(_timed_load, self.loader, self.paths[index])
+
+    def _store(self, index: int, future: concurrent.futures.Future[tuple[Optional[Image_t], float]]) -> Image_t:
+        try:
+            img, decode_time = future.result()
+        except Exception:
+            self.stats.failed += 1
+            raise
+        self.stats.decoded += 1
+        self.stats.decode_time_total += decode_time
+        self.stats.decode_time_max = max(self.stats.decode_time_max, decode_time)
+        if img is None:
+            self.stats.failed += 1
+            raise ValueError(f"could not read image {self.paths[index]}")
+        self.stats.evicted += self.cache.put(index, img)
+        return img
+
+    def _collect_done(self):
+        """Moves the finished prefetches to the cache. The errors of failed decodes are kept and raised when their image is requested."""
+        for index, future in list(self.pending.items()):
+            if future.done():
+                self.pending.pop(index)
+                try:
+                    self._store(index, future)
+                except Exception as e:
+                    self.errors[index] = e
+
+    def _schedule_prefetch(self):
+        window = [self.index + k * sign for k in range(1, self.prefetch + 1) for sign in (1, -1)]  # nearest images first
+        window = [index for index in window if 0 <= index < len(self.paths)]
+        for index in list(self.pending.keys()):
+            if index not in window and self.pending[index].cancel():
+                self.pending.pop(index)
+                self.stats.cancelled += 1
+        for index in [index for index in self.errors if index not in window]:
+            self.errors.pop(index)  # decoded again if requested
+        for index in window:
+            self._submit(index)
+
+    def get_image(self, index: int) -> Image_t:
+        """
+        Returns the decoded image, from the cache if possible. Blocks if it is still being decoded.
+        Raises the error of the decode (ValueError if the loader returned None). A failed image is decoded again at the next request.
+        """
+        self._collect_done()
+        error = self.errors.pop(index, None)
+        if error is not None:
+            self.stats.misses += 1
+            raise error
+        img = self.cache.get(index)
+        if img is not None:
+            self.stats.hits += 1
+            return img
+
+        self.stats.misses += 1
+        self._submit(index)
+        future = self.pending.pop(index)
+        tic = time.perf_counter()
+        try:
+            return self._store(index, future)
+        finally:
+            self.stats.wait_time_total += time.perf_counter() - tic
+
+    def seek(self, index: int) -> Image_t:
+        """Shows the image at index (clipped to the dataset) and prefetches its neighbours"""
+        if len(self.paths) == 0:
+            raise IndexError("the dataset is empty")
+        index = min(max(index, 0), len(self.paths) - 1)
+        img = self.get_image(index)
+        self.index = index
+        self._schedule_prefetch()
+        if self.image_viewer is not None:
+            self.image_viewer.imshow(img)
+        if self.on_change is not None:
+            self.on_change(index, img)
+        return img
+
+    def next(self, step: int = 1) -> Image_t:
+        return self.seek(self.index + step)
+
+    def previous(self, step: int = 1) -> Image_t:
+        return self.seek(self.index - step)
+
+    def get_path(self) -> str:
+        return self.paths[self.index]
+
+    def close(self):
+        """Cancels the pending prefetches and stops the worker threads"""
+        for future in self.pending.values():
+            future.cancel()
+        self.pending = {}
+        self.errors = {}
+        self.executor.shutdown(wait=True)
+        self.cache.clear()
@@ -0,0 +1,279 @@
+import abc
+import dataclasses
+import itertools
+import time
+import tkinter as tk
+from typing import Any, Callable, Optional, Union
+
+import numpy as np
+from PIL import Image, ImageTk
+
+from .interactive_overlays import Layer, LayerStack, Rect
+from .typedef import Image_t
+
+TagOrId = Union[str, int]
+
+
+class DisplayBackend(metaclass=abc.ABCMeta):
+    """
+    Creates the canvas holding the items of the interactive overlays, and receives the viewport composited by the viewer (RGB, canvas space): the
+    image with the masks and the rasterized overlays.
+    """
+
+    is_headless = False  # the viewer creates no Tk widget (frame, toolbar, ...) around the canvas of a headless display
+
+    @abc.abstractmethod
+    def create_canvas(self, master, height: int, width: int) -> tk.Canvas:
+        pass
+
+    def set_layers(self, layers: LayerStack):
+        """Layer stack of the canvas, given once created"""
+        pass
+
+    @abc.abstractmethod
+    def present(self, viewport: Image_t):
+        pass
+
+    @abc.abstractmethod
+    def present_region(self, viewport: Image_t, can_rect: Rect):
+        """Only the rectangle can_rect (x0, y0, x1, y1) of the viewport changed since the last present(...)"""
+        pass
+
+
+class TkDisplay(DisplayBackend):
+    """Shows the viewport as a photo image in the IMAGE layer of the canvas, below the interactive overlays"""
+
+    def __init__(self):
+        self.canvas: tk.Canvas
+        self.layers: Optional[LayerStack] = None
+        self.imgtk: ImageTk.PhotoImage
+        self.image_id: Optional[int] = None
+
+    def create_canvas(self, master, height: int, width: int) -> tk.Canvas:
+        self.canvas = tk.Canvas(master=master, height=height, width=width, bg="gray10")
+        return self.canvas
+
+    def set_layers(self, layers: LayerStack):
+        self.layers = layers
+
+    def present(self, viewport: Image_t):
+        # Convert to PIL Image and then to PhotoImage
+        # Important: Pass master parameter to ensure PhotoImage is associated with the correct Tk instance
+        canh, canw = viewport.shape[:2]
+        pil_image = Image.fromarray(viewport)
+        self.imgtk = ImageTk.PhotoImage(image=pil_image, master=self.canvas)
+        if self.image_id is None:
+            self.image_id = self.canvas.create_image(canw // 2, canh // 2, anchor=tk.CENTER, image=self.imgtk)
+            if self.layers is not None:
+                self.layers.place([self.image_id], Layer.IMAGE, static=True)
+        else:
+            self.canvas.itemconfig(self.image_id, image=self.imgtk)
+            self.canvas.coords(self.image_id, canw // 2, canh // 2)  # the canvas may have been resized
+
+    def present_region(self, viewport: Image_t, can_rect: Rect):
+        x0, y0, x1, y1 = can_rect
+        region = np.ascontiguousarray(viewport[y0:y1, x0:x1])
+        ppm_data = f"P6\n{x1 - x0} {y1 - y0}\n255\n".encode() + region.tobytes()
+        self.canvas.tk.call(str(self.imgtk), "put", ppm_data, "-format", "ppm", "-to", x0, y0)
+
+
+class OffscreenDisplay(DisplayBackend):
+    """
+    Keeps the last presented viewport in a numpy buffer, without any window nor Tk root: ImageViewer(None, height, width, display=OffscreenDisplay())
+    runs the whole render pipeline of a window, to test and benchmark it or to make screenshots in batch. The items of the interactive overlays are
+    kept by an OffscreenCanvas, ImageViewer.get_rendered_view() draws the live ones with OpenCV.
+    """
+
+    is_headless = True
+
+    def __init__(self):
+        self.frame: Optional[Image_t] = None
+        self.present_count = 0
+
+    def create_canvas(self, master, height: int, width: int) -> tk.Canvas:
+        return OffscreenCanvas(height, width)
+
+    def present(self, viewport: Image_t):
+        self.frame = viewport.copy()
+        self.present_count += 1
+
+    def present_region(self, viewport: Image_t, can_rect: Rect):
+        if self.frame is None or self.frame.shape != viewport.shape:
+            self.present(viewport)
+            return
+        x0, y0, x1, y1 = can_rect
+        self.frame[y0:y1, x0:x1] = viewport[y0:y1, x0:x1]
+        self.present_count += 1
+
+
+@dataclasses.dataclass
+class CanvasItem:
+    type: str  # "oval", "line", "rectangle", "text" or "image"
+    coords: list[float]
+    options: dict[str, Any]
+    tags: set[str]
+
+
+class OffscreenCanvas(tk.Canvas):
+    """
+    Canvas of an OffscreenDisplay: keeps the items (coordinates, options and tags) and the bindings of the overlays without Tk, with the subset of
+    the tk.Canvas interface used by the viewer and its overlays. Items are not drawn and their z-order is not kept.
+    The timers (after, after_idle) run when update() or update_idletasks() is called, like the Tk event loop of a window.
+    """
+
+    def __init__(self, height: int, width: int):
+        # tk.Canvas.__init__ is not called: it needs a Tk root
+        self.options: dict[str, Any] = {"height": height, "width": width, "highlightthickness": 0}
+        self.items: dict[int, CanvasItem] = {}
+        self.ids_by_tag: dict[str, set[int]] = {}
+        self.item_id_counter = itertools.count(1)
+        self.bindings: dict[tuple[TagOrId, str], dict[str, Callable[[Any], Any]]] = {}  # by (tag or id, sequence), then by funcid
+        self.funcid_counter = itertools.count()
+        self.idle_callbacks: dict[str, Callable[[], object]] = {}  # by timer id, in order
+        self.timers: dict[str, tuple[float, Callable[[], object]]] = {}  # by timer id: (due time, callback)
+        self.timer_id_counter = itertools.count()
+
+    def __repr__(self) -> str:
+        return f"<OffscreenCanvas {len(self.items)} items>"
+
+    def _find(self, tag_or_id: TagOrId) -> list[int]:
+        """Ids of the items matching an id, a tag, "all" or tags joined with "&&" """
+        if isinstance(tag_or_id, int) or tag_or_id.isdigit():
+            return [int(tag_or_id)] if int(tag_or_id) in self.items else []
+        if tag_or_id == "all":
+            return list(self.items.keys())
+        ids: Optional[set[int]] = None
+        for tag in tag_or_id.split("&&"):
+            tagged_ids = self.ids_by_tag.get(tag, set())
+            ids = tagged_ids if ids is None else ids & tagged_ids
+        return sorted(ids) if ids else []
+
+    def _create(self, item_type: str, args: tuple[Any, ...], options: dict[str, Any]) -> int:
+        item_id = next(self.item_id_counter)
+        tags = options.pop("tags", ())
+        self.items[item_id] = CanvasItem(item_type, list(np.ravel(args).astype(float)), options, set())
+        for tag in (tags,) if isinstance(tags, str) else tags:
+            self.addtag_withtag(tag, item_id)
+        return item_id
+
+    def create_oval(self, *args, **options) -> int:
+        return self._create("oval", args, options)
+
+    def create_line(self, *args, **options) -> int:
+        return self._create("line", args, options)
+
+    def create_rectangle(self, *args, **options) -> int:
+        return self._create("rectangle", args, options)
+
+    def create_text(self, *args, **options) -> int:
+        return self._create("text", args, options)
+
+    def create_image(self, *args, **options) -> int:
+        return self._create("image", args, options)
+
+    # the methods overloaded by tk.Canvas take *args: coords(tag_or_id, *coords), itemconfigure(tag_or_id, **options), ...
+
+    def coords(self, *args: Any) -> Any:
+        tag_or_id, coords = args[0], args[1:]
+        item_ids = self._find(tag_or_id)
+        if len(item_ids) == 0:
+            return []
+        item = self.items[item_ids[0]]
+        if len(coords) > 0:
+            item.coords = list(np.ravel(coords).astype(float))
+        return item.coords
+
+    def itemconfigure(self, *args: Any, **options: Any) -> Any:
+        for item_id in self._find(args[0]):
+            self.items[item_id].options.update(options)
+
+    itemconfig = itemconfigure
+
+    def delete(self, *tags_or_ids: TagOrId) -> None:
+        for tag_or_id in tags_or_ids:
+            for item_id in self._find(tag_or_id):
+                for tag in self.items.pop(item_id).tags:
+                    self.ids_by_tag[tag].discard(item_id)
+                    if len(self.ids_by_tag[tag]) == 0:
+                        del self.ids_by_tag[tag]
+
+    def addtag_withtag(self, newtag: str, tag_or_id: TagOrId) -> None:
+        for item_id in self._find(tag_or_id):
+            self.items[item_id].tags.add(newtag)
+            self.ids_by_tag.setdefault(newtag, set()).add(item_id)
+
+    def find_withtag(self, tag_or_id: TagOrId) -> tuple[int, ...]:
+        return tuple(self._find(tag_or_id))  # no item is under the cursor ("current")
+
+    def find_all(self) -> tuple[int, ...]:
+        return tuple(self.items.keys())
+
+    def tag_lower(self, *args) -> None:
+        pass
+
+    def tag_raise(self, *args) -> None:
+        pass
+
+    def tag_bind(self, *args: Any, **kwargs: Any) -> Any:
+        tag_or_id, sequence, func = args
+        funcid = f"offscreen_binding_{next(self.funcid_counter)}"
+        callbacks = self.bindings.setdefault((tag_or_id, sequence), {})
+        if not kwargs.get("add", False):
+            callbacks.clear()
+        callbacks[funcid] = func
+        return funcid
+
+    def tag_unbind(self, tag_or_id: TagOrId, sequence: str, funcid: Optional[str] = None) -> None:
+        callbacks = self.bindings.get((tag_or_id, sequence), {})
+        if funcid is None:
+            callbacks.clear()
+        else:
+            callbacks.pop(funcid, None)
+        if len(callbacks) == 0:
+            self.bindings.pop((tag_or_id, sequence), None)
+
+    def bind(self, *args: Any, **kwargs: Any) -> Any:
+        return self.tag_bind("", *args, **kwargs)
+
+    def configure(self, *args: Any, **options: Any) -> Any:
+        self.options.update(options)
+
+    def cget(self, key: str) -> Any:
+        return self.options.get(key, "")
+
+    def winfo_height(self) -> int:
+        return int(self.options["height"])
+
+    def winfo_width(self) -> int:
+        return int(self.options["width"])
+
+    def winfo_exists(self) -> bool:
+        return True
+
+    def after(self, ms: Union[int, str], func: Callable[..., object], *func_args: Any) -> str:  # type: ignore[override]
+        timer_id = f"offscreen_after_{next(self.timer_id_counter)}"
+        self.timers[timer_id] = (time.perf_counter() + int(ms) / 1000, lambda: func(*func_args))
+        return timer_id
+
+    def after_idle(self, func: Callable[..., object], *func_args: Any) -> str:  # type: ignore[override]
+        timer_id = f"offscreen_after_{next(self.timer_id_counter)}"
+        self.idle_callbacks[timer_id] = lambda: func(*func_args)
+        return timer_id
+
+    def after_cancel(self, timer_id: str) -> None:
+        self.idle_callbacks.pop(timer_id, None)
+        self.timers.pop(timer_id, None)
+
+    def update_idletasks(self) -> None:
+        """Runs the idle callbacks, including the ones they schedule"""
+        while len(self.idle_callbacks) > 0:
+            timer_id = next(iter(self.idle_callbacks))
+            self.idle_callbacks.pop(timer_id)()
+
+    def update(self) -> None:
+        """Runs the timers which are due, then the idle callbacks"""
+        now = time.perf_counter()
+        for timer_id, (due_time, callback) in list(self.timers.items()):
+            if due_time <= now and self.timers.pop(timer_id, None) is not None:
+                callback()
+        self.update_idletasks()
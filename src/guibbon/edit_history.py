@@ -0,0 +1,231 @@
+import dataclasses
+import itertools
+from typing import Any, Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from .typedef import Point2D
+
+Rect = tuple[int, int, int, int]  # x0, y0, x1, y1 with x1 and y1 excluded
+
+RECORD_DTYPE = np.dtype(
+    [
+        ("kind", np.int8),
+        ("overlay_id", np.int32),
+        ("vertex", np.int32),
+        ("old_xy", np.float64, (2,)),
+        ("new_xy", np.float64, (2,)),
+    ]
+)
+
+
+class Kind:
+    MOVE = 0
+    MASK = 1
+
+
+@dataclasses.dataclass
+class MaskDelta:
+    """Pixels of a mask before and after an edit, cropped to the bounding box of the modified pixels"""
+
+    rect: Rect
+    old: npt.NDArray[np.uint8]
+    new: npt.NDArray[np.uint8]
+
+    @property
+    def nbytes(self) -> int:
+        return self.old.nbytes + self.new.nbytes
+
+
+class EditHistory:
+    """
+    Undo/redo history of the edits made with the mouse: moves of the vertices of the overlays and brush strokes on the masks.
+    Entries are stored in a numpy ring buffer of fixed size records (overlay id, vertex index, old xy, new xy). Mask edits additionally keep the
+    old and new pixels cropped to the bounding box of the modified pixels. The ring buffer grows up to the capacity while the memory budget allows
+    it, its allocated size counts in the budget. A brush stroke keeps one delta per segment instead of the bounding box of the whole stroke. When the memory budget or the capacity is exceeded, the oldest entries are evicted first.
+    Overlays are referenced by an id: removed overlays must be forgotten, their entries are then dropped.
+    Undoable overlays implement set_vertex_xy(index, xy), masks implement apply_mask_delta(rect, pixels).
+    """
+
+    DEFAULT_CAPACITY = 65536  # number of entries
+    DEFAULT_MAX_BYTES = 64 * 2**20  # ring buffer and mask deltas
+    INITIAL_CAPACITY = 256  # number of entries allocated first
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.capacity = capacity
+        self.records = np.zeros(shape=(min(EditHistory.INITIAL_CAPACITY, self._get_max_capacity(max_bytes)),), dtype=RECORD_DTYPE)
+        self.mask_deltas: dict[int, list[MaskDelta]] = {}  # by slot of the record in the ring buffer
+        self.mask_deltas_nbytes = 0
+        self.max_bytes = max_bytes
+
+        self.start = 0  # slot of the oldest entry
+        self.count = 0  # number of entries
+        self.cursor = 0  # number of entries currently applied, undo() reverts the entry cursor - 1
+
+        self.overlays: dict[int, Any] = {}  # by overlay id
+        self.overlay_ids: dict[int, int] = {}  # by python id of the overlay
+        self.overlay_id_counter = itertools.count()
+        self.is_applying = False  # edits made by undo/redo are not recorded
+
+    def get_nbytes(self) -> int:
+        return self.records.nbytes + self.mask_deltas_nbytes
+
+    def _get_max_capacity(self, max_bytes: int) -> int:
+        """Number of entries of the largest ring buffer within the capacity and max_bytes"""
+        return max(1, min(self.capacity, max_bytes // RECORD_DTYPE.itemsize))
+
+    def set_max_bytes(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        max_capacity = self._get_max_capacity(max_bytes)
+        if len(self.records) > max_capacity:
+            while self.count > max_capacity:
+                self._evict_oldest()
+            self._rebuild(np.arange(self.count), max_capacity, self.cursor)
+        self._evict_over_budget()
+
+    def register(self, overlay) -> int:
+        overlay_id = self.overlay_ids.get(id(overlay), None)
+        if overlay_id is None:
+            overlay_id = next(self.overlay_id_counter)
+            self.overlay_ids[id(overlay)] = overlay_id
+            self.overlays[overlay_id] = overlay
+        return overlay_id
+
+    def forget(self, *overlays):
+        """Drops the entries of the overlays, to be called when they are removed. The ring buffer is filtered once for all the overlays."""
+        overlay_ids = [self.overlay_ids.pop(id(overlay)) for overlay in overlays if id(overlay) in self.overlay_ids]
+        if len(overlay_ids) == 0:
+            return
+        for overlay_id in overlay_ids:
+            self.overlays.pop(overlay_id)
+        ks = np.arange(self.count)
+        is_kept = ~np.isin(self.records["overlay_id"][self._slot(ks)], np.array(overlay_ids))
+        if not np.all(is_kept):
+            self._rebuild(ks[is_kept], len(self.records), int(np.count_nonzero(is_kept[: self.cursor])))
+
+    def _slot(self, k):
+        """Slot in the ring buffer of the entry k (int or array), counted from the oldest entry"""
+        return (self.start + k) % len(self.records)
+
+    def _rebuild(self, ks: npt.NDArray[np.int_], capacity: int, cursor: int):
+        """Moves the entries ks (counted from the oldest entry, in order) to the beginning of a new ring buffer of the given capacity"""
+        slots = self._slot(ks)
+        records = np.zeros(shape=(capacity,), dtype=RECORD_DTYPE)
+        records[: len(slots)] = self.records[slots]
+        mask_deltas = {new_slot: self.mask_deltas[slot] for new_slot, slot in enumerate(slots.tolist()) if slot in self.mask_deltas}
+        self.records = records
+        self.mask_deltas = mask_deltas
+        self.mask_deltas_nbytes = sum(mask_delta.nbytes for deltas in mask_deltas.values() for mask_delta in deltas)
+        self.start = 0
+        self.count = len(slots)
+        self.cursor = cursor
+
+    def _drop_slot(self, slot: int):
+        for mask_delta in self.mask_deltas.pop(slot, []):
+            self.mask_deltas_nbytes -= mask_delta.nbytes
+
+    def _evict_oldest(self):
+        self._drop_slot(self.start)
+        self.start = self._slot(1)
+        self.count -= 1
+        self.cursor = max(0, self.cursor - 1)
+
+    def _evict_over_budget(self):
+        while self.count > 0 and self.get_nbytes() > self.max_bytes:
+            self._evict_oldest()
+
+    def _push(self, kind: int, overlay, vertex: int, old_xy: Point2D, new_xy: Point2D, mask_deltas: Optional[list[MaskDelta]] = None):
+        # a new edit discards the entries that could be redone
+        for k in range(self.cursor, self.count):
+            self._drop_slot(self._slot(k))
+        self.count = self.cursor
+        if self.count == len(self.records):
+            capacity = min(2 * len(self.records), self.capacity)
+            if capacity > len(self.records) and capacity * RECORD_DTYPE.itemsize + self.mask_deltas_nbytes <= self.max_bytes:
+                self._rebuild(np.arange(self.count), capacity, self.cursor)
+            else:
+                self._evict_oldest()
+
+        slot = self._slot(self.count)
+        self.records[slot] = (kind, self.register(overlay), vertex, old_xy, new_xy)
+        if mask_deltas is not None:
+            self.mask_deltas[slot] = mask_deltas
+            self.mask_deltas_nbytes += sum(mask_delta.nbytes for mask_delta in mask_deltas)
+        self.count += 1
+        self.cursor = self.count
+        self._evict_over_budget()
+
+    def record_move(self, overlay, vertex: int, old_xy: Point2D, new_xy: Point2D):
+        if self.is_applying or tuple(old_xy) == tuple(new_xy):
+            return
+        self._push(Kind.MOVE, overlay, vertex, old_xy, new_xy)
+
+    def record_mask_edit(self, overlay, rect: Rect, old: npt.NDArray[np.uint8], new: npt.NDArray[np.uint8]):
+        """old, new: pixels of the mask in rect, before and after the edit. They are cropped again to the modified pixels."""
+        if self.is_applying:
+            return
+        ys, xs = np.nonzero(old != new)
+        if len(xs) == 0:
+            return
+        cx0, cy0, cx1, cy1 = int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1
+        x0, y0 = rect[:2]
+        mask_delta = MaskDelta((x0 + cx0, y0 + cy0, x0 + cx1, y0 + cy1), old[cy0:cy1, cx0:cx1].copy(), new[cy0:cy1, cx0:cx1].copy())
+        self._push(Kind.MASK, overlay, -1, (0, 0), (0, 0), [mask_delta])
+
+    def record_mask_stroke(self, overlay, segments: Sequence[tuple[Rect, npt.NDArray[np.uint8], npt.NDArray[np.uint8]]]):
+        """
+        Records the segments of a brush stroke as a single edit, one delta per segment: a long diagonal stroke only keeps the pixels along its path,
+        not its bounding box. segments: (rect, old, new) in painting order, old: pixels of rect before the segment was painted, new: pixels of rect
+        at the end of the stroke. Undo restores the segments from the newest to the oldest one.
+        """
+        if self.is_applying:
+            return
+        if len(segments) == 1:
+            self.record_mask_edit(overlay, *segments[0])
+            return
+        if all(np.array_equal(old, new) for _, old, new in segments):
+            return
+        self._push(Kind.MASK, overlay, -1, (0, 0), (0, 0), [MaskDelta(rect, old.copy(), new.copy()) for rect, old, new in segments])
+
+    def can_undo(self) -> bool:
+        return self.cursor > 0
+
+    def can_redo(self) -> bool:
+        return self.cursor < self.count
+
+    def undo(self) -> bool:
+        """Reverts the last applied entry. Returns False if there is nothing to undo."""
+        if not self.can_undo():
+            return False
+        self.cursor -= 1
+        self._apply(self._slot(self.cursor), forward=False)
+        return True
+
+    def redo(self) -> bool:
+        """Applies again the last reverted entry. Returns False if there is nothing to redo."""
+        if not self.can_redo():
+            return False
+        self._apply(self._slot(self.cursor), forward=True)
+        self.cursor += 1
+        return True
+
+    def _apply(self, slot: int, forward: bool):
+        record = self.records[slot]
+        overlay = self.overlays[int(record["overlay_id"])]
+        self.is_applying = True
+        try:
+            if record["kind"] == Kind.MOVE:
+                x, y = record["new_xy"] if forward else record["old_xy"]
+                overlay.set_vertex_xy(int(record["vertex"]), (float(x), float(y)))
+            else:
+                mask_deltas = self.mask_deltas[slot]
+                for mask_delta in mask_deltas if forward else reversed(mask_deltas):
+                    overlay.apply_mask_delta(mask_delta.rect, mask_delta.new if forward else mask_delta.old)
+        finally:
+            self.is_applying = False
+
+    def clear(self):
+        self.mask_deltas = {}
+        self.mask_deltas_nbytes = 0
+        self.start = self.count = self.cursor = 0
@@ -0,0 +1,190 @@
+import collections
+import concurrent.futures
+import dataclasses
+import queue
+import threading
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from .typedef import Image_t
+
+
+@dataclasses.dataclass
+class FrameHistoryStats:
+    pushed: int = 0
+    encoded: int = 0
+    dropped: int = 0  # frames not recorded because the encoder thread was busy
+    evicted: int = 0
+    encode_time_total: float = 0.0  # seconds, in the encoder thread
+    nbytes: int = 0
+    count: int = 0
+
+
+@dataclasses.dataclass
+class EncodedFrame:
+    seq: int  # sequence number of the frame, never reused
+    timestamp: float  # time.monotonic() when the frame was displayed
+    data: np.ndarray  # compressed image, see cv2.imencode
+
+
+class FrameHistory:
+    """
+    Ring buffer of the last displayed frames, compressed with cv2.imencode in a background thread and bounded by a duration and a memory budget.
+    push(...) never blocks: the frames arriving while the encoder is busy are dropped from the history, the live display is not affected.
+    Frames are addressed by a sequence number, stable while older frames are evicted. Decoded frames are kept in a small cache filled ahead of the
+    scrubbing position by a decode thread.
+    """
+
+    DEFAULT_MAX_SECONDS = 10.0
+    DEFAULT_MAX_BYTES = 256 * 2**20
+    DEFAULT_CODEC = ".jpg"
+    DECODED_CACHE_SIZE = 16  # number of decoded frames
+    DECODE_AHEAD = 4  # number of frames decoded on each side of the requested one
+
+    def __init__(self, max_seconds: float = DEFAULT_MAX_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES, codec: str = DEFAULT_CODEC, quality: int = 90):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.codec = codec
+        if codec == ".jpg":
+            self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        elif codec == ".png":
+            self.encode_params = [cv2.IMWRITE_PNG_COMPRESSION, 1]  # favour speed, the encoder must keep up with the display
+        else:
+            self.encode_params = []
+
+        self.lock = threading.Lock()
+        self.frames: collections.deque[EncodedFrame] = collections.deque()
+        self.nbytes = 0
+        self.next_seq = 0
+        self.stats = FrameHistoryStats()
+
+        self.encode_queue: queue.Queue[Optional[tuple[int, float, Image_t]]] = queue.Queue(maxsize=2)
+        self.encoder_thread = threading.Thread(target=self._run_encoder, name="gbn_frame_history_encoder", daemon=True)
+        self.encoder_thread.start()
+
+        self.decoded: collections.OrderedDict[int, Image_t] = collections.OrderedDict()  # by seq, least recently used first
+        self.decode_futures: dict[int, concurrent.futures.Future[Optional[Image_t]]] = {}
+        self.decoder = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="gbn_frame_history_decoder")
+
+    def push(self, mat: Image_t, timestamp: Optional[float] = None):
+        """Records a displayed frame. The array must not be modified afterwards, it is encoded asynchronously."""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        seq = self.next_seq
+        self.next_seq += 1
+        self.stats.pushed += 1
+        try:
+            self.encode_queue.put_nowait((seq, timestamp, mat))
+        except queue.Full:
+            self.stats.dropped += 1
+
+    def _run_encoder(self):
+        while True:
+            item = self.encode_queue.get()
+            if item is None:
+                return
+            seq, timestamp, mat = item
+            tic = time.perf_counter()
+            ret, data = cv2.imencode(self.codec, mat, self.encode_params)
+            encode_time = time.perf_counter() - tic
+            if not ret:
+                continue
+            with self.lock:
+                self.frames.append(EncodedFrame(seq, timestamp, data))
+                self.nbytes += data.nbytes
+                self.stats.encoded += 1
+                self.stats.encode_time_total += encode_time
+                self._evict(timestamp)
+
+    def _evict(self, now: float):
+        while len(self.frames) > 1 and (self.nbytes > self.max_bytes or now - self.frames[0].timestamp > self.max_seconds):
+            frame = self.frames.popleft()
+            self.nbytes -= frame.data.nbytes
+            self.stats.evicted += 1
+
+    def get_stats(self) -> FrameHistoryStats:
+        with self.lock:
+            return dataclasses.replace(self.stats, nbytes=self.nbytes, count=len(self.frames))
+
+    def get_seq_range(self) -> Optional[tuple[int, int]]:
+        """Sequence numbers of the oldest and the newest recorded frames, None if the history is empty"""
+        with self.lock:
+            if len(self.frames) == 0:
+                return None
+            return self.frames[0].seq, self.frames[-1].seq
+
+    def _find(self, seq: int) -> Optional[EncodedFrame]:
+        """
+        Frame with the highest sequence number <= seq (frames may be missing after drops), or the oldest frame if seq was evicted.
+        Binary search, the lock must be held.
+        """
+        lo, hi = 0, len(self.frames)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.frames[mid].seq <= seq:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo > 0:
+            return self.frames[lo - 1]
+        return self.frames[0] if len(self.frames) > 0 else None
+
+    def _decode(self, seq: int) -> Optional[Image_t]:
+        with self.lock:
+            frame = self._find(seq)
+        if frame is None:
+            return None
+        mat: Optional[Image_t] = cv2.imdecode(frame.data, cv2.IMREAD_UNCHANGED)  # type: ignore
+        return mat
+
+    def get_frame(self, seq: int) -> Optional[Image_t]:
+        """Decoded frame for seq (or the closest older recorded one). Starts decoding the neighbouring frames ahead of the next requests."""
+        seq_range = self.get_seq_range()
+        if seq_range is not None:
+            seq = min(max(seq, seq_range[0]), seq_range[1])  # the decoded cache may still hold evicted frames
+        self._collect_decoded()
+        mat = self.decoded.get(seq, None)
+        if mat is not None:
+            self.decoded.move_to_end(seq)
+        else:
+            future = self.decode_futures.pop(seq, None)
+            mat = future.result() if future is not None else self._decode(seq)
+            if mat is not None:
+                self._cache_decoded(seq, mat)
+
+        if seq_range is not None:
+            for offset in range(1, FrameHistory.DECODE_AHEAD + 1):
+                for neighbour in (seq + offset, seq - offset):
+                    if seq_range[0] <= neighbour <= seq_range[1] and neighbour not in self.decoded and neighbour not in self.decode_futures:
+                        self.decode_futures[neighbour] = self.decoder.submit(self._decode, neighbour)
+        return mat
+
+    def _cache_decoded(self, seq: int, mat: Image_t):
+        self.decoded[seq] = mat
+        while len(self.decoded) > FrameHistory.DECODED_CACHE_SIZE:
+            self.decoded.popitem(last=False)
+
+    def _collect_decoded(self):
+        for seq, future in list(self.decode_futures.items()):
+            if future.done():
+                self.decode_futures.pop(seq)
+                mat = future.result()
+                if mat is not None:
+                    self._cache_decoded(seq, mat)
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.nbytes = 0
+        self.decoded.clear()
+
+    def close(self):
+        """Stops the encoder and decoder threads"""
+        self.encode_queue.put(None)
+        self.encoder_thread.join()
+        for future in self.decode_futures.values():
+            future.cancel()
+        self.decode_futures = {}
+        self.decoder.shutdown(wait=True)
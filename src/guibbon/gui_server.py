@@ -0,0 +1,310 @@
+import atexit
+import concurrent.futures
+import dataclasses
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from .shared_frames import SharedFrameWriter
+from .typedef import Image_t
+
+
+@dataclasses.dataclass(frozen=True)
+class CallbackRef:
+    """Placeholder of a callback of the client process in the arguments of a call, see GuiClient.call(...)"""
+
+    callback_id: int
+
+
+def is_plain(value: Any) -> bool:
+    """True if value can be sent back to the client: widgets, overlays and other objects owning Tk resources stay in the GUI process"""
+    if value is None or isinstance(value, (bool, int, float, str, np.ndarray, np.generic)):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(is_plain(item) for item in value)
+    if isinstance(value, dict):
+        return all(is_plain(key) and is_plain(item) for key, item in value.items())
+    return False
+
+
+class GuiServer:
+    """
+    Runs in the GUI process and executes the calls of a GuiClient: functions of the namespace (the guibbon module by default) called with the
+    window name as first argument. Callbacks given by the client are replaced by functions sending their arguments back through the pipe.
+    Messages from the client: ("call", call_id, name, args, kwargs) and ("quit",).
+    Messages to the client: ("result", call_id, value), ("error", call_id, exception), ("callback", callback_id, args), ("key", key) and
+    ("closed", winname).
+    """
+
+    POLL_INTERVAL = 0.005  # seconds, maximum wait for a message between two GUI updates
+
+    def __init__(self, conn: Connection, namespace: Any):
+        self.conn = conn
+        self.namespace = namespace
+        self.is_running = True
+
+    def send(self, message: tuple[Any, ...]):
+        self.conn.send(message)
+
+    def make_callback(self, ref: CallbackRef) -> Callable[..., None]:
+        def callback(*args):
+            self.send(("callback", ref.callback_id, args))
+
+        return callback
+
+    def resolve(self, value: Any) -> Any:
+        if isinstance(value, CallbackRef):
+            return self.make_callback(value)
+        if isinstance(value, (list, tuple)):
+            return type(value)(self.resolve(item) for item in value)
+        if isinstance(value, dict):
+            return {key: self.resolve(item) for key, item in value.items()}
+        return value
+
+    def handle(self, message: tuple[Any, ...]):
+        if message[0] == "quit":
+            self.is_running = False
+            return
+        _, call_id, name, args, kwargs = message
+        try:
+            if name.startswith("_"):
+                raise AttributeError(f"{name} can not be called remotely")
+            result = getattr(self.namespace, name)(*self.resolve(args), **self.resolve(kwargs))
+            self.send(("result", call_id, result if is_plain(result) else None))
+        except Exception as e:
+            self.send(("error", call_id, e))
+
+    def pump(self):
+        """Updates the GUI between messages"""
+        pass
+
+    def serve_forever(self):
+        while self.is_running:
+            try:
+                while self.is_running and self.conn.poll(GuiServer.POLL_INTERVAL):
+                    self.handle(self.conn.recv())
+            except (EOFError, OSError):
+                return  # the client process exited
+            self.pump()
+
+
+class TkGuiServer(GuiServer):
+    """GuiServer of the guibbon windows: the Tk event loop runs between messages and the key presses are forwarded to the client"""
+
+    def __init__(self, conn: Connection, namespace: Any):
+        super().__init__(conn, namespace)
+        self.winnames: set[str] = set()
+
+    def pump(self):
+        Guibbon = self.namespace.Guibbon
+        if Guibbon.is_alive:
+            Guibbon.root.update_idletasks()
+            Guibbon.root.update()  # root can be destroyed at this line
+        while Guibbon.is_alive and (event := Guibbon.keyboard.pop_event()) is not None:
+            self.send(("key", event.key))
+        winnames = set(Guibbon.instances.keys()) if Guibbon.is_alive else set()
+        for winname in self.winnames - winnames:
+            self.send(("closed", winname))
+        self.winnames = winnames
+
+
+def run_server(conn: Connection):
+    """Entry point of the GUI process"""
+    import guibbon  # the whole GUI is only imported and initialized in this process
+
+    TkGuiServer(conn, guibbon).serve_forever()
+
+
+class GuiClient:
+    """
+    Starts the GUI in a child process and calls the guibbon functions there. Frames given to imshow travel through a shared memory ring per window
+    (see SharedFrameWriter), the other calls and their results through a pipe.
+    Callbacks (sliders, buttons, mouse, ...) are called in the thread calling waitKeyEx(...), like with the in-process GUI, while the GUI stays
+    responsive whatever the client is doing.
+    With the "spawn" start method (the default, and the only one on Windows and macOS), the child process imports the main module of the client:
+    the script creating the client must guard its entry point with if __name__ == "__main__":, else the child process starts the script again.
+    """
+
+    instance: Optional["GuiClient"] = None
+
+    @staticmethod
+    def get_instance() -> "GuiClient":
+        if GuiClient.instance is None or not GuiClient.instance.is_alive():
+            GuiClient.instance = GuiClient()
+            atexit.register(GuiClient.instance.close)
+        return GuiClient.instance
+
+    def __init__(self, server: Callable[[Connection], None] = run_server, start_method: str = "spawn"):
+        self.conn, server_conn = multiprocessing.Pipe(duplex=True)
+        context: Any = multiprocessing.get_context(start_method)
+        self.process = context.Process(target=server, args=(server_conn,), name="gbn_gui_server", daemon=True)
+        self.process.start()
+        server_conn.close()
+
+        self.send_lock = threading.Lock()
+        self.call_ids = itertools.count()
+        self.pending_lock = threading.Lock()  # pending_calls and is_closed, shared with the receiver thread
+        self.pending_calls: dict[int, concurrent.futures.Future[Any]] = {}
+        self.is_closed = False  # the connection to the GUI process is lost, no call can be answered anymore
+        self.callbacks: dict[int, Callable[..., Any]] = {}
+        self.events: queue.Queue[tuple[Any, ...]] = queue.Queue()  # callbacks and keys, dispatched by waitKeyEx(...)
+        self.closed_winnames: set[str] = set()
+        self.frame_writers: dict[str, SharedFrameWriter] = {}
+
+        self.receiver_thread = threading.Thread(target=self._receive, name="gbn_gui_client", daemon=True)
+        self.receiver_thread.start()
+
+    def is_alive(self) -> bool:
+        return bool(self.process.is_alive())
+
+    def _receive(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            kind = message[0]
+            if kind in ("result", "error"):
+                with self.pending_lock:
+                    future = self.pending_calls.pop(message[1], None)
+                if future is None:
+                    continue
+                if kind == "result":
+                    future.set_result(message[2])
+                else:
+                    future.set_exception(message[2])
+            else:
+                self.events.put(message)
+        # closed first: a call made from now on fails instead of waiting for a result which will never come
+        with self.pending_lock:
+            self.is_closed = True
+            futures, self.pending_calls = list(self.pending_calls.values()), {}
+        for future in futures:
+            future.set_exception(ConnectionError("The GUI process exited"))
+
+    def _encode(self, value: Any) -> Any:
+        if callable(value):
+            callback_id = len(self.callbacks)
+            self.callbacks[callback_id] = value
+            return CallbackRef(callback_id)
+        if isinstance(value, (list, tuple)):
+            return type(value)(self._encode(item) for item in value)
+        if isinstance(value, dict):
+            return {key: self._encode(item) for key, item in value.items()}
+        return value
+
+    def call(self, name: str, *args, **kwargs) -> Any:
+        """Calls the function name of the GUI process and returns its result, or None if it can not leave the GUI process (widgets, ...)"""
+        call_id = next(self.call_ids)
+        future: concurrent.futures.Future[Any] = concurrent.futures.Future()
+        with self.pending_lock:
+            if self.is_closed:
+                raise ConnectionError("The GUI process exited")
+            self.pending_calls[call_id] = future
+        try:
+            with self.send_lock:
+                self.conn.send(("call", call_id, name, self._encode(args), self._encode(kwargs)))
+        except (BrokenPipeError, OSError) as e:
+            with self.pending_lock:
+                self.pending_calls.pop(call_id, None)
+            raise ConnectionError("The GUI process exited") from e
+        return future.result()
+
+    def imshow(self, winname: str, mat: Image_t):
+        """Writes the frame in the shared memory ring of the window, which is created (or enlarged) on demand"""
+        writer = self.frame_writers.get(winname, None)
+        h, w = mat.shape[:2]
+        if writer is None or h > writer.max_shape_hw[0] or w > writer.max_shape_hw[1]:
+            max_shape_hw = (h, w) if writer is None else (max(h, writer.max_shape_hw[0]), max(w, writer.max_shape_hw[1]))
+            new_writer = SharedFrameWriter(max_shape_hw)
+            new_writer.write(mat)
+            self.call("attach_shared_frames", winname, new_writer.name)
+            if writer is not None:
+                writer.close()
+            self.frame_writers[winname] = new_writer
+        else:
+            writer.write(mat)
+        self.closed_winnames.discard(winname)
+
+    def dispatch(self, message: tuple[Any, ...]) -> Optional[int]:
+        """Handles an event of the GUI process, returns the key if it is a key press"""
+        kind = message[0]
+        if kind == "callback":
+            self.callbacks[message[1]](*message[2])
+        elif kind == "key":
+            return int(message[1])
+        elif kind == "closed":
+            self.closed_winnames.add(message[1])
+        return None
+
+    def waitKeyEx(self, delay: int) -> int:
+        """Calls the pending callbacks and waits for a key press for delay ms (forever if delay <= 0). Returns -1 if no key was pressed."""
+        deadline = time.perf_counter() + delay / 1000 if delay > 0 else None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            try:
+                message = self.events.get(timeout=timeout)
+            except queue.Empty:
+                return -1
+            key = self.dispatch(message)
+            if key is not None:
+                return key
+            if not self.is_alive() and self.events.empty():
+                return -1
+
+    def close(self):
+        if self.process.is_alive():
+            with self.send_lock:
+                try:
+                    self.conn.send(("quit",))
+                except (BrokenPipeError, OSError):
+                    pass
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.conn.close()
+        for writer in self.frame_writers.values():
+            writer.close()
+        self.frame_writers = {}
+
+
+class WindowProxy:
+    """
+    Window of the GUI process, with the API of the guibbon module without the window name:
+        window = gbn.create_window("win", out_of_process=True)
+        window.create_slider("threshold", list(range(256)), on_change=lambda index, value: ...)
+        window.imshow(frame)
+        key = window.waitKeyEx(1)
+    Results that can not leave the GUI process (widgets, overlays) are returned as None.
+    """
+
+    def __init__(self, client: GuiClient, winname: str):
+        self.client = client
+        self.winname = winname
+
+    def imshow(self, mat: Image_t):
+        self.client.imshow(self.winname, mat)
+
+    def waitKeyEx(self, delay: int) -> int:
+        return self.client.waitKeyEx(delay)
+
+    def waitKey(self, delay: int) -> int:
+        return self.client.waitKeyEx(delay)  # same as waitKeyEx, like gbn.waitKey
+
+    def is_open(self) -> bool:
+        return self.client.is_alive() and self.winname not in self.client.closed_winnames
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self.client.call(name, self.winname, *args, **kwargs)
+
+        return call
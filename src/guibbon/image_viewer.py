@@ -1,20 +1,48 @@
+import contextlib
 import dataclasses
 import enum
 import math
+import time
 import tkinter as tk
 import types
-from typing import Any, Optional
+from typing import Any, Callable, Optional, Iterator, Sequence
 
 import cv2
 import numpy as np
-from PIL import Image, ImageTk
 
 from . import interactive_overlays
 from . import mouse_pan
+from . import overlay_io
 from . import transform_matrix as tm
 from . import wrapped_tk_widgets as wtk
+from .display_backend import DisplayBackend, TkDisplay
+from .edit_history import EditHistory
+from .frame_history import FrameHistory
+from .overlay_rasterizer import OverlayRasterizer, is_rasterizable
+from .recorder import VideoRecorder, RecorderStats
+from .shared_frames import SharedFrameReader
 from .transform_matrix import TransformMatrix
-from .typedef import Image_t, CallbackPoint, CallbackPolygon, CallbackRect, Point2D, Point2DList, CallbackMouse
+from .typedef import Image_t, CallbackPoint, CallbackPolygon, CallbackRect, Point2D, Point2DList, CallbackMouse, CallbackPointCloud, Point2DArray
+
+
+def to_rgb(mat: Image_t) -> Image_t:
+    """Converts an image given to imshow (BGR or grayscale, uint8 or float in [0, 1]) to the uint8 RGB image displayed by the viewer"""
+    if mat.dtype == float:
+        mat = (np.clip(mat, 0, 1) * 255).astype(np.uint8)
+    mat_rgb: Image_t = cv2.cvtColor(mat, cv2.COLOR_BGR2RGB)  # type: ignore
+    return mat_rgb
+
+
+@dataclasses.dataclass
+class RenderStats:
+    rendered: int = 0
+    render_time_total: float = 0.0  # seconds, warp, compositing and drawing of the overlays
+    render_time_max: float = 0.0
+    skipped: int = 0  # frames given to imshow and never rendered, replaced by a newer one while the window was hidden or waiting for a scheduler
+
+    @property
+    def render_time_mean(self) -> float:
+        return self.render_time_total / self.rendered if self.rendered > 0 else 0.0
 
 
 class MODE(enum.IntEnum):
@@ -23,6 +51,71 @@ class MODE(enum.IntEnum):
     P100 = enum.auto()
 
 
+def get_home_zoom_factor(mode: MODE, canvas_shape_hw: tuple[int, int], img_shape_hw: tuple[int, int]) -> float:
+    canh, canw = canvas_shape_hw
+    imgh, imgw = img_shape_hw
+    if mode == MODE.FIT:
+        return min(canh / imgh, canw / imgw)
+    elif mode == MODE.FILL:
+        return max(canh / imgh, canw / imgw)
+    elif mode == MODE.P100:
+        return 1.0
+    raise ValueError(f"unknown mode. Expected on of {MODE}, got {mode}")
+
+
+def compute_img2can_matrix(canvas_shape_hw: tuple[int, int], img_shape_hw: tuple[int, int], zoom_factor: float, pan_xy: Point2D) -> TransformMatrix:
+    """Image to canvas transform: the image center is zoomed, panned and placed at the canvas center"""
+    canh, canw = canvas_shape_hw
+    imgh, imgw = img_shape_hw
+    img_center_matrix: TransformMatrix = tm.T((imgw / 2, imgh / 2))
+    can_center_matrix: TransformMatrix = tm.T((canw / 2, canh / 2))
+    pan_and_zoom_matrix: TransformMatrix = tm.S((zoom_factor, zoom_factor)) @ tm.T(pan_xy)
+    img2can_matrix: TransformMatrix = can_center_matrix @ pan_and_zoom_matrix @ np.linalg.inv(img_center_matrix)
+    return img2can_matrix
+
+
+def compute_visible_roi(img2can_matrix: TransformMatrix, canvas_shape_hw: tuple[int, int], img_shape_hw: tuple[int, int]) -> Optional[interactive_overlays.Rect]:
+    """Rectangle of the canvas covered by the image, None if the image is out of view"""
+    imgh, imgw = img_shape_hw
+    return interactive_overlays.project_rect((0, 0, imgw, imgh), img2can_matrix, canvas_shape_hw)
+
+
+@dataclasses.dataclass(frozen=True)
+class ViewTransform:
+    """Pan and zoom of a viewer for a given canvas size and image size, shared by the viewers of a ViewLink"""
+
+    img2can_matrix: TransformMatrix
+    can2img_matrix: TransformMatrix
+    visible_roi: Optional[interactive_overlays.Rect]  # see compute_visible_roi(...)
+
+
+def compute_view_transform(canvas_shape_hw: tuple[int, int], img_shape_hw: tuple[int, int], zoom_factor: float, pan_xy: Point2D) -> ViewTransform:
+    img2can_matrix = compute_img2can_matrix(canvas_shape_hw, img_shape_hw, zoom_factor, pan_xy)
+    can2img_matrix = np.linalg.inv(img2can_matrix).astype(float)
+    return ViewTransform(img2can_matrix, can2img_matrix, compute_visible_roi(img2can_matrix, canvas_shape_hw, img_shape_hw))
+
+
+def warp_viewport(
+    mat: Image_t,
+    img2can_matrix: TransformMatrix,
+    canvas_shape_hw: tuple[int, int],
+    cv2_interpolation: int = cv2.INTER_LINEAR,
+    visible_roi: Optional[interactive_overlays.Rect] = None,
+) -> Image_t:
+    """
+    Part of the image visible on the canvas, in canvas space.
+    visible_roi: see compute_visible_roi(...), only this rectangle is warped when the image doesn't cover the whole canvas, the rest is black.
+    """
+    canh, canw = canvas_shape_hw
+    if visible_roi is None or visible_roi == (0, 0, canw, canh):
+        viewport: Image_t = cv2.warpPerspective(mat, img2can_matrix, dsize=(canw, canh), flags=cv2_interpolation)  # type: ignore
+        return viewport
+    x0, y0, x1, y1 = visible_roi
+    viewport = np.zeros(shape=(canh, canw) + mat.shape[2:], dtype=mat.dtype)
+    viewport[y0:y1, x0:x1] = cv2.warpPerspective(mat, tm.T((-x0, -y0)) @ img2can_matrix, dsize=(x1 - x0, y1 - y0), flags=cv2_interpolation)  # type: ignore
+    return viewport
+
+
 class ImageViewer:
     class BUTTONNUM(enum.IntEnum):
         LEFT = 1
@@ -52,15 +145,57 @@ class ImageViewer:
         MOUSE_BUTTON_2: bool = False
         MOUSE_BUTTON_3: bool = False
 
-    def __init__(self, master, height: int, width: int):
-        self.frame = tk.Frame(master=master)
-        self.canvas = tk.Canvas(master=self.frame, height=height, width=width, bg="gray10")
+    def __init__(self, master, height: int, width: int, display: Optional[DisplayBackend] = None, show_toolbar: bool = True):
+        """
+        display: creates the canvas and receives the composited viewport, shown on the canvas by default. With an OffscreenDisplay, the viewer needs
+        no Tk root (master is None): no widget is created around the canvas and get_rendered_view() returns the view as displayed.
+        show_toolbar: shows the zoom buttons below the canvas. See Dashboard for many viewers in one window.
+        """
+        self.display: DisplayBackend = TkDisplay() if display is None else display
+        self.is_headless = self.display.is_headless
+        self.frame: tk.Frame  # not created by a headless display
+        if not self.is_headless:
+            self.frame = tk.Frame(master=master)
+        self.canvas = self.display.create_canvas(None if self.is_headless else self.frame, height, width)
         self.canvas_shape_hw = (height, width)
 
-        self.imgtk: ImageTk.PhotoImage
         self.onMouse: CallbackMouse = None
         self.modifier = ImageViewer.Modifier()
         self.interactive_overlay_instance_list: list[Any] = []
+        self.update_batch = interactive_overlays.UpdateBatch()
+        self.is_draw_pending = False
+        self.is_draw_scheduled = False
+        self.is_render_scheduled = False
+        self.layers = interactive_overlays.LayerStack(self.canvas)
+        self.display.set_layers(self.layers)
+        self.rasterizer = OverlayRasterizer(on_request_render=self.schedule_render_viewport, layers=self.layers)
+        self.imshow_mask: Optional[interactive_overlays.MaskOverlay] = None  # mask given to imshow(...)
+        self.history = EditHistory()
+        self.frame_history: Optional[FrameHistory] = None  # recording of the displayed frames, see enable_frame_history(...)
+        self.is_scrubbing = False
+        self.is_timeline_grabbed = False
+        self.live_frame: Optional[tuple[Any, ...]] = None  # last arguments of imshow received while scrubbing
+        self.timeline_frame: Optional[tk.Frame] = None
+        self.timeline_scale: Optional[tk.Scale] = None
+        self.recorder: Optional[VideoRecorder] = None  # see start_recording(...)
+        self.recording_start_time = 0.0
+        self.recording_frames = 0  # frames queued to the recorder, repeated frames included
+        self.recording_after_id: Optional[str] = None
+        self.shared_frames: Optional[SharedFrameReader] = None  # see attach_shared_frames(...)
+        self.shared_frame_seq = -1  # sequence number of the displayed shared frame
+        self.is_mat_shared = False  # mat is a view on a slot of the shared frame ring, see draw_shared_frame()
+        self.shared_frames_poll_ms = 5
+        self.shared_frames_after_id: Optional[str] = None
+        self.stats = RenderStats()
+        self.is_mapped = True  # updated by the <Map> and <Unmap> events of the canvas, e.g. when its pane is removed from the grid
+        self.is_toplevel_mapped = True  # updated by the <Map> and <Unmap> events of the window, e.g. when it is minimized or withdrawn
+        self.is_obscured = False  # updated by the <Visibility> events of the canvas
+        self.pending_frame: Optional[tuple[Any, ...]] = None  # last arguments of imshow not rendered yet, see defer_frame(...)
+        self.render_scheduler: Optional[Any] = None  # see set_render_scheduler(...)
+        self.view_link: Optional[Any] = None  # pan and zoom shared with other viewers, see ViewLink
+        self.visible_roi: Optional[interactive_overlays.Rect] = None  # rectangle of the canvas covered by the image
+        self.viewport_base: Image_t  # warped image, before compositing the masks and the rasterized overlays
+        self.viewport: Image_t  # image displayed on the canvas
         self.mode: Optional[MODE] = None
 
         self.mouse_pan_calculator = mouse_pan.MousePan(ImageViewer.BUTTONNUM.RIGHT, on_drag=self.on_mouse_pan_drag, on_release=self.on_mouse_pan_release)
@@ -75,6 +210,15 @@ class ImageViewer:
 
         self.set_img2can_matrix(tm.identity_matrix())
 
+        self.toolbar_frame: tk.Frame
+        self.zoom_entry: Optional[wtk.Entry] = None
+        self.is_mouse_panzoom_enabled: Optional[tk.BooleanVar] = None  # enabled if None
+        self.toplevel: Optional[tk.Misc] = None
+        if not self.is_headless:
+            self.create_widgets(show_toolbar)
+
+    def create_widgets(self, show_toolbar: bool):
+        """Toolbar and event bindings around the canvas of a window"""
         self.canvas.pack(side=tk.TOP)
 
         self.toolbar_frame = tk.Frame(master=self.frame)
@@ -95,7 +239,8 @@ class ImageViewer:
         # self.mouse_panzoom_checkbutton.configure(state='selected')
         # self.mouse_panzoom_checkbutton.state(["selected"])
 
-        self.toolbar_frame.pack(side=tk.TOP, fill=tk.X)
+        if show_toolbar:
+            self.toolbar_frame.pack(side=tk.TOP, fill=tk.X)
 
         # <MODIFIER-MODIFIER-TYPE-DETAIL>
         # see https://dafarry.github.io/tkinterbook/tkinter-events-and-bindings.htm
@@ -103,6 +248,139 @@ class ImageViewer:
         self.canvas.bind("<ButtonPress>", self.on_event)
         self.canvas.bind("<ButtonRelease>", self.on_event)
         self.canvas.bind("<MouseWheel>", self.on_event)
+        self.canvas.bind("<Map>", self.on_visibility_event)
+        self.canvas.bind("<Unmap>", self.on_visibility_event)
+        self.canvas.bind("<Visibility>", self.on_visibility_event)
+        # minimizing or withdrawing the window unmaps the toplevel only, its descendants stay mapped
+        self.toplevel = self.canvas.winfo_toplevel()
+        self.toplevel.bind("<Map>", self.on_visibility_event, add="+")
+        self.toplevel.bind("<Unmap>", self.on_visibility_event, add="+")
+
+    def set_zoom_entry(self):
+        if self.zoom_entry is not None and not self.zoom_entry.is_focus:
+            self.zoom_entry.set(f"{int(self.zoom_factor * 100 ** 2) / 100}")
+
+    def unfocus_zoom_entry(self):
+        if self.zoom_entry is not None:
+            self.zoom_entry.is_focus = False  # focus out to allow auto update
+
+    def is_hidden(self) -> bool:
+        return not self.is_mapped or not self.is_toplevel_mapped or self.is_obscured
+
+    def on_visibility_event(self, event):
+        if event.widget is self.toplevel:
+            # the bindings of the toplevel also receive the events of all its descendants, hence the filter
+            if not self.canvas.winfo_exists():
+                return  # viewer destroyed, its window is still alive
+            if event.type == tk.EventType.Map:
+                self.is_toplevel_mapped = True
+            elif event.type == tk.EventType.Unmap:
+                self.is_toplevel_mapped = False
+        elif event.widget is not self.canvas:
+            return
+        elif event.type == tk.EventType.Map:
+            self.is_mapped = True
+        elif event.type == tk.EventType.Unmap:
+            self.is_mapped = False
+        elif event.type == tk.EventType.Visibility:
+            self.is_obscured = event.state == "VisibilityFullyObscured"
+        if not self.is_hidden() and self.view_link is not None and self in self.view_link.dirty_viewers:
+            self.view_link.schedule_redraw()  # panned or zoomed while hidden
+        if not self.is_hidden() and self.pending_frame is not None and self.render_scheduler is None:
+            (mat, is_rgb, mode, cv2_interpolation, mask, palette, alpha), self.pending_frame = self.pending_frame, None
+            self.stats.skipped -= 1  # the last frame is rendered now
+            if is_rgb:
+                self.imshow_rgb(mat, mode, cv2_interpolation, mask, palette, alpha)
+            else:
+                self.imshow(mat, mode, cv2_interpolation, mask, palette, alpha)
+
+    def defer_frame(self, mat: Image_t, is_rgb: bool, *args) -> bool:
+        """
+        Keeps a reference to the frame instead of rendering it if the window is hidden (minimized, withdrawn or fully obscured) or if the viewer is
+        rendered by a RenderScheduler. Only the newest frame is rendered, once, when the window is shown again or by the scheduler.
+        """
+        if self.frame_history is not None:  # the frame history records every frame
+            return False
+        if not self.is_hidden() and self.render_scheduler is None:
+            return False
+        self.pending_frame = (mat, is_rgb, *args)
+        self.stats.skipped += 1
+        return True
+
+    def set_render_scheduler(self, scheduler):
+        """imshow(...) only keeps the newest frame, converted and warped by a worker thread of the scheduler, see RenderScheduler"""
+        self.render_scheduler = scheduler
+        scheduler.add(self)
+
+    def is_render_pending(self) -> bool:
+        return self.pending_frame is not None
+
+    def begin_render(self) -> Callable[[], tuple[Any, ...]]:
+        """Takes the pending frame and returns its conversion and warp, run by a worker thread. The result is given to end_render(...)"""
+        assert self.pending_frame is not None
+        (mat, is_rgb, mode, cv2_interpolation, mask, palette, alpha), self.pending_frame = self.pending_frame, None
+        self.stats.skipped -= 1
+        if self.mode is None:
+            self.mode = mode
+        self.cv2_interpolation = cv2.INTER_LINEAR if cv2_interpolation is None else cv2_interpolation
+        self.init_panzoom(mat.shape[:2])
+        canvas_shape_hw = self.canvas_shape_hw
+        interpolation = self.cv2_interpolation
+        transform = self.get_view_transform(mat.shape[:2])
+
+        def render() -> tuple[Any, ...]:
+            mat_rgb = mat if is_rgb else to_rgb(mat)
+            viewport_base = warp_viewport(mat_rgb, transform.img2can_matrix, canvas_shape_hw, interpolation, transform.visible_roi)
+            return mat_rgb, transform, viewport_base, (mask, palette, alpha)
+
+        return render
+
+    def end_render(self, result: tuple[Any, ...]):
+        """Composites and displays the viewport warped by begin_render(...), in the Tk thread"""
+        mat_rgb, transform, viewport_base, (mask, palette, alpha) = result
+        tic = time.perf_counter()
+        self.mat = mat_rgb
+        self.is_mat_shared = False
+        self.set_imshow_mask(mask, palette, alpha)
+        current_transform = self.get_view_transform(mat_rgb.shape[:2])
+        is_outdated = viewport_base.shape[:2] != self.canvas_shape_hw or (
+            current_transform is not transform and not np.array_equal(current_transform.img2can_matrix, transform.img2can_matrix)
+        )
+        if self.update_batch.is_active():
+            self.draw()  # drawn at the end of the batch
+            return
+        if is_outdated:
+            # resized, panned or zoomed while rendering: rendered again by the scheduler, within its frame budget, unless a newer frame is pending
+            if self.pending_frame is None:
+                self.pending_frame = (mat_rgb, True, self.mode, self.cv2_interpolation, mask, palette, alpha)
+                self.stats.skipped += 1
+            return
+        self.set_zoom_entry()
+        self.set_view_transform(transform)
+        self.viewport_base = viewport_base
+        self.present_viewport_base()
+        self.count_render(time.perf_counter() - tic)
+
+    def resize(self, height: int, width: int):
+        """Changes the size of the canvas. The zoom relative to the home zoom (e.g. fit) is kept, except for linked viewers."""
+        canvas_shape_hw = (max(1, height), max(1, width))
+        if canvas_shape_hw == self.canvas_shape_hw:
+            return
+        previous_shape_hw, self.canvas_shape_hw = self.canvas_shape_hw, canvas_shape_hw
+        self.canvas.configure(height=canvas_shape_hw[0], width=canvas_shape_hw[1])
+        if not hasattr(self, "mat") or self.mode is None:
+            return
+        if self.view_link is not None:
+            self.view_link.invalidate(self)
+            return
+        try:
+            self.zoom_factor *= get_home_zoom_factor(self.mode, canvas_shape_hw, self.mat.shape[:2]) / get_home_zoom_factor(self.mode, previous_shape_hw, self.mat.shape[:2])
+        except AttributeError:
+            pass
+        self.schedule_draw()
+
+    def get_stats(self) -> RenderStats:
+        return dataclasses.replace(self.stats)
 
     def setMouseCallback(self, onMouse, userdata=None):
         if not isinstance(onMouse, types.FunctionType) and not isinstance(onMouse, types.MethodType):
@@ -197,7 +475,19 @@ class ImageViewer:
         x, y = tm.apply(self.can2img_matrix, (event.x, event.y))
         param = None
 
-        if self.is_mouse_panzoom_enabled.get():
+        brush_mask = self.get_brush_mask()
+        if brush_mask is not None and (is_motion or ((is_buttonpress or is_buttonrelease) and is_left)):
+            brush_mask.on_brush_event(event.type, (x, y), is_button_down=event.state & ImageViewer.EVENTSTATE.MOUSE_BUTTON_1 > 0)
+
+        if is_motion and self.rasterizer.is_enabled and self.rasterizer.update_hovered((event.x, event.y), self.img2can_matrix):
+            # the overlay under the cursor becomes a live canvas item, the others are rasterized
+            self.rasterizer.is_rendering = True
+            try:
+                self.render_viewport()
+            finally:
+                self.rasterizer.is_rendering = False
+
+        if self.is_mouse_panzoom_enabled is None or self.is_mouse_panzoom_enabled.get():
             if is_mousewheel:
                 # mouse wheel zoom
                 step = 0.2
@@ -211,8 +501,8 @@ class ImageViewer:
                 self.pan_xy = tuple(self.pan_xy - center2mouse_xy * (1 - zoom_gain))
                 self.cumulative_pan_xy = self.pan_xy
                 self.zoom_factor *= zoom_gain
-                self.zoom_entry.is_focus = False  # focus out to allow auto update
-                self.draw()
+                self.unfocus_zoom_entry()
+                self.on_panzoom_change()
             else:
                 # mouse panning
                 can2img_scale_matrix = tm.identity_matrix()
@@ -228,10 +518,19 @@ class ImageViewer:
             self.cumulative_pan_xy[0] + p1_xy[0] - p0_xy[0],
             self.cumulative_pan_xy[1] + p1_xy[1] - p0_xy[1],
         )
-        self.draw()
+        self.on_panzoom_change()
 
     def on_mouse_pan_release(self, p0_xy, p1_xy):
         self.cumulative_pan_xy = self.pan_xy
+        if self.view_link is not None:
+            self.view_link.set_panzoom(self.zoom_factor, self.pan_xy, self.cumulative_pan_xy)
+
+    def on_panzoom_change(self):
+        """Redraws after a pan or a zoom from the mouse or the toolbar. Linked viewers are redrawn together when Tk is idle, see ViewLink."""
+        if self.view_link is not None:
+            self.view_link.set_panzoom(self.zoom_factor, self.pan_xy, self.cumulative_pan_xy)
+        else:
+            self.draw()
 
     def on_mouse_zoom(self):
         pass
@@ -239,6 +538,180 @@ class ImageViewer:
     def set_img2can_matrix(self, img2can_matrix: TransformMatrix):
         self.img2can_matrix = img2can_matrix.copy()
         self.can2img_matrix = np.linalg.inv(self.img2can_matrix).astype(float)
+        self.visible_roi = None
+
+    def set_view_transform(self, transform: ViewTransform):
+        self.img2can_matrix = transform.img2can_matrix.copy()
+        self.can2img_matrix = transform.can2img_matrix.copy()
+        self.visible_roi = transform.visible_roi
+
+    def get_view_transform(self, img_shape_hw: tuple[int, int]) -> ViewTransform:
+        """Transform of the current pan and zoom, computed once for all the linked viewers with the same canvas and image sizes"""
+        if self.view_link is not None:
+            transform: ViewTransform = self.view_link.get_view_transform(self.canvas_shape_hw, img_shape_hw)
+            return transform
+        return compute_view_transform(self.canvas_shape_hw, img_shape_hw, self.zoom_factor, self.pan_xy)
+
+    def init_panzoom(self, img_shape_hw: tuple[int, int]):
+        """Sets the home pan and zoom if nothing was shown yet, and takes the pan and zoom of the linked viewers"""
+        try:
+            self.zoom_factor
+        except AttributeError:
+            if self.mode is None:
+                raise ValueError(f"unknown mode. Expected on of {MODE}, got None")
+            self.zoom_factor = get_home_zoom_factor(self.mode, self.canvas_shape_hw, img_shape_hw)
+            self.pan_xy = (0.0, 0.0)
+            self.cumulative_pan_xy = (0.0, 0.0)
+        if self.view_link is not None:
+            self.view_link.sync(self)
+
+    def add_interactive_overlay(self, overlay):
+        overlay.batch = self.update_batch
+        if is_rasterizable(overlay):
+            overlay.rasterizer = self.rasterizer
+        overlay.set_layers(self.layers)
+        if hasattr(overlay, "set_history"):
+            overlay.set_history(self.history)
+        self.interactive_overlay_instance_list.append(overlay)
+
+    def remove_overlay(self, overlay):
+        """Removes the overlay from the viewer and releases its canvas items, bindings and callbacks"""
+        self.interactive_overlay_instance_list.remove(overlay)
+        self._release_overlays([overlay])
+
+    def remove_overlays(self, label: Optional[str] = None, tag: Optional[str] = None):
+        """Removes all the overlays matching the given label and/or having a canvas item with the given tag"""
+        tagged_ids = set() if tag is None else set(self.canvas.find_withtag(tag))
+        kept_overlays: list[Any] = []
+        removed_overlays: list[Any] = []
+        for overlay in self.interactive_overlay_instance_list:
+            is_removed = (label is None or overlay.label == label) and (tag is None or not tagged_ids.isdisjoint(overlay.get_item_ids()))
+            (removed_overlays if is_removed else kept_overlays).append(overlay)
+        self.interactive_overlay_instance_list[:] = kept_overlays  # rebuilt once, not one list.remove(...) per overlay
+        self._release_overlays(removed_overlays)
+
+    def clear_overlays(self):
+        self.remove_overlays()
+
+    def _release_overlays(self, overlays: Sequence[Any]):
+        """Releases the canvas items, bindings, callbacks and edit history of overlays already removed from interactive_overlay_instance_list"""
+        self.history.forget(*overlays)
+        was_rasterized = False
+        for overlay in overlays:
+            if overlay is self.imshow_mask:
+                self.imshow_mask = None
+            self.update_batch.pending.pop(id(overlay), None)
+            if self.rasterizer.hovered_overlay is overlay:
+                self.rasterizer.hovered_overlay = None
+            was_rasterized = was_rasterized or getattr(overlay, "rasterized", False)
+            overlay.delete()
+        if was_rasterized:
+            self.schedule_draw()  # remove them from the raster layer
+
+    def get_overlay_count(self) -> int:
+        return len(self.interactive_overlay_instance_list)
+
+    def export_overlays(self, path, label: Optional[str] = None):
+        """Saves the type, label and vertices (img space) of the interactive overlays to a .npz or .json file, see overlay_io"""
+        overlays = [overlay for overlay in self.interactive_overlay_instance_list if label is None or overlay.label == label]
+        overlay_io.save_overlay_table(overlay_io.get_overlay_table(overlays), path)
+
+    def import_overlays(self, path) -> list[Any]:
+        """Loads the overlays saved by export_overlays(...) and returns them. Callbacks can be assigned afterwards (overlay.on_release = ...)."""
+        return self.create_overlays(overlay_io.load_overlay_table(path))
+
+    def create_overlays(self, table: overlay_io.OverlayTable) -> list[Any]:
+        """
+        Creates all the overlays of the table at once. The first update of each overlay is deferred to a single flush at the end, where the whole
+        scene is drawn once (and rasterized if the number of overlays exceeds the threshold of the rasterizer). The overlays which will be
+        rasterized are created without canvas items nor bindings, these are only created for the overlays going live (hovered or dragged).
+        """
+        img2can_matrix, batch = self.img2can_matrix, self.update_batch
+        n_rasterizable = sum(is_rasterizable(overlay) for overlay in self.interactive_overlay_instance_list)
+        n_rasterizable += int(np.count_nonzero(table.kinds != overlay_io.OverlayKind.POINT_CLOUD))  # point clouds are not rasterized
+        rasterized = n_rasterizable > self.rasterizer.threshold
+        overlays: list[Any] = []
+        with self.batch():
+            for k in range(len(table)):
+                kind = overlay_io.OverlayKind(int(table.kinds[k]))
+                label = table.labels[k]
+                vertices = table.get_vertices(k)
+                overlay: Any
+                if kind == overlay_io.OverlayKind.POINT:
+                    point_xy = (float(vertices[0, 0]), float(vertices[0, 1]))
+                    overlay = interactive_overlays.Point(self.canvas, point_xy, label, img2can_matrix=img2can_matrix, rasterized=rasterized)
+                elif kind == overlay_io.OverlayKind.POLYGON:
+                    point_xy_list = [(x, y) for x, y in vertices.tolist()]
+                    overlay = interactive_overlays.Polygon(self.canvas, point_xy_list, label, img2can_matrix=img2can_matrix, batch=batch, rasterized=rasterized)
+                elif kind == overlay_io.OverlayKind.RECTANGLE:
+                    (x0, y0), (x1, y1) = vertices.tolist()
+                    overlay = interactive_overlays.Rectangle(self.canvas, (x0, y0), (x1, y1), label, img2can_matrix=img2can_matrix, batch=batch, rasterized=rasterized)
+                elif kind == overlay_io.OverlayKind.CONTOUR:
+                    point_xy_list = [(x, y) for x, y in vertices.tolist()]
+                    overlay = interactive_overlays.Contour(self.canvas, point_xy_list, label, img2can_matrix=img2can_matrix, batch=batch, rasterized=rasterized)
+                else:
+                    overlay = interactive_overlays.PointCloud(self.canvas, vertices, label, img2can_matrix=img2can_matrix)
+                self.add_interactive_overlay(overlay)
+                overlay.update()
+                overlays.append(overlay)
+            if hasattr(self, "mat") and len(overlays) > 0:
+                self.is_draw_pending = True
+        return overlays
+
+    def undo(self) -> bool:
+        """Reverts the last move of a vertex or brush stroke. Returns False if there is nothing to undo."""
+        with self.batch():
+            return self.history.undo()
+
+    def redo(self) -> bool:
+        with self.batch():
+            return self.history.redo()
+
+    def set_history_budget(self, max_bytes: int):
+        """Max memory used by the undo/redo history. The oldest edits are evicted first."""
+        self.history.set_max_bytes(max_bytes)
+
+    def set_layer_visible(self, layer: interactive_overlays.Layer, value: bool):
+        """
+        Shows/hides all the items of a layer at once. Only the overlays with live canvas items are updated, the rasterized ones are drawn again as
+        a whole by the rasterizer, which hides the lines and handles of the hidden layers.
+        """
+        if value == self.layers.is_visible(layer):
+            return
+        self.layers.set_visible(layer, value)
+        for overlay in self.interactive_overlay_instance_list:
+            if not getattr(overlay, "rasterized", False):
+                overlay.update()
+        if self.rasterizer.is_enabled:
+            self.schedule_draw()
+
+    def set_layer_order(self, order: Sequence[interactive_overlays.Layer]):
+        """order: all the layers, from bottom to top"""
+        self.layers.set_order(order)
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Context manager deferring the redraws of the image and of the overlays until the end of the block, where a single coalesced flush is done.
+        Batches can be nested, only the outermost one flushes.
+        """
+        self.update_batch.depth += 1
+        try:
+            yield
+        finally:
+            self.update_batch.depth -= 1
+            if not self.update_batch.is_active():
+                self.flush()
+
+    def flush(self):
+        pending_overlays = self.update_batch.pop_pending()
+        if self.is_draw_pending:
+            # draw() updates all the overlays anyway
+            self.is_draw_pending = False
+            self.draw()
+            return
+        for overlay in pending_overlays:
+            overlay.update()
 
     def createInteractivePoint(
             self,
@@ -248,13 +721,31 @@ class ImageViewer:
             on_drag: CallbackPoint = None,
             on_release: CallbackPoint = None,
             magnet_points: Optional[Point2DList] = None,
-    ):
+    ) -> interactive_overlays.Point:
         magnets = None
         if magnet_points is not None:
             magnets = interactive_overlays.Magnets(self.canvas, magnet_points)
 
         ipoint = interactive_overlays.Point(self.canvas, point_xy, label, on_click, on_drag, on_release, magnets=magnets)
-        self.interactive_overlay_instance_list.append(ipoint)
+        self.add_interactive_overlay(ipoint)
+        return ipoint
+
+    def createInteractivePointCloud(
+            self,
+            points_xy: Point2DArray,
+            label="",
+            on_click: CallbackPointCloud = None,
+            on_drag: CallbackPointCloud = None,
+            on_release: CallbackPointCloud = None,
+            magnet_points: Optional[Point2DList] = None,
+    ) -> interactive_overlays.PointCloud:
+        magnets = None
+        if magnet_points is not None:
+            magnets = interactive_overlays.Magnets(self.canvas, magnet_points)
+
+        ipoint_cloud = interactive_overlays.PointCloud(self.canvas, points_xy, label, on_click, on_drag, on_release, magnets=magnets)
+        self.add_interactive_overlay(ipoint_cloud)
+        return ipoint_cloud
 
     def createInteractivePolygon(
             self,
@@ -270,9 +761,26 @@ class ImageViewer:
             magnets = interactive_overlays.Magnets(self.canvas, magnet_points)
 
         ipolygon = interactive_overlays.Polygon(self.canvas, point_xy_list, label, on_click, on_drag, on_release, magnets=magnets)
-        self.interactive_overlay_instance_list.append(ipolygon)
+        self.add_interactive_overlay(ipolygon)
         return ipolygon
 
+    def createInteractiveContour(
+            self,
+            point_xy_list,
+            label="",
+            on_click: CallbackPolygon = None,
+            on_drag: CallbackPolygon = None,
+            on_release: CallbackPolygon = None,
+            magnet_points: Optional[Point2DList] = None,
+    ) -> interactive_overlays.Contour:
+        magnets = None
+        if magnet_points is not None:
+            magnets = interactive_overlays.Magnets(self.canvas, magnet_points)
+
+        icontour = interactive_overlays.Contour(self.canvas, point_xy_list, label, on_click, on_drag, on_release, magnets=magnets)
+        self.add_interactive_overlay(icontour)
+        return icontour
+
     def createInteractiveRectangle(
             self,
             point0_xy,
@@ -288,57 +796,148 @@ class ImageViewer:
             magnets = interactive_overlays.Magnets(self.canvas, magnet_points)
 
         irectangle = interactive_overlays.Rectangle(self.canvas, point0_xy, point1_xy, label, on_click, on_drag, on_release, magnets=magnets)
-        self.interactive_overlay_instance_list.append(irectangle)
+        self.add_interactive_overlay(irectangle)
         return irectangle
 
+    def createAnnotationLayer(self, label="") -> interactive_overlays.AnnotationLayer:
+        annotation_layer = interactive_overlays.AnnotationLayer(self.canvas, label, img2can_matrix=self.img2can_matrix)
+        self.add_interactive_overlay(annotation_layer)
+        return annotation_layer
+
+    def createMaskOverlay(self, mask, label="", palette=None, alpha: float = interactive_overlays.MaskOverlay.DEFAULT_ALPHA) -> interactive_overlays.MaskOverlay:
+        mask_overlay = interactive_overlays.MaskOverlay(self.canvas, mask, label, palette=palette, alpha=alpha, img2can_matrix=self.img2can_matrix)
+        mask_overlay.on_change = self.on_mask_change
+        self.add_interactive_overlay(mask_overlay)
+        self.on_mask_change(None)
+        return mask_overlay
+
+    def get_mask_overlays(self) -> list[interactive_overlays.MaskOverlay]:
+        return [overlay for overlay in self.interactive_overlay_instance_list if isinstance(overlay, interactive_overlays.MaskOverlay)]
+
+    def get_brush_mask(self) -> Optional[interactive_overlays.MaskOverlay]:
+        brush_masks = [mask_overlay for mask_overlay in self.get_mask_overlays() if mask_overlay.brush_enabled]
+        return brush_masks[-1] if len(brush_masks) > 0 else None
+
+    def on_mask_change(self, img_rect: Optional[interactive_overlays.Rect]):
+        """Redraws the given rectangle of a mask (img space), or the whole viewport"""
+        if not hasattr(self, "viewport"):
+            return  # nothing displayed yet
+        if self.update_batch.is_active():
+            self.is_draw_pending = True
+            return
+        if img_rect is None:
+            self.schedule_render_viewport()
+            return
+        can_rect = interactive_overlays.project_rect(img_rect, self.img2can_matrix, self.viewport.shape[:2])
+        if can_rect is not None:
+            self.render_viewport_region(can_rect)
+
     def draw(self):
-        # if zoom_factor is not defined yet, define it
-        try:
-            self.zoom_factor
-        except AttributeError:
-            self.set_panzoom_home()
+        if self.update_batch.is_active():
+            self.is_draw_pending = True
+            return
+        if self.is_mat_shared:
+            self.draw_shared_frame()  # the slot may have been overwritten since it was displayed
+            return
 
-        if not self.zoom_entry.is_focus:
-            self.zoom_entry.set(f"{int(self.zoom_factor * 100 ** 2) / 100}")
+        self.init_panzoom(self.mat.shape[:2])
 
-        canh, canw = self.canvas_shape_hw
-        imgh, imgw = self.mat.shape[:2]
-        img_center_matrix: TransformMatrix = tm.T((imgw / 2, imgh / 2))
-        can_center_matrix: TransformMatrix = tm.T((canw / 2, canh / 2))
-        pan_and_zoom_matrix: TransformMatrix = tm.S((self.zoom_factor, self.zoom_factor)) @ tm.T(self.pan_xy)
-        self.set_img2can_matrix(can_center_matrix @ pan_and_zoom_matrix @ np.linalg.inv(img_center_matrix))
-        mat = cv2.warpPerspective(self.mat, self.img2can_matrix, dsize=(canh, canw), flags=self.cv2_interpolation)  # type: ignore
-        
-        # Convert to PIL Image and then to PhotoImage
-        # Important: Pass master parameter to ensure PhotoImage is associated with the correct Tk instance
-        pil_image = Image.fromarray(mat)
-        self.imgtk = ImageTk.PhotoImage(image=pil_image, master=self.canvas)        
-        self.canvas.create_image(canw // 2, canh // 2, anchor=tk.CENTER, image=self.imgtk)
+        self.set_zoom_entry()
 
-        for overlay in self.interactive_overlay_instance_list:
-            overlay.set_img2can_matrix(self.img2can_matrix)
-            overlay.update()
+        tic = time.perf_counter()
+        self.set_view_transform(self.get_view_transform(self.mat.shape[:2]))
+        self.viewport_base = warp_viewport(self.mat, self.img2can_matrix, self.canvas_shape_hw, self.cv2_interpolation, self.visible_roi)
+        self.present_viewport_base()
+        self.count_render(time.perf_counter() - tic)
+
+    def present_viewport_base(self):
+        """Composites and displays the warped image, and moves the interactive overlays to the current pan and zoom"""
+        self.is_render_scheduled = False
+        self.rasterizer.is_rendering = True
+        try:
+            for overlay in self.interactive_overlay_instance_list:
+                overlay.set_img2can_matrix(self.img2can_matrix)  # before render_viewport(): the masks are blended with their matrix
+            self.render_viewport()
+            for overlay in self.interactive_overlay_instance_list:
+                overlay.update()
+        finally:
+            self.rasterizer.is_rendering = False
+
+    def count_render(self, render_time: float):
+        self.stats.rendered += 1
+        self.stats.render_time_total += render_time
+        self.stats.render_time_max = max(self.stats.render_time_max, render_time)
+
+    def render_viewport(self):
+        """Composites the masks and the static overlays (if rasterized) on the warped image and sends the result to the canvas"""
+        mat = self.viewport_base
+        mask_overlays = self.get_mask_overlays()
+        if len(mask_overlays) > 0:
+            mat = mat.copy()
+            for mask_overlay in mask_overlays:
+                mask_overlay.blend(mat, self.visible_roi)  # masks are in img space, nothing to blend outside of the image
+        if self.rasterizer.update_enabled(self.interactive_overlay_instance_list):
+            mat = self.rasterizer.render(mat, self.img2can_matrix, self.interactive_overlay_instance_list)
+        self.viewport = mat
+        self.display.present(mat)
+
+    def render_viewport_region(self, can_rect: interactive_overlays.Rect):
+        """Composites again a rectangle of the viewport (canvas space) and only sends this rectangle to the displayed photo image"""
+        if self.viewport is self.viewport_base:
+            self.viewport = self.viewport_base.copy()
+        x0, y0, x1, y1 = can_rect
+        self.viewport[y0:y1, x0:x1] = self.viewport_base[y0:y1, x0:x1]
+        for mask_overlay in self.get_mask_overlays():
+            mask_overlay.blend(self.viewport, can_rect)
+        if self.rasterizer.is_enabled:
+            self.rasterizer.composite(self.viewport, can_rect)
+
+        self.display.present_region(self.viewport, can_rect)
+
+    def schedule_draw(self):
+        """Coalesces redraw requests into a single draw() when Tk is idle"""
+        if self.is_draw_scheduled:
+            return
+        self.is_draw_scheduled = True
+        self.canvas.after_idle(self._on_scheduled_draw)
+
+    def _on_scheduled_draw(self):
+        self.is_draw_scheduled = False
+        if hasattr(self, "mat"):
+            self.draw()
+
+    def schedule_render_viewport(self):
+        """
+        Coalesces requests to composite the viewport again (mask changed, alpha or visibility toggled, ...) into a single render_viewport() when Tk
+        is idle. The image is not warped again.
+        """
+        if self.is_render_scheduled or self.is_draw_scheduled:
+            return
+        self.is_render_scheduled = True
+        self.canvas.after_idle(self._on_scheduled_render_viewport)
+
+    def _on_scheduled_render_viewport(self):
+        if not self.is_render_scheduled:
+            return  # already rendered by a draw()
+        self.is_render_scheduled = False
+        if not hasattr(self, "viewport_base"):
+            return
+        self.rasterizer.is_rendering = True
+        try:
+            self.render_viewport()
+        finally:
+            self.rasterizer.is_rendering = False
 
     def set_zoom_fit(self):
-        canh, canw = self.canvas_shape_hw
-        imgh, imgw = self.mat.shape[:2]
-        self.zoom_factor = min(canh / imgh, canw / imgw)
+        self.zoom_factor = get_home_zoom_factor(MODE.FIT, self.canvas_shape_hw, self.mat.shape[:2])
 
     def set_zoom_fill(self):
-        canh, canw = self.canvas_shape_hw
-        imgh, imgw = self.mat.shape[:2]
-        self.zoom_factor = max(canh / imgh, canw / imgw)
+        self.zoom_factor = get_home_zoom_factor(MODE.FILL, self.canvas_shape_hw, self.mat.shape[:2])
 
     def set_panzoom_home(self):
-        if self.mode == MODE.FIT:
-            self.set_zoom_fit()
-        elif self.mode == MODE.FILL:
-            self.set_zoom_fill()
-        elif self.mode == MODE.P100:
-            self.zoom_factor = 1.0
-        else:
-            raise ValueError(f"unknown mode. Expected on of {MODE}, got")
-
+        if self.mode is None:
+            raise ValueError(f"unknown mode. Expected on of {MODE}, got None")
+        self.zoom_factor = get_home_zoom_factor(self.mode, self.canvas_shape_hw, self.mat.shape[:2])
         self.pan_xy = (0.0, 0.0)
         self.cumulative_pan_xy = (0.0, 0.0)
 
@@ -348,37 +947,297 @@ class ImageViewer:
         except ValueError:
             return
         self.zoom_factor = zoom / 100
-        self.draw()
+        self.on_panzoom_change()
 
     def onclick_zoom_fit(self):
         self.set_zoom_fit()
-        self.zoom_entry.is_focus = False  # focus out to allow auto update
-        self.draw()
+        self.unfocus_zoom_entry()
+        self.on_panzoom_change()
 
     def onclick_zoom_fill(self):
         self.set_zoom_fill()
-        self.zoom_entry.is_focus = False  # focus out to allow auto update
-        self.draw()
+        self.unfocus_zoom_entry()
+        self.on_panzoom_change()
 
     def onclick_zoom_100(self):
         self.zoom_factor = 1
-        self.zoom_entry.is_focus = False  # focus out to allow auto update
-        self.draw()
+        self.unfocus_zoom_entry()
+        self.on_panzoom_change()
 
     def onclick_zoom_home(self):
         self.set_panzoom_home()
-        self.zoom_entry.is_focus = False
-        self.draw()
+        self.unfocus_zoom_entry()
+        self.on_panzoom_change()
+
+    def imshow(self, mat: Image_t, mode: MODE = MODE.FIT, cv2_interpolation: Optional[int] = None, mask=None, palette=None, alpha: Optional[float] = None):
+        """
+        mask: optional label map (2D array of the size of mat, labels in [0, 255], ValueError otherwise) blended on the displayed viewport only. Label 0
+        is transparent.
+        palette: optional array of shape (N, 3) of BGR colors by label. alpha: opacity of the mask.
+        The mask is only shown with the image it was given with. Use imshow_mask.set_alpha(...) and imshow_mask.set_visible(...) to change it
+        without redrawing the image.
+        While the window is hidden, the frame is neither converted nor rendered, see defer_frame(...).
+        """
+        if mask is not None:
+            mask = interactive_overlays.to_label_mask(mask, mat.shape[:2])  # raises in the caller thread, not at render time
+        if self.defer_frame(mat, False, mode, cv2_interpolation, mask, palette, alpha):
+            return
+        self.imshow_rgb(to_rgb(mat), mode, cv2_interpolation, mask, palette, alpha)
 
-    def imshow(self, mat: Image_t, mode: MODE = MODE.FIT, cv2_interpolation: Optional[int] = None):
+    def imshow_rgb(self, mat_rgb: Image_t, mode: MODE = MODE.FIT, cv2_interpolation: Optional[int] = None, mask=None, palette=None, alpha: Optional[float] = None):
+        """Same as imshow(...) for an image already converted with to_rgb(...), for instance by a decoding thread"""
+        if mask is not None:
+            mask = interactive_overlays.to_label_mask(mask, mat_rgb.shape[:2])
+        if self.defer_frame(mat_rgb, True, mode, cv2_interpolation, mask, palette, alpha):
+            return
         if self.mode is None:
             self.mode = mode
 
         self.cv2_interpolation = cv2.INTER_LINEAR if cv2_interpolation is None else cv2_interpolation
 
-        if mat.dtype == float:
-            mat = (np.clip(mat, 0, 1) * 255).astype(np.uint8)
+        if self.frame_history is not None:
+            self.frame_history.push(mat_rgb)
+            if self.is_scrubbing:
+                self.live_frame = (mat_rgb, mask, palette, alpha)  # shown when going back to live
+                return
+        self._show_rgb(mat_rgb, mask, palette, alpha)
+        self.update_timeline()
+
+    def _show_rgb(self, mat_rgb: Image_t, mask=None, palette=None, alpha: Optional[float] = None):
+        with self.batch():
+            self.mat = mat_rgb
+            self.is_mat_shared = False
+            self.set_imshow_mask(mask, palette, alpha)
+            self.draw()
+
+    def enable_frame_history(
+        self, max_seconds: float = FrameHistory.DEFAULT_MAX_SECONDS, max_bytes: int = FrameHistory.DEFAULT_MAX_BYTES, codec: str = FrameHistory.DEFAULT_CODEC
+    ) -> FrameHistory:
+        """
+        Records the last displayed frames (compressed in a background thread) and adds a timeline slider to scrub through them. While scrubbing,
+        new frames given to imshow are still recorded but not displayed, until the "live" button is clicked.
+        """
+        self.disable_frame_history()
+        self.frame_history = FrameHistory(max_seconds, max_bytes, codec)
+        if self.is_headless:
+            return self.frame_history  # scrubbed with show_history_frame(...) and resume_live()
+        self.timeline_frame = tk.Frame(master=self.frame)
+        toolbar_cfg = {"side": tk.LEFT, "padx": 1, "pady": 2}
+        tk.Button(master=self.timeline_frame, text="live", command=self.resume_live).pack(toolbar_cfg)
+        self.timeline_scale = tk.Scale(master=self.timeline_frame, orient=tk.HORIZONTAL, showvalue=False, from_=0, to=0, command=self.on_timeline_change)
+        self.timeline_scale.bind("<ButtonPress-1>", self.on_timeline_press)
+        self.timeline_scale.bind("<ButtonRelease-1>", self.on_timeline_release)
+        self.timeline_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=1, pady=2)
+        self.timeline_frame.pack(side=tk.TOP, fill=tk.X)
+        return self.frame_history
+
+    def disable_frame_history(self):
+        if self.frame_history is None:
+            return
+        self.resume_live()
+        self.frame_history.close()
+        self.frame_history = None
+        if self.timeline_frame is not None:
+            self.timeline_frame.destroy()
+        self.timeline_frame = self.timeline_scale = None
+
+    def update_timeline(self):
+        """Moves the timeline to the newest recorded frame"""
+        if self.frame_history is None or self.timeline_scale is None or self.is_scrubbing:
+            return
+        seq_range = self.frame_history.get_seq_range()
+        if seq_range is not None:
+            self.timeline_scale.configure(from_=seq_range[0], to=seq_range[1])
+            self.timeline_scale.set(seq_range[1])
+
+    def show_history_frame(self, seq: int):
+        """Displays a recorded frame, see FrameHistory. The live frames are not displayed until resume_live() is called."""
+        if self.frame_history is None:
+            return
+        mat_rgb = self.frame_history.get_frame(seq)
+        if mat_rgb is None:
+            return
+        self.is_scrubbing = True
+        self._show_rgb(mat_rgb)
+
+    def resume_live(self):
+        if not self.is_scrubbing:
+            return
+        self.is_scrubbing = False
+        if self.live_frame is not None:
+            self._show_rgb(*self.live_frame)
+            self.live_frame = None
+        self.update_timeline()
+
+    def on_timeline_press(self, event):
+        self.is_timeline_grabbed = True
+
+    def on_timeline_release(self, event):
+        self.is_timeline_grabbed = False
+        if self.timeline_scale is not None:
+            self.show_history_frame(int(self.timeline_scale.get()))
+
+    def on_timeline_change(self, value: str):
+        # the command of the scale is also called when the timeline follows the live frames: only react to the user
+        if self.is_timeline_grabbed:
+            self.show_history_frame(int(float(value)))
+
+    def get_rendered_view(self) -> Optional[Image_t]:
+        """RGB image of the canvas as displayed: the viewport with the masks and all the visible overlays, point clouds and annotation layers included"""
+        if not hasattr(self, "viewport"):
+            return None
+        return self.rasterizer.draw_live(self.viewport, self.img2can_matrix, self.interactive_overlay_instance_list)
+
+    def start_recording(self, path, fps: float = VideoRecorder.DEFAULT_FPS, queue_size: int = 8, fourcc: str = VideoRecorder.DEFAULT_FOURCC) -> VideoRecorder:
+        """
+        Records the rendered view (pan/zoom, masks and overlays included) to a video file, sampled fps times per second while the GUI is updated.
+        Frames are encoded in a background thread and dropped when it can not keep up. When the GUI was not updated for several frame periods (e.g.
+        during a long computation), the last view is repeated so that the video stays in real time. The periods of the dropped frames are filled by
+        repeating the next recorded frame.
+        Raises if the video file can not be opened (the file is opened now if an image is displayed, else on the first frame).
+        """
+        self.stop_recording()
+        frame_size_wh = None if not hasattr(self, "viewport") else (self.viewport.shape[1], self.viewport.shape[0])
+        self.recorder = VideoRecorder(path, fps, queue_size, fourcc, frame_size_wh)
+        self.recording_start_time = time.perf_counter()
+        self.recording_frames = 0
+        self.on_recording_tick()
+        return self.recorder
+
+    def stop_recording(self) -> Optional[RecorderStats]:
+        """Writes the pending frames and closes the video file. Returns the recording statistics, None if nothing was recorded"""
+        if self.recorder is None:
+            return None
+        if self.recording_after_id is not None:
+            self.canvas.after_cancel(self.recording_after_id)
+            self.recording_after_id = None
+        recorder, self.recorder = self.recorder, None
+        return recorder.close()
+
+    def on_recording_tick(self):
+        self.recording_after_id = None
+        if self.recorder is None or self.recorder.error is not None:
+            return  # the error is raised by stop_recording()
+        period = 1 / self.recorder.fps
+        elapsed = time.perf_counter() - self.recording_start_time
+        due = int(elapsed / period) + 1  # number of frames the video should contain by now
+        repeat = due - self.recording_frames  # includes the periods of the dropped frames
+        if repeat > 0:
+            mat = self.get_rendered_view()
+            if mat is not None:
+                if self.recorder.push(mat, repeat):
+                    self.recording_frames += repeat
+            else:
+                self.recording_start_time += repeat * period  # nothing displayed yet, the video starts with the first image
+        # the next tick is scheduled from the fixed start time, so that timer delays do not accumulate
+        delay_ms = max(1, int(1000 * ((due * period) - elapsed)))
+        self.recording_after_id = self.canvas.after(delay_ms, self.on_recording_tick)
+
+    def attach_shared_frames(self, name: str, poll_interval_ms: int = 5) -> SharedFrameReader:
+        """
+        Displays the frames written to the shared memory frame ring name by a SharedFrameWriter, possibly in another process. The ring is polled
+        every poll_interval_ms while the GUI is updated and only its newest frame is rendered. The frame is warped straight from the shared memory and only
+        displayed if the producer did not overwrite it meanwhile, see draw_shared_frame(). It is only copied if the frame history or a RenderScheduler
+        keeps it.
+        Returns the SharedFrameReader, see its stats for the displayed, skipped and torn frames.
+        """
+        self.detach_shared_frames()
+        self.shared_frames = SharedFrameReader(name)
+        self.shared_frame_seq = -1
+        self.shared_frames_poll_ms = poll_interval_ms
+        self.on_shared_frames_tick()
+        return self.shared_frames
+
+    def detach_shared_frames(self):
+        if self.shared_frames is None:
+            return
+        if self.shared_frames_after_id is not None:
+            self.canvas.after_cancel(self.shared_frames_after_id)
+            self.shared_frames_after_id = None
+        if self.is_mat_shared:
+            self.mat = self.mat.copy()  # the last frame stays displayed, the shared memory is released
+            self.is_mat_shared = False
+        reader, self.shared_frames = self.shared_frames, None
+        reader.close()
+
+    def on_shared_frames_tick(self):
+        self.shared_frames_after_id = None
+        reader = self.shared_frames
+        if reader is None:
+            return
+        try:
+            frame = reader.get_latest() if not self.is_hidden() else None  # hidden: the frame is read when the window is shown again
+            if frame is not None and frame.seq != self.shared_frame_seq:
+                if self.frame_history is not None or self.render_scheduler is not None:
+                    # the frame is kept after the tick (recorded, or warped later by a worker thread), the slot is overwritten by the producer
+                    mat_rgb = frame.mat_rgb.copy()
+                    if reader.is_intact(frame):
+                        self.imshow_rgb(mat_rgb)
+                        self.count_shared_frame(frame.seq)
+                    else:
+                        reader.stats.torn += 1  # read again from the newest frame at the next tick
+                else:
+                    self.set_imshow_mask(None)
+                    self.draw_shared_frame()
+        finally:
+            # an error in a frame must not stop the polling
+            self.shared_frames_after_id = self.canvas.after(self.shared_frames_poll_ms, self.on_shared_frames_tick)
+
+    def draw_shared_frame(self):
+        """
+        Warps the newest frame of the shared frame ring straight from the shared memory into viewport_base, without copying it, and displays it
+        only if the producer did not overwrite the slot during the warp. mat stays a view on the slot, only its shape is used: pan and zoom warp
+        the newest frame of the ring again.
+        """
+        if self.update_batch.is_active():
+            self.is_draw_pending = True
+            return
+        reader = self.shared_frames
+        frame = reader.get_latest() if reader is not None else None
+        if reader is None or frame is None:
+            return
+        tic = time.perf_counter()
+        if self.mode is None:
+            self.mode = MODE.FIT
+        self.cv2_interpolation = cv2.INTER_LINEAR
+        self.mat = frame.mat_rgb
+        self.is_mat_shared = True
+        self.init_panzoom(self.mat.shape[:2])
+        transform = self.get_view_transform(self.mat.shape[:2])
+        viewport_base = warp_viewport(self.mat, transform.img2can_matrix, self.canvas_shape_hw, self.cv2_interpolation, transform.visible_roi)
+        if not reader.is_intact(frame):
+            reader.stats.torn += 1  # the previous viewport stays displayed, the newest frame is read again at the next tick
+            return
+        self.set_zoom_entry()
+        self.set_view_transform(transform)
+        self.viewport_base = viewport_base
+        self.present_viewport_base()
+        self.count_render(time.perf_counter() - tic)
+        if frame.seq != self.shared_frame_seq:
+            self.count_shared_frame(frame.seq)
+
+    def count_shared_frame(self, seq: int):
+        assert self.shared_frames is not None
+        self.shared_frames.stats.displayed += 1
+        self.shared_frames.stats.skipped += seq - self.shared_frame_seq - 1
+        self.shared_frame_seq = seq
+
+    def set_imshow_mask(self, mask, palette=None, alpha: Optional[float] = None):
+        if mask is None:
+            if self.imshow_mask is not None:
+                self.imshow_mask.set_visible(False)
+            return
 
-        self.mat = cv2.cvtColor(mat, cv2.COLOR_BGR2RGB)  # type: ignore
+        mask = np.asarray(mask)
+        mask = interactive_overlays.to_label_mask(mask, mask.shape if self.mat is None else self.mat.shape[:2])
+        if self.imshow_mask is None:
+            alpha = interactive_overlays.MaskOverlay.DEFAULT_ALPHA if alpha is None else alpha
+            self.imshow_mask = self.createMaskOverlay(mask, "imshow_mask", palette, alpha)
+            return
 
-        self.draw()
+        self.imshow_mask.set_mask(mask)
+        if palette is not None:
+            self.imshow_mask.set_palette(palette)
+        if alpha is not None:
+            self.imshow_mask.set_alpha(alpha)
+        self.imshow_mask.set_visible(True)
@@ -1,4 +1,8 @@
 
-from .base import Point as Point, Magnets as Magnets, State as State
-from .polygons import Polygon as Polygon, Rectangle as Rectangle
-from .multi_slider import MultiSliderOverlay as MultiSliderOverlay, MultiSliderState as MultiSliderState, CallbackMultiSlider as CallbackMultiSlider
\ No newline at end of file
+from .base import Point as Point, Magnets as Magnets, State as State, UpdateBatch as UpdateBatch
+from .polygons import Polygon as Polygon, Rectangle as Rectangle, Contour as Contour, PointListView as PointListView
+from .point_cloud import PointCloud as PointCloud
+from .multi_slider import MultiSliderOverlay as MultiSliderOverlay, MultiSliderState as MultiSliderState, CallbackMultiSlider as CallbackMultiSlider
+from .annotations import AnnotationLayer as AnnotationLayer, ItemPool as ItemPool
+from .layers import Layer as Layer, LayerStack as LayerStack
+from .mask import MaskOverlay as MaskOverlay, Rect as Rect, default_palette as default_palette, project_rect as project_rect, to_label_mask as to_label_mask
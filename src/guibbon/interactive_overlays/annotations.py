@@ -0,0 +1,263 @@
+import itertools
+import tkinter as tk
+from typing import Callable, Optional, Sequence, Any
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+from guibbon import transform_matrix as tmat
+from guibbon.transform_matrix import TransformMatrix
+from guibbon.typedef import Image_t, Point2DArray
+from .base import UpdateBatch, get_rgb
+from .layers import Layer, LayerStack
+
+ItemCoords = tuple[int, ...]
+
+
+class ItemPool:
+    """
+    Pool of canvas items of the same type. Items are reused from one call of show(...) to the next one: extra items are hidden instead of being
+    deleted, and only the coordinates and options that changed are sent to the canvas.
+    default_options: options of the created items, restored on the items shown without options.
+    """
+
+    def __init__(self, canvas: tk.Canvas, create_item: Callable[[], int], default_options: Optional[dict[str, Any]] = None):
+        self.canvas = canvas
+        self.create_item = create_item
+        self.default_options: dict[str, Any] = {} if default_options is None else default_options
+        self.item_ids: list[int] = []
+        self.item_coords: list[Optional[ItemCoords]] = []
+        self.item_options: list[dict[str, Any]] = []
+        self.n_shown = 0
+
+    def show(self, coords_list: Sequence[ItemCoords], options_list: Optional[Sequence[dict[str, Any]]] = None):
+        n = len(coords_list)
+        while len(self.item_ids) < n:
+            self.item_ids.append(self.create_item())
+            self.item_coords.append(None)
+            self.item_options.append(dict(self.default_options, state="hidden"))
+
+        for k in range(n):
+            item_id = self.item_ids[k]
+            coords = coords_list[k]
+            if coords != self.item_coords[k]:
+                self.canvas.coords(item_id, *coords)
+                self.item_coords[k] = coords
+
+            options = dict(self.default_options, state="normal") if options_list is None else dict(self.default_options, **options_list[k], state="normal")
+            self._configure(k, options)
+
+        for k in range(n, self.n_shown):
+            self._configure(k, {"state": "hidden"})
+        self.n_shown = n
+
+    def _configure(self, k: int, options: dict[str, Any]):
+        current_options = self.item_options[k]
+        changed_options = {key: val for key, val in options.items() if current_options.get(key) != val}
+        if len(changed_options) > 0:
+            self.canvas.itemconfig(self.item_ids[k], **changed_options)
+            current_options.update(changed_options)
+
+    def delete(self):
+        for item_id in self.item_ids:
+            self.canvas.delete(item_id)
+        self.item_ids = []
+        self.item_coords = []
+        self.item_options = []
+        self.n_shown = 0
+
+
+class AnnotationLayer:
+    """
+    Non-interactive layer drawing boxes, points, line segments and labels given as arrays (img space), typically the output of a detector at every
+    frame. The canvas items are pooled so that the cost of a new frame scales with the number of items that actually changed.
+    """
+
+    colors = {
+        "box": "#%02x%02x%02x" % (255, 0, 0),
+        "point": "#%02x%02x%02x" % (255, 255, 0),
+        "line": "#%02x%02x%02x" % (0, 255, 255),
+        "label": "#%02x%02x%02x" % (255, 255, 255),
+    }
+    point_radius = 3
+    raster_layer = Layer.ANNOTATIONS  # layer of the canvas items, see draw_raster(...)
+    font_scale = 0.4  # OpenCV font of the labels drawn by draw_raster(...), close to the default font of the canvas
+    _tag_counter = itertools.count()
+
+    def __init__(self, canvas: tk.Canvas, label: str = "", img2can_matrix: Optional[TransformMatrix] = None):
+        if img2can_matrix is None:
+            img2can_matrix = tmat.identity_matrix()
+
+        self.canvas = canvas
+        self.label = label
+        self.tag = f"gbn_annotation_layer_{next(AnnotationLayer._tag_counter)}"
+        self.img2can_matrix: TransformMatrix = img2can_matrix.copy()
+        self.visible: bool = True
+        self.batch: Optional[UpdateBatch] = None
+        self.layers: Optional[LayerStack] = None
+
+        # annotations are stored in img space
+        self.boxes_xyxy: npt.NDArray[np.float64] = np.zeros(shape=(0, 4), dtype=float)
+        self.points_xy: Point2DArray = np.zeros(shape=(0, 2), dtype=float)
+        self.segments_xyxy: npt.NDArray[np.float64] = np.zeros(shape=(0, 4), dtype=float)
+        self.labels_xy: Point2DArray = np.zeros(shape=(0, 2), dtype=float)
+        self.label_texts: list[str] = []
+        self.box_colors: Optional[list[str]] = None
+        self.point_colors: Optional[list[str]] = None
+        self.segment_colors: Optional[list[str]] = None
+
+        tags = (self.tag,)
+        self.box_pool = ItemPool(
+            canvas,
+            lambda: self._place(canvas.create_rectangle(0, 0, 0, 0, outline=AnnotationLayer.colors["box"], width=2, state="hidden", tags=tags)),
+            {"outline": AnnotationLayer.colors["box"]},
+        )
+        self.point_pool = ItemPool(
+            canvas,
+            lambda: self._place(canvas.create_oval(0, 0, 0, 0, fill=AnnotationLayer.colors["point"], width=0, state="hidden", tags=tags)),
+            {"fill": AnnotationLayer.colors["point"]},
+        )
+        self.segment_pool = ItemPool(
+            canvas,
+            lambda: self._place(canvas.create_line(0, 0, 0, 0, fill=AnnotationLayer.colors["line"], width=2, state="hidden", tags=tags)),
+            {"fill": AnnotationLayer.colors["line"]},
+        )
+        self.label_pool = ItemPool(
+            canvas,
+            lambda: self._place(canvas.create_text(0, 0, text="", fill=AnnotationLayer.colors["label"], anchor=tk.SW, state="hidden", tags=tags)),
+        )
+
+    def _place(self, item_id: int) -> int:
+        if self.layers is not None:
+            self.layers.place([item_id], Layer.ANNOTATIONS)
+        return item_id
+
+    def _is_shown(self) -> bool:
+        return self.visible and (self.layers is None or self.layers.is_visible(Layer.ANNOTATIONS))
+
+    def _project(self, points_xy: Point2DArray) -> npt.NDArray[np.int_]:
+        return np.round(tmat.apply_array(self.img2can_matrix, points_xy)).astype(int)
+
+    def _update_boxes(self):
+        if not self._is_shown():
+            self.box_pool.show([])
+            return
+        corners = self._project(self.boxes_xyxy.reshape(-1, 2)).reshape(-1, 4)
+        options_list = None if self.box_colors is None else [{"outline": color} for color in self.box_colors]
+        self.box_pool.show([tuple(c) for c in corners.tolist()], options_list)
+
+    def _update_points(self):
+        if not self._is_shown():
+            self.point_pool.show([])
+            return
+        r = AnnotationLayer.point_radius
+        centers = self._project(self.points_xy)
+        options_list = None if self.point_colors is None else [{"fill": color} for color in self.point_colors]
+        self.point_pool.show([(x - r, y - r, x + r, y + r) for x, y in centers.tolist()], options_list)
+
+    def _update_segments(self):
+        if not self._is_shown():
+            self.segment_pool.show([])
+            return
+        ends = self._project(self.segments_xyxy.reshape(-1, 2)).reshape(-1, 4)
+        options_list = None if self.segment_colors is None else [{"fill": color} for color in self.segment_colors]
+        self.segment_pool.show([tuple(e) for e in ends.tolist()], options_list)
+
+    def _update_labels(self):
+        if not self._is_shown():
+            self.label_pool.show([])
+            return
+        anchors = self._project(self.labels_xy)
+        self.label_pool.show([tuple(a) for a in anchors.tolist()], [{"text": text} for text in self.label_texts])
+
+    def update(self):
+        if self.batch is not None and self.batch.defer(self):
+            return
+        self._update_boxes()
+        self._update_points()
+        self._update_segments()
+        self._update_labels()
+
+    def draw_raster(self, mat: Image_t, img2can_matrix: TransformMatrix):
+        """Draws the boxes, points, segments and labels on mat (RGB, canvas space) like their canvas items, see OverlayRasterizer.draw_live(...)"""
+        if not self._is_shown():
+            return
+        colors = AnnotationLayer.colors
+
+        def get_colors(item_colors: Optional[list[str]], n: int, default: str) -> list[tuple[int, int, int]]:
+            return [get_rgb(color, get_rgb(default)) for color in ([default] * n if item_colors is None else item_colors)]
+
+        boxes = np.round(tmat.apply_array(img2can_matrix, self.boxes_xyxy.reshape(-1, 2))).astype(int).reshape(-1, 4)
+        for (x0, y0, x1, y1), rgb in zip(boxes.tolist(), get_colors(self.box_colors, len(boxes), colors["box"])):
+            cv2.rectangle(mat, (x0, y0), (x1, y1), rgb, 2)
+        centers = np.round(tmat.apply_array(img2can_matrix, self.points_xy)).astype(int)
+        for (x, y), rgb in zip(centers.tolist(), get_colors(self.point_colors, len(centers), colors["point"])):
+            cv2.circle(mat, (x, y), AnnotationLayer.point_radius, rgb, -1)
+        ends = np.round(tmat.apply_array(img2can_matrix, self.segments_xyxy.reshape(-1, 2))).astype(int).reshape(-1, 4)
+        for (x0, y0, x1, y1), rgb in zip(ends.tolist(), get_colors(self.segment_colors, len(ends), colors["line"])):
+            cv2.line(mat, (x0, y0), (x1, y1), rgb, 2)
+        anchors = np.round(tmat.apply_array(img2can_matrix, self.labels_xy)).astype(int)
+        label_rgb = get_rgb(colors["label"])
+        for (x, y), text in zip(anchors.tolist(), self.label_texts):
+            cv2.putText(mat, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, AnnotationLayer.font_scale, label_rgb, 1, cv2.LINE_AA)  # anchored at its bottom-left
+
+    def _update_or_defer(self, update_func: Callable[[], None]):
+        if self.batch is not None and self.batch.defer(self):
+            return
+        update_func()
+
+    def set_boxes(self, boxes_xyxy: npt.ArrayLike, colors: Optional[Sequence[str]] = None):
+        """boxes_xyxy: array of shape (N, 4) of boxes (x0, y0, x1, y1) in img space. colors: optional list of N tk colors."""
+        self.boxes_xyxy = np.asarray(boxes_xyxy, dtype=float).reshape(-1, 4)
+        self.box_colors = None if colors is None else list(colors)
+        self._update_or_defer(self._update_boxes)
+
+    def set_points(self, points_xy: npt.ArrayLike, colors: Optional[Sequence[str]] = None):
+        """points_xy: array of shape (N, 2) in img space. colors: optional list of N tk colors."""
+        self.points_xy = np.asarray(points_xy, dtype=float).reshape(-1, 2)
+        self.point_colors = None if colors is None else list(colors)
+        self._update_or_defer(self._update_points)
+
+    def set_segments(self, segments_xyxy: npt.ArrayLike, colors: Optional[Sequence[str]] = None):
+        """segments_xyxy: array of shape (N, 4) of line segments (x0, y0, x1, y1) in img space. colors: optional list of N tk colors."""
+        self.segments_xyxy = np.asarray(segments_xyxy, dtype=float).reshape(-1, 4)
+        self.segment_colors = None if colors is None else list(colors)
+        self._update_or_defer(self._update_segments)
+
+    def set_labels(self, points_xy: npt.ArrayLike, texts: Sequence[str]):
+        """points_xy: array of shape (N, 2) of the bottom-left corners of the N texts, in img space"""
+        self.labels_xy = np.asarray(points_xy, dtype=float).reshape(-1, 2)
+        self.label_texts = [str(text) for text in texts]
+        assert len(self.labels_xy) == len(self.label_texts)
+        self._update_or_defer(self._update_labels)
+
+    def clear(self):
+        self.set_boxes(np.zeros((0, 4)))
+        self.set_points(np.zeros((0, 2)))
+        self.set_segments(np.zeros((0, 4)))
+        self.set_labels(np.zeros((0, 2)), [])
+
+    def set_img2can_matrix(self, img2can_matrix: TransformMatrix):
+        self.img2can_matrix = img2can_matrix.copy()
+
+    def set_visible(self, value: bool):
+        if value == self.visible:
+            return
+        self.visible = value
+        self.update()
+
+    def delete(self):
+        self.box_pool.delete()
+        self.point_pool.delete()
+        self.segment_pool.delete()
+        self.label_pool.delete()
+        self.batch = None
+        self.layers = None
+
+    def get_item_ids(self) -> list[int]:
+        return self.box_pool.item_ids + self.point_pool.item_ids + self.segment_pool.item_ids + self.label_pool.item_ids
+
+    def set_layers(self, layers: LayerStack):
+        self.layers = layers
+        layers.place(self.get_item_ids(), Layer.ANNOTATIONS)
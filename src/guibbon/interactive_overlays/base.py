@@ -1,13 +1,24 @@
-from typing import Optional
+from typing import Optional, Any
 
 import numpy as np
 
-from guibbon.typedef import Point2D, Point2DList, CallbackPoint, InteractivePoint
+from guibbon.typedef import Point2D, Point2DList, Point2DArray, CallbackPoint, InteractivePoint
 
 import enum
 import tkinter as tk
+from PIL import ImageColor
 from guibbon import transform_matrix as tmat
 from guibbon.transform_matrix import TransformMatrix
+from .layers import Layer, LayerStack, get_item_state
+
+
+def get_rgb(color: str, default: tuple[int, int, int] = (255, 255, 255)) -> tuple[int, int, int]:
+    """RGB of a tk color ("#rrggbb" or a color name), to draw the canvas items with OpenCV. Default for the names unknown without a Tk root."""
+    try:
+        r, g, b = ImageColor.getrgb(color)[:3]
+    except ValueError:
+        return default
+    return r, g, b
 
 
 class State(enum.IntEnum):
@@ -16,6 +27,31 @@ class State(enum.IntEnum):
     DRAGGED = 2
 
 
+class UpdateBatch:
+    """
+    Defers the redraw of overlays while active. Batches can be nested: the deferred overlays are flushed once, when the outermost batch exits.
+    Overlays holding a reference to an UpdateBatch must call defer(self) at the beginning of their update() method and return if it returns True.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.pending: dict[int, Any] = {}  # deferred overlays by id, in order of first request
+
+    def is_active(self) -> bool:
+        return self.depth > 0
+
+    def defer(self, overlay) -> bool:
+        if not self.is_active():
+            return False
+        self.pending.setdefault(id(overlay), overlay)
+        return True
+
+    def pop_pending(self) -> list[Any]:
+        pending = list(self.pending.values())
+        self.pending = {}
+        return pending
+
+
 class Magnets:
     DISTANCE_THERSHOLD = 20  # distance on img space
     COLOR = "#%02x%02x%02x" % (255, 0, 255)
@@ -27,12 +63,19 @@ class Magnets:
         self.dist_threshold = dist_threshold
         self.visible = False
         self.circle_id_list = [self.canvas.create_oval(0, 0, 1, 1, fill=Magnets.COLOR, width=0) for _ in point_xy_list]
+        self.layers: Optional[LayerStack] = None
 
         self.img2can_matrix: TransformMatrix = tmat.identity_matrix()
 
+    def set_layers(self, layers: LayerStack):
+        if layers is self.layers:
+            return  # magnets shared by the vertices of a polygon
+        self.layers = layers
+        layers.place(self.circle_id_list, Layer.MAGNETS)
+
     def update(self):
         radius = Point.radius[State.NORMAL] // 2
-        item_state = "normal" if self.visible else "hidden"
+        item_state = get_item_state(self.visible, self.layers, Layer.MAGNETS)
         for circle_id, point_xy in zip(self.circle_id_list, self.point_xy_list):
             point_xy = tmat.apply(self.img2can_matrix, point_xy)
             point_xy = (int(round(point_xy[0])), int(round(point_xy[1])))
@@ -42,7 +85,11 @@ class Magnets:
             y2 = point_xy[1] + radius
             self.canvas.coords(circle_id, x1, y1, x2, y2)
             self.canvas.itemconfig(circle_id, fill=Magnets.COLOR, state=item_state)
-            self.canvas.tag_raise(circle_id)
+
+    def delete(self):
+        for circle_id in self.circle_id_list:
+            self.canvas.delete(circle_id)
+        self.circle_id_list = []
 
     def snap_to_nearest_magnet(self, point_xy_img: Point2D) -> Point2D:
         if len(self.point_xy_list) == 0:
@@ -83,7 +130,9 @@ class Point(InteractivePoint):
         on_release: CallbackPoint = None,
         img2can_matrix: Optional[TransformMatrix] = None,
         magnets: Optional[Magnets] = None,
+        rasterized: bool = False,
     ):
+        """rasterized: the point starts rasterized, its canvas item and bindings are only created once it goes live (hovered or dragged)"""
         if img2can_matrix is None:
             img2can_matrix = tmat.identity_matrix()
 
@@ -97,25 +146,85 @@ class Point(InteractivePoint):
         self.magnets = magnets
 
         self.visible: bool = True
+        self.batch: Optional[UpdateBatch] = None
+        self.rasterized: bool = rasterized
+        self.rasterizer: Optional[Any] = None
+        self.layers: Optional[LayerStack] = None
 
-        self.circle_id = self.canvas.create_oval(0, 0, 1, 1, fill=Point.colors[self.state], outline="#FFFFFF", width=2)
+        # undo/redo: moves are recorded as (history_owner, history_vertex). Vertices of a polygon record the moves of their polygon
+        self.history: Optional[Any] = None
+        self.history_owner: Optional[Any] = None
+        self.history_vertex = 0
+        self.drag_start_xy: Optional[Point2D] = None
 
         self.on_click = on_click
-        self.canvas.tag_bind(self.circle_id, "<Button-1>", lambda event: self._on_click(event))
-
         self.on_drag = on_drag
-        self.canvas.tag_bind(self.circle_id, "<B1-Motion>", lambda event: self._on_drag(event))
-
         self.on_release = on_release
-        self.canvas.tag_bind(self.circle_id, "<ButtonRelease-1>", lambda event: self._on_release(event))
 
-        self.canvas.tag_bind(self.circle_id, "<Enter>", self._on_enter)
-        self.canvas.tag_bind(self.circle_id, "<Leave>", self._on_leave)
+        # keep the ids of the bindings to release the tcl commands on delete
+        self.binding_ids: list[tuple[str, str]] = []
+        self.circle_id: Optional[int] = None
+        if not rasterized:
+            self._create_item()
+
+    def _create_item(self) -> int:
+        circle_id = self.canvas.create_oval(0, 0, 1, 1, fill=Point.colors[self.state], outline="#FFFFFF", width=2)
+        self.binding_ids.append(("<Button-1>", self.canvas.tag_bind(circle_id, "<Button-1>", lambda event: self._on_click(event))))
+        self.binding_ids.append(("<B1-Motion>", self.canvas.tag_bind(circle_id, "<B1-Motion>", lambda event: self._on_drag(event))))
+        self.binding_ids.append(("<ButtonRelease-1>", self.canvas.tag_bind(circle_id, "<ButtonRelease-1>", lambda event: self._on_release(event))))
+        self.binding_ids.append(("<Enter>", self.canvas.tag_bind(circle_id, "<Enter>", self._on_enter)))
+        self.binding_ids.append(("<Leave>", self.canvas.tag_bind(circle_id, "<Leave>", self._on_leave)))
+        if self.layers is not None:
+            self.layers.place([circle_id], Layer.HANDLES)
+        self.circle_id = circle_id
+        return circle_id
 
     def delete(self):
-        self.canvas.delete(self.circle_id)
+        if self.circle_id is not None:
+            for sequence, funcid in self.binding_ids:
+                self.canvas.tag_unbind(self.circle_id, sequence, funcid)
+            self.canvas.delete(self.circle_id)
+            self.circle_id = None
+        self.binding_ids = []
+        if self.magnets is not None:
+            self.magnets.delete()
+        self.on_click = self.on_drag = self.on_release = None
+        self.magnets = None
+        self.batch = None
+        self.rasterizer = None
+        self.layers = None
+        self.history = self.history_owner = None
+
+    def get_item_ids(self) -> list[int]:
+        return [] if self.circle_id is None else [self.circle_id]
+
+    def set_history(self, history):
+        self.history = history
+
+    def set_vertex_xy(self, index: int, img_point_xy: Point2D):
+        self.set_img_point_xy(img_point_xy)
+        self.update()
+
+    def _record_move(self):
+        if self.history is not None and self.drag_start_xy is not None:
+            owner = self if self.history_owner is None else self.history_owner
+            self.history.record_move(owner, self.history_vertex, self.drag_start_xy, self.point_xy)
+        self.drag_start_xy = None
+
+    def set_layers(self, layers: LayerStack):
+        self.layers = layers
+        layers.place(self.get_item_ids(), Layer.HANDLES)
+        if self.magnets is not None:
+            self.magnets.set_layers(layers)
 
     def update(self):
+        if self.batch is not None and self.batch.defer(self):
+            return
+        if self.rasterized:
+            if self.rasterizer is not None:
+                self.rasterizer.request_render(self)
+            return
+        circle_id = self._create_item() if self.circle_id is None else self.circle_id
         self.update_magnets()
         radius = Point.radius[self.state]
         can_x, can_y = tmat.apply(self.img2can_matrix, self.point_xy)
@@ -123,15 +232,30 @@ class Point(InteractivePoint):
         y1 = can_y - radius
         x2 = can_x + radius
         y2 = can_y + radius
-        self.canvas.coords(self.circle_id, x1, y1, x2, y2)
-        item_state = "normal" if self.visible else "hidden"
-        self.canvas.itemconfig(self.circle_id, fill=Point.colors[self.state], state=item_state)
-        self.canvas.tag_raise(self.circle_id)
+        self.canvas.coords(circle_id, x1, y1, x2, y2)
+        item_state = get_item_state(self.visible, self.layers, Layer.HANDLES)
+        self.canvas.itemconfig(circle_id, fill=Point.colors[self.state], state=item_state)
 
     def set_img2can_matrix(self, img2can_matrix: TransformMatrix):
         self.img2can_matrix = img2can_matrix.copy()
         self.can2img_matrix = np.linalg.inv(self.img2can_matrix).astype(float)
 
+    def get_raster_primitives(self) -> tuple[list[Point2DArray], Point2DArray]:
+        return [], np.array([self.point_xy], dtype=float)
+
+    def set_rasterized(self, value: bool):
+        if value == self.rasterized:
+            return
+        self.rasterized = value
+        if value:
+            if self.circle_id is not None:
+                self.canvas.itemconfig(self.circle_id, state="hidden")
+        else:
+            self.update()
+
+    def is_dragged(self) -> bool:
+        return self.state == State.DRAGGED
+
     def get_img_point_xy(self) -> Point2D:
         return self.point_xy
 
@@ -152,6 +276,7 @@ class Point(InteractivePoint):
 
     def _on_click(self, event):
         self.state = State.DRAGGED
+        self.drag_start_xy = self.point_xy
         self.update()
         if self.on_click is not None:
             p_xy = event.x, event.y
@@ -181,6 +306,7 @@ class Point(InteractivePoint):
     def _on_release(self, event):
         self.state = State.HOVERED
         self.update()
+        self._record_move()
         if self.on_release is not None:
             can_xy = event.x, event.y
             img_xy = tmat.apply(self.can2img_matrix, can_xy)
@@ -0,0 +1,76 @@
+import enum
+import tkinter as tk
+from typing import Iterable, Optional, Sequence
+
+
+class Layer(enum.Enum):
+    IMAGE = "image"
+    ANNOTATIONS = "annotations"
+    POLYGONS = "polygons"
+    HANDLES = "handles"
+    MAGNETS = "magnets"
+    HUD = "hud"
+
+
+class LayerStack:
+    """
+    Fixed z-order of the canvas items, set once through tags instead of raising items on every update.
+    Each layer owns a hidden sentinel item sitting at the top of the layer: new items are lowered right below the sentinel of their layer when they
+    are created, and the display list is only reordered when the order of the layers changes.
+    Overlays hide their items when their layer is hidden (see get_item_state). Static items (image, HUD, ...) not redrawn by an overlay are placed
+    with static=True and are shown/hidden directly by the stack.
+    """
+
+    DEFAULT_ORDER = (Layer.IMAGE, Layer.ANNOTATIONS, Layer.POLYGONS, Layer.HANDLES, Layer.MAGNETS, Layer.HUD)  # bottom to top
+    STATIC_TAG = "gbn_layer_static"
+
+    def __init__(self, canvas: tk.Canvas, order: Sequence[Layer] = DEFAULT_ORDER):
+        self.canvas = canvas
+        self.order: tuple[Layer, ...] = ()
+        self.hidden_layers: set[Layer] = set()
+        self.sentinel_ids = {layer: canvas.create_line(0, 0, 0, 0, state="hidden", tags=(LayerStack.get_tag(layer),)) for layer in Layer}
+        self.set_order(order)
+
+    @staticmethod
+    def get_tag(layer: Layer) -> str:
+        return f"gbn_layer_{layer.value}"
+
+    def place(self, item_ids: Iterable[int], layer: Layer, static: bool = False):
+        """Moves newly created items on top of the given layer. Must be called once per item, after its creation."""
+        tags = (LayerStack.get_tag(layer), LayerStack.STATIC_TAG) if static else (LayerStack.get_tag(layer),)
+        sentinel_id = self.sentinel_ids[layer]
+        for item_id in item_ids:
+            for tag in tags:
+                self.canvas.addtag_withtag(tag, item_id)
+            self.canvas.tag_lower(item_id, sentinel_id)
+            if static and not self.is_visible(layer):
+                self.canvas.itemconfig(item_id, state="hidden")
+
+    def set_order(self, order: Sequence[Layer]):
+        """order: all the layers, from bottom to top"""
+        order = tuple(order)
+        if sorted(layer.value for layer in order) != sorted(layer.value for layer in Layer):
+            raise ValueError(f"order must contain each layer exactly once, got {order}")
+        if order == self.order:
+            return
+        self.order = order
+        for layer in order:
+            self.canvas.tag_raise(LayerStack.get_tag(layer))
+
+    def is_visible(self, layer: Layer) -> bool:
+        return layer not in self.hidden_layers
+
+    def set_visible(self, layer: Layer, value: bool):
+        """Shows/hides the static items of the layer. The overlays of the layer must then be updated to apply the change on their items."""
+        if value == self.is_visible(layer):
+            return
+        if value:
+            self.hidden_layers.discard(layer)
+        else:
+            self.hidden_layers.add(layer)
+        self.canvas.itemconfig(f"{LayerStack.get_tag(layer)}&&{LayerStack.STATIC_TAG}", state="normal" if value else "hidden")
+
+
+def get_item_state(visible: bool, layers: Optional[LayerStack], layer: Layer) -> str:
+    """Tk state of the items of an overlay, taking into account the visibility of its layer"""
+    return "normal" if visible and (layers is None or layers.is_visible(layer)) else "hidden"
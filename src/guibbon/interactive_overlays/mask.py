@@ -0,0 +1,247 @@
+import tkinter as tk
+from typing import Any, Callable, Optional
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+from guibbon import transform_matrix as tmat
+from guibbon.transform_matrix import TransformMatrix
+from guibbon.typedef import Image_t, Point2D
+from .base import UpdateBatch
+from .layers import LayerStack
+
+Rect = tuple[int, int, int, int]  # x0, y0, x1, y1 with x1 and y1 excluded
+Mask_t = npt.NDArray[np.uint8]
+
+
+def default_palette() -> npt.NDArray[np.uint8]:
+    """256 BGR colors with well separated hues. Label 0 is transparent, its color is not used."""
+    hues = (np.arange(256) * 0.618033988749895 * 180) % 180
+    hsv = np.stack([hues, np.full(256, 220), np.full(256, 255)], axis=-1).astype(np.uint8).reshape(1, 256, 3)
+    palette = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR).reshape(256, 3).astype(np.uint8)
+    palette[0] = 0
+    return palette
+
+
+def to_label_mask(mask: npt.ArrayLike, shape_hw: tuple[int, ...]) -> Mask_t:
+    """Label map of an image of shape shape_hw (height, width) as uint8. Raises ValueError if the shapes differ or a label is not in [0, 255]."""
+    mask = np.asarray(mask)
+    if mask.shape != tuple(shape_hw):
+        raise ValueError(f"mask must have the shape of the image {tuple(shape_hw)}, got {mask.shape}")
+    if mask.dtype == np.uint8:
+        return mask
+    if mask.dtype != np.bool_ and mask.size > 0:
+        if not np.issubdtype(mask.dtype, np.number):
+            raise ValueError(f"mask must be an array of labels, got dtype={mask.dtype}")
+        min_label, max_label = mask.min(), mask.max()
+        if min_label < 0 or max_label > 255:
+            raise ValueError(f"mask labels must be in [0, 255], got labels in [{min_label}, {max_label}]")
+        if not np.issubdtype(mask.dtype, np.integer) and not np.array_equal(mask, np.floor(mask)):
+            raise ValueError("mask labels must be integers")
+    return mask.astype(np.uint8)
+
+
+def project_rect(img_rect: Rect, img2can_matrix: TransformMatrix, can_shape_hw: tuple[int, int]) -> Optional[Rect]:
+    """Bounding rectangle on the canvas of a rectangle of the image, clipped to the canvas. Returns None if empty."""
+    x0, y0, x1, y1 = img_rect
+    corners = tmat.apply_array(img2can_matrix, np.array([(x0, y0), (x1, y0), (x1, y1), (x0, y1)], dtype=float))
+    h, w = can_shape_hw
+    cx0, cy0 = np.floor(corners.min(axis=0)).astype(int) - 1
+    cx1, cy1 = np.ceil(corners.max(axis=0)).astype(int) + 1
+    cx0, cy0, cx1, cy1 = max(0, int(cx0)), max(0, int(cy0)), min(w, int(cx1)), min(h, int(cy1))
+    if cx0 >= cx1 or cy0 >= cy1:
+        return None
+    return cx0, cy0, cx1, cy1
+
+
+class MaskOverlay:
+    """
+    Binary mask or label map (uint8, img space) blended on the displayed image, with a brush to paint it.
+    The mask is resampled with nearest-neighbour on the viewport only. While painting, only the canvas rectangle covered by the new brush segment is
+    re-composited, so that the cost of a stroke does not depend on the resolution of the image.
+    Labels are mapped to colors with a palette, label 0 is transparent.
+    """
+
+    DEFAULT_ALPHA = 0.5
+
+    def __init__(
+        self,
+        canvas: Optional[tk.Canvas],
+        mask: Mask_t,
+        label: str = "",
+        palette: Optional[npt.ArrayLike] = None,
+        alpha: float = DEFAULT_ALPHA,
+        img2can_matrix: Optional[TransformMatrix] = None,
+    ):
+        if img2can_matrix is None:
+            img2can_matrix = tmat.identity_matrix()
+        if mask.dtype != np.uint8 or mask.ndim != 2:
+            raise TypeError(f"mask must be a 2D array of dtype uint8, got shape={mask.shape} and dtype={mask.dtype}")
+
+        self.canvas = canvas
+        self.label = label
+        self.mask: Mask_t = mask  # not copied, painting modifies the given array
+        self.img2can_matrix: TransformMatrix = img2can_matrix.copy()
+        self.visible: bool = True
+        self.batch: Optional[UpdateBatch] = None
+        self.layers: Optional[LayerStack] = None
+
+        # called with the modified rectangle (img space), or None if the whole mask must be redrawn
+        self.on_change: Optional[Callable[[Optional[Rect]], None]] = None
+
+        self.brush_enabled: bool = False
+        self.brush_label: int = 1
+        self.brush_radius: int = 10  # img space
+        self.last_brush_xy: Optional[tuple[int, int]] = None
+
+        # undo/redo: the pixels modified by a stroke are saved segment by segment, and recorded as a single edit at the end of the stroke
+        self.history: Optional[Any] = None
+        self.stroke_backups: Optional[list[tuple[Rect, Mask_t]]] = None
+
+        self.alpha: float = float(np.clip(alpha, 0, 1))
+        self.palette_rgb: npt.NDArray[np.float32]
+        self.premultiplied_lut: npt.NDArray[np.float32]  # palette_rgb * alpha, by label
+        self.set_palette(default_palette() if palette is None else palette)
+
+    def _update_lut(self):
+        self.premultiplied_lut = self.palette_rgb * np.float32(self.alpha)
+
+    def set_palette(self, palette: npt.ArrayLike):
+        """palette: array of shape (N, 3) of BGR colors, like the images given to imshow. Labels >= N are drawn with the last color."""
+        palette_bgr = np.asarray(palette, dtype=np.float32).reshape(-1, 3)
+        palette_bgr = np.concatenate([palette_bgr, np.repeat(palette_bgr[-1:], 256 - len(palette_bgr), axis=0)])[:256]
+        self.palette_rgb = np.ascontiguousarray(palette_bgr[:, ::-1])
+        self._update_lut()
+        self._notify(None)
+
+    def set_alpha(self, alpha: float):
+        self.alpha = float(np.clip(alpha, 0, 1))
+        self._update_lut()
+        self._notify(None)
+
+    def _notify(self, img_rect: Optional[Rect]):
+        if self.on_change is not None:
+            self.on_change(img_rect)
+
+    def get_mask(self) -> Mask_t:
+        """Returns the mask array itself (not a copy). Call invalidate() after modifying it in place."""
+        return self.mask
+
+    def set_mask(self, mask: Mask_t):
+        if mask.dtype != np.uint8 or mask.ndim != 2:
+            raise TypeError(f"mask must be a 2D array of dtype uint8, got shape={mask.shape} and dtype={mask.dtype}")
+        self.mask = mask
+        self._notify(None)
+
+    def invalidate(self, img_rect: Optional[Rect] = None):
+        """Redraws the given rectangle of the mask (img space), or the whole mask"""
+        self._notify(img_rect)
+
+    def blend(self, viewport_rgb: Image_t, can_rect: Optional[Rect] = None):
+        """Alpha blends the mask on viewport_rgb (canvas space, modified in place), within can_rect or on the whole viewport"""
+        if not self.visible or self.alpha == 0:
+            return
+        h, w = viewport_rgb.shape[:2]
+        x0, y0, x1, y1 = (0, 0, w, h) if can_rect is None else can_rect
+        img2roi_matrix = tmat.T((-x0, -y0)) @ self.img2can_matrix
+        labels = cv2.warpPerspective(self.mask, img2roi_matrix, dsize=(x1 - x0, y1 - y0), flags=cv2.INTER_NEAREST, borderValue=0)
+        is_labeled = labels != 0
+        if not np.any(is_labeled):
+            return
+        roi = viewport_rgb[y0:y1, x0:x1]
+        roi_labeled = roi[is_labeled].astype(np.float32)
+        roi[is_labeled] = (roi_labeled * np.float32(1 - self.alpha) + self.premultiplied_lut[labels[is_labeled]]).astype(np.uint8)
+
+    def paint(self, p0_xy: Point2D, p1_xy: Optional[Point2D] = None) -> Optional[Rect]:
+        """Paints a brush segment (or a single stamp) with brush_label, in img space. Returns the modified rectangle (img space)."""
+        if p1_xy is None:
+            p1_xy = p0_xy
+        x0, y0 = int(round(p0_xy[0])), int(round(p0_xy[1]))
+        x1, y1 = int(round(p1_xy[0])), int(round(p1_xy[1]))
+        r = self.brush_radius
+        h, w = self.mask.shape
+        rect = max(0, min(x0, x1) - r - 1), max(0, min(y0, y1) - r - 1), min(w, max(x0, x1) + r + 2), min(h, max(y0, y1) + r + 2)
+        if rect[0] >= rect[2] or rect[1] >= rect[3]:
+            return None
+        rx0, ry0, rx1, ry1 = rect
+        backup = self.mask[ry0:ry1, rx0:rx1].copy() if self.history is not None else None
+
+        cv2.circle(self.mask, (x1, y1), r, self.brush_label, thickness=-1)
+        if (x0, y0) != (x1, y1):
+            cv2.circle(self.mask, (x0, y0), r, self.brush_label, thickness=-1)
+            cv2.line(self.mask, (x0, y0), (x1, y1), self.brush_label, thickness=2 * r + 1)
+
+        if backup is not None:
+            if self.stroke_backups is not None:
+                self.stroke_backups.append((rect, backup))
+            else:
+                self._record_edit([(rect, backup)])
+        self._notify(rect)
+        return rect
+
+    def _record_edit(self, backups: list[tuple[Rect, Mask_t]]):
+        if self.history is None or len(backups) == 0:
+            return
+        # one delta per segment: the pixels from before each segment, and from the end of the stroke
+        segments = [(rect, backup, self.mask[rect[1] : rect[3], rect[0] : rect[2]]) for rect, backup in backups]
+        self.history.record_mask_stroke(self, segments)
+
+    def apply_mask_delta(self, rect: Rect, pixels: Mask_t):
+        x0, y0, x1, y1 = rect
+        self.mask[y0:y1, x0:x1] = pixels
+        self._notify(rect)
+
+    def set_history(self, history):
+        self.history = history
+
+    def set_brush(self, label: Optional[int] = None, radius: Optional[int] = None, enabled: bool = True):
+        """Enables painting with the left mouse button. label: painted label, 0 to erase. radius: in img space."""
+        if label is not None:
+            self.brush_label = int(label)
+        if radius is not None:
+            self.brush_radius = int(radius)
+        self.brush_enabled = enabled
+        self.last_brush_xy = None
+
+    def on_brush_event(self, event_type: tk.EventType, img_xy: Point2D, is_button_down: bool):
+        """Mouse events of the left button, forwarded by the viewer when the brush is enabled"""
+        xy = int(round(img_xy[0])), int(round(img_xy[1]))
+        if event_type == tk.EventType.ButtonPress:
+            self.last_brush_xy = xy
+            self.stroke_backups = []
+            self.paint(xy)
+        elif event_type == tk.EventType.Motion and is_button_down and self.last_brush_xy is not None:
+            if xy != self.last_brush_xy:
+                self.paint(self.last_brush_xy, xy)
+                self.last_brush_xy = xy
+        elif event_type == tk.EventType.ButtonRelease:
+            self.last_brush_xy = None
+            if self.stroke_backups is not None:
+                self._record_edit(self.stroke_backups)
+            self.stroke_backups = None
+
+    def set_img2can_matrix(self, img2can_matrix: TransformMatrix):
+        self.img2can_matrix = img2can_matrix.copy()
+
+    def update(self):
+        """The mask is blended in the image by the viewer: nothing to draw on the canvas"""
+        pass
+
+    def set_visible(self, value: bool):
+        if value == self.visible:
+            return
+        self.visible = value
+        self._notify(None)
+
+    def set_layers(self, layers: LayerStack):
+        self.layers = layers
+
+    def delete(self):
+        self.on_change = None
+        self.batch = None
+        self.layers = None
+        self.history = None
+
+    def get_item_ids(self) -> list[int]:
+        return []
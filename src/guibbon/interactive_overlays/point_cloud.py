@@ -0,0 +1,288 @@
+import itertools
+import tkinter as tk
+from typing import Any, Optional
+
+import cv2
+import numpy as np
+
+from guibbon import transform_matrix as tmat
+from guibbon.transform_matrix import TransformMatrix
+from guibbon.typedef import Image_t, Point2D, Point2DArray, CallbackPointCloud
+from .base import State, Point, Magnets, UpdateBatch, get_rgb
+from .layers import Layer, LayerStack, get_item_state
+
+
+class PointCloud:
+    """
+    Large set of draggable points sharing a single tag on the canvas.
+    The coordinates (img space) are stored in a single numpy array of shape (N, 2). Styling and bindings are applied once on the shared tag, and a
+    single drag handler reports the index of the point being moved.
+    The canvas items and bindings are created when the points are first shown: a point cloud created hidden (visible=False) costs no Tk call.
+    """
+
+    colors = Point.colors
+    radius = Point.radius
+    raster_layer = Layer.HANDLES  # layer of the canvas items, see draw_raster(...)
+    _tag_counter = itertools.count()
+
+    def __init__(
+        self,
+        canvas: tk.Canvas,
+        points_xy: Point2DArray,
+        label: str = "",
+        on_click: CallbackPointCloud = None,
+        on_drag: CallbackPointCloud = None,
+        on_release: CallbackPointCloud = None,
+        img2can_matrix: Optional[TransformMatrix] = None,
+        magnets: Optional[Magnets] = None,
+        visible: bool = True,
+    ):
+        if img2can_matrix is None:
+            img2can_matrix = tmat.identity_matrix()
+
+        self.canvas = canvas
+        self.label = label
+        self.tag = f"gbn_point_cloud_{next(PointCloud._tag_counter)}"
+        self.points_xy: Point2DArray = np.array(points_xy, dtype=float).reshape(-1, 2)  # coordinates are expressed in img space
+        self.img2can_matrix: TransformMatrix
+        self.can2img_matrix: TransformMatrix
+        self.set_img2can_matrix(img2can_matrix)
+        self.magnets = magnets
+
+        self.visible: bool = visible
+        self.batch: Optional[UpdateBatch] = None
+        self.layers: Optional[LayerStack] = None
+        self.history: Optional[Any] = None
+        self.history_owner: Optional[Any] = None  # the contour using the point cloud as handles
+        self.drag_start_xy: Optional[Point2D] = None
+        self.hovered_index: Optional[int] = None
+        self.dragged_index: Optional[int] = None
+
+        self.on_click = on_click
+        self.on_drag = on_drag
+        self.on_release = on_release
+
+        self.circle_ids: list[int] = []
+        self.index_by_circle_id: dict[int, int] = {}
+        self._can_points_xy = np.zeros(shape=(0, 2), dtype=int)  # last coordinates sent to the canvas
+        # keep the ids of the bindings to release the tcl commands on delete
+        self.binding_ids: list[tuple[str, str]] = []
+        self.has_items = False
+        if visible:
+            self._create_items()
+
+    def _create_items(self):
+        self.has_items = True
+        self._resize_items(len(self.points_xy))
+        self.binding_ids.append(("<Button-1>", self.canvas.tag_bind(self.tag, "<Button-1>", self._on_click)))
+        self.binding_ids.append(("<B1-Motion>", self.canvas.tag_bind(self.tag, "<B1-Motion>", self._on_drag)))
+        self.binding_ids.append(("<ButtonRelease-1>", self.canvas.tag_bind(self.tag, "<ButtonRelease-1>", self._on_release)))
+        self.binding_ids.append(("<Enter>", self.canvas.tag_bind(self.tag, "<Enter>", self._on_enter)))
+        self.binding_ids.append(("<Leave>", self.canvas.tag_bind(self.tag, "<Leave>", self._on_leave)))
+
+    def _resize_items(self, n: int):
+        while len(self.circle_ids) > n:
+            circle_id = self.circle_ids.pop()
+            self.index_by_circle_id.pop(circle_id)
+            self.canvas.delete(circle_id)
+
+        new_circle_ids = []
+        while len(self.circle_ids) < n:
+            circle_id = self.canvas.create_oval(0, 0, 1, 1, fill=PointCloud.colors[State.NORMAL], outline="#FFFFFF", width=2, tags=(self.tag,))
+            self.index_by_circle_id[circle_id] = len(self.circle_ids)
+            self.circle_ids.append(circle_id)
+            new_circle_ids.append(circle_id)
+        if self.layers is not None:
+            self.layers.place(new_circle_ids, Layer.HANDLES)
+
+        # force the next update to move all the items
+        self._can_points_xy = np.full(shape=(n, 2), fill_value=np.iinfo(int).min, dtype=int)
+
+        if self.hovered_index is not None and self.hovered_index >= n:
+            self.hovered_index = None
+        if self.dragged_index is not None and self.dragged_index >= n:
+            self.dragged_index = None
+
+    def get_state(self, index: int) -> State:
+        if index == self.dragged_index:
+            return State.DRAGGED
+        if index == self.hovered_index:
+            return State.HOVERED
+        return State.NORMAL
+
+    def _update_item(self, index: int):
+        state = self.get_state(index)
+        radius = PointCloud.radius[state]
+        can_x, can_y = self._can_points_xy[index]
+        self.canvas.coords(self.circle_ids[index], can_x - radius, can_y - radius, can_x + radius, can_y + radius)
+        self.canvas.itemconfig(self.circle_ids[index], fill=PointCloud.colors[state])
+
+    def update(self):
+        if self.batch is not None and self.batch.defer(self):
+            return
+        if not self.has_items:
+            if not self.visible:
+                return  # nothing shown yet
+            self._create_items()
+        self.update_magnets()
+        item_state = get_item_state(self.visible, self.layers, Layer.HANDLES)
+        self.canvas.itemconfig(self.tag, state=item_state)
+
+        can_points_xy = np.round(tmat.apply_array(self.img2can_matrix, self.points_xy)).astype(int)
+        # only move the items whose position changed on the canvas
+        moved_indexes = np.flatnonzero(np.any(can_points_xy != self._can_points_xy, axis=1))
+        self._can_points_xy = can_points_xy
+
+        radius = PointCloud.radius[State.NORMAL]
+        for index in moved_indexes.tolist():
+            can_x, can_y = can_points_xy[index]
+            self.canvas.coords(self.circle_ids[index], can_x - radius, can_y - radius, can_x + radius, can_y + radius)
+
+        for live_index in (self.hovered_index, self.dragged_index):
+            if live_index is not None:
+                self._update_item(live_index)
+
+    def draw_raster(self, mat: Image_t, img2can_matrix: TransformMatrix):
+        """Draws the visible points on mat (RGB, canvas space) like their canvas items, see OverlayRasterizer.draw_live(...)"""
+        if get_item_state(self.visible, self.layers, Layer.HANDLES) == "hidden":
+            return
+        can_points_xy = np.round(tmat.apply_array(img2can_matrix, self.points_xy)).astype(int)
+        for index, (x, y) in enumerate(can_points_xy.tolist()):
+            state = self.get_state(index)
+            radius = PointCloud.radius[state]
+            cv2.circle(mat, (x, y), radius + 1, (255, 255, 255), -1)
+            cv2.circle(mat, (x, y), radius - 1, get_rgb(PointCloud.colors[state]), -1)
+
+    def delete(self):
+        for sequence, funcid in self.binding_ids:
+            self.canvas.tag_unbind(self.tag, sequence, funcid)
+        self.binding_ids = []
+        self.canvas.delete(self.tag)
+        self.circle_ids = []
+        self.index_by_circle_id = {}
+        if self.magnets is not None:
+            self.magnets.delete()
+        self.on_click = self.on_drag = self.on_release = None
+        self.magnets = None
+        self.batch = None
+        self.layers = None
+        self.history = self.history_owner = None
+
+    def get_item_ids(self) -> list[int]:
+        return self.circle_ids + []
+
+    def set_history(self, history):
+        self.history = history
+
+    def set_vertex_xy(self, index: int, img_point_xy: Point2D):
+        self.points_xy[index] = img_point_xy
+        self.update()
+
+    def set_layers(self, layers: LayerStack):
+        self.layers = layers
+        layers.place(self.circle_ids, Layer.HANDLES)
+        if self.magnets is not None:
+            self.magnets.set_layers(layers)
+
+    def set_img2can_matrix(self, img2can_matrix: TransformMatrix):
+        self.img2can_matrix = img2can_matrix.copy()
+        self.can2img_matrix = np.linalg.inv(self.img2can_matrix).astype(float)
+
+    def get_points(self) -> Point2DArray:
+        """Returns the coordinates array itself (not a copy). Call update() after modifying it in place."""
+        return self.points_xy
+
+    def set_points(self, points_xy: Point2DArray):
+        """Copies the given coordinates in place. The number of points is allowed to change."""
+        points_xy = np.asarray(points_xy, dtype=float).reshape(-1, 2)
+        if points_xy.shape == self.points_xy.shape:
+            self.points_xy[...] = points_xy
+        else:
+            self.points_xy = points_xy.copy()
+            if self.has_items:
+                self._resize_items(len(self.points_xy))
+        self.update()
+
+    def set_visible(self, value: bool):
+        if value == self.visible:
+            return
+        self.visible = value
+        self.update()
+
+    def update_magnets(self):
+        if self.magnets is not None:
+            self.magnets.visible = self.hovered_index is not None or self.dragged_index is not None
+            self.magnets.set_img2can_matrix(self.img2can_matrix)
+            self.magnets.update()
+
+    def _get_current_index(self) -> Optional[int]:
+        current_ids = self.canvas.find_withtag("current")
+        if len(current_ids) == 0:
+            return None
+        return self.index_by_circle_id.get(current_ids[0], None)
+
+    def _event_to_img_xy(self, event):
+        img_xy = tmat.apply(self.can2img_matrix, (event.x, event.y))
+        if self.magnets is not None:
+            img_xy = self.magnets.snap_to_nearest_magnet(img_xy)
+        return img_xy
+
+    def _on_click(self, event):
+        index = self._get_current_index()
+        if index is None:
+            return
+        self.dragged_index = index
+        self.drag_start_xy = (float(self.points_xy[index, 0]), float(self.points_xy[index, 1]))
+        self._update_item(index)
+        self.update_magnets()
+        if self.on_click is not None:
+            event.x, event.y = self._event_to_img_xy(event)
+            self.on_click(event, index, self.points_xy)
+
+    def _on_drag(self, event):
+        index = self.dragged_index
+        if index is None:
+            return
+        try:
+            img_xy = self._event_to_img_xy(event)
+            self.points_xy[index] = img_xy
+            self._can_points_xy[index] = np.round(tmat.apply(self.img2can_matrix, img_xy)).astype(int)
+            self._update_item(index)
+            if self.on_drag is not None:
+                event.x, event.y = img_xy
+                self.on_drag(event, index, self.points_xy)
+        except Exception as e:
+            print(f"ERROR: {self}: self._on_drag({event}) --->", e)
+            raise e
+
+    def _on_release(self, event):
+        index = self.dragged_index
+        if index is None:
+            return
+        self.dragged_index = None
+        self.hovered_index = index
+        self._update_item(index)
+        self.update_magnets()
+        if self.history is not None and self.drag_start_xy is not None:
+            owner = self if self.history_owner is None else self.history_owner
+            self.history.record_move(owner, index, self.drag_start_xy, tuple(self.points_xy[index].tolist()))
+        self.drag_start_xy = None
+        if self.on_release is not None:
+            event.x, event.y = self._event_to_img_xy(event)
+            self.on_release(event, index, self.points_xy)
+
+    def _on_enter(self, event):
+        index = self._get_current_index()
+        if index is None or self.dragged_index is not None:
+            return
+        self.hovered_index = index
+        self._update_item(index)
+        self.update_magnets()
+
+    def _on_leave(self, event):
+        index = self.hovered_index
+        if index is None or self.dragged_index is not None:
+            return
+        self.hovered_index = None
+        self._update_item(index)
+        self.update_magnets()
@@ -1,11 +1,53 @@
 
 
+import collections
+import math
 import tkinter as tk
-from typing import Sequence, Optional
+from typing import Sequence, Optional, Any, Union, overload
 
+import cv2
+import numpy as np
+
+from guibbon import transform_matrix as tmat
 from guibbon.transform_matrix import TransformMatrix
-from guibbon.typedef import Point2D, Point2DList, CallbackPoint, CallbackPolygon, CallbackRect, InteractivePolygon
-from .base import State, Point, Magnets
+from guibbon.typedef import Point2D, Point2DList, Point2DArray, CallbackPoint, CallbackPolygon, CallbackRect, InteractivePolygon
+from .base import State, Point, Magnets, UpdateBatch
+from .layers import Layer, LayerStack, get_item_state
+from .point_cloud import PointCloud
+
+
+class PointListView(Sequence[Point2D]):
+    """
+    Read-only view on the vertices (img space) of a polygon or a contour, given to their callbacks instead of a copy of all the vertices on every
+    mouse event. The view follows the overlay: copy it with list(view) to keep the vertices after the callback.
+    """
+
+    def __init__(self, points_xy: Union[Point2DList, Point2DArray]):
+        self._points_xy = points_xy
+
+    def __len__(self) -> int:
+        return len(self._points_xy)
+
+    @overload
+    def __getitem__(self, index: int) -> Point2D: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Point2DList: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[k] for k in range(*index.indices(len(self)))]
+        x, y = self._points_xy[index]
+        return float(x), float(y)
+
+    def __add__(self, other) -> Point2DList:
+        return list(self) + list(other)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Sequence) and list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"PointListView({list(self)})"
 
 
 class Polygon(InteractivePolygon):
@@ -25,10 +67,18 @@ class Polygon(InteractivePolygon):
         on_release: CallbackPolygon = None,
         img2can_matrix: Optional[TransformMatrix] = None,
         magnets: Optional[Magnets] = None,
+        batch: Optional[UpdateBatch] = None,
+        rasterized: bool = False,
     ):
+        """rasterized: the polygon starts rasterized, its canvas items and bindings are only created once it goes live (hovered or dragged)"""
         self.canvas = canvas
         self.label = label
         self.visible: bool = True
+        self.batch: Optional[UpdateBatch] = batch  # given at creation to defer the first update, when creating many overlays at once
+        self.rasterized: bool = rasterized
+        self.rasterizer: Optional[Any] = None
+        self.layers: Optional[LayerStack] = None
+        self.history: Optional[Any] = None
         self.state: State = State.NORMAL
 
         self.on_click = on_click
@@ -56,12 +106,32 @@ class Polygon(InteractivePolygon):
                 on_release=None if on_release is None else self._on_release,
                 img2can_matrix=img2can_matrix,
                 magnets=magnets,
+                rasterized=rasterized,
             )
             self.ipoints.append(ipoint)
 
-        self.lines = self._create_lines()
+        # cache of the vertices coordinates. Only the dirty vertices are recomputed on update
+        self.img_point_xy_list: Point2DList = [ipoint.get_img_point_xy() for ipoint in self.ipoints]
+        self.can_point_xy_list: list[tuple[int, int]] = [(0, 0)] * N
+        self.dirty_indices: set[int] = set(range(N))
+
+        self.lines: list[tuple[int, int, int]] = []
+        self.has_lines = False
+        if not rasterized:
+            self._create_line_items()
         self.update()
 
+    def _create_line_items(self):
+        self.lines = self._create_lines()
+        self.has_lines = True
+        # keep the lines below the vertices. Done once at creation, the z-order is then maintained by the layers
+        first_circle_id = self.ipoints[0].circle_id if len(self.ipoints) > 0 else None
+        if first_circle_id is not None:
+            for _, _, line_id in self.lines:
+                self.canvas.tag_lower(line_id, first_circle_id)
+        if self.layers is not None:
+            self.layers.place([line_id for _, _, line_id in self.lines], Layer.POLYGONS)
+
     def _create_lines(self):
         lines = []
         N = len(self.ipoints)
@@ -72,55 +142,132 @@ class Polygon(InteractivePolygon):
             lines.append((i1, i2, line_id))
         return lines
 
+    def _update_dirty_vertices(self):
+        for k in self.dirty_indices:
+            self.img_point_xy_list[k] = self.ipoints[k].get_img_point_xy()
+            x, y = self.ipoints[k].get_can_point_xy()
+            self.can_point_xy_list[k] = (int(round(x)), int(round(y)))
+
     def _update_lines(self):
-        # draw lines
-        item_state = "normal" if self.visible else "hidden"
-        point_xy_list = [ipoint.get_can_point_xy() for ipoint in self.ipoints]
-        point_xy_list = [(int(round(x)), int(round(y))) for x, y in point_xy_list]
-        for i1, i2, line_id in self.lines:
-            x1, y1 = point_xy_list[i1]
-            x2, y2 = point_xy_list[i2]
+        # draw only the lines adjacent to a dirty vertex
+        item_state = get_item_state(self.visible, self.layers, Layer.POLYGONS)
+        self._update_dirty_vertices()
+        N = len(self.ipoints)
+        line_indices = self.dirty_indices | {(k - 1) % N for k in self.dirty_indices}
+        for line_index in line_indices:
+            i1, i2, line_id = self.lines[line_index]
+            x1, y1 = self.can_point_xy_list[i1]
+            x2, y2 = self.can_point_xy_list[i2]
             self.canvas.coords(line_id, x1, y1, x2, y2)
             self.canvas.itemconfig(line_id, state=item_state)
-            self.canvas.tag_raise(line_id)
+        self.dirty_indices.clear()
 
     def _update_points(self):
         for ipoint in self.ipoints:
             ipoint.update()
 
     def update(self):
+        if self.batch is not None and self.batch.defer(self):
+            return
+        if self.rasterized:
+            if self.rasterizer is not None:
+                self.rasterizer.request_render(self)
+            return
+        if not self.has_lines:
+            self._create_line_items()
+        self.dirty_indices.update(range(len(self.ipoints)))
         self._update_lines()
         self._update_points()
 
+    def delete(self):
+        for _, _, line_id in self.lines:
+            self.canvas.delete(line_id)
+        self.lines = []
+        for ipoint in self.ipoints:
+            ipoint.delete()
+        self.ipoints = []
+        self.on_click = self.on_drag = self.on_release = None
+        self.batch = None
+        self.rasterizer = None
+        self.layers = None
+        self.history = None
+
+    def get_item_ids(self) -> list[int]:
+        return [line_id for _, _, line_id in self.lines] + [item_id for ipoint in self.ipoints for item_id in ipoint.get_item_ids()]
+
+    def set_layers(self, layers: LayerStack):
+        self.layers = layers
+        layers.place([line_id for _, _, line_id in self.lines], Layer.POLYGONS)
+        for ipoint in self.ipoints:
+            ipoint.set_layers(layers)
+
+    def set_history(self, history):
+        self.history = history
+        for k, ipoint in enumerate(self.ipoints):
+            ipoint.set_history(history)
+            ipoint.history_owner = self
+            ipoint.history_vertex = k
+
+    def set_vertex_xy(self, index: int, img_point_xy: Point2D):
+        """Moves a vertex (undo/redo): only this vertex and its 2 adjacent lines are redrawn"""
+        ipoint = self.ipoints[index]
+        ipoint.set_img_point_xy(img_point_xy)
+        self.dirty_indices.add(index)
+        if self.rasterized or not self.has_lines:
+            self.update()  # projected again by the rasterizer, or the line items are created
+            return
+        if self.batch is not None and self.batch.defer(self):
+            return
+        self._update_lines()
+        ipoint.update()
+
     def _on_click(self, event):
         if self.on_click is not None:
-            point_xy_list = [ipoint.get_img_point_xy() for ipoint in self.ipoints]
-            self.on_click(event, point_xy_list)
+            self.on_click(event, PointListView(self.img_point_xy_list))
 
     def _on_drag(self, i, event):
         try:
+            # the dragged Point updates itself, only its 2 adjacent lines need to be redrawn
+            self.dirty_indices.add(i)
             self._update_lines()
             if self.on_drag is not None:
-                point_xy_list = [ipoint.get_img_point_xy() for ipoint in self.ipoints]
-                self.on_drag(event, point_xy_list)
+                self.on_drag(event, PointListView(self.img_point_xy_list))
         except Exception as e:
             print(f"ERROR: {self}: self._on_drag({event}) --->", e)
             raise e
 
     def _on_release(self, event):
         if self.on_release is not None:
-            point_xy_list = [ipoint.get_img_point_xy() for ipoint in self.ipoints]
-            self.on_release(event, point_xy_list)
+            self.on_release(event, PointListView(self.img_point_xy_list))
 
     def set_img2can_matrix(self, img2can_matrix: TransformMatrix):
         for ipoint in self.ipoints:
             ipoint.set_img2can_matrix(img2can_matrix)
 
+    def get_raster_primitives(self) -> tuple[list[Point2DArray], Point2DArray]:
+        points_xy = np.array([ipoint.get_img_point_xy() for ipoint in self.ipoints], dtype=float).reshape(-1, 2)
+        return [points_xy], points_xy
+
+    def set_rasterized(self, value: bool):
+        if value == self.rasterized:
+            return
+        self.rasterized = value
+        for ipoint in self.ipoints:
+            ipoint.set_rasterized(value)  # the vertices are created before the lines, see _create_line_items()
+        if value:
+            for _, _, line_id in self.lines:
+                self.canvas.itemconfig(line_id, state="hidden")
+        else:
+            self.update()
+
+    def is_dragged(self) -> bool:
+        return any(ipoint.is_dragged() for ipoint in self.ipoints)
+
     def set_point_xy_list(self, point_xy_list: Point2DList):
         assert len(point_xy_list) == len(self.ipoints)
         for ipoint, point_xy in zip(self.ipoints, point_xy_list):
             ipoint.set_img_point_xy(point_xy)
-            self.update()
+        self.update()
 
     def set_visible(self, value: bool):
         if value == self.visible:
@@ -142,6 +289,8 @@ class Rectangle(Polygon):
         on_release: CallbackRect = None,
         img2can_matrix: Optional[TransformMatrix] = None,
         magnets: Optional[Magnets] = None,
+        batch: Optional[UpdateBatch] = None,
+        rasterized: bool = False,
     ):
         # wrap user callback to convert signature from CallbackRect to CallbackPolygon
         lambda0 = None if on_click is None else lambda event, point_list_xy: on_click(event, point_list_xy[0], point_list_xy[1])
@@ -166,16 +315,25 @@ class Rectangle(Polygon):
             on_release=None if on_release is None else on_release_rect,
             img2can_matrix=img2can_matrix,
             magnets=magnets,
+            batch=batch,
+            rasterized=rasterized,
         )
 
+    def get_raster_primitives(self) -> tuple[list[Point2DArray], Point2DArray]:
+        (x0, y0), (x1, y1) = [ipoint.get_img_point_xy() for ipoint in self.ipoints]
+        corners_xy = np.array([(x0, y0), (x1, y0), (x1, y1), (x0, y1)], dtype=float)
+        return [corners_xy], corners_xy[[0, 2]]
+
     def _create_lines(self):
         return [(-1, -1, self.canvas.create_line(-1, -1, -1, -1, fill=Polygon.colors[self.state], width=5)) for i in range(4)]
 
     def _update_lines(self):
-        item_state = "normal" if self.visible else "hidden"
+        item_state = get_item_state(self.visible, self.layers, Layer.POLYGONS)
 
-        point_xy_list = [ipoint.get_can_point_xy() for ipoint in self.ipoints]
-        point_xy_list = [(int(round(x)), int(round(y))) for x, y in point_xy_list]
+        # a rectangle only has 2 vertices, all 4 lines depend on both of them
+        self._update_dirty_vertices()
+        self.dirty_indices.clear()
+        point_xy_list = self.can_point_xy_list
 
         left = point_xy_list[0][0]
         top = point_xy_list[0][1]
@@ -185,19 +343,225 @@ class Rectangle(Polygon):
         line_id = self.lines[0][2]
         self.canvas.coords(line_id, left, top, right, top)
         self.canvas.itemconfig(line_id, state=item_state)
-        self.canvas.tag_raise(line_id)
 
         line_id = self.lines[1][2]
         self.canvas.coords(line_id, right, top, right, bottom)
         self.canvas.itemconfig(line_id, state=item_state)
-        self.canvas.tag_raise(line_id)
 
         line_id = self.lines[2][2]
         self.canvas.coords(line_id, right, bottom, left, bottom)
         self.canvas.itemconfig(line_id, state=item_state)
-        self.canvas.tag_raise(line_id)
 
         line_id = self.lines[3][2]
         self.canvas.coords(line_id, left, bottom, left, top)
         self.canvas.itemconfig(line_id, state=item_state)
-        self.canvas.tag_raise(line_id)
+
+
+class Contour(InteractivePolygon):
+    """
+    Polygon drawn as a single closed polyline item, suited for contours with thousands of vertices.
+    The polyline is simplified with Douglas-Peucker in canvas space (cached per zoom level) and the vertex handles are only shown when the vertices are
+    far enough from each other on the canvas. Hidden handles are not moved.
+    """
+
+    SIMPLIFY_EPSILON = 1.0  # max deviation in canvas space (pixels)
+    HANDLE_MIN_SPACING = 2 * Point.radius[State.HOVERED]  # min distance in canvas space between 2 consecutive vertices to show the handles
+    ZOOM_LEVELS_PER_OCTAVE = 4  # zoom quantization of the simplification cache
+    SIMPLIFIED_CACHE_SIZE = 16  # number of zoom levels kept
+
+    def __init__(
+        self,
+        canvas: tk.Canvas,
+        point_xy_list: Point2DList,
+        label: str = "",
+        on_click: CallbackPolygon = None,
+        on_drag: CallbackPolygon = None,
+        on_release: CallbackPolygon = None,
+        img2can_matrix: Optional[TransformMatrix] = None,
+        magnets: Optional[Magnets] = None,
+        batch: Optional[UpdateBatch] = None,
+        rasterized: bool = False,
+    ):
+        """rasterized: the contour starts rasterized, its canvas items and bindings are only created once it goes live (hovered or dragged)"""
+        if img2can_matrix is None:
+            img2can_matrix = tmat.identity_matrix()
+
+        self.canvas = canvas
+        self.label = label
+        self.visible: bool = True
+        self.batch: Optional[UpdateBatch] = batch
+        self.rasterized: bool = rasterized
+        self.rasterizer: Optional[Any] = None
+        self.layers: Optional[LayerStack] = None
+        self.history: Optional[Any] = None
+        self.state: State = State.NORMAL
+
+        self.on_click = on_click
+        self.on_drag = on_drag
+        self.on_release = on_release
+
+        self.img2can_matrix: TransformMatrix = img2can_matrix.copy()
+        self.simplified_by_zoom: collections.OrderedDict[int, Point2DArray] = collections.OrderedDict()  # by zoom level, least recently used first
+        self.handles_visible: bool = False
+
+        # the line is created first to stay below the handles
+        self.line_id: Optional[int] = None if rasterized else self._create_line_item()
+        self.handles = PointCloud(
+            canvas,
+            np.array(point_xy_list, dtype=float).reshape(-1, 2),
+            on_click=None if on_click is None else self._on_click,
+            on_drag=self._on_drag,
+            on_release=None if on_release is None else self._on_release,
+            img2can_matrix=img2can_matrix,
+            magnets=magnets,
+            visible=not rasterized,
+        )
+        self.update()
+
+    def _create_line_item(self) -> int:
+        line_id = self.canvas.create_line(-1, -1, -1, -1, fill=Polygon.colors[self.state], width=5)
+        if self.layers is not None:
+            self.layers.place([line_id], Layer.POLYGONS)
+        self.line_id = line_id
+        return line_id
+
+    def get_zoom(self) -> float:
+        return float(np.sqrt(abs(np.linalg.det(self.img2can_matrix[:2, :2]))))
+
+    def get_simplified_points(self) -> Point2DArray:
+        """
+        Douglas-Peucker simplification of the contour with a tolerance expressed in canvas space. Results are cached per zoom level: the zoom is
+        rounded up to a fraction of octave, so that the tolerance is never exceeded, and only the last zoom levels are kept.
+        """
+        zoom = self.get_zoom()
+        level = math.ceil(math.log2(zoom) * Contour.ZOOM_LEVELS_PER_OCTAVE) if zoom > 0 else -(2**31)
+        simplified_xy = self.simplified_by_zoom.get(level, None)
+        if simplified_xy is not None:
+            self.simplified_by_zoom.move_to_end(level)
+            return simplified_xy
+        points_xy: Point2DArray = self.handles.get_points()
+        if len(points_xy) > 2 and zoom > 0:
+            level_zoom = 2 ** (level / Contour.ZOOM_LEVELS_PER_OCTAVE)
+            points_xy = cv2.approxPolyDP(points_xy.astype(np.float32), Contour.SIMPLIFY_EPSILON / level_zoom, closed=True).reshape(-1, 2).astype(float)
+        simplified_xy = points_xy.astype(float)
+        self.simplified_by_zoom[level] = simplified_xy
+        while len(self.simplified_by_zoom) > Contour.SIMPLIFIED_CACHE_SIZE:
+            self.simplified_by_zoom.popitem(last=False)
+        return simplified_xy
+
+    def _update_line(self):
+        line_id = self._create_line_item() if self.line_id is None else self.line_id
+        item_state = get_item_state(self.visible, self.layers, Layer.POLYGONS)
+        can_points_xy = np.round(tmat.apply_array(self.img2can_matrix, self.get_simplified_points()))
+        if len(can_points_xy) > 0:
+            can_points_xy = np.concatenate([can_points_xy, can_points_xy[:1]])  # close the polyline
+        coords = can_points_xy.ravel().tolist() if len(can_points_xy) >= 2 else [-1, -1, -1, -1]
+        self.canvas.coords(line_id, *coords)
+        self.canvas.itemconfig(line_id, state=item_state)
+
+    def _compute_handles_visible(self) -> bool:
+        can_points_xy = tmat.apply_array(self.img2can_matrix, self.handles.get_points())
+        spacing = np.linalg.norm(can_points_xy - np.roll(can_points_xy, 1, axis=0), axis=1)
+        return len(spacing) == 0 or float(np.min(spacing)) >= Contour.HANDLE_MIN_SPACING
+
+    def _update_handles(self):
+        self.handles_visible = self._compute_handles_visible()
+        is_visible = self.visible and self.handles_visible and not self.rasterized
+        self.handles.set_img2can_matrix(self.img2can_matrix)
+        if is_visible != self.handles.visible:
+            self.handles.set_visible(is_visible)  # updates the handles once
+        elif is_visible:
+            self.handles.update()
+
+    def update(self):
+        if self.batch is not None and self.batch.defer(self):
+            return
+        if self.rasterized:
+            if self.rasterizer is not None:
+                self.rasterizer.request_render(self)
+            return
+        self._update_line()
+        self._update_handles()
+
+    def delete(self):
+        if self.line_id is not None:
+            self.canvas.delete(self.line_id)
+            self.line_id = None
+        self.handles.delete()
+        self.on_click = self.on_drag = self.on_release = None
+        self.batch = None
+        self.rasterizer = None
+        self.layers = None
+        self.history = None
+
+    def get_item_ids(self) -> list[int]:
+        return ([] if self.line_id is None else [self.line_id]) + self.handles.get_item_ids()
+
+    def set_layers(self, layers: LayerStack):
+        self.layers = layers
+        if self.line_id is not None:
+            layers.place([self.line_id], Layer.POLYGONS)
+        self.handles.set_layers(layers)
+
+    def set_history(self, history):
+        self.history = history
+        self.handles.set_history(history)
+        self.handles.history_owner = self
+
+    def set_vertex_xy(self, index: int, img_point_xy: Point2D):
+        self.handles.get_points()[index] = img_point_xy
+        self.simplified_by_zoom.clear()
+        self.update()
+
+    def get_raster_primitives(self) -> tuple[list[Point2DArray], Point2DArray]:
+        handles_xy = self.handles.get_points() if self._compute_handles_visible() else np.zeros(shape=(0, 2), dtype=float)
+        return [self.get_simplified_points()], handles_xy
+
+    def set_rasterized(self, value: bool):
+        if value == self.rasterized:
+            return
+        self.rasterized = value
+        if value:
+            if self.line_id is not None:
+                self.canvas.itemconfig(self.line_id, state="hidden")
+            self.handles.set_visible(False)
+        else:
+            self.update()
+
+    def is_dragged(self) -> bool:
+        return self.handles.dragged_index is not None
+
+    def get_point_xy_list(self) -> Point2DList:
+        return [(x, y) for x, y in self.handles.get_points().tolist()]
+
+    def _on_click(self, event, index, points_xy):
+        if self.on_click is not None:
+            self.on_click(event, PointListView(self.handles.get_points()))
+
+    def _on_drag(self, event, index, points_xy):
+        try:
+            self.simplified_by_zoom.clear()
+            self._update_line()
+            if self.on_drag is not None:
+                self.on_drag(event, PointListView(self.handles.get_points()))
+        except Exception as e:
+            print(f"ERROR: {self}: self._on_drag({event}) --->", e)
+            raise e
+
+    def _on_release(self, event, index, points_xy):
+        if self.on_release is not None:
+            self.on_release(event, PointListView(self.handles.get_points()))
+
+    def set_img2can_matrix(self, img2can_matrix: TransformMatrix):
+        self.img2can_matrix = img2can_matrix.copy()
+
+    def set_point_xy_list(self, point_xy_list: Point2DList):
+        self.handles.set_points(np.array(point_xy_list, dtype=float).reshape(-1, 2))
+        self.simplified_by_zoom.clear()
+        self.update()
+
+    def set_visible(self, value: bool):
+        if value == self.visible:
+            return
+        self.visible = value
+        self.update()
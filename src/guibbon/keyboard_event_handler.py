@@ -1,6 +1,16 @@
+import collections
 import dataclasses
 import enum
+import time
 import tkinter as tk
+from typing import Optional
+
+
+@dataclasses.dataclass(frozen=True)
+class KeyEvent:
+    key: int  # key code, like waitKeyEx
+    is_press: bool  # False for a key release
+    timestamp: float  # time.monotonic() when the event was received
 
 
 class KeyboardEventHandler:
@@ -15,6 +25,8 @@ class KeyboardEventHandler:
         CTRL: bool = False
         ALT: bool = False
 
+    MAX_EVENTS = 1024  # the oldest events are dropped beyond, see dropped_events
+
     def __init__(self):
         self.modifier = KeyboardEventHandler.Modifier()
         self.keysdown = set()
@@ -23,6 +35,10 @@ class KeyboardEventHandler:
         self.is_keypress_updated = False
         self.is_keyrelease_updated = False
 
+        # key presses and releases in order of arrival, consumed by waitKeyEx and pollKey: keys pressed while the program is busy are not lost
+        self.events: collections.deque[KeyEvent] = collections.deque()
+        self.dropped_events = 0
+
         cv_row1 = [27, 7340032, 7405568, 7471104, 7536640, 7602176, 7667712, 7733248, 7798784, 7864320, 7929856, 7995392, 8060928]
         ic_row1 = [65307, 65470, 65471, 65472, 65473, 65474, 65475, 65476, 65477, 65478, 65479, 65480, 65481]
         cv_row2 = [167, 49, 50, 51, 52, 53, 54, 55, 56, 57, 48, 39, 176, 43, 34, 42, 231, 37, 38, 47, 40, 41, 61, 63, 8]
@@ -75,10 +91,30 @@ class KeyboardEventHandler:
         num = self.map_ic2cv[event.keysym_num] if event.keysym_num in self.map_ic2cv else event.keysym_num
 
         if num not in self.keysdown and is_keypress:
-            self.is_keypress_updated = True
-            self.last_keypressed = num
             self.keysdown.add(num)
+            self.push_event(num, is_press=True)
         elif num in self.keysdown and is_keyrelease:
-            self.is_keyrelease_updated = True
-            self.last_keyreleased = num
             self.keysdown.remove(num)
+            self.push_event(num, is_press=False)
+
+    def push_event(self, key: int, is_press: bool, timestamp: Optional[float] = None):
+        if is_press:
+            self.is_keypress_updated = True
+            self.last_keypressed = key
+        else:
+            self.is_keyrelease_updated = True
+            self.last_keyreleased = key
+        if len(self.events) >= KeyboardEventHandler.MAX_EVENTS:
+            self.events.popleft()
+            self.dropped_events += 1
+        self.events.append(KeyEvent(key, is_press, time.monotonic() if timestamp is None else timestamp))
+
+    def pop_event(self, track_keypress: bool = True, track_keyrelease: bool = False) -> Optional[KeyEvent]:
+        """Oldest tracked event, None if there is none. Untracked events received before it are discarded."""
+        while True:
+            try:
+                event = self.events.popleft()
+            except IndexError:
+                return None
+            if (event.is_press and track_keypress) or (not event.is_press and track_keyrelease):
+                return event
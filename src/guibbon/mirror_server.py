@@ -0,0 +1,295 @@
+import concurrent.futures
+import dataclasses
+import html
+import http.server
+import json
+import threading
+import time
+import urllib.parse
+from typing import Any, Optional
+
+import cv2
+
+from .typedef import Image_t
+
+BOUNDARY = "gbnframe"
+
+
+@dataclasses.dataclass
+class MirrorStats:
+    captured: int = 0  # rendered views submitted to the encoders
+    encoded: int = 0
+    dropped: int = 0  # frame periods skipped because the previous frame was still being encoded
+    sent: int = 0  # frames written to the stream clients, all clients included
+    encode_time_total: float = 0.0  # seconds, in the worker pool
+    clients: int = 0  # connected stream clients
+    quality: int = 0  # current JPEG quality
+    fps: float = 0.0  # current frame rate
+
+    @property
+    def encode_time_mean(self) -> float:
+        return self.encode_time_total / self.encoded if self.encoded > 0 else 0.0
+
+
+class WindowMirror:
+    """
+    Latest JPEG frame and widget values of a window, shared between the Tk thread (producer), the encoder pool and the HTTP handler threads.
+    Quality and frame rate adapt to the clients: they decrease while sending a frame takes more than half of the frame period, and slowly increase
+    again when the clients keep up.
+    """
+
+    MIN_QUALITY = 30
+    MIN_FPS = 1.0
+    SMOOTHING = 0.2  # weight of the last measure in the moving averages
+
+    def __init__(self, max_fps: float, max_quality: int):
+        self.condition = threading.Condition()
+        self.max_fps = max_fps
+        self.max_quality = max_quality
+        self.fps = max_fps
+        self.quality = max_quality
+        self.jpeg: Optional[bytes] = None
+        self.seq = 0
+        self.clients = 0
+        self.is_encoding = False
+        self.last_capture_time = -float("inf")
+        self.last_drop_time = -float("inf")
+        self.send_time_ema = 0.0
+        self.widget_values: Optional[dict[str, Any]] = None
+        self.widgets_seq = 0
+        self.widgets_request_time = -float("inf")
+        self.stats = MirrorStats()
+
+    def is_frame_due(self, now: float) -> bool:
+        """True if a new view must be captured: some client is connected and the previous frame was encoded one period ago"""
+        with self.condition:
+            if self.clients == 0:
+                return False
+            if now - self.last_capture_time < 1 / self.fps:
+                return False
+            if self.is_encoding:
+                # polled more often than the frame period: a skipped frame is counted once
+                if now - max(self.last_capture_time, self.last_drop_time) >= 1 / self.fps:
+                    self.stats.dropped += 1
+                    self.last_drop_time = now
+                return False
+            self.is_encoding = True
+            self.last_capture_time = now
+            self.stats.captured += 1
+            return True
+
+    def set_jpeg(self, jpeg: bytes, encode_time: float):
+        with self.condition:
+            self.jpeg = jpeg
+            self.seq += 1
+            self.is_encoding = False
+            self.stats.encoded += 1
+            self.stats.encode_time_total += encode_time
+            self.condition.notify_all()
+
+    def cancel_encoding(self):
+        with self.condition:
+            self.is_encoding = False
+
+    def get_seq(self) -> int:
+        with self.condition:
+            return self.seq
+
+    def wait_jpeg(self, last_seq: int, timeout: float) -> tuple[int, Optional[bytes]]:
+        """Waits for a frame newer than last_seq. Slow clients skip the intermediate frames."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq > last_seq, timeout=timeout)
+            return self.seq, self.jpeg
+
+    def on_frame_sent(self, send_time: float):
+        with self.condition:
+            self.stats.sent += 1
+            self.send_time_ema += WindowMirror.SMOOTHING * (send_time - self.send_time_ema)
+            period = 1 / self.fps
+            if self.send_time_ema > period / 2:
+                self.quality = max(WindowMirror.MIN_QUALITY, self.quality - 5)
+                self.fps = max(WindowMirror.MIN_FPS, self.fps * 0.9)
+            elif self.send_time_ema < period / 4:
+                self.quality = min(self.max_quality, self.quality + 1)
+                self.fps = min(self.max_fps, self.fps * 1.05)
+
+    def add_client(self, delta: int):
+        with self.condition:
+            self.clients += delta
+            if self.clients == 0:
+                self.send_time_ema = 0.0  # the next clients start at full quality
+                self.quality = self.max_quality
+                self.fps = self.max_fps
+
+    def is_widgets_wanted(self, now: float) -> bool:
+        with self.condition:
+            return now - self.widgets_request_time < 1.0
+
+    def set_widget_values(self, values: dict[str, Any]):
+        with self.condition:
+            self.widget_values = values
+            self.widgets_seq += 1
+            self.condition.notify_all()
+
+    def wait_widget_values(self, timeout: float) -> Optional[dict[str, Any]]:
+        """Widgets belong to the Tk thread: asks it for a snapshot of their values and waits for it"""
+        with self.condition:
+            self.widgets_request_time = time.perf_counter()
+            widgets_seq = self.widgets_seq
+            self.condition.wait_for(lambda: self.widgets_seq > widgets_seq, timeout=timeout)
+            return self.widget_values
+
+    def get_stats(self) -> MirrorStats:
+        with self.condition:
+            return dataclasses.replace(self.stats, clients=self.clients, quality=self.quality, fps=self.fps)
+
+
+class MirrorRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    GET /                          list of the windows, with their streams
+    GET /windows.json              names of the windows
+    GET /<winname>/stream.mjpg     MJPEG stream of the rendered view
+    GET /<winname>/frame.jpg       last frame
+    GET /<winname>/widgets.json    values of the sliders, radio buttons, check buttons and color pickers
+    """
+
+    server: "MirrorHTTPServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body: bytes, content_type: str, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        mirror_server = self.server.mirror_server
+        path = urllib.parse.urlparse(self.path).path
+        if path in ("/", "/index.html"):
+            items = "".join(
+                f'<h2>{html.escape(winname)}</h2><img src="/{urllib.parse.quote(winname)}/stream.mjpg">' for winname in mirror_server.get_winnames()
+            )
+            self.send_body(f"<html><head><title>guibbon</title></head><body>{items}</body></html>".encode(), "text/html")
+            return
+        if path == "/windows.json":
+            self.send_body(json.dumps(mirror_server.get_winnames()).encode(), "application/json")
+            return
+
+        winname, _, resource = urllib.parse.unquote(path[1:]).rpartition("/")
+        mirror = mirror_server.windows.get(winname, None)
+        if mirror is None or resource not in ("stream.mjpg", "frame.jpg", "widgets.json"):
+            self.send_error(404)
+            return
+        if resource == "widgets.json":
+            values = mirror.wait_widget_values(timeout=1.0)
+            self.send_body(json.dumps(values, default=str).encode(), "application/json", 200 if values is not None else 503)
+        elif resource == "frame.jpg":
+            # a frame rendered after the request, the previous one may be outdated since no client was connected
+            request_seq = mirror.get_seq()
+            mirror.add_client(1)
+            try:
+                _, jpeg = mirror.wait_jpeg(request_seq, timeout=2.0)
+            finally:
+                mirror.add_client(-1)
+            if jpeg is None:
+                self.send_error(503)
+            else:
+                self.send_body(jpeg, "image/jpeg")
+        else:
+            self.stream(mirror)
+
+    def stream(self, mirror: WindowMirror):
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        mirror.add_client(1)
+        try:
+            seq = 0
+            while not self.server.is_closing:
+                seq, jpeg = mirror.wait_jpeg(seq, timeout=0.5)
+                if jpeg is None:
+                    continue
+                tic = time.perf_counter()
+                self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n")
+                self.wfile.flush()
+                mirror.on_frame_sent(time.perf_counter() - tic)
+        except OSError:
+            pass  # client disconnected
+        finally:
+            mirror.add_client(-1)
+
+
+class MirrorHTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    mirror_server: "MirrorServer"
+    is_closing = False
+
+
+class MirrorServer:
+    """
+    HTTP server mirroring the windows for remote viewing: the rendered view of each window as an MJPEG stream, and its widget values as JSON.
+    The Tk thread only captures a view when a stream client is connected and the previous frame was encoded, JPEG encoding runs in a worker pool
+    and each client is served by its own thread with the latest frame: slow clients never stall the GUI.
+    """
+
+    DEFAULT_PORT = 8080
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, max_fps: float = 15.0, quality: int = 80, num_workers: int = 2):
+        self.max_fps = max_fps
+        self.quality = quality
+        self.windows: dict[str, WindowMirror] = {}
+        self.windows_lock = threading.Lock()
+        self.encoder = concurrent.futures.ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="gbn_mirror_encoder")
+
+        self.http_server = MirrorHTTPServer((host, port), MirrorRequestHandler)
+        self.http_server.mirror_server = self
+        self.thread = threading.Thread(target=self.http_server.serve_forever, name="gbn_mirror_server", daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self.http_server.server_address[:2]
+        host = host.decode() if isinstance(host, bytes) else host
+        return f"http://{host}:{port}/"
+
+    def get_winnames(self) -> list[str]:
+        with self.windows_lock:
+            return list(self.windows.keys())
+
+    def get_window(self, winname: str) -> WindowMirror:
+        with self.windows_lock:
+            if winname not in self.windows:
+                self.windows[winname] = WindowMirror(self.max_fps, self.quality)
+            return self.windows[winname]
+
+    def remove_window(self, winname: str):
+        with self.windows_lock:
+            self.windows.pop(winname, None)
+
+    def submit_frame(self, mirror: WindowMirror, view_rgb: Image_t):
+        """Encodes the view in the worker pool. Called after mirror.is_frame_due(...) returned True, the view must not be modified afterwards."""
+        quality = mirror.quality
+        self.encoder.submit(self._encode, mirror, view_rgb, quality)
+
+    def _encode(self, mirror: WindowMirror, view_rgb: Image_t, quality: int):
+        tic = time.perf_counter()
+        try:
+            view_bgr = cv2.cvtColor(view_rgb, cv2.COLOR_RGB2BGR)
+            ret, data = cv2.imencode(".jpg", view_bgr, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        except Exception:
+            ret = False
+        if not ret:
+            mirror.cancel_encoding()
+            return
+        mirror.set_jpeg(data.tobytes(), time.perf_counter() - tic)
+
+    def close(self):
+        self.http_server.is_closing = True
+        self.http_server.shutdown()
+        self.http_server.server_close()
+        self.encoder.shutdown(wait=True)
@@ -0,0 +1,120 @@
+import dataclasses
+import enum
+import json
+import os
+from typing import Any, Optional, Sequence, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from . import interactive_overlays
+from .typedef import Point2DArray
+
+
+class OverlayKind(enum.IntEnum):
+    POINT = 0
+    POLYGON = 1
+    RECTANGLE = 2
+    CONTOUR = 3
+    POINT_CLOUD = 4
+
+
+@dataclasses.dataclass
+class OverlayTable:
+    """
+    Columnar state of a set of interactive overlays: the vertices of all the overlays are concatenated in a single array, the vertices of the k-th
+    overlay being vertices[offsets[k]:offsets[k + 1]].
+    """
+
+    kinds: npt.NDArray[np.int8]  # OverlayKind, shape (N,)
+    labels: list[str]
+    offsets: npt.NDArray[np.int64]  # shape (N + 1,)
+    vertices: Point2DArray  # img space, shape (M, 2)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def get_vertices(self, k: int) -> Point2DArray:
+        return self.vertices[self.offsets[k] : self.offsets[k + 1]]
+
+
+def get_overlay_kind(overlay) -> Optional[OverlayKind]:
+    """Returns None for the overlays without editable vertices (masks, annotation layers, ...)"""
+    # Rectangle derives from Polygon: test it first
+    if isinstance(overlay, interactive_overlays.Rectangle):
+        return OverlayKind.RECTANGLE
+    if isinstance(overlay, interactive_overlays.Polygon):
+        return OverlayKind.POLYGON
+    if isinstance(overlay, interactive_overlays.Contour):
+        return OverlayKind.CONTOUR
+    if isinstance(overlay, interactive_overlays.PointCloud):
+        return OverlayKind.POINT_CLOUD
+    if isinstance(overlay, interactive_overlays.Point):
+        return OverlayKind.POINT
+    return None
+
+
+def get_overlay_vertices(overlay, kind: OverlayKind) -> Point2DArray:
+    if kind == OverlayKind.POINT:
+        points_xy: Any = [overlay.get_img_point_xy()]
+    elif kind in (OverlayKind.POLYGON, OverlayKind.RECTANGLE):
+        points_xy = [ipoint.get_img_point_xy() for ipoint in overlay.ipoints]
+    elif kind == OverlayKind.CONTOUR:
+        points_xy = overlay.handles.get_points()
+    else:
+        points_xy = overlay.get_points()
+    return np.array(points_xy, dtype=float).reshape(-1, 2)
+
+
+def get_overlay_table(overlays: Sequence[Any]) -> OverlayTable:
+    """Gathers the state of the overlays. Overlays without editable vertices are skipped."""
+    kinds = []
+    labels = []
+    vertices_list = []
+    for overlay in overlays:
+        kind = get_overlay_kind(overlay)
+        if kind is None:
+            continue
+        kinds.append(kind)
+        labels.append(overlay.label)
+        vertices_list.append(get_overlay_vertices(overlay, kind))
+
+    offsets = np.zeros(shape=(len(kinds) + 1,), dtype=np.int64)
+    offsets[1:] = np.cumsum([len(vertices) for vertices in vertices_list], dtype=np.int64)
+    vertices = np.concatenate(vertices_list) if len(vertices_list) > 0 else np.zeros(shape=(0, 2), dtype=float)
+    return OverlayTable(np.array(kinds, dtype=np.int8), labels, offsets, vertices)
+
+
+def save_overlay_table(table: OverlayTable, path: Union[str, "os.PathLike[str]"]):
+    """The format is given by the extension of path: .npz (compressed numpy arrays) or .json"""
+    if os.fspath(path).lower().endswith(".json"):
+        data = {
+            "kinds": [OverlayKind(kind).name for kind in table.kinds.tolist()],
+            "labels": table.labels,
+            "offsets": table.offsets.tolist(),
+            "vertices": table.vertices.ravel().tolist(),
+        }
+        with open(path, "w") as f:
+            json.dump(data, f)
+    else:
+        np.savez_compressed(path, kinds=table.kinds, labels=np.array(table.labels, dtype=str), offsets=table.offsets, vertices=table.vertices)
+
+
+def load_overlay_table(path: Union[str, "os.PathLike[str]"]) -> OverlayTable:
+    if os.fspath(path).lower().endswith(".json"):
+        with open(path, "r") as f:
+            data = json.load(f)
+        kinds = np.array([OverlayKind[name] for name in data["kinds"]], dtype=np.int8)
+        labels = [str(label) for label in data["labels"]]
+        offsets = np.array(data["offsets"], dtype=np.int64)
+        vertices = np.array(data["vertices"], dtype=float).reshape(-1, 2)
+    else:
+        with np.load(path) as npz:
+            kinds = npz["kinds"].astype(np.int8)
+            labels = npz["labels"].tolist()
+            offsets = npz["offsets"].astype(np.int64)
+            vertices = npz["vertices"].astype(float).reshape(-1, 2)
+
+    if len(offsets) != len(kinds) + 1 or len(labels) != len(kinds) or (len(offsets) > 0 and offsets[-1] != len(vertices)):
+        raise ValueError(f"inconsistent overlay table in {path}: {len(kinds)} kinds, {len(labels)} labels, {len(offsets)} offsets, {len(vertices)} vertices")
+    return OverlayTable(kinds, labels, offsets, vertices)
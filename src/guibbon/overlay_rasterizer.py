@@ -0,0 +1,262 @@
+from typing import Any, Callable, Optional, Sequence
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+from . import transform_matrix as tmat
+from .interactive_overlays import State, Point, Polygon, Layer, LayerStack
+from .transform_matrix import TransformMatrix
+from .typedef import Image_t, Point2DArray
+
+
+def hex2rgb(color: str) -> tuple[int, int, int]:
+    return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+
+def is_rasterizable(overlay) -> bool:
+    return hasattr(overlay, "get_raster_primitives")
+
+
+class OverlayRasterizer:
+    """
+    Draws the static interactive overlays into the displayed frame with OpenCV, once their number exceeds a threshold. Only the overlay under the
+    cursor and the dragged ones stay live canvas items.
+    Rasterizable overlays implement get_raster_primitives(), set_rasterized(value) and is_dragged(), and hold a reference to the rasterizer to
+    call request_render(self) when their geometry changes while rasterized.
+    The raster layer is kept between renders: for a same view transform, only the overlays marked dirty by request_render(...) and the overlays
+    entering or leaving the static set are projected again, and only their previous and new bounding rectangles are redrawn.
+    """
+
+    DEFAULT_THRESHOLD = 200  # number of rasterizable overlays above which static overlays are rasterized
+    HIT_RADIUS = Point.radius[State.HOVERED] + 2  # canvas space
+    MAX_PARTIAL_AREA_RATIO = 0.5  # above this ratio of the layer area, the dirty rectangles are redrawn as a whole layer
+
+    line_color = hex2rgb(Polygon.colors[State.NORMAL])
+    line_width = 5
+    handle_color = hex2rgb(Point.colors[State.NORMAL])
+    handle_radius = Point.radius[State.NORMAL]
+    margin = max(line_width // 2 + 2, handle_radius + 2)  # extent of the drawing around the projected geometry, canvas space
+
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD, on_request_render: Optional[Callable[[], None]] = None, layers: Optional[LayerStack] = None):
+        self.threshold = threshold
+        self.on_request_render = on_request_render
+        self.layers = layers  # lines and handles of the hidden layers are not drawn
+        self.is_rendering = False
+        self.is_enabled = False
+        self.hovered_overlay: Any = None
+
+        # projection of the static overlays drawn in the layer: id(overlay) -> (overlay, polylines, handles, bounding rectangle x0, y0, x1, y1)
+        self.projection_cache: dict[int, tuple[Any, list[npt.NDArray[np.int32]], npt.NDArray[np.int32], Optional[tuple[int, int, int, int]]]] = {}
+        self.dirty_ids: set[int] = set()  # overlays whose geometry changed since the last render
+        self.layer_key: Optional[tuple[Any, ...]] = None
+        self.layer_rgb: Optional[Image_t] = None
+        self.layer_mask: Optional[npt.NDArray[np.bool_]] = None
+        self.redrawn_rects: list[tuple[int, int, int, int]] = []  # regions of the layer redrawn by the last render
+
+        # canvas coordinates of the handles of the rasterized overlays, for hit testing
+        self.handles_xy: Point2DArray = np.zeros(shape=(0, 2), dtype=float)
+        self.handles_owner: list[Any] = []
+
+    def update_enabled(self, overlays: Sequence[Any]) -> bool:
+        rasterizable_overlays = [overlay for overlay in overlays if is_rasterizable(overlay)]
+        is_enabled = len(rasterizable_overlays) > self.threshold
+        if is_enabled != self.is_enabled:
+            self.is_enabled = is_enabled
+            self.hovered_overlay = None
+            for overlay in rasterizable_overlays:
+                overlay.set_rasterized(is_enabled)
+        return self.is_enabled
+
+    def request_render(self, overlay: Any = None):
+        """Marks overlay (if given) to be projected and drawn again, and requests a render. Ignored while rendering, see render(...)."""
+        if self.is_rendering:
+            return  # the overlays are updated by the viewer after the render, their geometry did not change
+        if overlay is not None:
+            self.dirty_ids.add(id(overlay))
+        if self.on_request_render is not None:
+            self.on_request_render()
+
+    def is_live(self, overlay) -> bool:
+        return overlay is self.hovered_overlay or overlay.is_dragged()
+
+    def _project(self, overlay, img2can_matrix: TransformMatrix):
+        polylines_img, handles_img = overlay.get_raster_primitives()
+        polylines = [np.round(tmat.apply_array(img2can_matrix, p)).astype(np.int32) for p in polylines_img if len(p) > 0]
+        handles = np.round(tmat.apply_array(img2can_matrix, handles_img)).astype(np.int32).reshape(-1, 2)
+        points = np.concatenate(polylines + [handles])
+        if len(points) == 0:
+            return overlay, polylines, handles, None
+        x0, y0 = (points.min(axis=0) - OverlayRasterizer.margin).tolist()
+        x1, y1 = (points.max(axis=0) + OverlayRasterizer.margin + 1).tolist()
+        return overlay, polylines, handles, (x0, y0, x1, y1)
+
+    def render(self, mat: Image_t, img2can_matrix: TransformMatrix, overlays: Sequence[Any]) -> Image_t:
+        """
+        Draws the static overlays on mat (RGB, canvas space) and returns it.
+        Overlays are (un)rasterized here. The caller must set is_rendering to True, until the overlays are updated to the rendered view, to avoid
+        rasterized overlays requesting a new render and being projected again by the next one.
+        """
+        static_overlays = []
+        for overlay in overlays:
+            if not is_rasterizable(overlay):
+                continue
+            is_static = not self.is_live(overlay)
+            overlay.set_rasterized(is_static)
+            if is_static and overlay.visible:
+                static_overlays.append(overlay)
+
+        if self.layers is not None:
+            draw_lines = self.layers.is_visible(Layer.POLYGONS)
+            draw_handles = self.layers.is_visible(Layer.HANDLES)
+        else:
+            draw_lines = draw_handles = True
+
+        layer_key = (mat.shape, img2can_matrix.tobytes(), draw_lines, draw_handles)
+        previous_cache = self.projection_cache
+        self.projection_cache = {}
+        dirty_rects: list[tuple[int, int, int, int]] = []
+        is_full_redraw = layer_key != self.layer_key or self.layer_rgb is None or self.layer_mask is None
+        for overlay in static_overlays:
+            # a new overlay may reuse the id of a removed one, hence the identity check
+            cached = previous_cache.pop(id(overlay), None)
+            if not is_full_redraw and cached is not None and cached[0] is overlay and id(overlay) not in self.dirty_ids:
+                self.projection_cache[id(overlay)] = cached
+                continue
+            projection = self._project(overlay, img2can_matrix)
+            self.projection_cache[id(overlay)] = projection
+            if not is_full_redraw:
+                dirty_rects += [rect for rect in (None if cached is None else cached[3], projection[3]) if rect is not None]
+        # overlays removed, hidden or made live since the last render
+        dirty_rects += [cached[3] for cached in previous_cache.values() if cached[3] is not None]
+        self.dirty_ids = set()
+
+        height, width = mat.shape[:2]
+        dirty_rects = [(max(0, x0), max(0, y0), min(width, x1), min(height, y1)) for x0, y0, x1, y1 in dirty_rects]
+        dirty_rects = [(x0, y0, x1, y1) for x0, y0, x1, y1 in dirty_rects if x0 < x1 and y0 < y1]
+        if sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in dirty_rects) > OverlayRasterizer.MAX_PARTIAL_AREA_RATIO * height * width:
+            is_full_redraw = True
+
+        if is_full_redraw:
+            self.layer_key = layer_key
+            self.layer_rgb, self.layer_mask = self._draw_layer(mat.shape, list(self.projection_cache.values()), draw_lines, draw_handles)
+            self.redrawn_rects = [(0, 0, width, height)]
+        else:
+            self._redraw_rects(dirty_rects, draw_lines, draw_handles)
+            self.redrawn_rects = dirty_rects
+
+        if is_full_redraw or len(dirty_rects) > 0:
+            # hidden handles can not be hovered
+            projections = list(self.projection_cache.values()) if draw_handles else []
+            self.handles_owner = [projection[0] for projection in projections for _ in range(len(projection[2]))]
+            handles = [projection[2] for projection in projections]
+            self.handles_xy = np.concatenate(handles).astype(float) if len(handles) > 0 else np.zeros(shape=(0, 2), dtype=float)
+
+        mat = mat.copy()
+        self.composite(mat)
+        return mat
+
+    def _redraw_rects(self, rects: list[tuple[int, int, int, int]], draw_lines: bool, draw_handles: bool):
+        """Redraws the layer within each of the rects (x0, y0, x1, y1), with the static overlays whose bounding rectangle intersects it"""
+        assert self.layer_rgb is not None and self.layer_mask is not None
+        if len(rects) == 0:
+            return
+        height, width = self.layer_mask.shape
+        projections = [projection for projection in self.projection_cache.values() if projection[3] is not None]
+        bboxes = np.array([projection[3] for projection in projections], dtype=int).reshape(-1, 4)
+        for x0, y0, x1, y1 in rects:
+            is_intersecting = (bboxes[:, 0] < x1) & (bboxes[:, 2] > x0) & (bboxes[:, 1] < y1) & (bboxes[:, 3] > y0)
+            # the intersecting overlays are drawn whole (within the layer) so that their lines are clipped as in a full redraw
+            bx0, by0 = np.min(bboxes[is_intersecting, :2], axis=0, initial=np.iinfo(int).max).tolist()
+            bx1, by1 = np.max(bboxes[is_intersecting, 2:], axis=0, initial=np.iinfo(int).min).tolist()
+            ex0, ey0, ex1, ey1 = max(0, min(x0, bx0)), max(0, min(y0, by0)), min(width, max(x1, bx1)), min(height, max(y1, by1))
+            offset = np.array([ex0, ey0], dtype=np.int32)
+            shifted_projections = [
+                (overlay, [polyline - offset for polyline in polylines], handles - offset, None)
+                for overlay, polylines, handles, _ in (projections[k] for k in np.flatnonzero(is_intersecting))
+            ]
+            layer_rgb, layer_mask = self._draw_layer((ey1 - ey0, ex1 - ex0), shifted_projections, draw_lines, draw_handles)
+            self.layer_rgb[y0:y1, x0:x1] = layer_rgb[y0 - ey0 : y1 - ey0, x0 - ex0 : x1 - ex0]
+            self.layer_mask[y0:y1, x0:x1] = layer_mask[y0 - ey0 : y1 - ey0, x0 - ex0 : x1 - ex0]
+
+    def draw_live(self, mat: Image_t, img2can_matrix: TransformMatrix, overlays: Sequence[Any]) -> Image_t:
+        """
+        Draws on a copy of mat (RGB, canvas space) the visible overlays which are canvas items, to capture the view as displayed. The rasterized
+        overlays are already composited in the viewport. Besides the rasterizable overlays, the overlays implementing draw_raster(mat, img2can_matrix)
+        (point clouds, annotation layers) draw themselves, below the polygons if their layer is.
+        """
+        mat = mat.copy()
+        order = LayerStack.DEFAULT_ORDER if self.layers is None else self.layers.order
+        drawn_overlays = [overlay for overlay in overlays if hasattr(overlay, "draw_raster")]
+        for overlay in drawn_overlays:
+            if order.index(overlay.raster_layer) < order.index(Layer.POLYGONS):
+                overlay.draw_raster(mat, img2can_matrix)
+
+        live_overlays = [o for o in overlays if is_rasterizable(o) and not getattr(o, "rasterized", False) and getattr(o, "visible", True)]
+        if len(live_overlays) > 0:
+            if self.layers is not None:
+                draw_lines = self.layers.is_visible(Layer.POLYGONS)
+                draw_handles = self.layers.is_visible(Layer.HANDLES)
+            else:
+                draw_lines = draw_handles = True
+            projections = [self._project(overlay, img2can_matrix) for overlay in live_overlays]
+            layer_rgb, layer_mask = self._draw_layer(mat.shape, projections, draw_lines, draw_handles)
+            mat[layer_mask] = layer_rgb[layer_mask]
+
+        for overlay in drawn_overlays:
+            if order.index(overlay.raster_layer) >= order.index(Layer.POLYGONS):
+                overlay.draw_raster(mat, img2can_matrix)
+        return mat
+
+    def composite(self, mat: Image_t, can_rect: Optional[tuple[int, int, int, int]] = None):
+        """Copies the last rendered raster layer on mat (modified in place), within can_rect (x0, y0, x1, y1) or everywhere"""
+        if self.layer_rgb is None or self.layer_mask is None or self.layer_mask.shape != mat.shape[:2]:
+            return
+        x0, y0, x1, y1 = (0, 0, mat.shape[1], mat.shape[0]) if can_rect is None else can_rect
+        layer_mask = self.layer_mask[y0:y1, x0:x1]
+        mat[y0:y1, x0:x1][layer_mask] = self.layer_rgb[y0:y1, x0:x1][layer_mask]
+
+    def _draw_layer(self, shape, projections, draw_lines: bool = True, draw_handles: bool = True) -> tuple[Image_t, npt.NDArray[np.bool_]]:
+        layer = np.zeros(shape=shape[:2] + (3,), dtype=np.uint8)
+        mask = np.zeros(shape=shape[:2], dtype=np.uint8)
+
+        polylines = [polyline for projection in projections for polyline in projection[1]] if draw_lines else []
+        if len(polylines) > 0:
+            cv2.polylines(layer, polylines, isClosed=True, color=OverlayRasterizer.line_color, thickness=OverlayRasterizer.line_width)
+            cv2.polylines(mask, polylines, isClosed=True, color=255, thickness=OverlayRasterizer.line_width)
+
+        r = OverlayRasterizer.handle_radius
+        for projection in projections if draw_handles else []:
+            for x, y in projection[2].tolist():
+                cv2.circle(layer, (x, y), r + 1, (255, 255, 255), -1)
+                cv2.circle(layer, (x, y), r - 1, OverlayRasterizer.handle_color, -1)
+                cv2.circle(mask, (x, y), r + 1, 255, -1)
+
+        return layer, mask > 0
+
+    def hit_test(self, can_xy) -> Any:
+        """Returns the rasterized overlay having a handle under the given canvas coordinates, or None"""
+        if len(self.handles_xy) == 0:
+            return None
+        dists2 = np.sum((self.handles_xy - np.array(can_xy, dtype=float)) ** 2, axis=1)
+        ind = int(np.argmin(dists2))
+        if dists2[ind] > OverlayRasterizer.HIT_RADIUS**2:
+            return None
+        return self.handles_owner[ind]
+
+    def update_hovered(self, can_xy, img2can_matrix: TransformMatrix) -> bool:
+        """Makes live the overlay under the cursor. Returns True if the live overlays changed and the view must be redrawn"""
+        if self.hovered_overlay is not None:
+            if self.hovered_overlay.is_dragged():
+                return False
+            _, handles_img = self.hovered_overlay.get_raster_primitives()
+            handles_xy = tmat.apply_array(img2can_matrix, handles_img)
+            dists2 = np.sum((handles_xy - np.array(can_xy, dtype=float)) ** 2, axis=1)
+            if len(dists2) > 0 and np.min(dists2) <= OverlayRasterizer.HIT_RADIUS**2:
+                return False  # still hovering the live overlay
+
+        hovered_overlay = self.hit_test(can_xy)
+        if hovered_overlay is self.hovered_overlay:
+            return False
+        self.hovered_overlay = hovered_overlay
+        return True
@@ -0,0 +1,128 @@
+import dataclasses
+import os
+import queue
+import threading
+import time
+from typing import Optional, Union
+
+import cv2
+
+from .typedef import Image_t
+
+
+@dataclasses.dataclass
+class RecorderStats:
+    captured: int = 0  # frames given to push(...), repeated frames included
+    encoded: int = 0  # frames written to the video file, repeated frames included
+    dropped: int = 0  # frames not recorded because the writer thread could not keep up
+    encode_time_total: float = 0.0  # seconds, color conversion and cv2.VideoWriter.write in the writer thread
+    encode_time_max: float = 0.0
+    latency_total: float = 0.0  # seconds, from push(...) until the frame is written
+    latency_max: float = 0.0
+    written: int = 0  # distinct frames written, the count of the time statistics
+
+    @property
+    def encode_time_mean(self) -> float:
+        return self.encode_time_total / self.written if self.written > 0 else 0.0
+
+    @property
+    def latency_mean(self) -> float:
+        return self.latency_total / self.written if self.written > 0 else 0.0
+
+
+class VideoRecorder:
+    """
+    Writes RGB frames to a video file with cv2.VideoWriter in a background thread.
+    push(...) never blocks: frames are handed over through a bounded queue and dropped when it is full, so a slow encoder or disk never stalls the
+    GUI. The video file is opened on the first frame, all frames must have its size. If frame_size_wh is given, the file is opened by the constructor
+    instead, so that an invalid path or codec raises immediately rather than at close().
+    """
+
+    DEFAULT_FPS = 25.0
+    DEFAULT_FOURCC = "mp4v"
+
+    def __init__(
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        fps: float = DEFAULT_FPS,
+        queue_size: int = 8,
+        fourcc: str = DEFAULT_FOURCC,
+        frame_size_wh: Optional[tuple[int, int]] = None,
+    ):
+        self.path = os.fspath(path)
+        self.fps = fps
+        self.fourcc = fourcc
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"Can not record to {self.path}: directory {directory} does not exist")
+        self.writer: Optional[cv2.VideoWriter] = None if frame_size_wh is None else self._open(frame_size_wh)
+        self.error: Optional[Exception] = None  # raised by close(...) if the writer thread failed
+        self.lock = threading.Lock()
+        self.stats = RecorderStats()
+
+        self.queue: queue.Queue[Optional[tuple[Image_t, int, float]]] = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._run, name="gbn_video_recorder", daemon=True)
+        self.thread.start()
+
+    def push(self, mat_rgb: Image_t, repeat: int = 1) -> bool:
+        """
+        Records a frame repeat times (to keep the video in real time when frames could not be captured on schedule). The array must not be modified
+        afterwards. Returns False if the frame was dropped.
+        """
+        with self.lock:
+            self.stats.captured += repeat
+        try:
+            self.queue.put_nowait((mat_rgb, repeat, time.perf_counter()))
+        except queue.Full:
+            with self.lock:
+                self.stats.dropped += repeat
+            return False
+        return True
+
+    def _open(self, frame_size_wh: tuple[int, int]) -> cv2.VideoWriter:
+        writer = cv2.VideoWriter(self.path, cv2.VideoWriter.fourcc(*self.fourcc), self.fps, frame_size_wh)
+        if not writer.isOpened():
+            raise ValueError(f"Can not open {self.path} for writing with fourcc {self.fourcc}")
+        return writer
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue  # keep emptying the queue, push(...) must not block
+            mat_rgb, repeat, push_time = item
+            try:
+                tic = time.perf_counter()
+                if self.writer is None:
+                    self.writer = self._open((mat_rgb.shape[1], mat_rgb.shape[0]))
+                mat_bgr = cv2.cvtColor(mat_rgb, cv2.COLOR_RGB2BGR)
+                for _ in range(repeat):
+                    self.writer.write(mat_bgr)
+                toc = time.perf_counter()
+            except Exception as e:
+                self.error = e
+                continue
+            with self.lock:
+                self.stats.encoded += repeat
+                self.stats.written += 1
+                self.stats.encode_time_total += toc - tic
+                self.stats.encode_time_max = max(self.stats.encode_time_max, toc - tic)
+                self.stats.latency_total += toc - push_time
+                self.stats.latency_max = max(self.stats.latency_max, toc - push_time)
+        if self.writer is not None:
+            self.writer.release()
+
+    def get_stats(self) -> RecorderStats:
+        with self.lock:
+            return dataclasses.replace(self.stats)
+
+    def close(self) -> RecorderStats:
+        """Writes the queued frames, closes the video file and returns the final statistics"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.get_stats()
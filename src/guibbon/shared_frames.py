@@ -0,0 +1,183 @@
+import dataclasses
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+from .typedef import Image_t
+
+# Layout of the shared memory block, all the header fields are int64:
+#   ring header: MAGIC, slot count, slot capacity (bytes), sequence number of the newest complete frame (-1 if none)
+#   slots: slot header (seqlock counter, sequence number, height, width, padding), then the RGB pixels, uint8
+MAGIC = 0x47424E52494E4731  # "GBNRING1"
+RING_HEADER_SIZE = 64  # bytes
+SLOT_HEADER_SIZE = 64  # bytes, a cache line: the data of each slot stays aligned
+RING_MAGIC, RING_SLOT_COUNT, RING_SLOT_CAPACITY, RING_LATEST = range(4)
+SLOT_LOCK, SLOT_SEQ, SLOT_HEIGHT, SLOT_WIDTH = range(4)
+
+
+def get_slot_offset(slot: int, slot_capacity: int) -> int:
+    slot_size = SLOT_HEADER_SIZE + (slot_capacity + 63) // 64 * 64
+    return RING_HEADER_SIZE + slot * slot_size
+
+
+def get_ring_size(slot_count: int, slot_capacity: int) -> int:
+    return get_slot_offset(slot_count, slot_capacity)
+
+
+class _FrameRing:
+    """Numpy views on the headers and the pixels of a ring of frame slots in shared memory"""
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        self.header: npt.NDArray[np.int64] = np.ndarray(shape=(4,), dtype=np.int64, buffer=shm.buf)
+        if self.header[RING_MAGIC] != MAGIC:
+            raise ValueError(f"Shared memory {shm.name} is not a guibbon frame ring")
+        self.slot_count = int(self.header[RING_SLOT_COUNT])
+        self.slot_capacity = int(self.header[RING_SLOT_CAPACITY])
+        offsets = [get_slot_offset(slot, self.slot_capacity) for slot in range(self.slot_count)]
+        self.slot_headers: list[npt.NDArray[np.int64]] = [np.ndarray(shape=(4,), dtype=np.int64, buffer=shm.buf, offset=offset) for offset in offsets]
+        self.slot_data: list[npt.NDArray[np.uint8]] = [
+            np.ndarray(shape=(self.slot_capacity,), dtype=np.uint8, buffer=shm.buf, offset=offset + SLOT_HEADER_SIZE) for offset in offsets
+        ]
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def release(self):
+        # the shared memory can only be closed once no array uses its buffer
+        del self.header, self.slot_headers, self.slot_data
+        self.shm.close()
+
+
+class SharedFrameWriter:
+    """
+    Producer side of a frame ring in shared memory, to display frames captured in another process without pickling them.
+    write(...) converts each frame (BGR, grayscale or float, like the images given to imshow) to RGB directly in the next slot of the ring, and
+    publishes it with a sequence lock: the seqlock counter of the slot is odd while the slot is written. There is no lock to wait for, the
+    viewer detects and skips the frames overwritten while it was reading them.
+    Single producer: only one process may write to a ring.
+        writer = SharedFrameWriter((1080, 1920))
+        # in the GUI process: gbn.attach_shared_frames(winname, writer.name)
+        while True:
+            writer.write(camera.read())
+    """
+
+    DEFAULT_SLOT_COUNT = 3
+
+    def __init__(self, max_shape_hw: tuple[int, int], slot_count: int = DEFAULT_SLOT_COUNT, name: Optional[str] = None):
+        if slot_count < 2:
+            raise ValueError(f"A frame ring needs at least 2 slots, got {slot_count}")
+        slot_capacity = max_shape_hw[0] * max_shape_hw[1] * 3
+        shm = shared_memory.SharedMemory(name=name, create=True, size=get_ring_size(slot_count, slot_capacity))
+        header: npt.NDArray[np.int64] = np.ndarray(shape=(4,), dtype=np.int64, buffer=shm.buf)
+        header[:] = (MAGIC, slot_count, slot_capacity, -1)
+        del header
+        self.ring = _FrameRing(shm)
+        self.max_shape_hw = max_shape_hw
+        self.next_seq = 0
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block, to give to attach_shared_frames(...)"""
+        return self.ring.name
+
+    def write(self, mat: Image_t) -> int:
+        """Copies a frame in the ring and publishes it. Returns its sequence number."""
+        h, w = mat.shape[:2]
+        if h * w * 3 > self.ring.slot_capacity:
+            raise ValueError(f"Frame of shape {mat.shape} exceeds the capacity of the ring, created for frames up to {self.max_shape_hw}")
+        seq = self.next_seq
+        self.next_seq += 1
+        slot = seq % self.ring.slot_count
+        slot_header = self.ring.slot_headers[slot]
+        dst = self.ring.slot_data[slot][: h * w * 3].reshape(h, w, 3)
+
+        slot_header[SLOT_LOCK] += 1  # odd: the slot is being written
+        slot_header[SLOT_SEQ] = seq
+        slot_header[SLOT_HEIGHT] = h
+        slot_header[SLOT_WIDTH] = w
+        if mat.dtype == float:
+            mat = (np.clip(mat, 0, 1) * 255).astype(np.uint8)
+        cv2.cvtColor(mat, cv2.COLOR_GRAY2RGB if mat.ndim == 2 else cv2.COLOR_BGR2RGB, dst=dst)
+        slot_header[SLOT_LOCK] += 1  # even: the slot is complete
+        self.ring.header[RING_LATEST] = seq
+        return seq
+
+    def close(self, unlink: bool = True):
+        """Releases the shared memory. It is destroyed if unlink is True, the readers must be closed first on Windows."""
+        shm = self.ring.shm
+        self.ring.release()
+        if unlink:
+            shm.unlink()
+
+    def __enter__(self) -> "SharedFrameWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+@dataclasses.dataclass
+class SharedFrame:
+    seq: int
+    slot: int
+    lock: int  # seqlock counter of the slot when the frame was read, see SharedFrameReader.is_intact(...)
+    mat_rgb: Image_t  # view on the shared memory, not a copy
+
+
+@dataclasses.dataclass
+class SharedFramesStats:
+    displayed: int = 0
+    skipped: int = 0  # frames published by the producer but never displayed, because newer frames were already available
+    torn: int = 0  # frames overwritten by the producer while they were copied, not displayed: read again from a newer frame
+
+
+class SharedFrameReader:
+    """Viewer side of a frame ring created by SharedFrameWriter, in this or another process"""
+
+    def __init__(self, name: str):
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)  # type: ignore[call-arg]  # python >= 3.13
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+            # before python 3.13, attaching registers the block to the resource tracker, which would destroy it when this process exits
+            resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+        self.ring = _FrameRing(shm)
+        self.stats = SharedFramesStats()
+
+    def get_latest_seq(self) -> int:
+        """Sequence number of the newest complete frame, -1 if none was written"""
+        return int(self.ring.header[RING_LATEST])
+
+    def get_latest(self) -> Optional[SharedFrame]:
+        """
+        Newest complete frame, as a view on the shared memory. The producer may overwrite it after slot_count - 1 new frames: check is_intact(...)
+        after using it. Returns None if no frame was written yet.
+        """
+        for _ in range(self.ring.slot_count):
+            seq = self.get_latest_seq()
+            if seq < 0:
+                return None
+            slot = seq % self.ring.slot_count
+            slot_header = self.ring.slot_headers[slot]
+            lock = int(slot_header[SLOT_LOCK])
+            if lock % 2 == 1 or slot_header[SLOT_SEQ] != seq:
+                continue  # the producer already wraps around the ring, read the newest frame again
+            h, w = int(slot_header[SLOT_HEIGHT]), int(slot_header[SLOT_WIDTH])
+            if int(slot_header[SLOT_LOCK]) != lock or not (0 < h * w * 3 <= self.ring.slot_capacity):
+                continue  # the shape was read while the producer wrote the header of the slot
+            mat_rgb = self.ring.slot_data[slot][: h * w * 3].reshape(h, w, 3)
+            return SharedFrame(seq, slot, lock, mat_rgb)
+        return None
+
+    def is_intact(self, frame: SharedFrame) -> bool:
+        """True if the slot of the frame was not written again since get_latest()"""
+        return int(self.ring.slot_headers[frame.slot][SLOT_LOCK]) == frame.lock
+
+    def close(self):
+        """The frames returned by get_latest() must not be used anymore"""
+        self.ring.release()
@@ -1,6 +1,6 @@
 import numpy as np
 import numpy.typing as npt
-from .typedef import Point2D
+from .typedef import Point2D, Point2DArray
 
 # 3x3 matrix of float64
 TransformMatrix = npt.NDArray[np.float64]
@@ -80,3 +80,15 @@ def apply(mat: TransformMatrix, point_xy: Point2D) -> Point2D:
     point_xyw = mat @ point_xyw
     point_xyw /= point_xyw[2]
     return (point_xyw[0, 0], point_xyw[1, 0])
+
+
+def apply_array(mat: TransformMatrix, points_xy: Point2DArray) -> Point2DArray:
+    """Vectorized version of apply(...) for an array of points of shape (N, 2)"""
+    if not isTransformMatrix(mat):
+        raise TypeError("Transform Matrix 'mat' must be a numpy array of shape=(3, 3) and dtype=float")
+
+    points_xy = np.asarray(points_xy, dtype=float).reshape(-1, 2)
+    points_xyw = points_xy @ mat[:2, :2].T + mat[:2, 2]
+    w = points_xy @ mat[2, :2] + mat[2, 2]
+    res: Point2DArray = points_xyw / w[:, None]
+    return res
@@ -1,4 +1,4 @@
-from typing import Optional, Callable
+from typing import Optional, Callable, Sequence
 import numpy as np
 import numpy.typing as npt
 import abc
@@ -11,13 +11,19 @@ Point2D = tuple[float, float]
 
 Point2DList = list[Point2D]
 
+# array of shape (N, 2) of float64
+Point2DArray = npt.NDArray[np.float64]
+
 CallbackRadioButtons = Optional[Callable[[int, str], None]]
 
 # foo(event) -> None
 CallbackPoint = Optional[Callable[[tk.Event], None]]
 
-# foo(event, point_xy_list) -> None
-CallbackPolygon = Optional[Callable[[tk.Event, Point2DList], None]]
+# foo(event, point_xy_list) -> None, point_xy_list is a read-only view on the vertices, see interactive_overlays.PointListView
+CallbackPolygon = Optional[Callable[[tk.Event, Sequence[Point2D]], None]]
+
+# foo(event, point_index, points_xy) -> None
+CallbackPointCloud = Optional[Callable[[tk.Event, int, Point2DArray], None]]
 
 # foo(event, point0_xy, point1_xy) -> None
 CallbackRect = Optional[Callable[[tk.Event, Point2D, Point2D], None]]
@@ -56,3 +62,7 @@ class InteractivePolygon(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def set_visible(self, value: bool):
         pass
+
+    @abc.abstractmethod
+    def delete(self):
+        raise NotImplementedError()
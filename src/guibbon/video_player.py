@@ -0,0 +1,389 @@
+import dataclasses
+import math
+import queue
+import threading
+import time
+import tkinter as tk
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+
+import cv2
+
+from .image_viewer import to_rgb
+from .typedef import Image_t
+
+FrameSource = Union[str, cv2.VideoCapture, Iterable[Image_t]]
+
+
+@dataclasses.dataclass
+class PlaybackStats:
+    presented: int = 0
+    dropped: int = 0  # decoded frames skipped because a later frame was already due
+    decoded: int = 0
+    decode_time_total: float = 0.0  # seconds, decode and color conversion in the reader thread
+    decode_time_max: float = 0.0
+    render_time_total: float = 0.0  # seconds, imshow in the GUI thread
+    render_time_max: float = 0.0
+
+    @property
+    def decode_time_mean(self) -> float:
+        return self.decode_time_total / self.decoded if self.decoded > 0 else 0.0
+
+    @property
+    def render_time_mean(self) -> float:
+        return self.render_time_total / self.presented if self.presented > 0 else 0.0
+
+
+@dataclasses.dataclass
+class DecodedFrame:
+    generation: int  # incremented on each seek, frames of older generations are discarded
+    index: int
+    mat_rgb: Optional[Image_t]  # None at the end of the stream
+    decode_time: float
+
+
+class FrameReader:
+    """
+    Decodes the frames of a video file, a cv2.VideoCapture or an iterator of frames in a background thread, and converts them to RGB.
+    Frames are handed over through a bounded queue: the thread blocks when the queue is full, so that at most queue_size frames are decoded ahead.
+    An exception raised while reading or converting a frame is kept in error and ends the stream.
+    """
+
+    def __init__(self, source: FrameSource, queue_size: int = 8):
+        self.capture: Optional[cv2.VideoCapture] = None
+        self.iterator: Optional[Iterator[Image_t]] = None
+        self.is_capture_owned = False
+        if isinstance(source, str):
+            self.capture = cv2.VideoCapture(source)
+            self.is_capture_owned = True
+            if not self.capture.isOpened():
+                raise FileNotFoundError(f"could not open video {source}")
+        elif isinstance(source, cv2.VideoCapture):
+            self.capture = source
+        else:
+            self.iterator = iter(source)
+
+        self.fps = 0.0 if self.capture is None else float(self.capture.get(cv2.CAP_PROP_FPS))  # 0 if unknown
+        self.frame_count = 0 if self.capture is None else max(0, int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)))  # 0 if unknown
+
+        self.queue: queue.Queue[DecodedFrame] = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.seek_index: Optional[int] = None
+        self.is_stopped = False
+        self.error: Optional[Exception] = None  # raised by the reading or the conversion of a frame, see VideoPlayer.raise_error()
+        self.thread = threading.Thread(target=self._run, name="gbn_frame_reader", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def is_seekable(self) -> bool:
+        return self.capture is not None
+
+    def seek(self, index: int):
+        if self.capture is None:
+            raise ValueError("seek requires a video file or a cv2.VideoCapture, not an iterator")
+        with self.lock:
+            self.seek_index = max(0, index)
+            self.generation += 1
+        # unblock the reader thread if it is waiting on a full queue of outdated frames
+        self._drain()
+
+    def _drain(self):
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _read(self) -> Optional[Image_t]:
+        if self.capture is not None:
+            ret, mat = self.capture.read()
+            return mat if ret else None  # type: ignore
+        assert self.iterator is not None
+        return next(self.iterator, None)
+
+    def _run(self):
+        index = 0
+        is_end = False
+        while not self.is_stopped:
+            with self.lock:
+                if self.seek_index is not None:
+                    assert self.capture is not None
+                    self.capture.set(cv2.CAP_PROP_POS_FRAMES, self.seek_index)
+                    index = self.seek_index
+                    self.seek_index = None
+                    is_end = False
+                generation = self.generation
+            if is_end:
+                time.sleep(0.01)  # wait for a seek or for stop()
+                continue
+
+            tic = time.perf_counter()
+            try:
+                mat = self._read()
+                mat_rgb = None if mat is None else to_rgb(mat)
+            except Exception as e:
+                self.error = e
+                mat_rgb = None  # end of the stream
+            self._put(DecodedFrame(generation, index, mat_rgb, time.perf_counter() - tic))
+            is_end = mat_rgb is None
+            index += 1
+
+    def _put(self, frame: DecodedFrame):
+        while not self.is_stopped and frame.generation == self.generation:
+            try:
+                self.queue.put(frame, timeout=0.05)
+                return
+            except queue.Full:
+                pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[DecodedFrame]:
+        """Next decoded frame of the current generation. Returns None if none is available (within timeout, or immediately if timeout is None)."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            try:
+                if deadline is None:
+                    frame = self.queue.get_nowait()
+                else:
+                    frame = self.queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                return None
+            if frame.generation == self.generation:
+                return frame
+
+    def stop(self):
+        self.is_stopped = True
+        self._drain()
+        if self.thread.is_alive():
+            self.thread.join()
+        if self.capture is not None and self.is_capture_owned:
+            self.capture.release()
+
+
+class VideoPlayer:
+    """
+    Presents the frames decoded by a FrameReader on an ImageViewer, paced to the fps of the source.
+    Presentation times are computed from a fixed time origin (clock_start, clock_index) instead of sleeping 1/fps between frames, so that timer jitter
+    and render times do not accumulate into drift. When several decoded frames are due, only the latest one is shown and the others are counted as
+    dropped. When the decoder is late, the late frame is shown as soon as available and the time origin is moved to it.
+    """
+
+    DEFAULT_FPS = 30.0
+    MAX_POLL_INTERVAL = 0.01  # seconds, keeps the GUI responsive between 2 frames
+
+    def __init__(
+        self,
+        image_viewer: Any,
+        source: FrameSource,
+        fps: Optional[float] = None,
+        queue_size: int = 8,
+        loop: bool = False,
+        on_frame: Optional[Callable[[int, Image_t], None]] = None,
+    ):
+        self.image_viewer = image_viewer
+        self.reader = FrameReader(source, queue_size)
+        self.fps = fps if fps else (self.reader.fps if self.reader.fps > 0 else VideoPlayer.DEFAULT_FPS)
+        self.loop = loop
+        self.on_frame = on_frame  # called with (index, frame RGB) after each presented frame
+        self.clock: Callable[[], float] = time.perf_counter
+
+        self.index = -1  # index of the last presented frame
+        self.is_playing = False
+        self.is_finished = False
+        self.pending: Optional[DecodedFrame] = None  # decoded frame waiting for its presentation time
+        self.clock_start = 0.0
+        self.clock_index = 0  # frame presented at clock_start
+        self.stats = PlaybackStats()
+
+    def start(self):
+        self.reader.start()
+        self.play()
+
+    def close(self):
+        """Stops the reader thread. Raises the error of the reader, if not already raised by run()"""
+        self.reader.stop()
+        self.raise_error()
+
+    def raise_error(self):
+        """Raises (once) the exception which ended the stream in the reader thread, if any"""
+        error, self.reader.error = self.reader.error, None
+        if error is not None:
+            raise error
+
+    def get_stats(self) -> PlaybackStats:
+        return dataclasses.replace(self.stats)
+
+    def _reset_clock(self, index: int):
+        self.clock_index = index
+        self.clock_start = self.clock()
+
+    def play(self):
+        if self.is_playing:
+            return
+        self.is_playing = True
+        self._reset_clock(self.index + 1)
+
+    def pause(self):
+        self.is_playing = False
+
+    def toggle(self):
+        if self.is_playing:
+            self.pause()
+        else:
+            self.play()
+
+    def _receive(self, timeout: Optional[float] = None) -> Optional[DecodedFrame]:
+        frame = self.reader.get(timeout)
+        if frame is not None and frame.mat_rgb is not None:
+            self.stats.decoded += 1
+            self.stats.decode_time_total += frame.decode_time
+            self.stats.decode_time_max = max(self.stats.decode_time_max, frame.decode_time)
+        return frame
+
+    def _on_end(self):
+        self.pending = None
+        if self.loop and self.reader.is_seekable() and self.index >= 0 and self.reader.error is None:
+            self.reader.seek(0)
+            self._reset_clock(0)
+        else:
+            self.is_finished = True
+            self.is_playing = False
+
+    def present(self, frame: DecodedFrame):
+        assert frame.mat_rgb is not None
+        tic = self.clock()
+        self.image_viewer.imshow_rgb(frame.mat_rgb)
+        if self.on_frame is not None:
+            self.on_frame(frame.index, frame.mat_rgb)
+        render_time = self.clock() - tic
+        self.index = frame.index
+        self.stats.presented += 1
+        self.stats.render_time_total += render_time
+        self.stats.render_time_max = max(self.stats.render_time_max, render_time)
+
+    def step(self, timeout: float = 1.0):
+        """Pauses and presents the next frame"""
+        self.pause()
+        frame = self.pending if self.pending is not None else self._receive(timeout)
+        self.pending = None
+        if frame is None:
+            return
+        if frame.mat_rgb is None:
+            self._on_end()
+        else:
+            self.present(frame)
+
+    def seek(self, index: int):
+        """Moves to the frame at index. If paused, the frame is presented immediately."""
+        if self.reader.frame_count > 0:
+            index = min(index, self.reader.frame_count - 1)
+        self.reader.seek(index)
+        self.pending = None
+        self.is_finished = False
+        self.index = index - 1
+        self._reset_clock(index)
+        if not self.is_playing:
+            self.step()
+
+    def tick(self) -> float:
+        """Presents the frame due now, if any. Returns the time in seconds until the next call is needed."""
+        if not self.is_playing:
+            return VideoPlayer.MAX_POLL_INTERVAL
+        now = self.clock()
+        due_index = self.clock_index + math.floor((now - self.clock_start) * self.fps)
+
+        frame = None
+        while True:
+            if self.pending is None:
+                self.pending = self._receive()
+                if self.pending is None:
+                    break  # the decoder is late
+            if self.pending.mat_rgb is None:
+                if frame is None:
+                    self._on_end()
+                break  # present the last frame first, the end is handled at the next tick
+            if self.pending.index > due_index:
+                break
+            if frame is not None:
+                self.stats.dropped += 1
+            frame, self.pending = self.pending, None
+
+        if frame is not None:
+            if frame.index < due_index and self.pending is None:
+                self._reset_clock(frame.index)  # late decode: resume the pacing from this frame
+            self.present(frame)
+
+        if self.pending is None or self.pending.mat_rgb is None:
+            return VideoPlayer.MAX_POLL_INTERVAL
+        next_time = self.clock_start + (self.pending.index - self.clock_index) / self.fps
+        return min(VideoPlayer.MAX_POLL_INTERVAL, max(0.0, next_time - self.clock()))
+
+    def run(self, update_gui: Callable[[], bool]):
+        """
+        Plays until the end of the stream, or until update_gui() returns False. update_gui processes the GUI events and returns False to stop, for
+        instance when the window is closed. Raises the exception which ended the stream in the reader thread, if any.
+        """
+        self.start()
+        while update_gui() and not self.is_finished:
+            time.sleep(self.tick())
+        self.raise_error()
+
+
+class PlayerToolbar:
+    """Play/pause, step and seek controls of a VideoPlayer, with decode/render counters"""
+
+    REFRESH_INTERVAL = 0.5  # seconds between 2 updates of the counters
+
+    def __init__(self, master, player: VideoPlayer):
+        self.player = player
+        self.frame = tk.Frame(master=master)
+        toolbar_cfg = {"side": tk.LEFT, "padx": 1, "pady": 2}
+        self.play_button = tk.Button(master=self.frame, text="pause", width=5, command=self.onclick_play)
+        self.play_button.pack(toolbar_cfg)
+        tk.Button(master=self.frame, text="step", command=self.onclick_step).pack(toolbar_cfg)
+
+        self.is_seeking = False
+        self.scale: Optional[tk.Scale] = None
+        if player.reader.is_seekable() and player.reader.frame_count > 0:
+            self.scale = tk.Scale(master=self.frame, from_=0, to=player.reader.frame_count - 1, orient=tk.HORIZONTAL, showvalue=False, length=200)
+            self.scale.bind("<ButtonPress-1>", self.on_seek_press)
+            self.scale.bind("<ButtonRelease-1>", self.on_seek_release)
+            self.scale.pack(toolbar_cfg)
+
+        self.stats_label = tk.Label(master=self.frame, text="", anchor=tk.W)
+        self.stats_label.pack(toolbar_cfg)
+        self.last_refresh = 0.0
+        self.frame.pack(side=tk.TOP, fill=tk.X)
+
+    def onclick_play(self):
+        self.player.toggle()
+        self.refresh(force=True)
+
+    def onclick_step(self):
+        self.player.step()
+        self.refresh(force=True)
+
+    def on_seek_press(self, event):
+        self.is_seeking = True
+
+    def on_seek_release(self, event):
+        self.is_seeking = False
+        assert self.scale is not None
+        self.player.seek(int(self.scale.get()))
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False):
+        now = time.perf_counter()
+        if not force and now - self.last_refresh < PlayerToolbar.REFRESH_INTERVAL:
+            return
+        self.last_refresh = now
+        self.play_button.configure(text="pause" if self.player.is_playing else "play")
+        if self.scale is not None and not self.is_seeking:
+            self.scale.set(max(0, self.player.index))
+        stats = self.player.stats
+        self.stats_label.configure(
+            text=f"frame {self.player.index}  decode {stats.decode_time_mean * 1000:.1f}ms  render {stats.render_time_mean * 1000:.1f}ms  dropped {stats.dropped}"
+        )
+
+    def destroy(self):
+        self.frame.destroy()
@@ -0,0 +1,127 @@
+import dataclasses
+from typing import Optional, Sequence
+
+from .image_viewer import ImageViewer, ViewTransform, compute_view_transform
+from .typedef import Point2D
+
+
+@dataclasses.dataclass
+class LinkStats:
+    changes: int = 0  # pan or zoom changes broadcast to the viewers
+    redraw_passes: int = 0
+    draws: int = 0
+    transforms_computed: int = 0
+    transforms_reused: int = 0
+
+
+class ViewLink:
+    """
+    Shares the pan and the zoom (pan_xy, zoom_factor) of several ImageViewers, in the same window or not: a pan or a zoom of any of them applies
+    to all. The changes are broadcast to the viewers right away but the redraws are coalesced into a single pass when Tk is idle, however many
+    mouse events changed the view meanwhile. The view transform and the visible rectangle are computed once per canvas and image sizes and reused
+    by the viewers sharing them. Hidden viewers are redrawn when they are shown again.
+    """
+
+    def __init__(self, viewers: Sequence[ImageViewer] = ()):
+        self.viewers: list[ImageViewer] = []
+        self.zoom_factor: Optional[float] = None  # None until a linked viewer shows an image
+        self.pan_xy: Point2D = (0.0, 0.0)
+        self.cumulative_pan_xy: Point2D = (0.0, 0.0)
+        self.transforms: dict[tuple[tuple[int, int], tuple[int, int]], ViewTransform] = {}  # by canvas and image sizes, for the current pan and zoom
+        self.dirty_viewers: set[ImageViewer] = set()
+        self.is_redraw_scheduled = False
+        self.redraw_after: Optional[tuple[ImageViewer, str]] = None  # viewer whose canvas timer runs the scheduled redraw, and the timer id
+        self.stats = LinkStats()
+        for viewer in viewers:
+            self.add(viewer)
+
+    def add(self, viewer: ImageViewer):
+        if viewer.view_link is self:
+            return
+        if viewer.view_link is not None:
+            viewer.view_link.remove(viewer)
+        viewer.view_link = self
+        self.viewers.append(viewer)
+        if hasattr(viewer, "mat"):
+            self.invalidate(viewer)  # sync(...) gives the link pan and zoom to the viewer, or the viewer pan and zoom to the link
+
+    def remove(self, viewer: ImageViewer):
+        """Must be called before the viewer is destroyed, e.g. when its window or its dashboard is closed"""
+        if viewer.view_link is not self:
+            return
+        viewer.view_link = None
+        self.viewers.remove(viewer)
+        self.dirty_viewers.discard(viewer)
+        if self.redraw_after is not None and self.redraw_after[0] is viewer:
+            # the timer dies with the canvas: the redraw is scheduled again with another viewer
+            viewer.canvas.after_cancel(self.redraw_after[1])
+            self.redraw_after = None
+            self.is_redraw_scheduled = False
+            self.schedule_redraw()
+
+    def sync(self, viewer: ImageViewer):
+        """Called by the viewer before rendering: the first viewer with an image gives its pan and zoom to the link, the others take them"""
+        if self.zoom_factor is None:
+            self.set_panzoom(viewer.zoom_factor, viewer.pan_xy, viewer.cumulative_pan_xy)
+            self.dirty_viewers.discard(viewer)  # being drawn
+            return
+        viewer.zoom_factor = self.zoom_factor
+        viewer.pan_xy = self.pan_xy
+        viewer.cumulative_pan_xy = self.cumulative_pan_xy
+
+    def set_panzoom(self, zoom_factor: float, pan_xy: Point2D, cumulative_pan_xy: Optional[Point2D] = None):
+        """Applies a pan and a zoom to all the linked viewers, redrawn together when Tk is idle"""
+        self.cumulative_pan_xy = pan_xy if cumulative_pan_xy is None else cumulative_pan_xy
+        is_changed = zoom_factor != self.zoom_factor or tuple(pan_xy) != tuple(self.pan_xy)
+        self.zoom_factor = zoom_factor
+        self.pan_xy = pan_xy
+        for viewer in self.viewers:
+            viewer.zoom_factor = zoom_factor
+            viewer.pan_xy = pan_xy
+            viewer.cumulative_pan_xy = self.cumulative_pan_xy
+        if not is_changed:
+            return
+        self.stats.changes += 1
+        self.transforms.clear()
+        self.dirty_viewers.update(self.viewers)
+        self.schedule_redraw()
+
+    def invalidate(self, viewer: ImageViewer):
+        """Redraws the viewer with the next pass, e.g. after a resize"""
+        self.dirty_viewers.add(viewer)
+        self.schedule_redraw()
+
+    def get_view_transform(self, canvas_shape_hw: tuple[int, int], img_shape_hw: tuple[int, int]) -> ViewTransform:
+        assert self.zoom_factor is not None, "sync(...) must be called first"
+        key = (canvas_shape_hw, img_shape_hw)
+        transform = self.transforms.get(key, None)
+        if transform is None:
+            transform = compute_view_transform(canvas_shape_hw, img_shape_hw, self.zoom_factor, self.pan_xy)
+            self.transforms[key] = transform
+            self.stats.transforms_computed += 1
+        else:
+            self.stats.transforms_reused += 1
+        return transform
+
+    def schedule_redraw(self):
+        if self.is_redraw_scheduled or len(self.dirty_viewers) == 0:
+            return
+        self.is_redraw_scheduled = True
+        viewer = next(iter(self.dirty_viewers))
+        self.redraw_after = (viewer, viewer.canvas.after_idle(self.redraw))
+
+    def redraw(self):
+        """Draws the dirty viewers once. The hidden ones stay dirty until they are shown, see ImageViewer.on_visibility_event(...)"""
+        self.is_redraw_scheduled = False
+        self.redraw_after = None
+        self.stats.redraw_passes += 1
+        for viewer in list(self.viewers):
+            if viewer not in self.dirty_viewers or viewer.is_hidden():
+                continue
+            self.dirty_viewers.discard(viewer)
+            if hasattr(viewer, "mat"):
+                viewer.draw()
+                self.stats.draws += 1
+
+    def get_stats(self) -> LinkStats:
+        return dataclasses.replace(self.stats)
@@ -0,0 +1,85 @@
+import tkinter
+import unittest
+
+import numpy as np
+
+from guibbon import interactive_overlays
+from guibbon import transform_matrix as tmat
+
+
+class TestAnnotationLayer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.canvas = tkinter.Canvas()
+        self.boxes_xyxy = np.array([(10.0 * k, 10.0 * k, 10.0 * k + 5, 10.0 * k + 8) for k in range(20)])
+
+    def test_boxes(self):
+        layer = interactive_overlays.AnnotationLayer(self.canvas)
+        layer.set_img2can_matrix(tmat.T((10, 20)))
+        layer.set_boxes(self.boxes_xyxy)
+
+        self.assertEqual(len(self.boxes_xyxy), len(layer.box_pool.item_ids))
+        for box_xyxy, item_id in zip(self.boxes_xyxy, layer.box_pool.item_ids):
+            self.assertListEqual((box_xyxy + [10, 20, 10, 20]).tolist(), self.canvas.coords(item_id))
+            self.assertEqual("normal", self.canvas.itemcget(item_id, "state"))
+
+    def test_pool_reuse(self):
+        layer = interactive_overlays.AnnotationLayer(self.canvas)
+        layer.set_boxes(self.boxes_xyxy)
+        item_ids = layer.box_pool.item_ids + []
+        n_items = len(self.canvas.find_all())
+
+        layer.set_boxes(self.boxes_xyxy[:5])
+        self.assertEqual(n_items, len(self.canvas.find_all()), "Extra items must be hidden instead of deleted")
+        for item_id in item_ids[5:]:
+            self.assertEqual("hidden", self.canvas.itemcget(item_id, "state"))
+
+        layer.set_boxes(self.boxes_xyxy + 1)
+        self.assertListEqual(item_ids, layer.box_pool.item_ids, "Items must be reused")
+        self.assertEqual(n_items, len(self.canvas.find_all()), "Items must be reused")
+
+    def test_changed_items_only(self):
+        layer = interactive_overlays.AnnotationLayer(self.canvas)
+        layer.set_boxes(self.boxes_xyxy)
+
+        moved_items = []
+        self.canvas.coords = lambda item_id, *args: moved_items.append(item_id)  # type: ignore
+        boxes_xyxy = self.boxes_xyxy.copy()
+        boxes_xyxy[3] += 1
+        layer.set_boxes(boxes_xyxy)
+        self.assertListEqual([layer.box_pool.item_ids[3]], moved_items, "Only the changed items must be sent to the canvas")
+
+    def test_default_colors(self):
+        layer = interactive_overlays.AnnotationLayer(self.canvas)
+        layer.set_boxes(self.boxes_xyxy[:3], colors=["red", "green", "blue"])
+        self.assertEqual("green", self.canvas.itemcget(layer.box_pool.item_ids[1], "outline"))
+
+        layer.set_boxes(self.boxes_xyxy[:3])
+        for item_id in layer.box_pool.item_ids:
+            self.assertEqual(interactive_overlays.AnnotationLayer.colors["box"], self.canvas.itemcget(item_id, "outline"), "Reused items must get the default color back")
+
+    def test_labels_points_segments(self):
+        layer = interactive_overlays.AnnotationLayer(self.canvas)
+        layer.set_points(self.boxes_xyxy[:, :2])
+        layer.set_segments(self.boxes_xyxy)
+        layer.set_labels(self.boxes_xyxy[:, :2], [f"obj{k}" for k in range(len(self.boxes_xyxy))])
+        self.assertEqual(len(self.boxes_xyxy), layer.point_pool.n_shown)
+        self.assertEqual(len(self.boxes_xyxy), layer.segment_pool.n_shown)
+        self.assertEqual("obj3", self.canvas.itemcget(layer.label_pool.item_ids[3], "text"))
+
+        layer.clear()
+        for pool in [layer.box_pool, layer.point_pool, layer.segment_pool, layer.label_pool]:
+            self.assertEqual(0, pool.n_shown)
+
+    def test_visible(self):
+        layer = interactive_overlays.AnnotationLayer(self.canvas)
+        layer.set_boxes(self.boxes_xyxy)
+        layer.set_visible(False)
+        for item_id in layer.box_pool.item_ids:
+            self.assertEqual("hidden", self.canvas.itemcget(item_id, "state"))
+        layer.set_visible(True)
+        for item_id in layer.box_pool.item_ids:
+            self.assertEqual("normal", self.canvas.itemcget(item_id, "state"))
+
+
+if __name__ == "__main__":
+    unittest.main()
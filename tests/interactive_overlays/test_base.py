@@ -24,6 +24,35 @@ class EventName:
     LEAVE = "<Leave>"
 
 
+class Overlay:
+    def __init__(self, batch):
+        self.batch = batch
+        self.update_count = 0
+
+    def update(self):
+        if self.batch is not None and self.batch.defer(self):
+            return
+        self.update_count += 1
+
+
+class TestUpdateBatch(unittest.TestCase):
+    def test_defer(self):
+        batch = interactive_overlays.UpdateBatch()
+        overlay = Overlay(batch)
+        overlay.update()
+        self.assertEqual(1, overlay.update_count, "Inactive batch must not defer updates")
+
+        batch.depth += 1
+        for _ in range(10):
+            overlay.update()
+        self.assertEqual(1, overlay.update_count, "Active batch must defer updates")
+        batch.depth -= 1
+
+        pending = batch.pop_pending()
+        self.assertListEqual([overlay], pending, "Deferred updates must be coalesced")
+        self.assertListEqual([], batch.pop_pending())
+
+
 class TestMagnets(unittest.TestCase):
     def foo(self, x_img, y_img):
         return self.val, self.val
@@ -109,7 +138,9 @@ class TestPoint(unittest.TestCase):
             canvas=self.canvas, point_xy=self.point_xy, label="ok", on_click=self.on_event, on_drag=self.on_event, on_release=self.on_event
         )
 
-        binds = self.canvas.tag_bind(self.pt.circle_id)
+        circle_id = self.pt.circle_id
+        assert circle_id is not None
+        binds = self.canvas.tag_bind(circle_id)
         self.assertIn(EventName.CLICK, binds, f"{EventName.CLICK} tag not binded")
         self.assertIn(EventName.DRAG, binds, f"{EventName.DRAG} tag not binded")
         self.assertIn(EventName.RELEASE, binds, f"{EventName.RELEASE} tag not binded")
@@ -142,7 +173,9 @@ class TestPoint(unittest.TestCase):
     def test_none_callback(self):
         self.pt = interactive_overlays.Point(canvas=self.canvas, point_xy=self.point_xy, label="ok", on_click=None, on_drag=None, on_release=None)
 
-        binds = self.canvas.tag_bind(self.pt.circle_id)
+        circle_id = self.pt.circle_id
+        assert circle_id is not None
+        binds = self.canvas.tag_bind(circle_id)
         self.assertIn(EventName.CLICK, binds, f"{EventName.CLICK} tag not binded")
         self.assertIn(EventName.DRAG, binds, f"{EventName.DRAG} tag not binded")
         self.assertIn(EventName.RELEASE, binds, f"{EventName.RELEASE} tag not binded")
@@ -0,0 +1,72 @@
+import tkinter
+import unittest
+
+from guibbon import interactive_overlays
+from guibbon.interactive_overlays import Layer, LayerStack
+
+
+class TestLayerStack(unittest.TestCase):
+    def setUp(self) -> None:
+        self.canvas = tkinter.Canvas()
+        self.layers = LayerStack(self.canvas)
+
+    def get_layer_of_items(self, item_ids):
+        tag_to_layer = {LayerStack.get_tag(layer): layer for layer in Layer}
+        res = []
+        for item_id in item_ids:
+            layer = next(tag_to_layer[tag] for tag in self.canvas.gettags(item_id) if tag in tag_to_layer)
+            if item_id != self.layers.sentinel_ids[layer]:
+                res.append(layer)
+        return res
+
+    def test_z_order(self):
+        # create the items in reverse order of their layers
+        point = interactive_overlays.Point(self.canvas, (10, 10))
+        point.set_layers(self.layers)
+        polygon = interactive_overlays.Polygon(self.canvas, [(0, 0), (0, 10), (10, 10)])
+        polygon.set_layers(self.layers)
+        image_id = self.canvas.create_rectangle(0, 0, 100, 100)
+        self.layers.place([image_id], Layer.IMAGE, static=True)
+
+        expected = [Layer.IMAGE] + [Layer.POLYGONS] * 3 + [Layer.HANDLES] * 4
+        self.assertListEqual(expected, self.get_layer_of_items(self.canvas.find_all()))
+
+        display_list = self.canvas.find_all()
+        point.update()
+        polygon.update()
+        self.assertTupleEqual(display_list, self.canvas.find_all(), "Updates must not reorder the canvas items")
+
+        self.layers.set_order([Layer.POLYGONS, Layer.IMAGE, Layer.ANNOTATIONS, Layer.MAGNETS, Layer.HANDLES, Layer.HUD])
+        expected = [Layer.POLYGONS] * 3 + [Layer.IMAGE] + [Layer.HANDLES] * 4
+        self.assertListEqual(expected, self.get_layer_of_items(self.canvas.find_all()))
+
+        with self.assertRaises(ValueError):
+            self.layers.set_order([Layer.IMAGE, Layer.HUD])
+
+    def test_visible(self):
+        polygon = interactive_overlays.Polygon(self.canvas, [(0, 0), (0, 10), (10, 10)])
+        polygon.set_layers(self.layers)
+        hud_id = self.canvas.create_text(0, 0, text="fps")
+        self.layers.place([hud_id], Layer.HUD, static=True)
+
+        self.layers.set_visible(Layer.POLYGONS, False)
+        self.layers.set_visible(Layer.HUD, False)
+        polygon.update()
+        self.assertEqual("hidden", self.canvas.itemcget(hud_id, "state"))
+        for _, _, line_id in polygon.lines:
+            self.assertEqual("hidden", self.canvas.itemcget(line_id, "state"))
+        for ipoint in polygon.ipoints:
+            self.assertEqual("normal", self.canvas.itemcget(ipoint.circle_id, "state"), "Other layers must not be affected")
+
+        self.layers.set_visible(Layer.POLYGONS, True)
+        self.layers.set_visible(Layer.HUD, True)
+        polygon.update()
+        self.assertEqual("normal", self.canvas.itemcget(hud_id, "state"))
+        for _, _, line_id in polygon.lines:
+            self.assertEqual("normal", self.canvas.itemcget(line_id, "state"))
+        for sentinel_id in self.layers.sentinel_ids.values():
+            self.assertEqual("hidden", self.canvas.itemcget(sentinel_id, "state"))
+
+
+if __name__ == "__main__":
+    unittest.main()
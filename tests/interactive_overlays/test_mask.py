@@ -0,0 +1,86 @@
+import tkinter
+import unittest
+from typing import Optional
+
+import numpy as np
+
+from guibbon import interactive_overlays
+from guibbon import transform_matrix as tmat
+from guibbon.edit_history import EditHistory
+
+
+class TestMaskOverlay(unittest.TestCase):
+    def setUp(self) -> None:
+        self.canvas = tkinter.Canvas()
+        self.mask = np.zeros(shape=(100, 200), dtype=np.uint8)
+        self.palette = [(0, 0, 0), (255, 0, 0), (0, 0, 255)]  # BGR
+
+    def test_paint(self):
+        mask_overlay = interactive_overlays.MaskOverlay(self.canvas, self.mask)
+        changed_rects: list[Optional[interactive_overlays.Rect]] = []
+        mask_overlay.on_change = changed_rects.append
+        mask_overlay.set_brush(label=2, radius=3)
+
+        rect = mask_overlay.paint((10, 10), (50, 10))
+        self.assertIs(self.mask, mask_overlay.get_mask(), "The mask must not be copied")
+        self.assertEqual(2, self.mask[10, 30])
+        self.assertEqual(2, self.mask[13, 50])
+        self.assertEqual(0, self.mask[20, 30])
+        self.assertListEqual([rect], changed_rects)
+        assert rect is not None
+        x0, y0, x1, y1 = rect
+        self.assertEqual(0, np.count_nonzero(self.mask) - np.count_nonzero(self.mask[y0:y1, x0:x1]), "The dirty rectangle must cover the stroke")
+
+        mask_overlay.set_brush(label=0)
+        mask_overlay.paint((10, 10), (50, 10))
+        self.assertEqual(0, np.count_nonzero(self.mask), "Label 0 erases")
+
+    def test_stroke_history(self):
+        mask_overlay = interactive_overlays.MaskOverlay(self.canvas, self.mask)
+        history = EditHistory()
+        mask_overlay.set_history(history)
+        mask_overlay.set_brush(label=1, radius=3)
+
+        mask_overlay.on_brush_event(tkinter.EventType.ButtonPress, (10, 10), True)
+        mask_overlay.on_brush_event(tkinter.EventType.Motion, (30, 10), True)
+        mask_overlay.on_brush_event(tkinter.EventType.Motion, (30, 40), True)
+        mask_overlay.on_brush_event(tkinter.EventType.ButtonRelease, (30, 40), False)
+        self.assertEqual(1, history.count, "A stroke must be recorded as a single edit")
+        self.assertLess(history.mask_deltas_nbytes, 2 * 29 * 39, "The segments must be recorded, not the bounding box of the stroke")
+        painted = self.mask.copy()
+
+        history.undo()
+        self.assertEqual(0, np.count_nonzero(self.mask))
+        history.redo()
+        np.testing.assert_array_equal(painted, self.mask)
+
+    def test_blend(self):
+        self.mask[:, 100:] = 1
+        self.mask[50:, 150:] = 2
+        mask_overlay = interactive_overlays.MaskOverlay(self.canvas, self.mask, palette=self.palette, alpha=0.5)
+        mask_overlay.set_img2can_matrix(tmat.S((2, 2)))
+
+        viewport = np.full(shape=(300, 400, 3), fill_value=100, dtype=np.uint8)
+        mask_overlay.blend(viewport)
+        self.assertListEqual([100, 100, 100], viewport[10, 150].tolist(), "Label 0 is transparent")
+        self.assertListEqual([50, 50, 177], viewport[10, 250].tolist(), "Palette is BGR, viewport is RGB")
+        self.assertListEqual([177, 50, 50], viewport[150, 350].tolist())
+        self.assertListEqual([100, 100, 100], viewport[250, 250].tolist(), "Outside of the image")
+
+        viewport[:] = 100
+        mask_overlay.blend(viewport, can_rect=(300, 0, 400, 50))
+        self.assertListEqual([100, 100, 100], viewport[10, 250].tolist(), "Only the given rectangle must be blended")
+        self.assertListEqual([50, 50, 177], viewport[10, 350].tolist())
+
+        viewport[:] = 100
+        mask_overlay.set_visible(False)
+        mask_overlay.blend(viewport)
+        self.assertEqual(100, viewport.min())
+
+    def test_project_rect(self):
+        self.assertEqual((19, 39, 41, 61), interactive_overlays.project_rect((10, 20, 20, 30), tmat.S((2, 2)), (300, 400)))
+        self.assertIsNone(interactive_overlays.project_rect((500, 500, 600, 600), tmat.I(), (300, 400)))
+
+
+if __name__ == "__main__":
+    unittest.main()
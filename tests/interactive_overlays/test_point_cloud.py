@@ -0,0 +1,94 @@
+import dataclasses
+import tkinter
+import unittest
+
+import numpy as np
+
+from guibbon import interactive_overlays
+from guibbon import transform_matrix as tmat
+
+
+@dataclasses.dataclass
+class Event:
+    x: int = 0
+    y: int = 0
+
+
+class EventName:
+    CLICK = "<Button-1>"
+    DRAG = "<B1-Motion>"
+    RELEASE = "<ButtonRelease-1>"
+    ENTER = "<Enter>"
+    LEAVE = "<Leave>"
+
+
+class TestPointCloud(unittest.TestCase):
+    def setUp(self) -> None:
+        self.canvas = tkinter.Canvas()
+        self.points_xy = np.array([(10.0 * k, 20.0 * k) for k in range(5)])
+        self.img2can_matrix = tmat.T((12, 34)) @ tmat.S((2, 2))
+        self.events: list[tuple[int, np.ndarray]] = []
+
+    def on_event(self, event, index, points_xy):
+        self.events.append((index, points_xy))
+
+    def test_shared_tag(self):
+        cloud = interactive_overlays.PointCloud(self.canvas, self.points_xy)
+        self.assertEqual(len(self.points_xy), len(self.canvas.find_withtag(cloud.tag)), "Each point must have its item tagged with the shared tag")
+
+        binds = self.canvas.tag_bind(cloud.tag)
+        for event_name in [EventName.CLICK, EventName.DRAG, EventName.RELEASE, EventName.ENTER, EventName.LEAVE]:
+            self.assertIn(event_name, binds, f"{event_name} must be binded once on the shared tag")
+        for circle_id in cloud.circle_ids:
+            self.assertEqual((), self.canvas.tag_bind(circle_id), "Items must not have their own bindings")
+
+    def test_update(self):
+        cloud = interactive_overlays.PointCloud(self.canvas, self.points_xy)
+        cloud.set_img2can_matrix(self.img2can_matrix)
+        cloud.update()
+        for point_xy, circle_id in zip(self.points_xy, cloud.circle_ids):
+            x_expected, y_expected = tmat.apply(self.img2can_matrix, point_xy)
+            x1, y1, x2, y2 = self.canvas.coords(circle_id)
+            self.assertAlmostEqual(x_expected, (x1 + x2) / 2)
+            self.assertAlmostEqual(y_expected, (y1 + y2) / 2)
+
+    def test_set_points(self):
+        cloud = interactive_overlays.PointCloud(self.canvas, self.points_xy)
+        points_xy = cloud.get_points()
+
+        cloud.set_points(self.points_xy + 1)
+        self.assertIs(points_xy, cloud.get_points(), "set_points must update the array in place when the shape doesn't change")
+        self.assertListEqual((self.points_xy + 1).tolist(), cloud.get_points().tolist())
+
+        cloud.set_points(self.points_xy[:2])
+        self.assertEqual(2, len(self.canvas.find_withtag(cloud.tag)), "Extra items must be deleted")
+        cloud.set_points(np.zeros((7, 2)))
+        self.assertEqual(7, len(self.canvas.find_withtag(cloud.tag)), "Missing items must be created")
+
+    def test_callback(self):
+        cloud = interactive_overlays.PointCloud(self.canvas, self.points_xy, on_click=self.on_event, on_drag=self.on_event, on_release=self.on_event)
+        cloud._get_current_index = lambda: 3  # type: ignore
+
+        cloud._on_enter(Event())
+        self.assertEqual(interactive_overlays.State.HOVERED, cloud.get_state(3))
+        cloud._on_click(Event(0, 0))
+        self.assertEqual(interactive_overlays.State.DRAGGED, cloud.get_state(3))
+        cloud._on_drag(Event(123, 456))
+        self.assertListEqual([123, 456], cloud.get_points()[3].tolist(), "Dragged point must be updated in the array")
+        self.assertListEqual([0.0, 0.0], cloud.get_points()[0].tolist(), "Other points must not move")
+        cloud._on_release(Event(123, 456))
+        self.assertEqual(interactive_overlays.State.HOVERED, cloud.get_state(3))
+        cloud._on_leave(Event())
+        self.assertEqual(interactive_overlays.State.NORMAL, cloud.get_state(3))
+
+        self.assertListEqual([3, 3, 3], [index for index, _ in self.events], "Callbacks must report the index of the point")
+        self.assertIs(cloud.get_points(), self.events[-1][1])
+
+    def test_delete(self):
+        cloud = interactive_overlays.PointCloud(self.canvas, self.points_xy)
+        cloud.delete()
+        self.assertEqual(0, len(self.canvas.find_withtag(cloud.tag)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,10 @@ import sys
 import tkinter
 import unittest
 
+import numpy as np
+
 from guibbon import interactive_overlays
+from guibbon import transform_matrix as tmat
 from guibbon.typedef import InteractivePolygon
 
 eps = sys.float_info.epsilon
@@ -62,7 +65,9 @@ class TestPolygon(unittest.TestCase):
         self.assertEqual(len(self.plg.ipoints), len(self.point_xy_list), "Polygon must have 1 Interactive Point instance for each point in point_xy_list")
 
         for k in range(len(self.plg.ipoints)):
-            binds = self.canvas.tag_bind(self.plg.ipoints[k].circle_id)
+            circle_id = self.plg.ipoints[k].circle_id
+            assert circle_id is not None
+            binds = self.canvas.tag_bind(circle_id)
             self.assertIn(EventName.CLICK, binds, f"{EventName.CLICK} tag not binded")
             self.assertIn(EventName.DRAG, binds, f"{EventName.DRAG} tag not binded")
             self.assertIn(EventName.RELEASE, binds, f"{EventName.RELEASE} tag not binded")
@@ -102,7 +107,9 @@ class TestPolygon(unittest.TestCase):
         self.plg = interactive_overlays.Polygon(canvas=self.canvas, point_xy_list=self.point_xy_list, label="ok", on_click=None, on_drag=None, on_release=None)
 
         for k in range(len(self.plg.ipoints)):
-            binds = self.canvas.tag_bind(self.plg.ipoints[k].circle_id)
+            circle_id = self.plg.ipoints[k].circle_id
+            assert circle_id is not None
+            binds = self.canvas.tag_bind(circle_id)
             self.assertIn(EventName.CLICK, binds, f"{EventName.CLICK} tag not binded")
             self.assertIn(EventName.DRAG, binds, f"{EventName.DRAG} tag not binded")
             self.assertIn(EventName.RELEASE, binds, f"{EventName.RELEASE} tag not binded")
@@ -178,6 +185,51 @@ class TestPolygon(unittest.TestCase):
 
             self.assertEqual(self.plg.visible, val)
 
+    def test_incremental_drag(self):
+        point_xy_list = [(10.0 * k, (10.0 * k) ** 0.5) for k in range(10)]
+        self.plg = interactive_overlays.Polygon(canvas=self.canvas, point_xy_list=point_xy_list, on_drag=self.on_event)
+
+        k = 4
+        ipoint = self.plg.ipoints[k]
+        ipoint.on_drag = None  # only test the polygon part
+        ipoint.set_img_point_xy((123.0, 456.0))
+        moved_items = []
+        self.canvas.coords = lambda item_id, *args: moved_items.append(item_id)  # type: ignore
+        self.plg._on_drag(k, Event(123, 456))
+
+        expected_items = [self.plg.lines[k - 1][2], self.plg.lines[k][2]]
+        self.assertListEqual(sorted(expected_items), sorted(moved_items), "Only the 2 lines adjacent to the dragged vertex must be updated")
+        self.assertEqual((123.0, 456.0), self.point_xy_list[k], "Callback must receive the up to date vertices")
+        self.assertEqual(0, len(self.plg.dirty_indices))
+
+    def test_callback_view(self):
+        views = []
+        self.plg = interactive_overlays.Polygon(canvas=self.canvas, point_xy_list=self.point_xy_list, on_drag=lambda event, point_xy_list: views.append(point_xy_list))
+        self.plg._on_drag(0, Event())
+        view = views[0]
+        self.assertIsInstance(view, interactive_overlays.PointListView, "Callbacks must receive a view, not a copy of the vertices")
+        with self.assertRaises(TypeError):
+            view[0] = (1.0, 1.0)  # type: ignore[index]
+        self.plg.set_vertex_xy(0, (7.0, 8.0))
+        self.assertEqual((7.0, 8.0), view[0], "The view follows the polygon")
+        self.assertEqual(self.plg.img_point_xy_list, list(view), "Callbacks keeping the vertices copy them")
+
+    def test_set_vertex_xy(self):
+        point_xy_list = [(10.0 * k, (10.0 * k) ** 0.5) for k in range(10)]
+        self.plg = interactive_overlays.Polygon(canvas=self.canvas, point_xy_list=point_xy_list)
+
+        k = 4
+        moved_items = []
+        self.canvas.coords = lambda item_id, *args: moved_items.append(item_id)  # type: ignore
+        self.plg.set_vertex_xy(k, (123.0, 456.0))
+
+        circle_id = self.plg.ipoints[k].circle_id
+        assert circle_id is not None
+        expected_items = [self.plg.lines[k - 1][2], self.plg.lines[k][2], circle_id]
+        self.assertListEqual(sorted(expected_items), sorted(moved_items), "Only the moved vertex and its 2 adjacent lines must be updated")
+        self.assertEqual((123.0, 456.0), self.plg.img_point_xy_list[k], "The cached vertices must be up to date")
+        self.assertEqual(0, len(self.plg.dirty_indices))
+
 
 class TestRectangle(unittest.TestCase):
     def setUp(self) -> None:
@@ -224,7 +276,9 @@ class TestRectangle(unittest.TestCase):
         self.assertEqual(2, len(self.rect.ipoints), "Rectangle must have 2 Interactive Point instances")
 
         for k in range(2):
-            binds = self.canvas.tag_bind(self.rect.ipoints[k].circle_id)
+            circle_id = self.rect.ipoints[k].circle_id
+            assert circle_id is not None
+            binds = self.canvas.tag_bind(circle_id)
             self.assertIn(EventName.CLICK, binds, f"{EventName.CLICK} tag not binded")
             self.assertIn(EventName.DRAG, binds, f"{EventName.DRAG} tag not binded")
             self.assertIn(EventName.RELEASE, binds, f"{EventName.RELEASE} tag not binded")
@@ -274,7 +328,9 @@ class TestRectangle(unittest.TestCase):
         )
 
         for k in range(2):
-            binds = self.canvas.tag_bind(self.rect.ipoints[k].circle_id)
+            circle_id = self.rect.ipoints[k].circle_id
+            assert circle_id is not None
+            binds = self.canvas.tag_bind(circle_id)
             self.assertIn(EventName.CLICK, binds, f"{EventName.CLICK} tag not binded")
             self.assertIn(EventName.DRAG, binds, f"{EventName.DRAG} tag not binded")
             self.assertIn(EventName.RELEASE, binds, f"{EventName.RELEASE} tag not binded")
@@ -325,4 +381,71 @@ class TestRectangle(unittest.TestCase):
         event = Event(0, 0)
 
         with self.assertRaises(Exception):
-            self.rect._on_drag(0, event)
\ No newline at end of file
+            self.rect._on_drag(0, event)
+
+
+class TestContour(unittest.TestCase):
+    def setUp(self) -> None:
+        self.event_count = 0
+        self.canvas = tkinter.Canvas()
+        # circle of 2000 vertices with a radius of 100 pixels
+        angles = np.linspace(0, 2 * np.pi, 2000, endpoint=False)
+        self.point_xy_list = [(100 * np.cos(a) + 200, 100 * np.sin(a) + 200) for a in angles]
+
+    def on_event(self, event, point_xy_list):
+        self.event_count += 1
+
+    def test_interface(self):
+        contour = interactive_overlays.Contour(canvas=self.canvas, point_xy_list=self.point_xy_list)
+        self.assertIsInstance(contour, InteractivePolygon)
+
+    def test_single_item(self):
+        n_items = len(self.canvas.find_all())
+        contour = interactive_overlays.Contour(canvas=self.canvas, point_xy_list=self.point_xy_list)
+        n_handles = len(self.canvas.find_withtag(contour.handles.tag))
+        self.assertEqual(n_items + n_handles + 1, len(self.canvas.find_all()), "Contour must be drawn with a single line item")
+
+    def test_level_of_detail(self):
+        contour = interactive_overlays.Contour(canvas=self.canvas, point_xy_list=self.point_xy_list)
+        self.assertFalse(contour.handles_visible, "Handles must be hidden when vertices are too close to each other")
+        n_simplified = len(contour.get_simplified_points())
+        self.assertLess(n_simplified, len(self.point_xy_list), "Contour must be simplified at low zoom")
+
+        contour.set_img2can_matrix(tmat.S((100, 100)))
+        contour.update()
+        self.assertTrue(contour.handles_visible, "Handles must be visible when zooming close enough")
+        self.assertGreater(len(contour.get_simplified_points()), n_simplified, "Contour must have more details at high zoom")
+        self.assertEqual(2, len(contour.simplified_by_zoom), "Simplified contours must be cached per zoom level")
+
+        for k in range(100):  # mouse wheel zoom
+            contour.set_img2can_matrix(tmat.S((1.01**k, 1.01**k)))
+            contour.get_simplified_points()
+        self.assertLessEqual(len(contour.simplified_by_zoom), interactive_overlays.Contour.SIMPLIFIED_CACHE_SIZE)
+
+    def test_hidden_handles(self):
+        contour = interactive_overlays.Contour(canvas=self.canvas, point_xy_list=self.point_xy_list)
+        self.assertFalse(contour.handles.visible)
+        handle_id = contour.handles.circle_ids[0]
+        coords = self.canvas.coords(handle_id)
+        contour.set_img2can_matrix(tmat.T((50, 50)))
+        contour.update()
+        self.assertEqual(coords, self.canvas.coords(handle_id), "Hidden handles must not be moved")
+        self.assertEqual("hidden", self.canvas.itemcget(handle_id, "state"))
+
+    def test_callback(self):
+        contour = interactive_overlays.Contour(
+            canvas=self.canvas, point_xy_list=self.point_xy_list, on_click=self.on_event, on_drag=self.on_event, on_release=self.on_event
+        )
+        contour.handles._get_current_index = lambda: 5  # type: ignore
+        contour.handles._on_click(Event(0, 0))
+        contour.handles._on_drag(Event(10, 20))
+        contour.handles._on_release(Event(10, 20))
+        self.assertEqual(3, self.event_count)
+        self.assertEqual((10.0, 20.0), contour.get_point_xy_list()[5])
+
+    def test_visible(self):
+        contour = interactive_overlays.Contour(canvas=self.canvas, point_xy_list=self.point_xy_list)
+        contour.set_visible(False)
+        self.assertEqual("hidden", self.canvas.itemcget(contour.line_id, "state"))
+        contour.set_visible(True)
+        self.assertEqual("normal", self.canvas.itemcget(contour.line_id, "state"))
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+from typing import Any, Callable
+from unittest.mock import Mock
+
+from guibbon.async_bridge import AsyncBridge, GuiEvent, as_sync_callback
+from guibbon.keyboard_event_handler import KeyboardEventHandler
+
+
+class FakeGuibbon:
+    """Class attributes of Guibbon used by the bridge"""
+
+    is_alive = True
+    root = Mock()
+    keyboard = KeyboardEventHandler()
+    instances = {"win": object()}
+
+    @staticmethod
+    def press(key: int):
+        FakeGuibbon.keyboard.push_event(key, is_press=True)
+
+
+class TestAsyncBridge(unittest.TestCase):
+    def setUp(self) -> None:
+        FakeGuibbon.root = Mock()
+        FakeGuibbon.keyboard = KeyboardEventHandler()
+        FakeGuibbon.instances = {"win": object()}
+
+    def test_wait_key(self):
+        async def main():
+            bridge = AsyncBridge(FakeGuibbon, interval=0.001)
+            self.assertEqual(-1, await bridge.wait_key(0.02), "Timeout")
+            self.assertGreater(FakeGuibbon.root.update.call_count, 2, "Tk events must be processed while waiting")
+
+            asyncio.get_running_loop().call_later(0.01, FakeGuibbon.press, ord("a"))
+            self.assertEqual(ord("a"), await bridge.wait_key(1.0))
+            self.assertEqual(GuiEvent("keypress", ord("a")), await bridge.next_event())
+
+            FakeGuibbon.press(ord("b"))
+            FakeGuibbon.press(ord("c"))
+            await asyncio.sleep(0.01)  # the keys are pumped while nobody waits for them
+            self.assertEqual(ord("b"), await bridge.wait_key(0), "Pending key presses must be returned first")
+            self.assertEqual(ord("c"), await bridge.wait_key(0))
+            self.assertEqual(-1, await bridge.wait_key(0.01))
+            self.assertEqual(GuiEvent("keypress", ord("b")), await bridge.next_event())
+            self.assertEqual(GuiEvent("keypress", ord("c")), await bridge.next_event())
+
+            FakeGuibbon.instances = {}
+            self.assertEqual(GuiEvent("closed", winname="win"), await asyncio.wait_for(bridge.next_event(), 1.0))
+            self.assertEqual(-1, await bridge.wait_key(None), "No window left")
+            bridge.stop()
+
+        asyncio.run(main())
+
+    def test_coroutine_callback(self):
+        calls = []
+
+        async def on_change(value):
+            await asyncio.sleep(0)
+            calls.append(value)
+
+        def on_click():
+            pass
+
+        self.assertIs(on_click, as_sync_callback(on_click))
+        self.assertIsNone(as_sync_callback(None))
+        callback: Callable[..., Any] = as_sync_callback(on_change)
+        with self.assertRaises(RuntimeError, msg="Without running loop, the coroutine must not block the GUI"):
+            callback(1)
+        self.assertListEqual([], calls)
+
+        async def main():
+            callback(2)
+            self.assertListEqual([], calls, "The coroutine is scheduled on the loop")
+            await asyncio.sleep(0.01)
+            self.assertListEqual([2], calls)
+
+        asyncio.run(main())
+
+
+if __name__ == "__main__":
+    unittest.main()
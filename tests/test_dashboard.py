@@ -0,0 +1,101 @@
+import time
+import unittest
+from typing import Optional
+
+from guibbon.dashboard import RenderScheduler
+
+
+class FakePane:
+    def __init__(self, present_time: float = 0.0):
+        self.present_time = present_time
+        self.frame: Optional[int] = None
+        self.is_hidden_value = False
+        self.presented: list[int] = []
+
+    def imshow(self, frame: int):
+        self.frame = frame
+
+    def is_hidden(self) -> bool:
+        return self.is_hidden_value
+
+    def is_render_pending(self) -> bool:
+        return self.frame is not None
+
+    def begin_render(self):
+        frame, self.frame = self.frame, None
+        return lambda: frame
+
+    def end_render(self, frame: int):
+        time.sleep(self.present_time)
+        self.presented.append(frame)
+
+
+class TestRenderScheduler(unittest.TestCase):
+    def make_scheduler(self, **kwargs) -> RenderScheduler:
+        scheduler = RenderScheduler(**kwargs)
+        self.addCleanup(scheduler.close)
+        return scheduler
+
+    def run_ticks(self, scheduler: RenderScheduler, count: int):
+        for _ in range(count):
+            scheduler.tick()
+            for future in list(scheduler.in_flight.values()):
+                future.result()
+
+    def test_dirty_and_visible(self):
+        scheduler = self.make_scheduler()
+        panes = [FakePane() for _ in range(3)]
+        for pane in panes:
+            scheduler.add(pane)
+        panes[0].imshow(1)
+        panes[0].imshow(2)
+        panes[1].imshow(1)
+        panes[1].is_hidden_value = True
+        self.run_ticks(scheduler, 3)
+        self.assertListEqual([2], panes[0].presented, "Only the newest frame must be rendered")
+        self.assertListEqual([], panes[1].presented, "A hidden pane must not be rendered")
+        self.assertListEqual([], panes[2].presented)
+
+        panes[1].is_hidden_value = False
+        self.run_ticks(scheduler, 2)
+        self.assertListEqual([1], panes[1].presented, "The pending frame must be rendered when the pane is shown")
+        self.assertEqual(2, scheduler.get_stats().presented)
+
+    def test_fairness(self):
+        """A pane receiving a frame before every tick must not prevent the others from being rendered"""
+        scheduler = self.make_scheduler(num_workers=1)
+        busy = FakePane()
+        panes = [FakePane() for _ in range(3)]
+        scheduler.add(busy)
+        for pane in panes:
+            scheduler.add(pane)
+            pane.imshow(0)
+        for k in range(8):
+            busy.imshow(k)
+            self.run_ticks(scheduler, 1)
+        for pane in panes:
+            self.assertListEqual([0], pane.presented)
+        self.assertGreaterEqual(len(busy.presented), 2)
+
+    def test_frame_budget(self):
+        scheduler = self.make_scheduler(frame_budget=0.01)
+        panes = [FakePane(present_time=0.02) for _ in range(2)]
+        for pane in panes:
+            scheduler.add(pane)
+            pane.imshow(0)
+        self.run_ticks(scheduler, 2)
+        self.assertEqual(1, sum(len(pane.presented) for pane in panes), "The second render must wait for the next tick")
+        stats = scheduler.get_stats()
+        self.assertEqual(1, stats.deferred)
+        self.assertEqual(1, stats.over_budget)
+        self.run_ticks(scheduler, 1)
+        self.assertEqual(2, sum(len(pane.presented) for pane in panes))
+
+        scheduler.remove(panes[0])
+        panes[0].imshow(1)
+        self.run_ticks(scheduler, 2)
+        self.assertListEqual([0], panes[0].presented, "A removed pane must not be rendered")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import threading
+import unittest
+from unittest.mock import Mock
+
+import numpy as np
+
+from guibbon.dataset_navigator import DatasetNavigator, ImageCache
+
+
+class FakeLoader:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded_paths: list[str] = []
+
+    def __call__(self, path: str):
+        with self.lock:
+            self.loaded_paths.append(path)
+        if path == "missing":
+            return None
+        if path == "corrupt":
+            raise OSError("corrupt file")
+        return np.full(shape=(10, 10, 3), fill_value=int(path), dtype=np.uint8)
+
+
+class TestImageCache(unittest.TestCase):
+    def test_lru(self):
+        img = np.zeros(shape=(10, 10), dtype=np.uint8)  # 100 bytes
+        cache = ImageCache(max_bytes=250)
+        self.assertEqual(0, cache.put(0, img))
+        self.assertEqual(0, cache.put(1, img))
+        cache.get(0)
+        self.assertEqual(1, cache.put(2, img))
+        self.assertNotIn(1, cache.images, "The least recently used image must be evicted")
+        self.assertIn(0, cache.images)
+        self.assertEqual(200, cache.nbytes)
+
+        self.assertEqual(2, cache.put(3, np.zeros(shape=(20, 20), dtype=np.uint8)))
+        self.assertEqual([3], list(cache.images.keys()), "An image larger than the budget is kept alone")
+
+
+class TestDatasetNavigator(unittest.TestCase):
+    def setUp(self) -> None:
+        self.loader = FakeLoader()
+        self.image_viewer = Mock()
+        self.navigator = DatasetNavigator([str(k) for k in range(20)], self.image_viewer, prefetch=2, loader=self.loader)
+
+    def tearDown(self) -> None:
+        self.navigator.close()
+
+    def wait_prefetch(self):
+        for future in list(self.navigator.pending.values()):
+            future.result()
+
+    def test_navigation(self):
+        img = self.navigator.next()
+        self.assertEqual(0, self.navigator.index)
+        self.assertEqual(0, img[0, 0, 0])
+        self.image_viewer.imshow.assert_called_once_with(img)
+
+        self.wait_prefetch()
+        for k in range(1, 3):
+            self.assertEqual(k, self.navigator.next()[0, 0, 0])
+            self.wait_prefetch()
+        self.assertEqual(1, self.navigator.previous()[0, 0, 0])
+
+        stats = self.navigator.get_stats()
+        self.assertEqual(1, stats.misses, "Only the first image must be waited for")
+        self.assertEqual(3, stats.hits)
+        self.assertEqual(stats.decoded, len(self.loader.loaded_paths))
+        self.assertEqual(len(set(self.loader.loaded_paths)), len(self.loader.loaded_paths), "Images must be decoded once")
+        self.assertGreaterEqual(stats.decode_time_max, stats.decode_time_mean)
+
+        self.assertEqual(19, self.navigator.seek(100)[0, 0, 0], "Index is clipped to the dataset")
+        self.wait_prefetch()
+        self.assertIn(17, self.navigator.pending.keys() | self.navigator.cache.images.keys())
+
+    def test_missing_file(self):
+        navigator = DatasetNavigator(["0", "missing"], prefetch=1, loader=self.loader)
+        navigator.next()
+        with self.assertRaises(ValueError):
+            navigator.next()
+        self.assertEqual(0, navigator.index)
+        navigator.close()
+
+    def test_prefetch_error(self):
+        navigator = DatasetNavigator(["0", "corrupt", "2"], prefetch=1, loader=self.loader)
+        navigator.next()
+        for future in list(navigator.pending.values()):
+            future.exception()
+        self.assertEqual(1, navigator.get_stats().failed)
+        with self.assertRaisesRegex(OSError, "corrupt file"):
+            navigator.next()
+        self.assertEqual(1, self.loader.loaded_paths.count("corrupt"), "The error of the prefetch must be raised, not decoded again")
+        self.assertEqual(0, navigator.index)
+        with self.assertRaises(OSError):
+            navigator.next()
+        self.assertEqual(2, self.loader.loaded_paths.count("corrupt"), "A failed image must be decoded again at the next request")
+        navigator.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+
+import numpy as np
+
+from guibbon.edit_history import EditHistory, RECORD_DTYPE
+
+
+class FakeOverlay:
+    def __init__(self, n: int):
+        self.points_xy = [(0.0, 0.0)] * n
+
+    def set_vertex_xy(self, index, xy):
+        self.points_xy[index] = xy
+
+
+class FakeMask:
+    def __init__(self):
+        self.mask = np.zeros(shape=(100, 100), dtype=np.uint8)
+
+    def apply_mask_delta(self, rect, pixels):
+        x0, y0, x1, y1 = rect
+        self.mask[y0:y1, x0:x1] = pixels
+
+
+class TestEditHistory(unittest.TestCase):
+    def test_undo_redo(self):
+        history = EditHistory()
+        overlay = FakeOverlay(3)
+        history.record_move(overlay, 1, (0, 0), (1, 1))
+        history.record_move(overlay, 1, (1, 1), (2, 2))
+        history.record_move(overlay, 2, (0, 0), (0, 0))
+        self.assertEqual(2, history.count, "Null moves must not be recorded")
+
+        self.assertTrue(history.undo())
+        self.assertEqual((1, 1), overlay.points_xy[1])
+        self.assertTrue(history.undo())
+        self.assertEqual((0, 0), overlay.points_xy[1])
+        self.assertFalse(history.undo())
+
+        self.assertTrue(history.redo())
+        self.assertEqual((1, 1), overlay.points_xy[1])
+
+        history.record_move(overlay, 0, (0, 0), (5, 5))
+        self.assertFalse(history.can_redo(), "A new edit must discard the entries that could be redone")
+        self.assertEqual(2, history.count)
+
+    def test_capacity(self):
+        history = EditHistory(capacity=4)
+        overlay = FakeOverlay(1)
+        for k in range(10):
+            history.record_move(overlay, 0, (k, k), (k + 1, k + 1))
+        self.assertEqual(4, history.count)
+        while history.undo():
+            pass
+        self.assertEqual((6, 6), overlay.points_xy[0], "The oldest entries must be evicted first")
+
+    def test_budget(self):
+        history = EditHistory(max_bytes=10 * RECORD_DTYPE.itemsize)
+        overlay = FakeOverlay(1)
+        for k in range(20):
+            history.record_move(overlay, 0, (k, k), (k + 1, k + 1))
+        self.assertEqual(10, history.count)
+        self.assertLessEqual(history.get_nbytes(), 10 * RECORD_DTYPE.itemsize)
+
+        history.set_max_bytes(3 * RECORD_DTYPE.itemsize)
+        self.assertEqual(3, history.count)
+
+    def test_mask_edit(self):
+        history = EditHistory()
+        mask = FakeMask()
+        old = mask.mask[0:50, 0:50].copy()
+        mask.mask[10:12, 20:25] = 3
+        history.record_mask_edit(mask, (0, 0, 50, 50), old, mask.mask[0:50, 0:50])
+        (mask_delta,) = history.mask_deltas[0]
+        self.assertTupleEqual((20, 10, 25, 12), mask_delta.rect, "Mask deltas must be cropped to the modified pixels")
+        self.assertEqual(2 * 2 * 5, history.mask_deltas_nbytes)
+
+        history.undo()
+        self.assertEqual(0, np.count_nonzero(mask.mask))
+        history.redo()
+        self.assertEqual(10, np.count_nonzero(mask.mask))
+
+    def test_mask_stroke(self):
+        history = EditHistory()
+        mask = FakeMask()
+        mask.mask[50:60, 50:60] = 2
+        before = mask.mask.copy()
+        segments = []
+        for k in range(0, 90, 10):  # diagonal stroke, each segment overlaps the previous one
+            rect = (k, k, k + 15, k + 15)
+            segments.append((rect, mask.mask[k : k + 15, k : k + 15].copy()))
+            mask.mask[k + 2 : k + 13, k + 2 : k + 13] = 1
+        after = mask.mask.copy()
+        history.record_mask_stroke(mask, [(rect, old, mask.mask[rect[1] : rect[3], rect[0] : rect[2]]) for rect, old in segments])
+        self.assertEqual(1, history.count, "A stroke must be recorded as a single edit")
+        self.assertEqual(2 * 9 * 15 * 15, history.mask_deltas_nbytes, "Only the segments must be kept, not the bounding box of the stroke")
+
+        history.undo()
+        np.testing.assert_array_equal(before, mask.mask)
+        history.redo()
+        np.testing.assert_array_equal(after, mask.mask)
+
+        history.record_mask_stroke(mask, [(rect, after[rect[1] : rect[3], rect[0] : rect[2]], after[rect[1] : rect[3], rect[0] : rect[2]]) for rect, _ in segments])
+        self.assertEqual(1, history.count, "A stroke which did not change the mask must not be recorded")
+
+    def test_forget(self):
+        history = EditHistory()
+        overlay0 = FakeOverlay(1)
+        overlay1 = FakeOverlay(1)
+        history.record_move(overlay0, 0, (0, 0), (1, 1))
+        history.record_move(overlay1, 0, (0, 0), (1, 1))
+        history.record_move(overlay0, 0, (1, 1), (2, 2))
+        history.undo()
+        history.forget(overlay0)
+        self.assertEqual(1, history.count, "Entries of forgotten overlays must be dropped")
+        self.assertEqual(1, history.cursor)
+        overlay1.points_xy[0] = overlay0.points_xy[0] = (1, 1)
+        self.assertFalse(history.can_redo())
+        self.assertTrue(history.undo())
+        self.assertFalse(history.undo())
+        self.assertEqual((0, 0), overlay1.points_xy[0])
+        self.assertEqual((1, 1), overlay0.points_xy[0], "Entries of forgotten overlays must not be applied")
+
+        history.forget(overlay1, FakeOverlay(1))
+        self.assertEqual(0, history.count, "Several overlays can be forgotten at once, unknown overlays are ignored")
+
+    def test_ring_buffer_budget(self):
+        history = EditHistory(max_bytes=2**20)
+        self.assertLessEqual(history.get_nbytes(), EditHistory.INITIAL_CAPACITY * RECORD_DTYPE.itemsize, "The ring buffer must grow on demand")
+        overlay = FakeOverlay(1)
+        for k in range(100_000):
+            history.record_move(overlay, 0, (k, k), (k + 1, k + 1))
+        self.assertLessEqual(history.get_nbytes(), 2**20, "The allocated ring buffer must count in the budget")
+        self.assertEqual(len(history.records), history.count)
+        self.assertGreater(history.count, EditHistory.INITIAL_CAPACITY)
+
+        mask = FakeMask()
+        old = mask.mask.copy()
+        mask.mask[:] = 1
+        history.record_mask_edit(mask, (0, 0, 100, 100), old, mask.mask)
+        self.assertLessEqual(history.get_nbytes(), 2**20)
+        self.assertTrue(history.undo())
+        self.assertEqual(0, np.count_nonzero(mask.mask))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import time
+import unittest
+
+import numpy as np
+
+from guibbon.frame_history import FrameHistory
+
+
+def make_frame(k: int) -> np.ndarray:
+    return np.full(shape=(24, 32, 3), fill_value=10 * k, dtype=np.uint8)
+
+
+class TestFrameHistory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.history = FrameHistory(max_seconds=1.0, codec=".png")
+        self.addCleanup(self.history.close)
+
+    def wait_encoded(self, n: int):
+        deadline = time.perf_counter() + 5
+        while self.history.get_stats().encoded < n and time.perf_counter() < deadline:
+            time.sleep(0.001)
+
+    def test_record(self):
+        for k in range(10):
+            self.history.push(make_frame(k), timestamp=0.1 * k)
+            self.wait_encoded(k + 1)
+        self.assertEqual((0, 9), self.history.get_seq_range())
+        for seq in (9, 3, 4, 2):
+            mat = self.history.get_frame(seq)
+            assert mat is not None
+            self.assertEqual(10 * seq, mat[0, 0, 0], "png is lossless")
+
+        self.history.push(make_frame(20), timestamp=1.5)
+        self.wait_encoded(11)
+        self.assertEqual((5, 10), self.history.get_seq_range(), "Frames older than max_seconds must be evicted")
+        mat = self.history.get_frame(0)
+        assert mat is not None
+        self.assertEqual(50, mat[0, 0, 0], "Evicted frames are replaced by the oldest one")
+
+    def test_budget(self):
+        for k in range(10):
+            self.history.push(make_frame(k), timestamp=0)
+            self.wait_encoded(k + 1)
+        stats = self.history.get_stats()
+        self.history.max_bytes = stats.nbytes // 2
+        self.history.push(make_frame(0), timestamp=0)
+        self.wait_encoded(11)
+        stats = self.history.get_stats()
+        self.assertLessEqual(stats.nbytes, self.history.max_bytes)
+        self.assertGreater(stats.evicted, 0)
+
+    def test_push_does_not_block(self):
+        frame = np.random.randint(0, 255, size=(1000, 1000, 3), dtype=np.uint8)
+        for _ in range(20):
+            self.history.push(frame)
+        stats = self.history.get_stats()
+        self.assertEqual(20, stats.pushed)
+        self.assertGreater(stats.dropped, 0, "Frames pushed while the encoder is busy must be dropped")
+
+
+if __name__ == "__main__":
+    unittest.main()
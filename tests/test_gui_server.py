@@ -0,0 +1,109 @@
+import os
+import unittest
+
+import numpy as np
+
+from guibbon.gui_server import GuiClient, GuiServer, WindowProxy, is_plain
+from guibbon.shared_frames import SharedFrameReader
+
+
+class FakeGui:
+    """Namespace of the fake GUI process: records the calls instead of creating Tk windows"""
+
+    def __init__(self):
+        self.server: GuiServer
+        self.readers: dict[str, SharedFrameReader] = {}
+
+    def create_slider(self, winname, slider_name, values, on_change, initial_index=0):
+        on_change(initial_index, values[initial_index])
+        return object()  # like a widget, stays in the GUI process
+
+    def getWindowProperty(self, winname, prop_id):
+        return 1.0
+
+    def attach_shared_frames(self, winname, name):
+        self.readers[winname] = SharedFrameReader(name)
+        return self.readers[winname]
+
+    def get_displayed_pixel(self, winname):
+        frame = self.readers[winname].get_latest()
+        assert frame is not None
+        return frame.mat_rgb[0, 0].tolist(), frame.mat_rgb.shape
+
+    def press_key(self, winname, key):
+        self.server.send(("key", key))
+
+    def close_window(self, winname):
+        self.server.send(("closed", winname))
+
+    def fail(self, winname):
+        raise ValueError("fail")
+
+    def exit(self, winname):
+        os._exit(0)
+
+
+def run_fake_server(conn):
+    gui = FakeGui()
+    gui.server = GuiServer(conn, gui)
+    gui.server.serve_forever()
+
+
+class TestGuiClient(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = GuiClient(server=run_fake_server)
+        self.addCleanup(self.client.close)
+        self.window = WindowProxy(self.client, "win")
+
+    def test_calls(self):
+        self.assertEqual(1.0, self.window.getWindowProperty(0))
+        self.assertIsNone(self.window.create_slider("slider", [10, 20], on_change=lambda index, value: None), "Widgets are not sent back")
+        with self.assertRaises(ValueError):
+            self.window.fail()
+        with self.assertRaises(AttributeError):
+            self.window.missing_function()
+
+    def test_exited_server(self):
+        with self.assertRaises(ConnectionError):
+            self.window.exit()
+        self.client.receiver_thread.join(timeout=5)
+        self.assertTrue(self.client.is_closed)
+        self.assertEqual(0, len(self.client.pending_calls))
+        with self.assertRaises(ConnectionError, msg="Calls after the exit of the GUI process must fail instead of waiting"):
+            self.window.getWindowProperty(0)
+
+    def test_callbacks(self):
+        calls = []
+        self.window.create_slider("slider", [10, 20], lambda index, value: calls.append((index, value)), initial_index=1)
+        self.window.press_key(ord("a"))
+        self.assertListEqual([], calls, "Callbacks are only called by waitKeyEx")
+        self.assertEqual(ord("a"), self.window.waitKeyEx(1000))
+        self.assertListEqual([(1, 20)], calls)
+        self.assertEqual(-1, self.window.waitKeyEx(10))
+
+        self.assertTrue(self.window.is_open())
+        self.window.close_window()
+        self.window.waitKeyEx(10)
+        self.assertFalse(self.window.is_open())
+
+    def test_imshow(self):
+        frame = np.zeros(shape=(20, 30, 3), dtype=np.uint8)
+        frame[:, :, 0] = 255  # blue
+        self.window.imshow(frame)
+        self.assertEqual(([0, 0, 255], (20, 30, 3)), self.window.get_displayed_pixel())
+        writer = self.client.frame_writers["win"]
+        self.window.imshow(np.zeros(shape=(10, 10), dtype=np.uint8))
+        self.assertIs(writer, self.client.frame_writers["win"], "Smaller frames reuse the shared memory ring")
+        self.window.imshow(np.zeros(shape=(40, 10, 3), dtype=np.uint8))
+        self.assertEqual((40, 30), self.client.frame_writers["win"].max_shape_hw, "The ring is enlarged for larger frames")
+        self.assertEqual(([0, 0, 0], (40, 10, 3)), self.window.get_displayed_pixel())
+
+
+class TestIsPlain(unittest.TestCase):
+    def test_is_plain(self):
+        self.assertTrue(is_plain([1, 2.0, "a", None, (True,), {"key": np.zeros(3)}]))
+        self.assertFalse(is_plain([object()]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,10 @@
 import dataclasses
+import os
 import sys
+import tempfile
+import time
 import tkinter as tk
+import tracemalloc
 import unittest
 from unittest.mock import Mock
 
@@ -8,11 +12,15 @@ import cv2
 import numpy as np
 from PIL import ImageTk
 
+from guibbon.dashboard import RenderScheduler
+from guibbon.display_backend import TkDisplay
 from guibbon.image_viewer import ImageViewer, MODE
+from guibbon.shared_frames import SharedFrameWriter
 
 from guibbon.typedef import Point2DList
 
 from guibbon import transform_matrix as tmat
+from guibbon import interactive_overlays
 
 eps = sys.float_info.epsilon
 
@@ -110,8 +118,8 @@ class TestImageViewer(unittest.TestCase):
         try:
             assert _tk_root is not None
             self.image_viewer.canvas.delete("all")  # Clear all canvas items
-            if hasattr(self.image_viewer, 'imgtk'):
-                del self.image_viewer.imgtk
+            if hasattr(self.image_viewer.display, 'imgtk'):
+                del self.image_viewer.display.imgtk
             _tk_root.update_idletasks()
             self.frame.destroy()
         except (Exception, tk.TclError):
@@ -136,7 +144,126 @@ class TestImageViewer(unittest.TestCase):
         actual_zoom = self.image_viewer.img2can_matrix[0, 0]
         self.assertEqual(expected_zoom, actual_zoom)
 
-        self.assertIsNotNone(self.image_viewer.imgtk)
+        assert isinstance(self.image_viewer.display, TkDisplay)
+        self.assertIsNotNone(self.image_viewer.display.imgtk)
+
+    def test_hidden_window(self):
+        rendered = self.image_viewer.get_stats().rendered
+        self.image_viewer.on_visibility_event(Mock(widget=self.image_viewer.canvas, type=tk.EventType.Unmap))
+        frames = [np.full_like(self.img, k) for k in range(3)]
+        for frame in frames:
+            self.image_viewer.imshow(frame)
+        self.assertEqual(rendered, self.image_viewer.get_stats().rendered, "Nothing must be rendered while the window is minimized")
+        self.assertEqual(3, self.image_viewer.get_stats().skipped)
+
+        self.image_viewer.on_visibility_event(Mock(widget=self.image_viewer.canvas, type=tk.EventType.Map))
+        stats = self.image_viewer.get_stats()
+        self.assertEqual(rendered + 1, stats.rendered, "Only the last frame must be rendered")
+        self.assertEqual(2, stats.skipped)
+        self.assertEqual(2, self.image_viewer.mat.flat[0])
+
+        self.image_viewer.on_visibility_event(Mock(widget=self.image_viewer.canvas, type=tk.EventType.Visibility, state="VisibilityFullyObscured"))
+        self.assertTrue(self.image_viewer.is_hidden())
+        self.image_viewer.on_visibility_event(Mock(widget=self.image_viewer.canvas, type=tk.EventType.Visibility, state="VisibilityPartiallyObscured"))
+        self.assertFalse(self.image_viewer.is_hidden())
+
+    def test_withdrawn_window(self):
+        assert _tk_root is not None
+        toplevel = tk.Toplevel(_tk_root)
+        image_viewer = ImageViewer(toplevel, height=100, width=200)
+        image_viewer.frame.pack()
+        toplevel.update()
+        self.assertFalse(image_viewer.is_hidden())
+        image_viewer.imshow(self.img)
+        rendered = image_viewer.get_stats().rendered
+
+        # the canvas stays mapped, only the toplevel is unmapped
+        for hide in (toplevel.withdraw, toplevel.iconify):
+            hide()
+            toplevel.update()
+            self.assertTrue(image_viewer.is_hidden(), f"The viewer must be hidden after {hide.__name__}()")
+            image_viewer.imshow(np.full_like(self.img, 7))
+            self.assertEqual(rendered, image_viewer.get_stats().rendered, "Nothing must be rendered while the window is hidden")
+
+            toplevel.deiconify()
+            toplevel.update()
+            self.assertFalse(image_viewer.is_hidden())
+            rendered += 1
+            self.assertEqual(rendered, image_viewer.get_stats().rendered, "The last frame must be rendered when the window is shown again")
+            self.assertEqual(7, image_viewer.mat.flat[0])
+        toplevel.destroy()
+
+    def test_recording_dropped_frames(self):
+        recorder = Mock(fps=10.0, error=None)
+        recorder.push.side_effect = [False, True]
+        self.image_viewer.recorder = recorder
+        self.image_viewer.recording_frames = 0
+        self.image_viewer.recording_start_time = time.perf_counter() - 0.25  # 3 frames are due
+        self.image_viewer.on_recording_tick()
+        self.image_viewer.on_recording_tick()
+        self.assertListEqual([3, 3], [call.args[1] for call in recorder.push.call_args_list], "The periods of a dropped frame must be pushed again")
+        self.assertEqual(3, self.image_viewer.recording_frames)
+        self.image_viewer.on_recording_tick()
+        self.assertEqual(2, recorder.push.call_count)
+        self.image_viewer.stop_recording()
+
+    def test_shared_frames(self):
+        writer = SharedFrameWriter((100, 200))
+        self.addCleanup(writer.close)
+        reader = self.image_viewer.attach_shared_frames(writer.name, poll_interval_ms=1000)
+        self.addCleanup(self.image_viewer.detach_shared_frames)
+        writer.write(np.full(shape=(100, 200, 3), fill_value=10, dtype=np.uint8))
+        self.image_viewer.on_shared_frames_tick()
+        self.assertEqual(1, reader.stats.displayed)
+        self.assertFalse(self.image_viewer.mat.flags.owndata, "The frame must be warped from the slot, not copied")
+
+        writer.write(np.full(shape=(100, 200, 3), fill_value=20, dtype=np.uint8))
+        self.image_viewer.present_viewport_base = Mock(side_effect=RuntimeError("render error"))  # type: ignore
+        with self.assertRaises(RuntimeError):
+            self.image_viewer.on_shared_frames_tick()
+        self.assertIsNotNone(self.image_viewer.shared_frames_after_id, "An error must not stop the polling")
+
+    def test_render_scheduler(self):
+        scheduler = RenderScheduler(num_workers=1)
+        self.addCleanup(scheduler.close)
+        self.image_viewer.set_render_scheduler(scheduler)
+        rendered = self.image_viewer.get_stats().rendered
+        self.image_viewer.imshow(np.full_like(self.img, 7))
+        self.assertTrue(self.image_viewer.is_render_pending())
+        self.assertEqual(rendered, self.image_viewer.get_stats().rendered, "imshow must only keep the frame")
+
+        scheduler.tick()
+        scheduler.in_flight[self.image_viewer].result()
+        scheduler.tick()
+        self.assertEqual(rendered + 1, self.image_viewer.get_stats().rendered)
+        self.assertEqual(7, self.image_viewer.mat.flat[0])
+        self.assertEqual(0, self.image_viewer.get_stats().skipped)
+
+        self.image_viewer.resize(50, 100)
+        self.assertEqual((50, 100), self.image_viewer.canvas_shape_hw)
+        self.assertAlmostEqual(0.5, self.image_viewer.zoom_factor, msg="The fit zoom must follow the canvas size")
+
+    def test_render_scheduler_outdated(self):
+        scheduler = RenderScheduler(num_workers=1)
+        self.addCleanup(scheduler.close)
+        self.image_viewer.set_render_scheduler(scheduler)
+        rendered = self.image_viewer.get_stats().rendered
+        self.image_viewer.imshow(np.full_like(self.img, 7))
+        scheduler.tick()
+        scheduler.in_flight[self.image_viewer].result()
+        self.image_viewer.canvas_shape_hw = (50, 100)  # resized while rendering
+
+        scheduler.tick()
+        self.assertEqual(rendered, self.image_viewer.get_stats().rendered, "An outdated render must not be drawn in the Tk thread")
+        self.assertIn(self.image_viewer, scheduler.in_flight, "An outdated render must be submitted again")
+        self.assertEqual(2, scheduler.get_stats().submitted)
+
+        scheduler.in_flight[self.image_viewer].result()
+        scheduler.tick()
+        self.assertEqual(rendered + 1, self.image_viewer.get_stats().rendered)
+        self.assertEqual((50, 100), self.image_viewer.viewport_base.shape[:2])
+        self.assertEqual(7, self.image_viewer.mat.flat[0])
+        self.assertEqual(0, self.image_viewer.get_stats().skipped)
 
     def test_overlay_number(self):
         self.assertEqual(6, len(self.image_viewer.interactive_overlay_instance_list), "2 points and 2 polygons and 2 rectangles are 6 interactives overlays")
@@ -210,6 +337,141 @@ class TestImageViewer(unittest.TestCase):
         rect1._on_release(Event(x_screen, y_screen))
         self.assertEqual(1, self.iteractive_rect_event_count, "Undefined callback should not be triggered")
 
+    def test_createInteractivePointCloud(self):
+        points_xy = np.array([(10.0, 20.0), (30.0, 40.0)])
+        cloud = self.image_viewer.createInteractivePointCloud(points_xy, "cloud0", on_drag=lambda event, index, points: None)
+        self.assertIs(cloud, self.image_viewer.interactive_overlay_instance_list[-1])
+
+        self.image_viewer.draw()
+        for point_xy, circle_id in zip(points_xy, cloud.circle_ids):
+            x_expected, y_expected = tmat.apply(self.image_viewer.img2can_matrix, point_xy)
+            x1, y1, x2, y2 = self.image_viewer.canvas.coords(circle_id)
+            self.assertLess(abs((x1 + x2) / 2 - x_expected), 1)
+            self.assertLess(abs((y1 + y2) / 2 - y_expected), 1)
+
+    def test_batch(self):
+        poly0 = self.image_viewer.interactive_overlay_instance_list[2]
+        draw_mock = Mock(wraps=self.image_viewer.draw)
+        self.image_viewer.draw = draw_mock  # type: ignore
+
+        with self.image_viewer.batch():
+            poly0.set_point_xy_list([(1, 1), (2, 2), (3, 3)])
+            with self.image_viewer.batch():
+                poly0.set_point_xy_list([(4, 4), (5, 5), (6, 6)])
+            self.assertTrue(self.image_viewer.update_batch.is_active(), "Nested batch must not flush")
+        self.assertFalse(self.image_viewer.update_batch.is_active())
+        self.assertEqual(0, draw_mock.call_count, "Overlay changes must not trigger a full redraw")
+        self.assertEqual((4, 4), poly0.ipoints[0].get_img_point_xy())
+
+        draw_mock.reset_mock()
+        with self.image_viewer.batch():
+            self.image_viewer.imshow(self.img)
+            self.image_viewer.imshow(self.img)
+            poly0.set_point_xy_list([(1, 1), (2, 2), (3, 3)])
+        self.assertEqual(3, draw_mock.call_count, "2 deferred calls and a single flush")
+        self.assertFalse(self.image_viewer.is_draw_pending)
+
+    def test_remove_overlay(self):
+        assert _tk_root is not None
+        canvas = self.image_viewer.canvas
+        n_items = len(canvas.find_all())
+        n_commands = len(_tk_root.tk.call("info", "commands"))
+        for _ in range(20):
+            point = self.image_viewer.createInteractivePoint((10, 10), "tmp", on_click=self.iteractive_point_event)
+            polygon = self.image_viewer.createInteractivePolygon([(0, 0), (0, 10), (10, 10)], "tmp", on_drag=self.iteractive_polygon_event)
+            self.image_viewer.remove_overlay(point)
+            self.image_viewer.remove_overlay(polygon)
+        self.assertEqual(n_items, len(canvas.find_all()), "Canvas items must be deleted")
+        self.assertEqual(n_commands, len(_tk_root.tk.call("info", "commands")), "Tcl callbacks must be released")
+
+        self.assertEqual(6, self.image_viewer.get_overlay_count())
+        self.image_viewer.remove_overlays(label="poly1")
+        self.assertEqual(5, self.image_viewer.get_overlay_count())
+        self.assertNotIn("poly1", [overlay.label for overlay in self.image_viewer.interactive_overlay_instance_list])
+
+        self.image_viewer.clear_overlays()
+        self.assertEqual(0, self.image_viewer.get_overlay_count())
+        self.assertEqual(1 + len(interactive_overlays.Layer), len(canvas.find_all()), "Only the image and the layer sentinels must remain")
+
+    def test_remove_overlay_memory(self):
+        # short version of benchmarks/overlay_soak.py
+        def cycles(n):
+            for _ in range(n):
+                point = self.image_viewer.createInteractivePoint((10, 10), "soak", on_drag=self.iteractive_point_event)
+                polygon = self.image_viewer.createInteractivePolygon([(0, 0), (0, 10), (10, 10)], "soak", on_drag=self.iteractive_polygon_event)
+                self.image_viewer.remove_overlay(point)
+                self.image_viewer.remove_overlay(polygon)
+
+        tracemalloc.start()
+        try:
+            cycles(200)  # warm up the caches of tkinter and numpy
+            reference_bytes, _ = tracemalloc.get_traced_memory()
+            cycles(2000)
+            current_bytes, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(current_bytes - reference_bytes, 200_000, "Removed overlays must not leak python memory")
+
+    def test_export_import_overlays(self):
+        self.image_viewer.createInteractiveContour([(0, 0), (50, 0), (50, 50), (0, 50)], "contour")
+        self.image_viewer.createInteractivePointCloud(np.array([(1, 2), (3, 4)], dtype=float), "cloud")
+        expected = [(type(overlay), overlay.label) for overlay in self.image_viewer.interactive_overlay_instance_list]
+        for ext in (".npz", ".json"):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "overlays" + ext)
+                self.image_viewer.export_overlays(path)
+                self.image_viewer.clear_overlays()
+
+                draw_mock = Mock(wraps=self.image_viewer.draw)
+                self.image_viewer.draw = draw_mock  # type: ignore
+                overlays = self.image_viewer.import_overlays(path)
+                del self.image_viewer.draw
+            self.assertEqual(1, draw_mock.call_count, "The imported scene must be drawn once")
+            self.assertListEqual(expected, [(type(overlay), overlay.label) for overlay in overlays])
+            self.assertEqual((555, 666), overlays[5].ipoints[0].get_img_point_xy())
+            self.assertEqual([(1, 2), (3, 4)], overlays[7].get_points().tolist())
+
+    def test_mask_overlay(self):
+        mask = np.zeros(shape=self.img.shape[:2], dtype=np.uint8)
+        mask_overlay = self.image_viewer.createMaskOverlay(mask, palette=[(0, 0, 0), (255, 255, 255)], alpha=1.0)
+        mask_overlay.set_brush(label=1, radius=2)
+        self.image_viewer.draw()
+        self.image_viewer.draw = Mock()  # type: ignore
+
+        p0_xy = tmat.apply(self.image_viewer.img2can_matrix, (20, 20))
+        p1_xy = tmat.apply(self.image_viewer.img2can_matrix, (60, 20))
+        self.image_viewer.on_event(Event(x=int(p0_xy[0]), y=int(p0_xy[1]), type=tk.EventType.ButtonPress, num=ImageViewer.BUTTONNUM.LEFT))
+        self.image_viewer.on_event(Event(x=int(p1_xy[0]), y=int(p1_xy[1]), type=tk.EventType.Motion, state=ImageViewer.EVENTSTATE.MOUSE_BUTTON_1))
+        self.assertEqual(1, mask[20, 40], "The brush must paint the mask")
+        self.assertEqual(0, self.image_viewer.draw.call_count, "A brush stroke must not redraw the whole viewport")
+
+        can_x, can_y = tmat.apply(self.image_viewer.img2can_matrix, (40, 20))
+        self.assertListEqual([255, 255, 255], self.image_viewer.viewport[int(can_y), int(can_x)].tolist())
+
+    def test_imshow_mask(self):
+        mask = np.zeros(shape=self.img.shape[:2], dtype=np.uint8)
+        mask[:, 100:] = 1
+        self.image_viewer.imshow(self.img, mask=mask, palette=[(0, 0, 0), (255, 255, 255)], alpha=1.0)
+        can_x, can_y = tmat.apply(self.image_viewer.img2can_matrix, (150, 50))
+        self.assertListEqual([255, 255, 255], self.image_viewer.viewport[int(can_y), int(can_x)].tolist())
+        can_x0, can_y0 = tmat.apply(self.image_viewer.img2can_matrix, (50, 50))
+        self.assertListEqual([0, 0, 0], self.image_viewer.viewport[int(can_y0), int(can_x0)].tolist())
+
+        draw_mock = Mock()
+        self.image_viewer.draw = draw_mock  # type: ignore
+        assert self.image_viewer.imshow_mask is not None
+        self.image_viewer.imshow_mask.set_alpha(0.5)
+        self.image_viewer.imshow_mask.set_alpha(0.0)
+        self.assertTrue(self.image_viewer.is_render_scheduled)
+        self.image_viewer._on_scheduled_render_viewport()
+        self.assertEqual(0, draw_mock.call_count, "Changing the alpha of the mask must not warp the image again")
+        self.assertListEqual([0, 0, 0], self.image_viewer.viewport[int(can_y), int(can_x)].tolist())
+
+        with self.assertRaises(ValueError):
+            self.image_viewer.imshow(self.img, mask=mask[:, :50])
+        with self.assertRaises(ValueError):
+            self.image_viewer.set_imshow_mask(np.full(shape=self.img.shape[:2], fill_value=300))
+
 
 class TestImageViewerModes(unittest.TestCase):
     """Test suite for ImageViewer display modes"""
@@ -231,8 +493,8 @@ class TestImageViewerModes(unittest.TestCase):
         try:
             assert _tk_root is not None
             self.image_viewer.canvas.delete("all")
-            if hasattr(self.image_viewer, 'imgtk'):
-                del self.image_viewer.imgtk
+            if hasattr(self.image_viewer.display, 'imgtk'):
+                del self.image_viewer.display.imgtk
             _tk_root.update_idletasks()
             self.frame.destroy()
         except (Exception, tk.TclError):
@@ -246,7 +508,8 @@ class TestImageViewerModes(unittest.TestCase):
         self.assertEqual(self.image_viewer.mode, MODE.FIT)
         
         # Check image is displayed
-        self.assertIsNotNone(self.image_viewer.imgtk)
+        assert isinstance(self.image_viewer.display, TkDisplay)
+        self.assertIsNotNone(self.image_viewer.display.imgtk)
         
         # Check zoom factor makes image fit canvas
         canh, canw = self.image_viewer.canvas_shape_hw
@@ -259,7 +522,8 @@ class TestImageViewerModes(unittest.TestCase):
         self.image_viewer.imshow(self.img, mode=MODE.FILL)
         
         self.assertEqual(self.image_viewer.mode, MODE.FILL)
-        self.assertIsNotNone(self.image_viewer.imgtk)
+        assert isinstance(self.image_viewer.display, TkDisplay)
+        self.assertIsNotNone(self.image_viewer.display.imgtk)
         
         # Check zoom factor makes image fill canvas
         canh, canw = self.image_viewer.canvas_shape_hw
@@ -272,7 +536,8 @@ class TestImageViewerModes(unittest.TestCase):
         self.image_viewer.imshow(self.img, mode=MODE.P100)
         
         self.assertEqual(self.image_viewer.mode, MODE.P100)
-        self.assertIsNotNone(self.image_viewer.imgtk)
+        assert isinstance(self.image_viewer.display, TkDisplay)
+        self.assertIsNotNone(self.image_viewer.display.imgtk)
         
         # Check zoom factor is 1.0 (100%)
         self.assertEqual(self.image_viewer.zoom_factor, 1.0)
@@ -283,7 +548,8 @@ class TestImageViewerModes(unittest.TestCase):
         self.image_viewer.imshow(float_img)
         
         # Should convert float to uint8
-        self.assertIsNotNone(self.image_viewer.imgtk)
+        assert isinstance(self.image_viewer.display, TkDisplay)
+        self.assertIsNotNone(self.image_viewer.display.imgtk)
         self.assertEqual(self.image_viewer.mat.dtype, np.uint8)
 
     def test_imshow_custom_interpolation(self) -> None:
@@ -391,8 +657,8 @@ class TestImageViewerMouseCallbacks(unittest.TestCase):
         try:
             assert _tk_root is not None
             self.image_viewer.canvas.delete("all")
-            if hasattr(self.image_viewer, 'imgtk'):
-                del self.image_viewer.imgtk
+            if hasattr(self.image_viewer.display, 'imgtk'):
+                del self.image_viewer.display.imgtk
             _tk_root.update_idletasks()
             self.frame.destroy()
         except (Exception, tk.TclError):
@@ -473,8 +739,8 @@ class TestImageViewerMatrix(unittest.TestCase):
         try:
             assert _tk_root is not None
             self.image_viewer.canvas.delete("all")
-            if hasattr(self.image_viewer, 'imgtk'):
-                del self.image_viewer.imgtk
+            if hasattr(self.image_viewer.display, 'imgtk'):
+                del self.image_viewer.display.imgtk
             _tk_root.update_idletasks()
             self.frame.destroy()
         except (Exception, tk.TclError):
@@ -529,8 +795,8 @@ class TestImageViewerInteractiveOverlays(unittest.TestCase):
         try:
             assert _tk_root is not None
             self.image_viewer.canvas.delete("all")
-            if hasattr(self.image_viewer, 'imgtk'):
-                del self.image_viewer.imgtk
+            if hasattr(self.image_viewer.display, 'imgtk'):
+                del self.image_viewer.display.imgtk
             _tk_root.update_idletasks()
             self.frame.destroy()
         except (Exception, tk.TclError):
@@ -621,8 +887,8 @@ class TestImageViewerDraw(unittest.TestCase):
         try:
             assert _tk_root is not None
             self.image_viewer.canvas.delete("all")
-            if hasattr(self.image_viewer, 'imgtk'):
-                del self.image_viewer.imgtk
+            if hasattr(self.image_viewer.display, 'imgtk'):
+                del self.image_viewer.display.imgtk
             _tk_root.update_idletasks()
             self.frame.destroy()
         except (Exception, tk.TclError):
@@ -659,8 +925,9 @@ class TestImageViewerDraw(unittest.TestCase):
         img = np.zeros(shape=(100, 200, 3), dtype=np.uint8)
         self.image_viewer.imshow(img)
         
-        self.assertIsNotNone(self.image_viewer.imgtk)
-        self.assertIsInstance(self.image_viewer.imgtk, ImageTk.PhotoImage)
+        assert isinstance(self.image_viewer.display, TkDisplay)
+        self.assertIsNotNone(self.image_viewer.display.imgtk)
+        self.assertIsInstance(self.image_viewer.display.imgtk, ImageTk.PhotoImage)
 
 
 class TestImageViewerEnums(unittest.TestCase):
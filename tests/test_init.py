@@ -1,6 +1,7 @@
 import re
 import sys
 import unittest
+from unittest import mock
 from typing import Tuple
 
 import cv2
@@ -62,6 +63,13 @@ class TestGuibbon(unittest.TestCase):
         gbn.namedWindow("win1")
         self.assertEqual(len(gbn.Guibbon.instances), 2, msg="After 2 uses of gbn.namedWindow(...), number of instances must be 2.")
 
+    def test_pollKey_without_window(self):
+        root = mock.Mock()
+        with mock.patch.object(gbn.Guibbon, "is_alive", False), mock.patch.object(gbn.Guibbon, "root", root, create=True):
+            self.assertEqual(gbn.pollKey(), -1, msg="gbn.pollKey must return -1 when there is no window")
+        root.update.assert_not_called()
+        self.assertEqual(len(gbn.Guibbon.instances), 0, msg="gbn.pollKey should not be able to create new window")
+
     def test_imshow_and_getWindowProperty(self):
         img = np.zeros((10, 10), dtype=np.uint8)
         winname = "win0"
@@ -82,6 +90,21 @@ class TestGuibbon(unittest.TestCase):
         res = gbn.getWindowProperty(winname, cv2.WND_PROP_VISIBLE)
         self.assertTrue(abs(res - 0.0) <= eps, msg="Deleting instance of a windows must destroy it. getWindowProperty must return 0")
 
+    def test_close_linked_window(self):
+        img = np.zeros((10, 10), dtype=np.uint8)
+        for winname in ("win0", "win1", "win2"):
+            gbn.imshow(winname, img)
+        link = gbn.link_views(["win0", "win1", "win2"])
+        viewer = gbn.Guibbon.get_instance("win1").image_viewer
+        gbn.Guibbon.get_instance("win1").on_closing()
+        self.assertNotIn(viewer, link.viewers, msg="Closing a window must remove its viewer from the link")
+        self.assertIsNone(viewer.view_link)
+
+        link.set_panzoom(2.0, (5.0, 0.0))  # pan after the close
+        gbn.Guibbon.root.update()
+        self.assertEqual(0, len(link.dirty_viewers), msg="The remaining linked windows must be redrawn")
+        self.assertEqual((5.0, 0.0), gbn.Guibbon.get_instance("win0").image_viewer.pan_xy)
+
 
 def find_widget_by_name(guibbon_instance, widgetname):
     last_guibbon_widget = list(guibbon_instance.ctrl_frame.children.values())[-1]
@@ -0,0 +1,71 @@
+import threading
+import time
+import tkinter as tk
+import unittest
+from unittest.mock import Mock
+
+from guibbon.keyboard_event_handler import KeyboardEventHandler
+
+
+def make_event(keysym_num: int, is_press: bool) -> Mock:
+    return Mock(type=tk.EventType.KeyPress if is_press else tk.EventType.KeyRelease, keycode=0, keysym_num=keysym_num)
+
+
+class TestKeyboardEventHandler(unittest.TestCase):
+    def test_event_order(self):
+        keyboard = KeyboardEventHandler()
+        keyboard.on_event(make_event(ord("a"), True))
+        keyboard.on_event(make_event(ord("a"), True))  # auto-repeat while held down
+        keyboard.on_event(make_event(ord("b"), True))
+        keyboard.on_event(make_event(ord("a"), False))
+        keyboard.on_event(make_event(65307, True))  # escape
+
+        event = keyboard.pop_event()
+        assert event is not None
+        self.assertEqual(ord("a"), event.key)
+        event = keyboard.pop_event(track_keypress=False, track_keyrelease=True)
+        assert event is not None
+        self.assertEqual((ord("a"), False), (event.key, event.is_press), "The untracked press of b must be skipped")
+        event = keyboard.pop_event()
+        assert event is not None
+        self.assertEqual(27, event.key)
+        self.assertIsNone(keyboard.pop_event())
+
+    def test_overflow(self):
+        keyboard = KeyboardEventHandler()
+        for k in range(KeyboardEventHandler.MAX_EVENTS + 3):
+            keyboard.push_event(k, is_press=True)
+        self.assertEqual(3, keyboard.dropped_events)
+        event = keyboard.pop_event()
+        assert event is not None
+        self.assertEqual(3, event.key, "The oldest events must be dropped")
+
+    def test_slow_consumer(self):
+        """100 Hz key stream, read by a loop that spends 200 ms per iteration: every key must be received, in order"""
+        keyboard = KeyboardEventHandler()
+        keys = [ord("a") + k % 26 for k in range(100)]
+
+        def produce():
+            for key in keys:
+                keyboard.on_event(make_event(key, True))
+                keyboard.on_event(make_event(key, False))
+                time.sleep(0.01)
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        received = []
+        timestamps = []
+        while producer.is_alive() or len(keyboard.events) > 0:
+            time.sleep(0.2)  # processing
+            while (event := keyboard.pop_event()) is not None:
+                received.append(event.key)
+                timestamps.append(event.timestamp)
+        producer.join()
+
+        self.assertListEqual(keys, received)
+        self.assertListEqual(sorted(timestamps), timestamps)
+        self.assertEqual(0, keyboard.dropped_events)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import http.client
+import json
+import threading
+import time
+import unittest
+import urllib.request
+
+import cv2
+import numpy as np
+
+from guibbon.mirror_server import MirrorServer, WindowMirror
+
+
+class TestWindowMirror(unittest.TestCase):
+    def test_no_client(self):
+        mirror = WindowMirror(max_fps=10, max_quality=80)
+        self.assertFalse(mirror.is_frame_due(0.0), "Nothing is captured without client")
+        mirror.add_client(1)
+        self.assertTrue(mirror.is_frame_due(0.0))
+        self.assertFalse(mirror.is_frame_due(1.0), "The previous frame is still being encoded")
+        self.assertEqual(1, mirror.get_stats().dropped)
+        for now in (1.01, 1.05, 1.09):
+            mirror.is_frame_due(now)
+        self.assertEqual(1, mirror.get_stats().dropped, "A skipped frame period must be counted once, whatever the polling rate")
+        mirror.is_frame_due(1.1)
+        self.assertEqual(2, mirror.get_stats().dropped)
+        mirror.set_jpeg(b"jpeg", 0.01)
+        self.assertFalse(mirror.is_frame_due(0.05), "Frame rate is limited")
+        self.assertTrue(mirror.is_frame_due(0.1))
+
+    def test_adapt(self):
+        mirror = WindowMirror(max_fps=10, max_quality=80)
+        mirror.add_client(1)
+        for _ in range(10):
+            mirror.on_frame_sent(1.0)  # slow client
+        stats = mirror.get_stats()
+        self.assertLess(stats.quality, 80)
+        self.assertLess(stats.fps, 10)
+        for _ in range(200):
+            mirror.on_frame_sent(0.0)
+        stats = mirror.get_stats()
+        self.assertEqual(80, stats.quality, "Quality must recover when the clients keep up")
+        self.assertAlmostEqual(10, stats.fps)
+
+
+class TestMirrorServer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = MirrorServer(port=0, max_fps=100)
+        self.addCleanup(self.server.close)
+        self.mirror = self.server.get_window("win 1")
+        self.view = np.zeros(shape=(40, 60, 3), dtype=np.uint8)
+        self.view[:, :, 0] = 255  # red
+        self.is_running = True
+
+    def run_gui(self):
+        """Simulates the Tk tick of Guibbon"""
+        while self.is_running:
+            now = time.perf_counter()
+            if self.mirror.is_frame_due(now):
+                self.server.submit_frame(self.mirror, self.view)
+            if self.mirror.is_widgets_wanted(now):
+                self.mirror.set_widget_values({"slider": {"index": 2, "value": 0.5}})
+            time.sleep(0.005)
+
+    def start_gui(self):
+        thread = threading.Thread(target=self.run_gui)
+        thread.start()
+
+        def stop():
+            self.is_running = False
+            thread.join()
+
+        self.addCleanup(stop)
+
+    def test_frame(self):
+        self.mirror.set_jpeg(b"outdated", 0.0)
+        self.start_gui()
+        self.assertListEqual(["win 1"], json.loads(urllib.request.urlopen(self.server.url + "windows.json").read()))
+        jpeg = urllib.request.urlopen(self.server.url + "win%201/frame.jpg").read()
+        frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        assert frame is not None
+        self.assertEqual((40, 60, 3), frame.shape)
+        self.assertGreater(frame[20, 30, 2], 200, "Frames are encoded as BGR JPEG")
+
+        values = json.loads(urllib.request.urlopen(self.server.url + "win%201/widgets.json").read())
+        self.assertDictEqual({"slider": {"index": 2, "value": 0.5}}, values)
+
+        with self.assertRaises(urllib.error.HTTPError):
+            urllib.request.urlopen(self.server.url + "missing/frame.jpg")
+
+    def test_index(self):
+        self.server.get_window("<script>")
+        index = urllib.request.urlopen(self.server.url).read().decode()
+        self.assertIn("<h2>&lt;script&gt;</h2>", index, "Window names must be escaped")
+        self.assertNotIn("<script>", index)
+
+    def test_stream(self):
+        self.start_gui()
+        host, port = self.server.http_server.server_address[:2]
+        connection = http.client.HTTPConnection(str(host), int(port), timeout=5)
+        connection.request("GET", "/win%201/stream.mjpg")
+        response = connection.getresponse()
+        self.assertIn("multipart/x-mixed-replace", response.getheader("Content-Type", ""))
+        for _ in range(3):
+            self.assertEqual(b"--gbnframe\r\n", response.readline())
+            headers = {}
+            while (line := response.readline().strip()) != b"":
+                key, value = line.decode().split(": ")
+                headers[key] = value
+            self.assertEqual(b"\xff\xd8", response.read(int(headers["Content-Length"]))[:2], "JPEG magic")
+            response.readline()
+        self.assertEqual(1, self.mirror.get_stats().clients)
+        response.close()
+        connection.close()
+
+        deadline = time.perf_counter() + 5
+        while self.mirror.get_stats().clients > 0 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(0, self.mirror.get_stats().clients, "Disconnected clients must be detected")
+        stats = self.mirror.get_stats()
+        self.assertGreaterEqual(stats.sent, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,311 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from guibbon import overlay_io
+from guibbon.display_backend import OffscreenDisplay, OffscreenCanvas
+from guibbon.image_viewer import ImageViewer, MODE
+from guibbon.interactive_overlays import Layer
+from guibbon.overlay_rasterizer import OverlayRasterizer
+from guibbon.shared_frames import SharedFrameWriter
+
+
+class TestOffscreenViewer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.display = OffscreenDisplay()
+        self.viewer = ImageViewer(None, 200, 300, display=self.display)
+        self.img = np.zeros(shape=(20, 20, 3), dtype=np.uint8)
+        self.img[:, :] = (255, 0, 0)  # BGR
+
+    def get_rendered_view(self) -> np.ndarray:
+        view = self.viewer.get_rendered_view()
+        assert view is not None
+        return view
+
+    def test_headless(self):
+        self.assertIsInstance(self.viewer.canvas, OffscreenCanvas)
+        self.assertIsNone(self.viewer.zoom_entry, "No widget around the canvas")
+        self.assertIsNone(self.viewer.toplevel)
+
+    def test_imshow(self):
+        self.assertIsNone(self.viewer.get_rendered_view())
+        self.viewer.imshow(self.img)
+        view = self.get_rendered_view()
+        self.assertEqual((200, 300, 3), view.shape)
+        self.assertEqual(10, self.viewer.zoom_factor, "The image must fit the canvas height")
+        self.assertListEqual([0, 0, 255], view[100, 150].tolist(), "Rendered view is RGB")
+        self.assertListEqual([0, 0, 0], view[100, 10].tolist(), "Outside of the image")
+        assert self.display.frame is not None
+        np.testing.assert_array_equal(view, self.display.frame)
+
+        self.viewer.pan_xy = (12, 0)
+        self.viewer.draw()
+        panned_view = self.get_rendered_view()
+        self.assertListEqual([0, 0, 255], panned_view[100, 280].tolist())
+        self.assertListEqual([0, 0, 0], panned_view[100, 100].tolist())
+
+        self.viewer.imshow(np.zeros(shape=(40, 40, 3), dtype=np.uint8), mode=MODE.P100)
+        self.assertEqual(10, self.viewer.zoom_factor, "Pan and zoom are kept by the next images")
+        self.assertEqual(3, self.viewer.get_stats().rendered)
+
+    def test_overlays(self):
+        table = overlay_io.OverlayTable(
+            kinds=np.array([overlay_io.OverlayKind.POLYGON, overlay_io.OverlayKind.POINT], dtype=np.int8),
+            labels=["polygon", "point"],
+            offsets=np.array([0, 3, 4], dtype=np.int64),
+            vertices=np.array([(2, 2), (18, 2), (18, 18), (6, 14)], dtype=float),
+        )
+        self.viewer.imshow(self.img)
+        overlays = self.viewer.create_overlays(table)
+        self.assertGreater(len(overlays[0].get_item_ids()), 0, "Live overlays are canvas items")
+        view = self.get_rendered_view()
+        can_x0, can_y0 = 50 + 2 * 10, 2 * 10  # image is centered: it starts at x=50 on the canvas
+        self.assertListEqual(list(OverlayRasterizer.handle_color), view[can_y0, can_x0].tolist(), "Handles must be drawn")
+        self.assertListEqual(list(OverlayRasterizer.line_color), view[can_y0, can_x0 + 80].tolist(), "Lines must be drawn")
+        self.assertListEqual(list(OverlayRasterizer.handle_color), view[140, 110].tolist(), "Points must be drawn")
+
+        self.viewer.set_layer_visible(Layer.HANDLES, False)
+        overlays[1].set_visible(False)
+        view = self.get_rendered_view()
+        self.assertListEqual(list(OverlayRasterizer.line_color), view[can_y0, can_x0].tolist())
+        self.assertListEqual([0, 0, 255], view[140, 110].tolist())
+
+    def test_recording_overlays(self):
+        self.viewer.imshow(np.zeros(shape=(20, 20, 3), dtype=np.uint8))
+        self.viewer.createInteractivePoint((2, 2))
+        self.viewer.createInteractivePolygon([(4, 4), (8, 4), (8, 8)])
+        self.viewer.createInteractiveRectangle((10, 2), (14, 6))
+        self.viewer.createInteractiveContour([(2, 10), (6, 10), (6, 14), (2, 14)])
+        self.viewer.createInteractivePointCloud(np.array([(10, 10), (12, 12)], dtype=float))
+        annotations = self.viewer.createAnnotationLayer()
+        annotations.set_boxes([(15, 15, 19, 19)])
+        annotations.set_points([(16, 2)])
+        annotations.set_segments([(15, 8, 19, 8)])
+        annotations.set_labels([(10, 18)], ["car"])
+        self.viewer.draw()
+
+        # img (x, y) is at (50 + 10 * x, 10 * y) on the canvas
+        expected_colors = {
+            "point": ((70, 20), OverlayRasterizer.handle_color),
+            "polygon": ((110, 40), OverlayRasterizer.line_color),
+            "rectangle": ((170, 20), OverlayRasterizer.line_color),
+            "contour": ((90, 100), OverlayRasterizer.line_color),
+            "point cloud": ((150, 100), OverlayRasterizer.handle_color),
+            "box": ((220, 150), (255, 0, 0)),
+            "annotation point": ((210, 20), (255, 255, 0)),
+            "segment": ((220, 80), (0, 255, 255)),
+        }
+        view = self.get_rendered_view()
+        for name, ((x, y), rgb) in expected_colors.items():
+            self.assertListEqual(list(rgb), view[y, x].tolist(), f"The {name} must be drawn")
+        self.assertGreater(view[160:181, 150:190].min(axis=2).max(), 128, "The label must be drawn in white")
+
+        annotations.set_visible(False)
+        self.assertListEqual([0, 0, 0], self.get_rendered_view()[150, 220].tolist(), "Hidden annotations must not be drawn")
+        annotations.set_visible(True)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "record.avi")
+            self.viewer.start_recording(path, fps=10, fourcc="MJPG")
+            stats = self.viewer.stop_recording()
+            assert stats is not None
+            self.assertEqual(1, stats.written)
+            capture = cv2.VideoCapture(path)
+            is_read, frame_bgr = capture.read()
+            capture.release()
+        self.assertTrue(is_read)
+        for name, ((x, y), rgb) in expected_colors.items():
+            np.testing.assert_allclose(rgb[::-1], frame_bgr[y - 1 : y + 2, x - 1 : x + 2].mean(axis=(0, 1)), atol=80, err_msg=f"The {name} must be recorded")
+
+    def test_rasterized_overlays(self):
+        n = OverlayRasterizer.DEFAULT_THRESHOLD + 1
+        table = overlay_io.OverlayTable(
+            kinds=np.full(shape=n, fill_value=overlay_io.OverlayKind.POINT, dtype=np.int8),
+            labels=[""] * n,
+            offsets=np.arange(n + 1, dtype=np.int64),
+            vertices=np.full(shape=(n, 2), fill_value=10, dtype=float),
+        )
+        self.viewer.imshow(self.img)
+        overlays = self.viewer.create_overlays(table)
+        self.assertTrue(all(overlay.rasterized for overlay in overlays))
+        assert self.display.frame is not None
+        self.assertListEqual(list(OverlayRasterizer.handle_color), self.display.frame[100, 150].tolist(), "Rasterized in the presented viewport")
+
+        self.viewer.draw()
+        self.assertListEqual([], self.viewer.rasterizer.redrawn_rects, "An unchanged raster layer must not be drawn again")
+        rendered = self.viewer.get_stats().rendered
+        overlays[0].set_img_point_xy((5, 5))
+        overlays[0].update()
+        self.viewer.canvas.update_idletasks()
+        self.assertEqual(rendered, self.viewer.get_stats().rendered, "The image must not be warped again")
+        self.assertEqual(2, len(self.viewer.rasterizer.redrawn_rects), "Only the moved overlay must be drawn again")
+
+        self.viewer.set_layer_visible(Layer.HANDLES, False)
+        self.assertEqual(set(), self.viewer.rasterizer.dirty_ids, "Rasterized overlays must not be updated one by one")
+        self.viewer.canvas.update_idletasks()
+        self.assertListEqual([0, 0, 255], self.display.frame[100, 150].tolist(), "The handles of the hidden layer must not be rasterized")
+
+    def test_lazy_canvas_items(self):
+        n_points = OverlayRasterizer.DEFAULT_THRESHOLD
+        kinds = [overlay_io.OverlayKind.POLYGON, overlay_io.OverlayKind.CONTOUR] + [overlay_io.OverlayKind.POINT] * n_points
+        polygon_xy, contour_xy = [(2, 2), (6, 2), (6, 6)], [(12, 12), (16, 12), (16, 16), (12, 16)]
+        table = overlay_io.OverlayTable(
+            kinds=np.array(kinds, dtype=np.int8),
+            labels=[""] * len(kinds),
+            offsets=np.concatenate([[0, 3], np.arange(7, 8 + n_points)]).astype(np.int64),
+            vertices=np.array(polygon_xy + contour_xy + [(10, 10)] * n_points, dtype=float),
+        )
+        self.viewer.imshow(self.img)
+        n_items = len(self.viewer.canvas.find_all())
+        polygon, contour, *points = self.viewer.create_overlays(table)
+        self.assertEqual(n_items, len(self.viewer.canvas.find_all()), "Overlays created rasterized must not create canvas items")
+        self.assertListEqual([], polygon.get_item_ids() + contour.get_item_ids() + points[0].get_item_ids())
+        assert isinstance(self.viewer.canvas, OffscreenCanvas)
+        self.assertEqual(0, len(self.viewer.canvas.bindings), "Nor bindings")
+
+        # hovering the first vertex of the polygon, at (70, 20) on the canvas
+        self.assertTrue(self.viewer.rasterizer.update_hovered((70, 20), self.viewer.img2can_matrix))
+        self.viewer.schedule_render_viewport()
+        self.viewer.canvas.update_idletasks()
+        self.assertFalse(polygon.rasterized)
+        self.assertEqual(6, len(polygon.get_item_ids()), "The live polygon must have its lines and vertices")
+        self.assertListEqual([], contour.get_item_ids())
+        self.assertEqual(6 + n_items, len(self.viewer.canvas.find_all()))
+
+        self.viewer.remove_overlays()
+        self.assertEqual(n_items, len(self.viewer.canvas.find_all()))
+
+    def test_remove_overlays(self):
+        n = OverlayRasterizer.DEFAULT_THRESHOLD + 1
+        table = overlay_io.OverlayTable(
+            kinds=np.full(shape=2 * n, fill_value=overlay_io.OverlayKind.POINT, dtype=np.int8),
+            labels=["a", "b"] * n,
+            offsets=np.arange(2 * n + 1, dtype=np.int64),
+            vertices=np.full(shape=(2 * n, 2), fill_value=10, dtype=float),
+        )
+        self.viewer.imshow(self.img)
+        overlays = self.viewer.create_overlays(table)
+        overlay_list = self.viewer.interactive_overlay_instance_list
+        self.viewer.remove_overlays(label="a")
+        self.assertIs(overlay_list, self.viewer.interactive_overlay_instance_list)
+        self.assertListEqual(overlays[1::2], overlay_list, "The other overlays must be kept in order")
+        self.viewer.canvas.update_idletasks()
+        assert self.display.frame is not None
+        self.assertListEqual(list(OverlayRasterizer.handle_color), self.display.frame[100, 150].tolist())
+
+        self.viewer.clear_overlays()
+        self.assertEqual(0, self.viewer.get_overlay_count())
+        self.viewer.canvas.update_idletasks()
+        self.assertListEqual([0, 0, 255], self.display.frame[100, 150].tolist(), "Removed overlays must be removed from the raster layer")
+
+    def test_scheduled_draw(self):
+        self.viewer.imshow(self.img)
+        rendered = self.viewer.get_stats().rendered
+        self.viewer.schedule_draw()
+        self.viewer.schedule_draw()
+        self.assertEqual(rendered, self.viewer.get_stats().rendered)
+        self.viewer.canvas.update_idletasks()
+        self.assertEqual(rendered + 1, self.viewer.get_stats().rendered, "Draw requests are coalesced")
+
+    def test_mask(self):
+        mask = np.zeros(shape=(20, 20), dtype=np.uint8)
+        mask[10:, :] = 1
+        self.viewer.imshow(self.img, mask=mask, palette=[(0, 0, 0), (0, 255, 0)], alpha=1.0)
+        view = self.get_rendered_view()
+        self.assertListEqual([0, 0, 255], view[50, 150].tolist())
+        self.assertListEqual([0, 255, 0], view[150, 150].tolist())
+        self.viewer.imshow(self.img)
+        view = self.get_rendered_view()
+        self.assertListEqual([0, 0, 255], view[150, 150].tolist(), "The mask is only shown with its image")
+
+    def test_invalid_mask(self):
+        with self.assertRaises(ValueError):
+            self.viewer.imshow(self.img, mask=np.zeros(shape=(10, 20), dtype=np.uint8))
+        with self.assertRaises(ValueError):
+            self.viewer.imshow(self.img, mask=np.full(shape=(20, 20), fill_value=256))
+        with self.assertRaises(ValueError):
+            self.viewer.imshow(self.img, mask=np.full(shape=(20, 20), fill_value=-1))
+        self.viewer.imshow(self.img, mask=np.full(shape=(20, 20), fill_value=1), palette=[(0, 0, 0), (0, 255, 0)], alpha=1.0)
+        self.assertListEqual([0, 255, 0], self.get_rendered_view()[150, 150].tolist(), "Labels of any integer dtype must be accepted")
+
+    def test_shared_frames(self):
+        writer = SharedFrameWriter((20, 20))
+        self.addCleanup(writer.close)
+        reader = self.viewer.attach_shared_frames(writer.name, poll_interval_ms=1000)
+        self.addCleanup(self.viewer.detach_shared_frames)
+        writer.write(self.img)
+        self.viewer.on_shared_frames_tick()
+        self.assertEqual(1, reader.stats.displayed)
+        self.assertFalse(self.viewer.mat.flags.owndata, "The frame must be warped from the slot, not copied")
+        self.assertListEqual([0, 0, 255], self.get_rendered_view()[100, 150].tolist())
+
+        writer.write(np.zeros(shape=(20, 20, 3), dtype=np.uint8))
+        self.viewer.pan_xy = (5, 0)
+        self.viewer.draw()
+        self.assertListEqual([0, 0, 0], self.get_rendered_view()[100, 150].tolist(), "Pan and zoom warp the newest frame of the ring again")
+        self.assertEqual(2, reader.stats.displayed)
+
+        writer.write(self.img)
+        is_intact, reader.is_intact = reader.is_intact, lambda frame: False  # type: ignore[method-assign]
+        self.viewer.on_shared_frames_tick()
+        self.assertEqual(1, reader.stats.torn)
+        self.assertListEqual([0, 0, 0], self.get_rendered_view()[100, 150].tolist(), "A frame overwritten during the warp must not be displayed")
+        reader.is_intact = is_intact  # type: ignore[method-assign]
+        self.viewer.on_shared_frames_tick()
+        self.assertListEqual([0, 0, 255], self.get_rendered_view()[100, 150].tolist())
+
+        self.viewer.detach_shared_frames()
+        self.assertTrue(self.viewer.mat.flags.owndata, "The last frame is copied when the shared memory is released")
+        self.viewer.draw()
+        self.assertListEqual([0, 0, 255], self.get_rendered_view()[100, 150].tolist())
+
+
+class TestOffscreenCanvas(unittest.TestCase):
+    def setUp(self) -> None:
+        self.canvas = OffscreenCanvas(100, 200)
+
+    def test_items(self):
+        item_id = self.canvas.create_line(0, 0, 10, 10, fill="red", tags=("a", "b"))
+        self.canvas.create_oval(0, 0, 5, 5, tags="a")
+        self.assertEqual(2, len(self.canvas.find_withtag("a")))
+        self.assertEqual((item_id,), self.canvas.find_withtag("a&&b"))
+        self.canvas.coords(item_id, 1, 2, 3, 4)
+        self.assertListEqual([1, 2, 3, 4], self.canvas.coords(item_id))
+        self.canvas.itemconfig("b", state="hidden")
+        self.assertEqual("hidden", self.canvas.items[item_id].options["state"])
+        self.canvas.delete("a")
+        self.assertEqual((), self.canvas.find_all())
+        self.assertEqual(200, self.canvas.winfo_width())
+
+    def test_timers(self):
+        calls: list[str] = []
+        self.canvas.after_idle(calls.append, "idle")
+        timer_id = self.canvas.after(0, calls.append, "timer")
+        self.canvas.update_idletasks()
+        self.assertListEqual(["idle"], calls)
+        self.canvas.update()
+        self.assertListEqual(["idle", "timer"], calls)
+        self.canvas.after_cancel(self.canvas.after(0, calls.append, "cancelled"))
+        self.canvas.update()
+        self.assertListEqual(["idle", "timer"], calls)
+        self.assertNotEqual("", timer_id)
+
+
+class TestOffscreenDisplay(unittest.TestCase):
+    def test_present_region(self):
+        display = OffscreenDisplay()
+        viewport = np.zeros(shape=(10, 10, 3), dtype=np.uint8)
+        display.present(viewport)
+        viewport[:] = 255
+        display.present_region(viewport, (2, 3, 5, 6))
+        assert display.frame is not None
+        self.assertEqual(9 * 3 * 255, int(display.frame.sum()))
+        self.assertEqual(255, display.frame[3, 2, 0])
+        self.assertEqual(2, display.present_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
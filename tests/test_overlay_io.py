@@ -0,0 +1,39 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from guibbon.overlay_io import OverlayKind, OverlayTable, load_overlay_table, save_overlay_table
+
+
+class TestOverlayTable(unittest.TestCase):
+    def setUp(self) -> None:
+        kinds = np.array([OverlayKind.POINT, OverlayKind.RECTANGLE, OverlayKind.POLYGON], dtype=np.int8)
+        offsets = np.array([0, 1, 3, 6], dtype=np.int64)
+        vertices = np.arange(12, dtype=float).reshape(6, 2)
+        self.table = OverlayTable(kinds, ["point", "", "polygon é"], offsets, vertices)
+
+    def test_save_load(self):
+        for ext in (".npz", ".json"):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "overlays" + ext)
+                save_overlay_table(self.table, path)
+                table = load_overlay_table(path)
+            np.testing.assert_array_equal(self.table.kinds, table.kinds)
+            self.assertListEqual(self.table.labels, table.labels)
+            np.testing.assert_array_equal(self.table.offsets, table.offsets)
+            np.testing.assert_array_equal(self.table.vertices, table.vertices)
+            self.assertListEqual([[6, 7], [8, 9], [10, 11]], table.get_vertices(2).tolist())
+
+    def test_inconsistent(self):
+        self.table.offsets[-1] = 10
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "overlays.npz")
+            save_overlay_table(self.table, path)
+            with self.assertRaises(ValueError):
+                load_overlay_table(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import unittest
+
+import numpy as np
+
+from guibbon import transform_matrix as tmat
+from guibbon.interactive_overlays import Layer
+from guibbon.overlay_rasterizer import OverlayRasterizer
+
+
+class FakeOverlay:
+    def __init__(self, points_xy):
+        self.points_xy = np.array(points_xy, dtype=float)
+        self.visible = True
+        self.rasterized = False
+        self.dragged = False
+        self.primitives_count = 0
+
+    def get_raster_primitives(self):
+        self.primitives_count += 1
+        return [self.points_xy], self.points_xy
+
+    def set_rasterized(self, value):
+        self.rasterized = value
+
+    def is_dragged(self):
+        return self.dragged
+
+
+class FakeLayers:
+    def __init__(self):
+        self.hidden_layers = set()
+
+    def is_visible(self, layer):
+        return layer not in self.hidden_layers
+
+
+class TestOverlayRasterizer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.mat = np.zeros(shape=(200, 200, 3), dtype=np.uint8)
+        self.overlays = [FakeOverlay([(10 + k, 10 + k), (100, 10 + k), (100, 100)]) for k in range(0, 50, 10)]
+        self.rasterizer = OverlayRasterizer(threshold=2)
+
+    def test_threshold(self):
+        self.assertFalse(self.rasterizer.update_enabled(self.overlays[:2]), "Rasterizer must be disabled below threshold")
+        self.assertTrue(self.rasterizer.update_enabled(self.overlays))
+        self.assertTrue(all(overlay.rasterized for overlay in self.overlays))
+        self.rasterizer.threshold = 10
+        self.assertFalse(self.rasterizer.update_enabled(self.overlays))
+        self.assertFalse(any(overlay.rasterized for overlay in self.overlays))
+
+    def test_render(self):
+        self.rasterizer.update_enabled(self.overlays)
+        res = self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        self.assertEqual(0, self.mat.max(), "Input image must not be modified")
+        self.assertListEqual(list(OverlayRasterizer.handle_color), res[10, 10].tolist(), "Handles must be drawn")
+        self.assertListEqual(list(OverlayRasterizer.line_color), res[10, 55].tolist(), "Lines must be drawn")
+        self.assertListEqual([0, 0, 0], res[190, 190].tolist())
+
+    def test_draw_live(self):
+        self.rasterizer.update_enabled(self.overlays)
+        res = self.rasterizer.draw_live(self.mat, tmat.I(), self.overlays)
+        self.assertEqual(0, res.max(), "Rasterized overlays are already in the viewport")
+
+        self.overlays[0].rasterized = False
+        self.overlays[1].rasterized = False
+        self.overlays[1].visible = False
+        res = self.rasterizer.draw_live(self.mat, tmat.I(), self.overlays)
+        self.assertEqual(0, self.mat.max(), "Input image must not be modified")
+        self.assertListEqual(list(OverlayRasterizer.handle_color), res[10, 10].tolist(), "Live overlays must be drawn")
+        self.assertListEqual([0, 0, 0], res[20, 60].tolist(), "Hidden overlays must not be drawn")
+
+    def test_cache(self):
+        self.rasterizer.update_enabled(self.overlays)
+        self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        layer = self.rasterizer.layer_rgb
+        self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        self.assertIs(layer, self.rasterizer.layer_rgb, "Raster layer must be cached for a same view transform")
+
+        self.rasterizer.render(self.mat, tmat.T((1, 2)), self.overlays)
+        self.assertIsNot(layer, self.rasterizer.layer_rgb, "Raster layer must be redrawn when the view transform changes")
+
+        counts = [overlay.primitives_count for overlay in self.overlays]
+        self.rasterizer.render(self.mat, tmat.T((1, 2)), self.overlays)
+        self.assertListEqual(counts, [overlay.primitives_count for overlay in self.overlays], "Unchanged overlays must not be projected again")
+
+    def test_dirty_rects(self):
+        self.mat = np.zeros(shape=(400, 400, 3), dtype=np.uint8)
+        self.rasterizer.update_enabled(self.overlays)
+        self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        layer = self.rasterizer.layer_rgb
+        counts = [overlay.primitives_count for overlay in self.overlays]
+
+        self.overlays[0].points_xy[0] = (20, 5)
+        self.rasterizer.request_render(self.overlays[0])
+        res = self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        self.assertIs(layer, self.rasterizer.layer_rgb, "Raster layer must be updated in place")
+        self.assertEqual(counts[0] + 1, self.overlays[0].primitives_count)
+        self.assertListEqual(counts[1:], [overlay.primitives_count for overlay in self.overlays[1:]], "Only the changed overlay must be projected again")
+        self.assertEqual(2, len(self.rasterizer.redrawn_rects), "Only the previous and new bounding rectangles of the overlay must be redrawn")
+        for x0, y0, x1, y1 in self.rasterizer.redrawn_rects:
+            self.assertLess((x1 - x0) * (y1 - y0), 400 * 400 // 4)
+
+        expected = OverlayRasterizer(threshold=2).render(self.mat, tmat.I(), self.overlays)
+        np.testing.assert_array_equal(expected, res, "Partial redraw must match a full redraw")
+
+        self.overlays[3].visible = False
+        res = self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        self.assertIs(layer, self.rasterizer.layer_rgb)
+        expected = OverlayRasterizer(threshold=2).render(self.mat, tmat.I(), self.overlays)
+        np.testing.assert_array_equal(expected, res, "Hidden overlay must be erased from the raster layer")
+
+    def test_request_render_while_rendering(self):
+        requests: list[None] = []
+        self.rasterizer.on_request_render = lambda: requests.append(None)
+        self.rasterizer.update_enabled(self.overlays)
+        self.rasterizer.is_rendering = True
+        self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        for overlay in self.overlays:
+            self.rasterizer.request_render(overlay)  # overlays updated to the rendered view
+        self.rasterizer.is_rendering = False
+        self.assertEqual(0, len(requests))
+        self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        self.assertListEqual([], self.rasterizer.redrawn_rects, "Overlays updated while rendering must not be drawn again")
+
+        self.rasterizer.request_render(self.overlays[0])
+        self.assertEqual(1, len(requests))
+
+    def test_hover(self):
+        self.rasterizer.update_enabled(self.overlays)
+        self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        self.assertIsNone(self.rasterizer.hit_test((150, 150)))
+        self.assertIs(self.overlays[2], self.rasterizer.hit_test((31, 30)))
+
+        self.assertTrue(self.rasterizer.update_hovered((31, 30), tmat.I()), "Hovering an overlay must change the live overlays")
+        self.assertFalse(self.rasterizer.update_hovered((30, 31), tmat.I()))
+        res = self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        self.assertFalse(self.overlays[2].rasterized, "Hovered overlay must be live")
+        self.assertListEqual([0, 0, 0], res[30, 60].tolist(), "Hovered overlay must not be rasterized")
+
+        self.overlays[2].dragged = True
+        self.assertFalse(self.rasterizer.update_hovered((150, 150), tmat.I()), "Dragged overlay must stay live")
+        self.overlays[2].dragged = False
+        self.assertTrue(self.rasterizer.update_hovered((150, 150), tmat.I()))
+        self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        self.assertTrue(self.overlays[2].rasterized)
+
+    def test_hidden_layers(self):
+        layers = FakeLayers()
+        self.rasterizer.layers = layers  # type: ignore
+        self.rasterizer.update_enabled(self.overlays)
+
+        layers.hidden_layers = {Layer.POLYGONS}
+        res = self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        self.assertListEqual([0, 0, 0], res[10, 55].tolist(), "Lines of a hidden layer must not be drawn")
+        self.assertListEqual([255, 255, 255], res[15, 10].tolist())
+
+        layers.hidden_layers = {Layer.HANDLES}
+        res = self.rasterizer.render(self.mat, tmat.I(), self.overlays)
+        self.assertListEqual(list(OverlayRasterizer.line_color), res[10, 55].tolist())
+        self.assertListEqual([0, 0, 0], res[15, 10].tolist(), "Handles of a hidden layer must not be drawn")
+        self.assertIsNone(self.rasterizer.hit_test((10, 10)), "Hidden handles must not be hovered")
+
+
+if __name__ == "__main__":
+    unittest.main()
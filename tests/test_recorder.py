@@ -0,0 +1,85 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from guibbon.recorder import VideoRecorder
+
+
+def make_frame(k: int) -> np.ndarray:
+    return np.full(shape=(24, 32, 3), fill_value=20 * k, dtype=np.uint8)
+
+
+class BlockingWriter:
+    def __init__(self):
+        self.event = threading.Event()
+        self.count = 0
+
+    def write(self, mat):
+        self.event.wait()
+        self.count += 1
+
+    def release(self):
+        pass
+
+
+class TestVideoRecorder(unittest.TestCase):
+    def test_record(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "record.avi")
+            recorder = VideoRecorder(path, fps=10, fourcc="MJPG")
+            for k in range(5):
+                self.assertTrue(recorder.push(make_frame(k), repeat=2 if k == 4 else 1))
+                time.sleep(0.01)
+            stats = recorder.close()
+            self.assertEqual(6, stats.captured)
+            self.assertEqual(6, stats.encoded)
+            self.assertEqual(0, stats.dropped)
+            self.assertEqual(5, stats.written)
+            self.assertGreaterEqual(stats.latency_max, stats.latency_mean)
+            self.assertGreater(stats.encode_time_mean, 0)
+
+            capture = cv2.VideoCapture(path)
+            self.assertEqual(6, int(capture.get(cv2.CAP_PROP_FRAME_COUNT)))
+            self.assertEqual(10, capture.get(cv2.CAP_PROP_FPS))
+            capture.release()
+
+    def test_backpressure(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            recorder = VideoRecorder(os.path.join(tmp_dir, "record.avi"), queue_size=1)
+            writer = BlockingWriter()
+            recorder.writer = writer  # type: ignore
+            recorder.push(make_frame(0))
+            deadline = time.perf_counter() + 5
+            while not recorder.queue.empty() and time.perf_counter() < deadline:
+                time.sleep(0.001)
+            self.assertTrue(recorder.push(make_frame(1)))
+            tic = time.perf_counter()
+            self.assertFalse(recorder.push(make_frame(2), repeat=3), "Frames must be dropped when the queue is full")
+            self.assertLess(time.perf_counter() - tic, 0.1, "push must not block")
+            writer.event.set()
+            stats = recorder.close()
+            self.assertEqual(3, stats.dropped)
+            self.assertEqual(2, stats.encoded)
+            self.assertEqual(2, writer.count)
+
+    def test_open_error(self):
+        with self.assertRaises(FileNotFoundError, msg="A missing directory must be reported when the recording starts"):
+            VideoRecorder(os.path.join("missing_dir", "record.avi"), fourcc="MJPG")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(ValueError, msg="The file must be opened by the constructor if the frame size is known"):
+                VideoRecorder(tmp_dir, fourcc="MJPG", frame_size_wh=(32, 24))
+
+            recorder = VideoRecorder(tmp_dir, fourcc="MJPG")  # a directory can not be opened as a video file
+            recorder.push(make_frame(0))
+            with self.assertRaises(ValueError):
+                recorder.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import multiprocessing
+import unittest
+
+import numpy as np
+
+from guibbon.shared_frames import SharedFrameReader, SharedFrameWriter
+
+
+def make_frame(k: int) -> np.ndarray:
+    frame = np.zeros(shape=(24, 32, 3), dtype=np.uint8)
+    frame[:, :, 0] = k  # blue
+    return frame
+
+
+def produce(name: str, count: int):
+    writer = SharedFrameWriter((24, 32), name=name)
+    for k in range(count):
+        writer.write(make_frame(k))
+    writer.close(unlink=False)
+
+
+class TestSharedFrames(unittest.TestCase):
+    def setUp(self) -> None:
+        self.writer = SharedFrameWriter((24, 32), slot_count=3)
+        self.reader = SharedFrameReader(self.writer.name)
+
+    def tearDown(self) -> None:
+        self.reader.close()
+        self.writer.close()
+
+    def test_latest(self):
+        self.assertIsNone(self.reader.get_latest())
+        for k in range(5):
+            self.assertEqual(k, self.writer.write(make_frame(k)))
+        frame = self.reader.get_latest()
+        assert frame is not None
+        self.assertEqual(4, frame.seq)
+        self.assertEqual((24, 32, 3), frame.mat_rgb.shape)
+        self.assertListEqual([0, 0, 4], frame.mat_rgb[0, 0].tolist(), "Frames are converted to RGB")
+        self.assertFalse(frame.mat_rgb.flags.owndata, "Frames must be views on the shared memory")
+        del frame
+
+        self.writer.write(np.zeros(shape=(10, 12), dtype=np.uint8))
+        frame = self.reader.get_latest()
+        assert frame is not None
+        self.assertEqual((10, 12, 3), frame.mat_rgb.shape, "Smaller frames and grayscale frames are supported")
+        del frame
+
+        with self.assertRaises(ValueError):
+            self.writer.write(np.zeros(shape=(48, 32, 3), dtype=np.uint8))
+
+    def test_torn_frame(self):
+        self.writer.write(make_frame(0))
+        frame = self.reader.get_latest()
+        assert frame is not None
+        self.writer.write(make_frame(1))
+        self.writer.write(make_frame(2))
+        self.assertTrue(self.reader.is_intact(frame))
+        self.writer.write(make_frame(3))
+        self.assertFalse(self.reader.is_intact(frame), "The slot of the frame was written again")
+        del frame
+
+    def test_torn_header(self):
+        self.writer.write(make_frame(0))
+        self.writer.write(np.zeros(shape=(10, 12), dtype=np.uint8))  # seq 1, slot 1
+        slot_header = self.reader.ring.slot_headers[1]
+        writer = self.writer
+
+        class ConcurrentHeader:
+            """The producer writes the next frames while the reader reads the shape of the frame in slot 1"""
+
+            def __getitem__(self, index):
+                value = slot_header[index]
+                if index == 3 and writer.next_seq == 2:  # SLOT_WIDTH
+                    writer.write(make_frame(2))
+                    writer.write(make_frame(3))
+                    writer.write(make_frame(4))  # slot 1 again, with a different shape
+                return value
+
+        self.reader.ring.slot_headers[1] = ConcurrentHeader()  # type: ignore
+        frame = self.reader.get_latest()
+        self.reader.ring.slot_headers[1] = slot_header
+        assert frame is not None
+        self.assertEqual(4, frame.seq, "A shape read while the slot was written must be read again")
+        self.assertEqual((24, 32, 3), frame.mat_rgb.shape)
+        del frame
+
+    def test_other_process(self):
+        name = self.writer.name + "_mp"
+        process = multiprocessing.get_context("spawn").Process(target=produce, args=(name, 7))
+        process.start()
+        process.join(timeout=60)
+        self.assertEqual(0, process.exitcode)
+        reader = SharedFrameReader(name)
+        frame = reader.get_latest()
+        assert frame is not None
+        self.assertEqual(6, frame.seq)
+        self.assertEqual(6, frame.mat_rgb[0, 0, 2])
+        del frame
+        shm = reader.ring.shm
+        reader.close()
+        shm.unlink()
+
+
+if __name__ == "__main__":
+    unittest.main()
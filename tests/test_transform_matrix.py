@@ -106,6 +106,21 @@ class TestTransformMatrix(unittest.TestCase):
         with self.assertRaises(TypeError):
             tmat.apply(np.array([1]), (0, 0))
 
+    def test_apply_array(self):
+        point_xy_list = [(0, 0), (1, 1), (-1, -1), (1.0, 2.3)]
+        mat = tmat.T((10, -20.5)) @ tmat.R(0.3) @ tmat.S((2, -2.3))
+        mat[2, :2] = [0.001, -0.002]  # add perspective component
+
+        points_res = tmat.apply_array(mat, np.array(point_xy_list))
+        self.assertEqual((len(point_xy_list), 2), points_res.shape)
+        for point_xy, point_res in zip(point_xy_list, points_res):
+            self.assertLess(maxdiff(tuple(point_res), tmat.apply(mat, point_xy)), 1e-12)
+
+        self.assertEqual((0, 2), tmat.apply_array(mat, np.zeros((0, 2))).shape, "Empty array must be supported")
+
+        with self.assertRaises(TypeError):
+            tmat.apply_array(np.array([1]), np.zeros((1, 2)))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock
+
+import cv2
+import numpy as np
+
+from guibbon.video_player import FrameReader, VideoPlayer
+
+
+def make_frames(n: int) -> list[np.ndarray]:
+    return [np.full(shape=(24, 32, 3), fill_value=20 * k, dtype=np.uint8) for k in range(n)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+class TestVideoPlayer(unittest.TestCase):
+    def make_player(self, source, **kwargs) -> VideoPlayer:
+        player = VideoPlayer(Mock(), source, **kwargs)
+        player.clock = self.clock = FakeClock()
+        self.addCleanup(player.close)
+        return player
+
+    def wait_decoded(self, player: VideoPlayer, n: int):
+        deadline = time.perf_counter() + 5
+        while player.reader.queue.qsize() < n and time.perf_counter() < deadline:
+            time.sleep(0.001)
+
+    def get_presented(self, player: VideoPlayer) -> list[int]:
+        return [int(round(call.args[0][0, 0, 0] / 20)) for call in player.image_viewer.imshow_rgb.call_args_list]
+
+    def test_pacing(self):
+        player = self.make_player(make_frames(5), fps=10)
+        player.start()
+        self.wait_decoded(player, 6)  # 5 frames and the end of the stream
+        for _ in range(20):
+            player.tick()
+            self.clock.t += 0.1
+        self.assertListEqual([0, 1, 2, 3, 4], self.get_presented(player))
+        self.assertTrue(player.is_finished)
+        stats = player.get_stats()
+        self.assertEqual(5, stats.presented)
+        self.assertEqual(0, stats.dropped)
+        self.assertEqual(5, stats.decoded)
+
+    def test_drop_late_frames(self):
+        player = self.make_player(make_frames(8), fps=10, queue_size=8)
+        player.start()
+        self.wait_decoded(player, 8)
+        player.tick()
+        self.clock.t = 0.35  # frames 1, 2 and 3 are due
+        player.tick()
+        self.assertListEqual([0, 3], self.get_presented(player))
+        self.assertEqual(2, player.get_stats().dropped)
+
+        self.clock.t = 0.39
+        self.assertAlmostEqual(0.01, player.tick(), msg="The next frame is due at t=0.4")
+        self.assertEqual(2, player.stats.presented)
+
+    def test_pause_step(self):
+        player = self.make_player(make_frames(5), fps=10)
+        player.start()
+        player.pause()
+        player.step()
+        player.step()
+        self.clock.t = 10
+        player.tick()
+        self.assertListEqual([0, 1], self.get_presented(player), "A paused player must only present the stepped frames")
+
+        player.play()
+        self.wait_decoded(player, 1)
+        player.tick()
+        self.assertListEqual([0, 1, 2], self.get_presented(player), "The clock must restart from the next frame")
+
+    def test_seek(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "video.avi")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter.fourcc(*"MJPG"), 25, (32, 24))
+            for frame in make_frames(10):
+                writer.write(frame)
+            writer.release()
+
+            player = self.make_player(path)
+            self.assertEqual(25, player.fps)
+            self.assertEqual(10, player.reader.frame_count)
+            player.start()
+            player.pause()
+            player.seek(6)
+            self.assertEqual(6, player.index)
+            self.assertListEqual([6], self.get_presented(player))
+            player.close()
+
+        with self.assertRaises(ValueError):
+            FrameReader(iter(make_frames(2))).seek(0)
+
+    def test_reader_error(self):
+        def broken_frames():
+            yield from make_frames(2)
+            raise RuntimeError("broken decoder")
+
+        player = self.make_player(broken_frames(), fps=10, loop=True)
+        player.start()
+        self.wait_decoded(player, 3)  # 2 frames and the end of the stream
+        for _ in range(10):
+            player.tick()
+            self.clock.t += 0.1
+        self.assertListEqual([0, 1], self.get_presented(player))
+        self.assertTrue(player.is_finished, "An error of the reader must end the stream")
+        with self.assertRaisesRegex(RuntimeError, "broken decoder"):
+            player.close()
+        player.close()  # raised once
+
+        player = VideoPlayer(Mock(), broken_frames(), fps=1000)
+        self.addCleanup(player.close)
+        with self.assertRaisesRegex(RuntimeError, "broken decoder"):
+            player.run(lambda: True)
+        stats = player.get_stats()
+        self.assertEqual(2, stats.presented + stats.dropped)
+
+
+if __name__ == "__main__":
+    unittest.main()
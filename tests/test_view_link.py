@@ -0,0 +1,117 @@
+import unittest
+from typing import Any
+from unittest.mock import Mock
+
+import cv2
+import numpy as np
+
+from guibbon.image_viewer import compute_img2can_matrix, compute_view_transform, warp_viewport
+from guibbon.view_link import ViewLink
+
+
+class FakeViewer:
+    """Attributes of ImageViewer used by the link"""
+
+    def __init__(self):
+        self.view_link: Any = None
+        self.canvas = Mock()
+        self.mat = np.zeros(shape=(100, 200, 3), dtype=np.uint8)
+        self.zoom_factor = 2.0
+        self.pan_xy = (0.0, 0.0)
+        self.cumulative_pan_xy = (0.0, 0.0)
+        self.is_hidden_value = False
+        self.draw_count = 0
+
+    def is_hidden(self) -> bool:
+        return self.is_hidden_value
+
+    def draw(self):
+        self.view_link.sync(self)
+        self.draw_count += 1
+
+
+def run_idle(viewers: list[FakeViewer]):
+    for viewer in viewers:
+        for call in viewer.canvas.after_idle.call_args_list:
+            call.args[0]()
+        viewer.canvas.after_idle.reset_mock()
+
+
+class TestViewLink(unittest.TestCase):
+    def test_coalesced_redraws(self):
+        viewers = [FakeViewer() for _ in range(3)]
+        link = ViewLink(viewers)  # type: ignore
+        run_idle(viewers)
+        self.assertEqual(2.0, link.zoom_factor, "The first viewer gives its pan and zoom to the link")
+
+        for k in range(10):  # mouse drag on the first viewer
+            link.set_panzoom(2.0, (float(k), 0.0))
+        self.assertEqual(1, sum(viewer.canvas.after_idle.call_count for viewer in viewers), "A single redraw must be scheduled")
+        for viewer in viewers:
+            self.assertEqual((9.0, 0.0), viewer.pan_xy)
+        draw_counts = [viewer.draw_count for viewer in viewers]
+        run_idle(viewers)
+        self.assertListEqual([count + 1 for count in draw_counts], [viewer.draw_count for viewer in viewers])
+
+        link.set_panzoom(2.0, (9.0, 0.0), cumulative_pan_xy=(9.0, 0.0))  # mouse release
+        self.assertEqual(0, sum(viewer.canvas.after_idle.call_count for viewer in viewers), "An unchanged view must not be redrawn")
+        self.assertEqual((9.0, 0.0), viewers[2].cumulative_pan_xy)
+
+    def test_hidden_viewer(self):
+        viewers = [FakeViewer() for _ in range(2)]
+        link = ViewLink(viewers)  # type: ignore
+        run_idle(viewers)
+        viewers[1].is_hidden_value = True
+        link.set_panzoom(4.0, (1.0, 2.0))
+        run_idle(viewers)
+        self.assertEqual(1, viewers[1].draw_count, "A hidden viewer must not be redrawn")
+        self.assertIn(viewers[1], link.dirty_viewers)
+        self.assertEqual(4.0, viewers[1].zoom_factor)
+
+    def test_closed_viewer(self):
+        viewers = [FakeViewer() for _ in range(3)]
+        link = ViewLink(viewers)  # type: ignore
+        run_idle(viewers)
+        link.set_panzoom(4.0, (1.0, 2.0))
+        scheduling_viewer = next(viewer for viewer in viewers if viewer.canvas.after_idle.call_count == 1)
+        draw_count = scheduling_viewer.draw_count
+
+        link.remove(scheduling_viewer)  # type: ignore  # its window is closed before the redraw
+        scheduling_viewer.canvas.after_cancel.assert_called_once()
+        scheduling_viewer.canvas.after_idle.reset_mock()
+        self.assertIsNone(scheduling_viewer.view_link)
+        run_idle(viewers)
+        self.assertEqual(draw_count, scheduling_viewer.draw_count, "A removed viewer must not be redrawn")
+        self.assertEqual(0, len(link.dirty_viewers), "The redraw must be scheduled again with the remaining viewers")
+
+        link.set_panzoom(4.0, (5.0, 0.0))  # pan
+        run_idle(viewers)
+        self.assertEqual(draw_count, scheduling_viewer.draw_count)
+        self.assertEqual(0, scheduling_viewer.canvas.after_idle.call_count)
+        self.assertEqual((1.0, 2.0), scheduling_viewer.pan_xy, "A removed viewer must not follow the link")
+
+    def test_shared_transform(self):
+        link = ViewLink()
+        link.set_panzoom(0.5, (10.0, 0.0))
+        transform = link.get_view_transform((720, 720), (100, 200))
+        self.assertIs(transform, link.get_view_transform((720, 720), (100, 200)))
+        self.assertIsNot(transform, link.get_view_transform((360, 720), (100, 200)))
+        stats = link.get_stats()
+        self.assertEqual(2, stats.transforms_computed)
+        self.assertEqual(1, stats.transforms_reused)
+        np.testing.assert_allclose(compute_img2can_matrix((720, 720), (100, 200), 0.5, (10.0, 0.0)), transform.img2can_matrix)
+        self.assertEqual((314, 334, 416, 386), transform.visible_roi)
+
+
+class TestWarpViewport(unittest.TestCase):
+    def test_visible_roi(self):
+        mat = np.random.default_rng(0).integers(0, 255, size=(300, 400, 3), dtype=np.uint8)
+        for zoom_factor, pan_xy in [(0.5, (0.0, 0.0)), (0.3, (-500.0, 100.0)), (4.0, (10.0, 0.0)), (0.1, (10000.0, 0.0))]:
+            transform = compute_view_transform((240, 320), mat.shape[:2], zoom_factor, pan_xy)
+            expected = warp_viewport(mat, transform.img2can_matrix, (240, 320), cv2.INTER_LINEAR)
+            actual = warp_viewport(mat, transform.img2can_matrix, (240, 320), cv2.INTER_LINEAR, transform.visible_roi)
+            np.testing.assert_array_equal(expected, actual, "Warping the visible rectangle only must give the same viewport")
+
+
+if __name__ == "__main__":
+    unittest.main()